@@ -17,6 +17,9 @@ Usage:
 
     # List all available results
     python compare_benchmark_results.py --list
+
+    # Compare Ink engine benchmark runs (interactive_fiction/benchmarks)
+    python compare_benchmark_results.py --results-dir ../interactive_fiction/benchmarks/benchmark_results
 """
 
 from __future__ import annotations
@@ -296,6 +299,88 @@ def compare_metrics(results: list[dict[str, Any]]) -> None:
     print()
 
 
+def compare_story_config(results: list[dict[str, Any]]) -> None:
+    """
+    Compare synthetic story shape across Ink engine benchmark results.
+
+    Prints nothing for results without a "story" section (Locust runs).
+
+    Args:
+        results: List of result dictionaries
+    """
+    if not any("story" in r for r in results):
+        return
+
+    print("Story Configuration:")
+    print("-" * 100)
+
+    header = f"{'Setting':<25}"
+    for i in range(len(results)):
+        header += f" | Run {i+1:2d}{'':>12}"
+    print(header)
+    print("-" * 100)
+
+    keys = sorted({key for r in results for key in r.get("story", {})})
+    for key in keys:
+        row = f"{key:<25}"
+        values = [r.get("story", {}).get(key, "N/A") for r in results]
+        for value in values:
+            row += f" | {str(value):>16}"
+
+        # Runs of differently sized stories aren't directly comparable
+        if len(set(values)) > 1:
+            row += " ⚠️  CHANGED"
+
+        print(row)
+
+    print("-" * 100)
+    print()
+
+
+def compare_memory(results: list[dict[str, Any]]) -> None:
+    """
+    Compare memory measurements across results (lower is better).
+
+    Prints nothing for results without a "memory" section (Locust runs).
+
+    Args:
+        results: List of result dictionaries
+    """
+    if not any("memory" in r for r in results):
+        return
+
+    print("Memory:")
+    print("-" * 100)
+
+    header = f"{'Metric':<25}"
+    for i in range(len(results)):
+        header += f" | Run {i+1:2d}{'':>12}"
+    if len(results) > 1:
+        header += " | Change"
+    print(header)
+    print("-" * 100)
+
+    keys = sorted({key for r in results for key in r.get("memory", {})})
+    for key in keys:
+        row = f"{key:<25}"
+        values = [r.get("memory", {}).get(key, 0) for r in results]
+        for value in values:
+            row += f" | {format_bytes(value):>16}"
+
+        if len(values) > 1:
+            change = format_percent_change(values[0], values[-1])
+            if change != "N/A" and change != "0.0%":
+                indicator = "✗" if "+" in change else "✓"
+                row += f" | {change:>8} {indicator}"
+            else:
+                row += f" | {change:>8}  "
+
+        print(row)
+
+    print("-" * 100)
+    print()
+
+
 def compare_endpoints(results: list[dict[str, Any]]) -> None:
     """
     Compare per-endpoint metrics across results.
@@ -440,7 +525,9 @@ def main() -> int:
     # Print comparison
     print_comparison_header(result_files)
     compare_server_config(results)
+    compare_story_config(results)
     compare_metrics(results)
+    compare_memory(results)
     compare_endpoints(results)
 
     return 0
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import os
+from collections.abc import Iterator
 from pathlib import Path
 
 from django.conf import settings
@@ -102,6 +103,38 @@ def return_disk_listing_sync(fqpn: str) -> tuple[bool, dict]:
         return False, {}
 
 
+def iter_disk_listing(fqpn: str) -> Iterator[tuple[str, Path]]:
+    """
+    Lazily yield filtered directory entries, one at a time.
+
+    Streaming counterpart of return_disk_listing_sync() for very large
+    directories: os.scandir() is consumed incrementally, so the caller can
+    process entries in bounded chunks instead of holding the whole listing.
+    Applies the same EXTENSIONS_TO_IGNORE, FILES_TO_IGNORE and
+    IGNORE_DOT_FILES filtering.
+
+    Args:
+        fqpn: The fully qualified pathname of the directory to scan
+
+    Yields:
+        (title_cased_name, Path) tuples, same shape as the
+        return_disk_listing_sync() dict items
+
+    Raises:
+        OSError: (FileNotFoundError, NotADirectoryError, ...) on the first
+            next() call if the directory can't be opened
+    """
+    ext_ignore = settings.EXTENSIONS_TO_IGNORE
+    files_ignore = settings.FILES_TO_IGNORE
+    ignore_dots = settings.IGNORE_DOT_FILES
+
+    with os.scandir(fqpn) as scanner:
+        for item in scanner:
+            processed_item = _filter_and_process_item(item, ext_ignore, files_ignore, ignore_dots)
+            if processed_item:
+                yield processed_item
+
+
 async def return_disk_listing(fqpn, **kwargs) -> tuple[bool, dict]:
     """
     Async version of return_disk_listing. Delegates to sync version via thread.
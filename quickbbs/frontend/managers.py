@@ -31,7 +31,7 @@ from quickbbs.cache_registry import layout_manager_cache
 from quickbbs.common import normalize_sha_input
 from quickbbs.directoryindex import get_ordered_sibling_dirs
 from quickbbs.fileindex import FILEINDEX_SR_FILETYPE_HOME_VIRTUAL
-from quickbbs.models import FileIndex
+from quickbbs.models import FileIndex, MediaProbe
 from thumbnails.models import ThumbnailFiles
 
 
@@ -88,7 +88,8 @@ def build_context_info(
         # Deduplicate - cached distinct SHA list (distinct_files_cache)
         all_shas = directory_entry.get_distinct_file_shas(sort=sort_order_value, user=user)
 
-    # Get pagination data inline
+    # Get pagination data inline. all_shas is normally a PackedShaList, whose
+    # index() is an O(1) position-table lookup rather than a linear scan.
     try:
         current_page = all_shas.index(unique_file_sha256) + 1
     except ValueError:
@@ -105,6 +106,9 @@ def build_context_info(
     # overall position (dirs_count + N - 1), which determines which gallery page it appears on.
     dirs_count = directory_entry.get_dir_counts()
 
+    # Stored stream metadata (scan --add_thumbnails); None until the file is probed
+    media_probe = MediaProbe.for_sha(entry.file_sha256) if entry.filetype.is_movie or entry.filetype.is_audio else None
+
     # Single comprehensive dictionary creation
     context = {
         # Core data
@@ -127,7 +131,8 @@ def build_context_info(
         "filename": entry.name,
         "gallery_name": "",  # Don't show filename in breadcrumb (already shown in title)
         "filesize": entry.size,
-        "duration": entry.duration,
+        "duration": entry.duration if entry.duration is not None or media_probe is None else media_probe.duration,
+        "media_probe": media_probe,
         "is_animated": entry.is_animated,
         "lastmod": entry.lastmod,
         "lastmod_ds": datetime.datetime.fromtimestamp(entry.lastmod).strftime("%m/%d/%y %H:%M:%S"),
@@ -6,12 +6,19 @@ from __future__ import annotations
 
 from collections import defaultdict
 
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
 from quickbbs.common import require_login_if_configured
 from quickbbs.fileindex import FileIndex
+from thumbnails.engine import find_similar_groups, hamming_distance
+from thumbnails.models import ThumbnailFiles
+
+# dHash of an image with no horizontal gradient at all (solid colour, blank
+# page): every such image has it, so it says nothing about similarity.
+_UNIFORM_HASH = 0
 
 
 def _get_duplicate_sha_data() -> dict:
@@ -111,3 +118,126 @@ def duplicate_files_report(request: HttpRequest) -> HttpResponse:
         context,
         using="Jinja2",
     )
+
+
+def _get_near_duplicate_data(max_distance: int) -> dict:
+    """
+    Group visually similar images by their thumbnails' perceptual hashes.
+
+    The byte-identical counterpart of _get_duplicate_sha_data(): here each
+    distinct file_sha256 is one image, and images whose small thumbnails'
+    perceptual hashes are within max_distance bits of each other (directly
+    or through a chain of similar images) form a group.
+
+    Args:
+        max_distance: Largest Hamming distance between similar hashes
+
+    Returns:
+        Dictionary with 'groups' (largest first, at most
+        NEAR_DUPLICATE_REPORT_MAX_GROUPS; each with its images, closest to
+        the group's first image first, and their file locations),
+        'total_groups', 'total_images' and 'total_files' counts of the
+        groups shown, and 'found_groups' (groups found, shown or not).
+    """
+    # Query 1: the hash of every thumbnail a live image file uses
+    live_images = FileIndex.objects.filter(new_ftnail=OuterRef("pk"), delete_pending=False, filetype__is_image=True)
+    rows = list(
+        ThumbnailFiles.objects.filter(Exists(live_images), perceptual_hash__isnull=False)
+        .exclude(perceptual_hash=_UNIFORM_HASH)
+        .values_list("sha256_hash", "perceptual_hash")
+    )
+    found = find_similar_groups([perceptual_hash for _, perceptual_hash in rows], max_distance)
+    shown = found[: settings.NEAR_DUPLICATE_REPORT_MAX_GROUPS]
+
+    if not shown:
+        return {"groups": [], "total_groups": 0, "total_images": 0, "total_files": 0, "found_groups": len(found)}
+
+    # Query 2: every file location of the grouped images in one query
+    all_files = (
+        FileIndex.objects.filter(
+            file_sha256__in=[rows[index][0] for group in shown for index in group],
+            delete_pending=False,
+        )
+        .values("file_sha256", "name", "size", "home_directory__fqpndirectory")
+        .order_by("home_directory__fqpndirectory", "name")
+    )
+    files_by_sha: dict[str, list[dict]] = defaultdict(list)
+    for f in all_files:
+        files_by_sha[f["file_sha256"]].append(
+            {
+                "name": f["name"],
+                "size": f["size"],
+                "directory": f["home_directory__fqpndirectory"] or "(unknown)",
+            }
+        )
+
+    groups = []
+    total_images = 0
+    total_files = 0
+    for group in shown:
+        reference = rows[group[0]][1]
+        images = sorted(
+            (
+                {
+                    "sha256": sha256,
+                    "distance": hamming_distance(reference, perceptual_hash),
+                    "files": files_by_sha.get(sha256, []),
+                }
+                for sha256, perceptual_hash in (rows[index] for index in group)
+            ),
+            key=lambda image: image["distance"],
+        )
+        file_count = sum(len(image["files"]) for image in images)
+        groups.append({"count": len(images), "file_count": file_count, "images": images})
+        total_images += len(images)
+        total_files += file_count
+
+    return {
+        "groups": groups,
+        "total_groups": len(groups),
+        "total_images": total_images,
+        "total_files": total_files,
+        "found_groups": len(found),
+    }
+
+
+@require_login_if_configured
+def near_duplicate_files_report(request: HttpRequest) -> HttpResponse:
+    """
+    Display a report of visually similar images (resized, re-encoded copies).
+
+    Groups images whose thumbnails' perceptual hashes differ in at most
+    NEAR_DUPLICATE_MAX_DISTANCE bits (?distance= overrides it, clamped to
+    0..NEAR_DUPLICATE_DISTANCE_LIMIT), largest groups first, with the file
+    locations of each image.
+
+    Args:
+        request: HttpRequest object
+
+    Returns:
+        HttpResponse with rendered report
+    """
+    try:
+        max_distance = int(request.GET.get("distance", settings.NEAR_DUPLICATE_MAX_DISTANCE))
+    except ValueError:
+        max_distance = settings.NEAR_DUPLICATE_MAX_DISTANCE
+    max_distance = max(0, min(max_distance, settings.NEAR_DUPLICATE_DISTANCE_LIMIT))
+
+    data = _get_near_duplicate_data(max_distance)
+
+    context = {
+        "groups": data["groups"],
+        "total_groups": data["total_groups"],
+        "total_images": data["total_images"],
+        "total_files": data["total_files"],
+        "found_groups": data["found_groups"],
+        "max_distance": max_distance,
+        "distance_limit": settings.NEAR_DUPLICATE_DISTANCE_LIMIT,
+    }
+
+    return render(
+        request,
+        "reports/near_duplicate_files.jinja",
+        context,
+        using="Jinja2",
+    )
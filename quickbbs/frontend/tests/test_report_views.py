@@ -11,9 +11,10 @@ from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 
 from filetypes.models import filetypes
-from frontend.report_views import _get_duplicate_sha_data
+from frontend.report_views import _get_duplicate_sha_data, _get_near_duplicate_data
 from frontend.tests.test_views import assert_not_login_redirect
 from quickbbs.models import DirectoryIndex, FileIndex
+from thumbnails.models import ThumbnailFiles
 
 
 def _get_ft(fileext: str) -> filetypes:
@@ -136,3 +137,99 @@ class TestDuplicateFilesReportView(DuplicateReportTestBase):
         """The rendered report includes the duplicated SHA256."""
         response = self._get_report()
         assert self.dup_sha.encode() in response.content
+
+
+class NearDuplicateReportTestBase(DuplicateReportTestBase):
+    """Adds image files whose thumbnails carry perceptual hashes.
+
+    Three similar images (hashes 1-2 bits apart, one with two copies), one
+    unrelated image, one uniform image (hash 0) and a similar-hashed .txt
+    file, which is not an image and must be ignored.
+    """
+
+    SIMILAR = (0x0123_4567_89AB_CDEF, 0x0123_4567_89AB_CDEE, 0x0123_4567_89AB_CDEC)
+
+    def setUp(self) -> None:
+        super().setUp()
+        jpg = _get_ft(".jpg")
+        self.similar_shas = [_sha(f"sim{i}") for i in range(3)]
+        for i, (sha, value) in enumerate(zip(self.similar_shas, self.SIMILAR)):
+            self._image(f"similar_{i}.jpg", sha, value, jpg)
+        self._image("similar_0_copy.jpg", self.similar_shas[0], None, jpg, unique=_sha("ucopy"))
+        self._image("unrelated.jpg", _sha("other"), -0x0123_4567_89AB_CDF0, jpg)
+        self._image("blank.jpg", _sha("blank0"), 0, jpg)
+        self._image("blank_too.jpg", _sha("blank1"), 0, jpg)
+        self._image("lookalike.txt", _sha("text"), self.SIMILAR[0] ^ 1, _get_ft(".txt"))
+
+    def _image(self, name: str, file_sha: str, value: int | None, ft: filetypes, unique: str | None = None) -> None:
+        """Create a FileIndex row pointing at a (shared) thumbnail row with the given hash."""
+        thumbnail, _ = ThumbnailFiles.objects.get_or_create(sha256_hash=file_sha, defaults={"perceptual_hash": value})
+        file_index = _make_fileindex(self.dir_obj, name, file_sha, unique or _sha(f"u{name}"), ft)
+        file_index.new_ftnail = thumbnail
+        file_index.save(update_fields=["new_ftnail"])
+
+
+@pytest.mark.api
+class TestGetNearDuplicateData(NearDuplicateReportTestBase):
+    """api-layer: _get_near_duplicate_data grouping."""
+
+    def test_similar_images_form_one_group(self):
+        """The three similar images are grouped, closest to the first one first."""
+        result = _get_near_duplicate_data(2)
+        assert result["total_groups"] == result["found_groups"] == 1
+        group = result["groups"][0]
+        assert [image["sha256"] for image in group["images"]] == self.similar_shas
+        assert [image["distance"] for image in group["images"]] == [0, 1, 2]
+        assert group["file_count"] == result["total_files"] == 4
+
+    def test_distance_limits_the_group(self):
+        """At distance 1 the third image (2 bits from the first, 1 from the second) still chains in; at 0 nothing groups."""
+        assert _get_near_duplicate_data(1)["total_images"] == 3
+        assert _get_near_duplicate_data(0)["groups"] == []
+
+    def test_uniform_and_non_image_hashes_are_ignored(self):
+        """Hash-0 images and non-image files never appear in a group."""
+        result = _get_near_duplicate_data(2)
+        names = {f["name"] for group in result["groups"] for image in group["images"] for f in image["files"]}
+        assert not names & {"blank.jpg", "blank_too.jpg", "lookalike.txt", "unrelated.jpg"}
+
+    @override_settings(NEAR_DUPLICATE_REPORT_MAX_GROUPS=0)
+    def test_group_cap(self):
+        """Groups beyond NEAR_DUPLICATE_REPORT_MAX_GROUPS are counted but not shown."""
+        result = _get_near_duplicate_data(2)
+        assert result["groups"] == []
+        assert result["found_groups"] == 1
+
+
+@pytest.mark.web
+class TestNearDuplicateFilesReportView(NearDuplicateReportTestBase):
+    """web-layer: near_duplicate_files_report via /reports/near_duplicate_files.html"""
+
+    REPORT_URL = "/reports/near_duplicate_files.html"
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(username="reportuser", password="pw")
+        self.client.force_login(self.user)
+
+    def test_report_shows_similar_images(self):
+        """The rendered report lists every copy of the grouped images."""
+        response = self.client.get(self.REPORT_URL, secure=True)
+        assert_not_login_redirect(response, self.REPORT_URL)
+        assert response.status_code == 200
+        for sha in self.similar_shas:
+            assert sha.encode() in response.content
+        assert b"similar_0_copy.jpg" in response.content
+
+    def test_bad_distance_falls_back_to_the_default(self):
+        """A non-numeric ?distance= renders with NEAR_DUPLICATE_MAX_DISTANCE."""
+        response = self.client.get(self.REPORT_URL, {"distance": "many"}, secure=True)
+        assert response.status_code == 200
+        assert b'value="4"' in response.content
+
+    def test_distance_is_clamped_to_the_limit(self):
+        """A ?distance= above NEAR_DUPLICATE_DISTANCE_LIMIT renders with the limit."""
+        response = self.client.get(self.REPORT_URL, {"distance": "12"}, secure=True)
+        assert response.status_code == 200
+        assert b'value="8"' in response.content
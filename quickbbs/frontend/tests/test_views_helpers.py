@@ -6,15 +6,22 @@ from unittest import mock
 
 import pytest
 from django.db.utils import DatabaseError
-from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 
 from frontend.views import (
+    _get_paginated_search_results,
     create_search_regex_pattern,
     get_page_param,
     get_search_results,
+    normalize_search_text,
+)
+from quickbbs.cache_registry import (
+    clear_layout_cache_for_directories,
+    search_results_cache,
 )
 from quickbbs.fileindex import FileIndex
 from quickbbs.models import DirectoryIndex
+from quickbbs.tests.test_sync import SyncTestBase
 
 pytestmark = pytest.mark.api
 
@@ -126,3 +133,82 @@ class TestSafeRegexSearchFallback(TestCase):
                 ("fqpndirectory",),
             )
             assert not list(qs)
+
+
+class TestNormalizeSearchText(SimpleTestCase):
+    """Tests for normalize_search_text (search result cache keys)."""
+
+    def test_case_and_separators_are_normalized(self):
+        """Texts giving equivalent patterns share one normalized form."""
+        assert normalize_search_text("  My_Photo-Album ") == normalize_search_text("my photo album") == "my photo album"
+
+    def test_separator_runs_are_not_collapsed(self):
+        """Each separator is its own pattern element, so runs keep their length."""
+        assert normalize_search_text("a _b") == "a  b"
+        assert create_search_regex_pattern("a _b") != create_search_regex_pattern("a b")
+
+
+class TestSearchResultCache(SyncTestBase):
+    """_get_paginated_search_results: cached pages, refinement, invalidation."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        search_results_cache.clear()
+        for name in ("beach_day_1.txt", "beach_day_2.txt", "beach_night.txt", "city_day.txt"):
+            self.write_file(name)
+        self.sync()
+
+    def tearDown(self) -> None:
+        search_results_cache.clear()
+        super().tearDown()
+
+    def search(self, text: str, page: int = 1, per_page: int = 2) -> tuple[list, list, int]:
+        """Run one page of a search, sorted by name."""
+        return _get_paginated_search_results(text, create_search_regex_pattern(text), 0, page, per_page)
+
+    def names(self, file_pks: list[int]) -> list[str]:
+        """Return the lowercased names of file_pks, in order."""
+        names = dict(FileIndex.objects.filter(pk__in=file_pks).values_list("pk", "name"))
+        return [names[pk].lower() for pk in file_pks]
+
+    def test_later_pages_come_from_the_cache(self):
+        """The first page reads the whole result; paging through it costs no query."""
+        _, first, total = self.search("beach")
+        with self.assertNumQueries(0):
+            _, second, _ = self.search("Beach", page=2)
+        assert total == 3
+        assert self.names(first + second) == ["beach_day_1.txt", "beach_day_2.txt", "beach_night.txt"]
+
+    def test_refinement_is_filtered_in_memory(self):
+        """A query containing a cached one is narrowed from its hits, in order."""
+        self.search("day")
+        # Only the content match (SearchDocument) is queried again
+        with self.assertNumQueries(1):
+            _, files, total = self.search("beach-day", per_page=10)
+        assert total == 2
+        assert self.names(files) == ["beach_day_1.txt", "beach_day_2.txt"]
+
+    def test_new_file_retires_cached_results(self):
+        """A sync that creates a file bumps the generation."""
+        self.search("beach")
+        self.write_file("beach_dawn.txt")
+        self.sync()
+        _, _, total = self.search("beach")
+        assert total == 4
+
+    def test_layout_invalidation_keeps_cached_results(self):
+        """Clearing a directory's layout caches (thumbnails, favorites, rescans) leaves searches cached."""
+        self.search("beach")
+        clear_layout_cache_for_directories({self.dir_obj.pk})
+        with self.assertNumQueries(0):
+            _, _, total = self.search("beach")
+        assert total == 3
+
+    @override_settings(SEARCH_RESULTS_CACHE_MAX_ITEMS=2)
+    def test_large_results_page_through_the_database(self):
+        """Results over SEARCH_RESULTS_CACHE_MAX_ITEMS are not cached."""
+        _, first, total = self.search("beach")
+        _, second, _ = self.search("beach", page=2)
+        assert total == 3
+        assert len(search_results_cache) == 0
+        assert self.names(first + second) == ["beach_day_1.txt", "beach_day_2.txt", "beach_night.txt"]
@@ -17,6 +17,7 @@ import time
 import urllib.parse
 
 from asgiref.sync import sync_to_async
+from cachetools.keys import hashkey
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.handlers.wsgi import WSGIRequest
@@ -45,6 +46,7 @@ from frontend.utilities import (
     get_sort_param,
     return_breadcrumbs,
 )
+from quickbbs.cache_registry import search_generation, search_results_cache
 from quickbbs.common import (
     DIR_SORT_MATRIX,
     SORT_MATRIX,
@@ -65,9 +67,21 @@ from quickbbs.models import (
     DirectoryIndex,
     Favorite,
     FileIndex,
+    SearchDocument,
+    media_probe_annotations,
 )
 from quickbbs.MonitoredCache import ThreadSafeTTLCache
-from quickbbs.tasks import generate_missing_thumbnails, snapshot_cache_statistics
+from quickbbs.tasks import snapshot_cache_statistics
+from thumbnails.generation_queue import (
+    QUEUE_PRIORITY_DIRECTORY,
+    QUEUE_PRIORITY_PAGE,
+    enqueue_thumbnails,
+)
+from thumbnails.models import (
+    thumbnail_missing_annotations,
+    thumbnail_multipart_url,
+    thumbnail_version_annotations,
+)
 
 # =============================================================================
 # SEARCH PREFETCH_RELATED CONSTANTS
@@ -268,6 +282,31 @@ def create_search_regex_pattern(text: str) -> str:
     return pattern if len(pattern) <= 500 else ""
 
 
+# Maps each separator create_search_regex_pattern() treats as interchangeable
+# to one representative, character for character.
+_SEARCH_SEPARATORS = str.maketrans({"_": " ", "-": " "})
+
+
+def normalize_search_text(text: str) -> str:
+    """
+    Reduce search text to the form used to key the search result cache.
+
+    Two texts with the same normalized form produce equivalent patterns:
+    the search is case-insensitive, and each space/underscore/dash becomes
+    the same separator class. Separators are mapped one for one, not
+    collapsed: each one is its own separator class in the pattern. If one
+    normalized text contains another, everything the longer one matches is
+    matched by the shorter one as well.
+
+    Args:
+        text: The search text as entered
+
+    Returns:
+        Normalized text ("" for empty or whitespace-only input)
+    """
+    return (text or "").strip().lower().translate(_SEARCH_SEPARATORS)
+
+
 def _safe_regex_search(
     model,
     field_name: str,
@@ -412,6 +451,114 @@ def get_search_results(  # pylint: disable=too-many-arguments
     return dirs, files
 
 
+def _get_content_hits(searchtext: str, name_hits: tuple, limit: int) -> tuple:
+    """
+    Return the files whose indexed text or metadata matches, best match first.
+
+    Every live copy of each matching content (SearchDocument.ranked_shas())
+    is returned, in rank order and by name within a content, leaving out
+    the files already found by name.
+
+    Args:
+        searchtext: The search text as entered
+        name_hits: The file hits of the name search ((pk, name) pairs)
+        limit: Maximum number of hits to return
+
+    Returns:
+        Tuple of (pk, name) pairs
+    """
+    if limit <= 0:
+        return ()
+    shas = SearchDocument.ranked_shas(searchtext, limit)
+    if not shas:
+        return ()
+    rank = {sha: index for index, sha in enumerate(shas)}
+    found = {pk for pk, _ in name_hits}
+    rows = FileIndex.objects.filter(file_sha256__in=shas, delete_pending=False).values_list("pk", "name", "file_sha256")
+    hits = sorted((row for row in rows if row[0] not in found), key=lambda row: (rank[row[2]], row[1].lower()))
+    return tuple((pk, name) for pk, name, _ in hits[:limit])
+
+
+def _refine_search_hits(searchtext: str, regex_pattern: str, sort_order: int, generation: int) -> tuple | None:
+    """
+    Narrow a cached broader search down to this one, in memory.
+
+    A cached query whose normalized text is contained in this one's matched
+    a superset of this query's name results (see normalize_search_text()),
+    in the same order — so this query's name results are the cached hits
+    whose text also matches regex_pattern. The narrowest such entry is
+    used. Content matches don't narrow that way (the words are stemmed and
+    ranked), so they are queried again (_get_content_hits()).
+
+    Args:
+        searchtext: The search text as entered
+        regex_pattern: create_search_regex_pattern(searchtext)
+        sort_order: Sort order index
+        generation: The search generation the result must belong to
+
+    Returns:
+        (directory hits, file hits, content hits) as stored in
+        search_results_cache, or None if no cached query is a superset of
+        this one
+    """
+    normalized = normalize_search_text(searchtext)
+    superset = None
+    for key in list(search_results_cache.keys()):
+        prior, prior_sort, prior_generation = key
+        if prior_sort != sort_order or prior_generation != generation or prior == normalized or prior not in normalized:
+            continue
+        hits = search_results_cache.get(key)
+        if hits is not None and (superset is None or len(hits[0]) + len(hits[1]) < len(superset[0]) + len(superset[1])):
+            superset = hits
+    if superset is None:
+        return None
+
+    matcher = re.compile(regex_pattern, re.IGNORECASE)
+    dirs = tuple(hit for hit in superset[0] if matcher.search(hit[1]))
+    files = tuple(hit for hit in superset[1] if matcher.search(hit[1]))
+    return dirs, files, _get_content_hits(searchtext, files, settings.SEARCH_RESULTS_CACHE_MAX_ITEMS - len(dirs) - len(files))
+
+
+def _get_search_hits(searchtext: str, regex_pattern: str, sort_order: int) -> tuple | None:
+    """
+    Return every hit of a search, in display order, from search_results_cache.
+
+    On a miss the result is taken from a cached broader query when there is
+    one (_refine_search_hits()), otherwise read from the database as
+    ordered (pk, searched text) pairs — unless it has more than
+    SEARCH_RESULTS_CACHE_MAX_ITEMS name hits, which are left to DB-level
+    paging. Files found by their indexed content (_get_content_hits()) fill
+    the rest of the cap and are shown after the name matches.
+
+    Args:
+        searchtext: The search text as entered
+        regex_pattern: create_search_regex_pattern(searchtext)
+        sort_order: Sort order index
+
+    Returns:
+        (directory hits, file hits, content hits), each a tuple of (pk,
+        fqpndirectory or name) pairs, or None if the result is too large to
+        cache
+    """
+    generation = search_generation()
+    key = hashkey(normalize_search_text(searchtext), sort_order, generation)
+    hits = search_results_cache.get(key)
+    if hits is not None:
+        return hits
+
+    hits = _refine_search_hits(searchtext, regex_pattern, sort_order, generation)
+    if hits is None:
+        max_items = settings.SEARCH_RESULTS_CACHE_MAX_ITEMS
+        dirs_qs, files_qs = get_search_results(searchtext, regex_pattern, sort_order, (), (), include_annotations=False)
+        dirs = tuple(dirs_qs.values_list("pk", "fqpndirectory")[: max_items + 1])
+        files = tuple(files_qs.values_list("pk", "name")[: max_items + 1 - len(dirs)]) if len(dirs) <= max_items else ()
+        if len(dirs) + len(files) > max_items:
+            return None
+        hits = (dirs, files, _get_content_hits(searchtext, files, max_items - len(dirs) - len(files)))
+    search_results_cache[key] = hits
+    return hits
+
+
 def _get_paginated_search_results(
     searchtext: str,
     regex_pattern: str,
@@ -420,15 +567,16 @@ def _get_paginated_search_results(
     items_per_page: int,
 ) -> tuple[list, list, int]:
     """
-    Get search results for a single page using DB-level pagination.
-
-    Mirrors the layout_manager pattern: COUNT first, then LIMIT/OFFSET slices
-    using calculate_page_bounds(). Only fetches SHA values from the DB, then
-    hydrates full objects via __in lookups — identical to how view_gallery()
-    consumes layout_manager output.
+    Get search results for a single page.
 
-    Reduces async/sync boundary crossings to 1 and avoids fetching objects
-    for pages that will never be rendered.
+    The whole result is normally held in search_results_cache
+    (_get_search_hits()), so paging through it, or re-running it, costs no
+    query; files matched by content follow the files matched by name.
+    Results too large to cache fall back to the layout_manager pattern
+    (name matches only): COUNT first, then LIMIT/OFFSET slices using
+    calculate_page_bounds(). Either way only pks are returned; the caller
+    hydrates full objects via __in lookups, as view_gallery() does with
+    layout_manager output.
 
     Args:
         searchtext: Original search text for fallback
@@ -438,12 +586,26 @@ def _get_paginated_search_results(
         items_per_page: Number of items per page
 
     Returns:
-        Tuple of (directory_sha_list, file_sha_list, total_count). The SHAs
-        correspond to ``page`` clamped into the valid 1..total_pages range, so
-        an out-of-range page request returns the last page's items rather than
-        an empty slice.
+        Tuple of (directory_pk_list, file_pk_list, total_count), each list
+        in display order. The pks correspond to ``page`` clamped into the
+        valid 1..total_pages range, so an out-of-range page request returns
+        the last page's items rather than an empty slice.
     """
-    # Pass empty prefetch tuples and skip annotations — we only need SHA values
+    if not regex_pattern:
+        return [], [], 0
+
+    hits = _get_search_hits(searchtext, regex_pattern, sort_order)
+    if hits is not None:
+        dirs, files, content = hits
+        files += content
+        total = len(dirs) + len(files)
+        total_pages = max(1, math.ceil(total / items_per_page))
+        bounds = calculate_page_bounds(max(1, min(page, total_pages)), items_per_page, len(dirs))
+        dir_pks = [pk for pk, _ in dirs[slice(*bounds["dirs_slice"])]] if bounds["dirs_slice"] else []
+        file_pks = [pk for pk, _ in files[slice(*bounds["files_slice"])]] if bounds["files_slice"] else []
+        return dir_pks, file_pks, total
+
+    # Pass empty prefetch tuples and skip annotations — we only need pks
     # here for pagination, so the sliced query stays a plain filtered scan.
     # Full object hydration (with prefetch/annotate) happens in the caller via __in lookups.
     dirs_qs, files_qs = get_search_results(searchtext, regex_pattern, sort_order, (), (), include_annotations=False)
@@ -461,17 +623,17 @@ def _get_paginated_search_results(
 
     bounds = calculate_page_bounds(page, items_per_page, dirs_count)
 
-    dir_shas = []
+    dir_pks = []
     if bounds["dirs_slice"]:
         start, end = bounds["dirs_slice"]
-        dir_shas = list(dirs_qs[start:end].values_list("dir_fqpn_sha256", flat=True))
+        dir_pks = list(dirs_qs[start:end].values_list("pk", flat=True))
 
-    file_shas = []
+    file_pks = []
     if bounds["files_slice"]:
         start, end = bounds["files_slice"]
-        file_shas = list(files_qs[start:end].values_list("unique_sha256", flat=True))
+        file_pks = list(files_qs[start:end].values_list("pk", flat=True))
 
-    return dir_shas, file_shas, total
+    return dir_pks, file_pks, total
 
 
 @require_login_if_configured
@@ -525,7 +687,7 @@ def search_viewresults(request: WSGIRequest):
 
     items_per_page = settings.SEARCH_ITEMS_PER_PAGE
 
-    dir_shas, file_shas, total_items = _get_paginated_search_results(
+    dir_pks, file_pks, total_items = _get_paginated_search_results(
         searchtext,
         search_regex_pattern,
         context["sort"],
@@ -536,10 +698,11 @@ def search_viewresults(request: WSGIRequest):
     total_pages = max(1, math.ceil(total_items / items_per_page))
     current_page = max(1, min(current_page, total_pages))
 
-    # Hydrate full objects for this page only — same pattern as view_gallery()
+    # Hydrate full objects for this page only — same pattern as view_gallery().
+    # __in returns rows in no particular order; put them back in result order.
     dirs_to_display = (
         list(
-            DirectoryIndex.objects.filter(dir_fqpn_sha256__in=dir_shas, delete_pending=False)
+            DirectoryIndex.objects.filter(pk__in=dir_pks, delete_pending=False)
             .prefetch_related(*SEARCH_PR_FILETYPE)
             .annotate(
                 file_count=Count(
@@ -554,15 +717,15 @@ def search_viewresults(request: WSGIRequest):
                 ),
             )
         )
-        if dir_shas
+        if dir_pks
         else []
     )
 
     files_to_display = (
-        list(FileIndex.objects.filter(unique_sha256__in=file_shas, delete_pending=False).prefetch_related(*SEARCH_PR_FILETYPE_HOME))
-        if file_shas
-        else []
+        list(FileIndex.objects.filter(pk__in=file_pks, delete_pending=False).prefetch_related(*SEARCH_PR_FILETYPE_HOME)) if file_pks else []
     )
+    dirs_to_display.sort(key=lambda item: dir_pks.index(item.pk))  # at most one page of pks
+    files_to_display.sort(key=lambda item: file_pks.index(item.pk))
 
     # Update context with pagination data (consistent with gallery view)
     context.update(
@@ -811,7 +974,7 @@ def _find_directory(paths: dict) -> DirectoryIndex:
             _, directory = DirectoryIndex.search_for_directory_by_sha(dir_sha)
 
             # Sync newly created directory to populate file entries
-            directory = update_database_from_disk(directory)
+            directory = update_database_from_disk(directory, defer_large=True)
 
             if not directory:
                 logger.info("Directory sync failed: %s", dirpath)
@@ -839,35 +1002,48 @@ def _find_directory(paths: dict) -> DirectoryIndex:
         raise DirectoryInvalidError(f"Invalid path specified: {paths['album_viewing']}") from e
 
 
-def _check_and_enqueue_missing_thumbnails(directory: DirectoryIndex, sort_ordering: int, batch_limit: int) -> int:
+def _check_and_enqueue_missing_thumbnails(
+    directory: DirectoryIndex,
+    sort_ordering: int,
+    batch_limit: int,
+    page_shas: list[str] | None = None,
+) -> int:
     """
-    Check for files needing thumbnails and enqueue generation if needed.
+    Check for files needing thumbnails and add them to the thumbnail queue.
 
-    Consolidates three sequential ORM operations into a single sync function
-    to reduce async/sync boundary crossings.
+    Consolidates the ORM operations into a single sync function to reduce
+    async/sync boundary crossings.
 
-    Tasks are enqueued at priority 50 (web request).  Bulk maintenance tasks
-    via --add_thumbnails use priority 0 so user-facing requests are processed first.
+    Files on the page being viewed that lack a thumbnail (page_shas) are
+    queued at page priority, the first batch_limit missing files of the
+    directory at directory priority. Hashes already queued are coalesced by
+    enqueue_thumbnails(), so repeat views of a directory add no work (see
+    thumbnails/generation_queue.py).
 
     Args:
         directory: DirectoryIndex to check for missing thumbnails
         sort_ordering: Sort order for file query
-        batch_limit: Maximum number of thumbnails to enqueue per batch
+        batch_limit: Maximum number of directory thumbnails to queue
+        page_shas: file_sha256 values of the page's files that have no thumbnail
 
     Returns:
-        Number of files enqueued for thumbnail generation
+        Number of queue rows added or raised in priority
     """
     qs = _get_files_needing_thumbnails(directory, sort_ordering)
     no_thumbs = list(qs[:batch_limit])
-    missing_count = len(no_thumbs)
-    if missing_count > 0:
-        print(f"{missing_count} entries need thumbnails, enqueuing to task runner")
-        generate_missing_thumbnails.using(priority=50).enqueue(
-            files_needing_thumbnails=no_thumbs,
-            directory_pk=directory.pk,
-            batch_size=missing_count,
-        )
-    return missing_count
+    if not no_thumbs:
+        return 0
+    # The page's missing files are usually among the first batch_limit; query
+    # only for those the batch cut off
+    page_set = set(page_shas or ())
+    page_missing = [sha for sha in no_thumbs if sha in page_set]
+    if len(set(page_missing)) < len(page_set) and len(no_thumbs) == batch_limit:
+        page_missing = list(qs.filter(file_sha256__in=page_set))
+    changed = enqueue_thumbnails(page_missing, QUEUE_PRIORITY_PAGE, directory.pk)
+    changed += enqueue_thumbnails(no_thumbs, QUEUE_PRIORITY_DIRECTORY, directory.pk)
+    if changed:
+        print(f"{changed} entries need thumbnails, queued for the task runner")
+    return changed
 
 
 @require_login_if_configured
@@ -911,8 +1087,9 @@ def view_gallery(request: WSGIRequest):
     except DirectoryInvalidError:
         return HttpResponseBadRequest("<h1>Invalid path specified</h1>")
 
-    # Ensure directory data is up to date
-    update_database_from_disk(directory)
+    # Ensure directory data is up to date (a very large directory is synced
+    # by the task runner instead; this view shows what is there so far)
+    update_database_from_disk(directory, defer_large=True)
 
     # Build initial context - start with shared base context
     context = _create_base_context(request)
@@ -972,7 +1149,9 @@ def view_gallery(request: WSGIRequest):
                 user=request.user,
             ).filter(dir_fqpn_sha256__in=layout["page_items"]["directory_shas"])
             # REMOVED: .select_related("thumbnail__new_ftnail") - Phase 5 Fix 1
-            # Thumbnails load on-demand via thumbnail_dir() - no need for 750KB binary blobs
+            # Thumbnails load on-demand via thumbnail_dir() - no need for 750KB binary blobs.
+            # Only the cover's hash and generation are joined, for the ?v= URL token.
+            .annotate(**thumbnail_version_annotations("thumbnail__"))
         )
     else:
         dirs_to_display = []
@@ -982,9 +1161,11 @@ def view_gallery(request: WSGIRequest):
         # Fetch and separate files and links in one pass
         # Note: select_related already handled by files_in_dir() - no need to duplicate
         all_items = list(
-            directory.files_in_dir(sort=context["sort"], select_related=FILEINDEX_SR_FILETYPE_HOME_VIRTUAL, user=request.user).filter(
-                unique_sha256__in=layout["page_items"]["file_shas"]
-            )
+            directory.files_in_dir(sort=context["sort"], select_related=FILEINDEX_SR_FILETYPE_HOME_VIRTUAL, user=request.user)
+            .filter(unique_sha256__in=layout["page_items"]["file_shas"])
+            .annotate(**thumbnail_version_annotations(), **thumbnail_missing_annotations())
+            # Probed frame size for the movie resolution badge (one indexed lookup per row)
+            .annotate(**media_probe_annotations())
         )
         files_list = [f for f in all_items if not f.filetype.is_link]
         links_list = [f for f in all_items if f.filetype.is_link]
@@ -994,11 +1175,19 @@ def view_gallery(request: WSGIRequest):
 
     context["items_to_display"] = list(dirs_to_display) + links_list + files_list
     context["show_duplicates"] = show_duplicates
+    if settings.THUMBNAIL_MULTIPART_ENABLED:
+        # One request for the page's small file thumbnails (flags the items it covers)
+        context["thumbnail_multipart_url"] = thumbnail_multipart_url(files_list)
     # print("elapsed view gallery (pre-thumb) time - ", time.time() - start_time)
 
     # Check if thumbnails are needed (computed separately from cached layout
     # to avoid invalidating layout cache when thumbnails are generated)
-    _check_and_enqueue_missing_thumbnails(directory, context["sort"], settings.THUMBNAIL_BATCH_LIMIT)
+    _check_and_enqueue_missing_thumbnails(
+        directory,
+        context["sort"],
+        settings.THUMBNAIL_BATCH_LIMIT,
+        page_shas=[item.file_sha256 for item in files_list if item.thumbnail_missing],
+    )
 
     response = render(
         request,
@@ -0,0 +1 @@
+"""Benchmarking and soak-test tools for the interactive_fiction Ink engine."""
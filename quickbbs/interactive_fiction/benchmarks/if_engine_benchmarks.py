@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark and soak test for the Ink runtime (interactive_fiction/engine.py).
+
+Generates a synthetic compiled-Ink story of configurable size, then plays it
+for thousands of automated turns the way the play views do — restore the
+saved state, choose, continue, save — timing each operation and tracking
+peak memory with tracemalloc.
+
+Results are written as benchmark_<timestamp>.json using the same "total" /
+"endpoints" layout run_download_benchmark.py writes, so runs can be compared
+with the existing comparison script:
+
+Usage:
+    cd interactive_fiction/benchmarks
+    python if_engine_benchmarks.py --turns 5000 --knots 500
+
+    # Compare the latest two runs
+    python ../../benchmarks/compare_benchmark_results.py --results-dir benchmark_results
+
+Requirements:
+    - None beyond the engine itself (no database, no Django settings)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+# Add the source root to the path so this runs standalone: python if_engine_benchmarks.py
+BENCHMARKS_DIR = Path(__file__).parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent.parent))
+
+# pylint: disable=wrong-import-position
+from interactive_fiction.engine import CompiledStory, InkRuntimeState, compile_story
+
+# pylint: enable=wrong-import-position
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+# Synthetic story shape
+DEFAULT_KNOTS = 200
+DEFAULT_CHOICES = 3
+DEFAULT_VARIABLES = 20
+DEFAULT_TUNNEL_DEPTH = 4
+
+# Automated turns played in the soak loop
+DEFAULT_TURNS = 5000
+
+# compile_story() repetitions for the load timing
+DEFAULT_LOAD_ITERATIONS = 20
+
+# Operations reported per turn, in the order a play_submit request runs them
+OPERATIONS = ["load", "restore", "choose", "step", "save"]
+
+
+# ============================================================================
+# Synthetic Story Generation
+# ============================================================================
+
+
+def generate_story(knots: int, choices: int, variables: int, tunnel_depth: int, seed: int = 1) -> dict[str, Any]:
+    """
+    Build a compiled-Ink JSON story of the requested size.
+
+    Every knot bumps and prints one global variable, calls a chain of
+    tunnel_depth nested tunnels, then offers sticky choices diverting to
+    other knots (picked with a seeded RNG, so the same arguments always
+    build the same story). The story never ends, so a soak can run for
+    any number of turns.
+
+    Args:
+        knots: Number of knot containers
+        choices: Choices offered per knot
+        variables: Number of global VARs (shared round-robin by the knots)
+        tunnel_depth: Nested tunnel calls made on every turn (call stack depth)
+        seed: RNG seed for the choice targets
+
+    Returns:
+        The story as inklecate would write it ({"inkVersion", "root", "listDefs"})
+    """
+    rng = random.Random(seed)
+    named: dict[str, Any] = {}
+
+    declarations: list[Any] = ["ev"]
+    for var_index in range(variables):
+        declarations += [0, {"VAR=": f"v{var_index}"}]
+    named["global decl"] = declarations + ["/ev", "end", None]
+
+    for depth in range(tunnel_depth):
+        body: list[Any] = [f"^Passing tunnel {depth}.", "\n"]
+        if depth + 1 < tunnel_depth:
+            body.append({"->t->": f"tunnel_{depth + 1}"})
+        named[f"tunnel_{depth}"] = body + ["ev", "void", "/ev", "->->", None]
+
+    for knot_index in range(knots):
+        var_name = f"v{knot_index % variables}" if variables else None
+        body = [f"^Room {knot_index}.", "\n"]
+        if var_name:
+            body += ["ev", {"VAR?": var_name}, 1, "+", "/ev", {"VAR=": var_name, "re": True}]
+            body += ["^Counter ", "ev", {"VAR?": var_name}, "out", "/ev", "\n"]
+        if tunnel_depth:
+            body.append({"->t->": "tunnel_0"})
+        choice_targets: dict[str, Any] = {}
+        for choice_index in range(choices):
+            body += ["ev", "str", f"^Go to room {choice_index}", "/str", "/ev", {"*": f".^.c-{choice_index}", "flg": 4}]
+            choice_targets[f"c-{choice_index}"] = ["^ ", {"->": f"knot_{rng.randrange(knots)}"}, "\n", {"#f": 5}]
+        named[f"knot_{knot_index}"] = [body + [choice_targets], None]
+
+    root = [[{"->": "knot_0"}, ["done", {"#n": "g-0"}], None], "done", named]
+    return {"inkVersion": 21, "root": root, "listDefs": {}}
+
+
+# ============================================================================
+# Utility Functions
+# ============================================================================
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Return a nearest-rank percentile of already-sorted values.
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction (0.95 for P95)
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize_times(times: list[float], failures: int = 0, avg_size_bytes: float = 0.0) -> dict[str, Any]:
+    """
+    Summarize per-operation timings in run_download_benchmark.py's layout.
+
+    Args:
+        times: Individual operation times in seconds
+        failures: Number of failed operations
+        avg_size_bytes: Average serialized payload size, where meaningful
+
+    Returns:
+        Dictionary with requests/failures/rps and millisecond latency stats
+    """
+    ordered = sorted(times)
+    total_time = sum(ordered)
+    return {
+        "requests": len(ordered),
+        "failures": failures,
+        "median_ms": statistics.median(ordered) * 1000 if ordered else 0.0,
+        "p90_ms": percentile(ordered, 0.90) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "avg_ms": statistics.mean(ordered) * 1000 if ordered else 0.0,
+        "min_ms": ordered[0] * 1000 if ordered else 0.0,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+        "rps": len(ordered) / total_time if total_time else 0.0,
+        "avg_size_bytes": avg_size_bytes,
+    }
+
+
+def timed(func: Callable[[], Any]) -> tuple[Any, float]:
+    """
+    Call func and time it.
+
+    Args:
+        func: Zero-argument callable
+
+    Returns:
+        Tuple of (return value, elapsed seconds)
+    """
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+
+# ============================================================================
+# Benchmark Functions
+# ============================================================================
+
+
+def benchmark_load(story_text: str, iterations: int) -> list[float]:
+    """
+    Time parsing and compiling the story, as a cold get_compiled_story() does.
+
+    Args:
+        story_text: The story's compiled JSON text
+        iterations: Number of compile_story() runs
+
+    Returns:
+        List of per-iteration times in seconds
+    """
+    return [timed(lambda: compile_story(json.loads(story_text)))[1] for _ in range(iterations)]
+
+
+def soak(story: CompiledStory, turns: int, seed: int = 1) -> dict[str, Any]:
+    """
+    Play turns automated turns, restoring from the saved JSON each turn.
+
+    Each turn mirrors one play_submit request: json.loads + load_state()
+    (restore), choose(), continue_story() (step), to_dict() + json.dumps()
+    (save). A turn whose restored state offers different choices than the
+    state it was saved from counts as a failure — the soak doubles as a
+    save/restore round-trip check.
+
+    Args:
+        story: The compiled story to play
+        turns: Number of turns to play
+        seed: RNG seed for choice selection
+
+    Returns:
+        Dictionary with per-operation times, failure count and the
+        serialized save sizes of the first and last turns
+    """
+    rng = random.Random(seed)
+    times: dict[str, list[float]] = {"restore": [], "choose": [], "step": [], "save": []}
+    turn_times: list[float] = []
+    save_sizes: list[int] = []
+    failures = 0
+
+    state = story.new_state()
+    state.continue_story()
+    saved = json.dumps(state.to_dict())
+
+    for _ in range(turns):
+        turn_start = time.perf_counter()
+        restored, elapsed = timed(lambda: story.load_state(json.loads(saved)))
+        times["restore"].append(elapsed)
+        if [choice.text for choice in restored.current_choices] != [choice.text for choice in state.current_choices]:
+            failures += 1
+        state = restored
+        if not state.current_choices:
+            break
+
+        index = rng.randrange(len(state.current_choices))
+        times["choose"].append(timed(lambda: state.choose(index))[1])
+        times["step"].append(timed(state.continue_story)[1])
+        saved, elapsed = timed(lambda: json.dumps(state.to_dict()))
+        times["save"].append(elapsed)
+        save_sizes.append(len(saved))
+        turn_times.append(time.perf_counter() - turn_start)
+
+    return {
+        "times": times,
+        "turn_times": turn_times,
+        "failures": failures,
+        "save_sizes": save_sizes,
+        "final_state": state,
+    }
+
+
+def measure_memory(story_text: str, turns: int, seed: int = 1) -> dict[str, int]:
+    """
+    Measure peak and retained memory of a load and a soak under tracemalloc.
+
+    Run separately from the timed pass, since tracing slows every
+    allocation down.
+
+    Args:
+        story_text: The story's compiled JSON text
+        turns: Number of soak turns
+        seed: RNG seed for choice selection
+
+    Returns:
+        Dictionary of byte counts: load_peak_bytes, story_bytes (retained
+        by the CompiledStory), soak_peak_bytes and state_bytes (retained
+        by the final InkRuntimeState)
+    """
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        story = compile_story(json.loads(story_text))
+        after_load, load_peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.reset_peak()
+        result = soak(story, turns, seed)
+        _, soak_peak = tracemalloc.get_traced_memory()
+        # Keep only the final state alive (not the timing lists) so what's
+        # left over is what one stored game costs once the soak is done.
+        final_state: InkRuntimeState = result.pop("final_state")
+        del result
+        after_soak, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "load_peak_bytes": load_peak - baseline,
+        "story_bytes": after_load - baseline,
+        "soak_peak_bytes": soak_peak - after_load,
+        "state_bytes": after_soak - after_load if final_state is not None else 0,
+    }
+
+
+def run_benchmarks(
+    knots: int = DEFAULT_KNOTS,
+    choices: int = DEFAULT_CHOICES,
+    variables: int = DEFAULT_VARIABLES,
+    tunnel_depth: int = DEFAULT_TUNNEL_DEPTH,
+    turns: int = DEFAULT_TURNS,
+    load_iterations: int = DEFAULT_LOAD_ITERATIONS,
+    seed: int = 1,
+    memory: bool = True,
+) -> dict[str, Any]:
+    """
+    Generate a story, run the load/soak benchmarks and collect the results.
+
+    Args:
+        knots: Number of knot containers
+        choices: Choices offered per knot
+        variables: Number of global VARs
+        tunnel_depth: Nested tunnel calls per turn
+        turns: Number of soak turns
+        load_iterations: Number of compile_story() runs
+        seed: RNG seed for story generation and choice selection
+        memory: Whether to run the tracemalloc pass
+
+    Returns:
+        Results dictionary ("timestamp", "story", "total", "endpoints",
+        "memory")
+    """
+    story_text = json.dumps(generate_story(knots, choices, variables, tunnel_depth, seed))
+    load_times = benchmark_load(story_text, load_iterations)
+    story = compile_story(json.loads(story_text))
+    played = soak(story, turns, seed)
+
+    save_sizes = played["save_sizes"]
+    avg_save = statistics.mean(save_sizes) if save_sizes else 0.0
+    endpoints = {"load": summarize_times(load_times, avg_size_bytes=len(story_text))}
+    for name, times in played["times"].items():
+        sized = name in ("restore", "save")
+        endpoints[name] = summarize_times(times, failures=played["failures"] if name == "restore" else 0, avg_size_bytes=avg_save if sized else 0.0)
+
+    results: dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "story": {
+            "knots": knots,
+            "choices": choices,
+            "variables": variables,
+            "tunnel_depth": tunnel_depth,
+            "containers": len(story.index.containers),
+            "json_bytes": len(story_text),
+            "turns": turns,
+            "seed": seed,
+        },
+        "total": summarize_times(played["turn_times"], failures=played["failures"], avg_size_bytes=avg_save),
+        "endpoints": endpoints,
+        "memory": {
+            "save_first_bytes": save_sizes[0] if save_sizes else 0,
+            "save_last_bytes": save_sizes[-1] if save_sizes else 0,
+        },
+    }
+    if memory:
+        results["memory"].update(measure_memory(story_text, turns, seed))
+    return results
+
+
+# ============================================================================
+# Reporting
+# ============================================================================
+
+
+def format_bytes(bytes_value: float) -> str:
+    """
+    Format bytes in human-readable format.
+
+    Args:
+        bytes_value: Size in bytes
+
+    Returns:
+        Formatted string (e.g., "1.5 MB")
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(bytes_value) < 1024.0:
+            return f"{bytes_value:.2f} {unit}"
+        bytes_value /= 1024.0
+    return f"{bytes_value:.2f} TB"
+
+
+def print_summary(results: dict[str, Any]) -> None:
+    """
+    Print a human-readable summary of a run.
+
+    Args:
+        results: Results dictionary from run_benchmarks()
+    """
+    story = results["story"]
+    print("=" * 80)
+    print("Ink Engine Benchmark")
+    print("=" * 80)
+    print(
+        f"Story: {story['knots']:,} knots, {story['choices']} choices/knot, {story['variables']} variables, "
+        f"tunnel depth {story['tunnel_depth']} ({story['containers']:,} containers, {format_bytes(story['json_bytes'])})"
+    )
+    print(f"Turns: {results['total']['requests']:,} of {story['turns']:,}, failures: {results['total']['failures']:,}")
+    print()
+    print(f"{'Operation':<12} | {'Count':>8} | {'Ops/sec':>10} | {'Median ms':>10} | {'P95 ms':>10} | {'P99 ms':>10} | {'Max ms':>10}")
+    print("-" * 80)
+    for name in OPERATIONS + ["total"]:
+        stats = results["total"] if name == "total" else results["endpoints"].get(name)
+        if not stats:
+            continue
+        print(
+            f"{name:<12} | {stats['requests']:>8,} | {stats['rps']:>10.1f} | {stats['median_ms']:>10.3f} | "
+            f"{stats['p95_ms']:>10.3f} | {stats['p99_ms']:>10.3f} | {stats['max_ms']:>10.3f}"
+        )
+    print("-" * 80)
+    print()
+    print("Memory:")
+    for key, value in results["memory"].items():
+        print(f"  {key:<20} {format_bytes(value):>12}")
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parse command line arguments.
+
+    Returns:
+        Parsed arguments namespace
+    """
+    parser = argparse.ArgumentParser(description="Benchmark and soak-test the Ink runtime engine")
+    parser.add_argument("--knots", type=int, default=DEFAULT_KNOTS, help=f"Knot containers (default: {DEFAULT_KNOTS})")
+    parser.add_argument("--choices", type=int, default=DEFAULT_CHOICES, help=f"Choices per knot (default: {DEFAULT_CHOICES})")
+    parser.add_argument("--variables", type=int, default=DEFAULT_VARIABLES, help=f"Global variables (default: {DEFAULT_VARIABLES})")
+    parser.add_argument(
+        "--tunnel-depth", type=int, default=DEFAULT_TUNNEL_DEPTH, help=f"Nested tunnel calls per turn (default: {DEFAULT_TUNNEL_DEPTH})"
+    )
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help=f"Soak turns (default: {DEFAULT_TURNS})")
+    parser.add_argument(
+        "--load-iterations", type=int, default=DEFAULT_LOAD_ITERATIONS, help=f"compile_story() runs (default: {DEFAULT_LOAD_ITERATIONS})"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for the story and the choices (default: 1)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) tracemalloc pass")
+    parser.add_argument(
+        "--output-dir",
+        default="benchmark_results",
+        help="Output directory for results (default: benchmark_results)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """
+    Main entry point.
+
+    Returns:
+        Exit code (0 for success, 1 if any turn failed its round-trip check)
+    """
+    args = parse_args()
+    if args.knots < 1 or args.choices < 1:
+        print("Error: --knots and --choices must be at least 1", file=sys.stderr)
+        return 1
+
+    results = run_benchmarks(
+        knots=args.knots,
+        choices=args.choices,
+        variables=args.variables,
+        tunnel_depth=args.tunnel_depth,
+        turns=args.turns,
+        load_iterations=args.load_iterations,
+        seed=args.seed,
+        memory=not args.no_memory,
+    )
+    print_summary(results)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+
+    return 1 if results["total"]["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -66,6 +66,8 @@ from __future__ import annotations
 
 import math
 import time
+from bisect import bisect_left
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -671,6 +673,10 @@ class Container:
         self.content: list[Any] = []
         self.named_content: dict[str, Any] = {}
         self.count_flags: int = 0
+        # Position in ContainerIndex.containers, assigned when the index is
+        # built (-1 until then) — the key InkRuntimeState's visit_counts and
+        # visit_turns use at runtime.
+        self.ordinal: int = -1
 
     @property
     def visits_should_be_counted(self) -> bool:
@@ -802,7 +808,7 @@ def find_unbound_externals(root: Container) -> list[str]:
     compiled story declares must have a same-named ink fallback function
     defined in the story"). Walks every Container reached from root
     (recursing into both positional content and named-only/terminator-dict
-    children, matching _container_by_id_index()'s own traversal) collecting
+    children, matching ContainerIndex's own traversal) collecting
     every FunctionCall.is_external target name, then checks each one
     resolves to a real Container via resolve_path.
 
@@ -1054,6 +1060,164 @@ def resolve_path(start: Container, path: Path) -> Container | Any | None:
     return current
 
 
+class ContainerIndex:
+    """Container ordinals and path-string <-> Container lookups for one
+    loaded tree, built once.
+
+    Numbers every container of the tree in a fixed depth-first order
+    (positional content before named-only content, the order the compiled
+    JSON lists them) and stores that number on Container.ordinal, so
+    runtime counters can key on a small integer that means the same
+    container for every state and process loading the same compiled JSON
+    — unlike id(container), which only means anything within one loaded
+    tree. Saves still address containers by path string, which survives a
+    story being recompiled with containers added or removed where an
+    ordinal would not; containers, paths and by_path turn either form into
+    the other with one lookup instead of a parent-chain walk
+    (_container_path()) or component-by-component resolve_path().
+
+    Built once alongside the tree (compile_story()) and shared by every
+    state that plays it, since the tree is never modified after loading.
+    Building a second index over the same tree assigns the same ordinals.
+
+    Args:
+        root: The story's root Container (from load_story_root()).
+    """
+
+    def __init__(self, root: Container) -> None:
+        self.root = root
+        self.containers: list[Container] = []
+        self.paths: list[str | None] = []
+        self.by_path: dict[str, Container] = {}
+
+        def walk(container: Container) -> None:
+            container.ordinal = len(self.containers)
+            self.containers.append(container)
+            try:
+                path_str: str | None = _container_path(container)
+            except InkPathError:
+                path_str = None
+            self.paths.append(path_str)
+            if path_str is not None:
+                self.by_path.setdefault(path_str, container)
+            for item in container.content:
+                if isinstance(item, Container):
+                    walk(item)
+            for item in container.named_content.values():
+                if isinstance(item, Container) and not self._holds(item):
+                    walk(item)
+
+        walk(root)
+
+    def _holds(self, container: Container) -> bool:
+        """Return whether walk() has already numbered container (a named
+        container listed positionally is also in its parent's
+        named_content)."""
+        ordinal = container.ordinal
+        return 0 <= ordinal < len(self.containers) and self.containers[ordinal] is container
+
+    def path_of(self, container: Container) -> str:
+        """Return a container's absolute path string.
+
+        Args:
+            container: A container of this tree.
+
+        Returns:
+            The indexed path string (computed by _container_path() for a
+            container the index doesn't hold).
+
+        Raises:
+            InkPathError: If container has no reachable path (see
+                _container_path()).
+        """
+        path_str = self.paths[container.ordinal] if self._holds(container) else None
+        return path_str if path_str is not None else _container_path(container)
+
+    def container_at(self, path_str: str) -> Container | None:
+        """Return the Container an absolute path string addresses.
+
+        Args:
+            path_str: An absolute dotted path string.
+
+        Returns:
+            The Container, or None if the path doesn't address one. A path
+            string in a form the index doesn't hold verbatim (e.g. one
+            written by hand) falls back to resolve_path().
+        """
+        container = self.by_path.get(path_str)
+        if container is not None:
+            return container
+        target = resolve_path(self.root, Path.parse(path_str))
+        return target if isinstance(target, Container) else None
+
+
+# Completed paragraphs kept by a story's main OutputStream after they're
+# flushed out of its token list (see OutputStream's retain_paragraphs).
+DEFAULT_OUTPUT_RETENTION = 50
+
+
+@dataclass(frozen=True)
+class CompiledStory:
+    """A story's immutable runtime data, shareable across requests and threads.
+
+    Holds only what load_story_root()/load_list_defs() derive from the
+    compiled JSON plus the ContainerIndex over it. Nothing in the
+    interpreter mutates the tree, its leaf objects or list_defs — every
+    piece of playthrough state lives on InkRuntimeState — so one instance
+    can back any number of concurrent states (new_state()/load_state()).
+
+    Attributes:
+        root: The story's root Container.
+        list_defs: The story's LIST definitions.
+        index: Path lookups over root.
+    """
+
+    root: Container
+    list_defs: dict[str, dict[str, int]]
+    index: ContainerIndex
+
+    def new_state(self, output_retention: int = DEFAULT_OUTPUT_RETENTION) -> "InkRuntimeState":
+        """
+        Return a fresh InkRuntimeState for this story (not yet continued).
+
+        Args:
+            output_retention: See InkRuntimeState.
+
+        Returns:
+            The new state.
+        """
+        return InkRuntimeState(self.root, self.list_defs, container_index=self.index, output_retention=output_retention)
+
+    def load_state(self, data: dict[str, Any], output_retention: int = DEFAULT_OUTPUT_RETENTION) -> "InkRuntimeState":
+        """
+        Return an InkRuntimeState rebuilt from a to_dict() result.
+
+        Args:
+            data: A to_dict() result.
+            output_retention: See InkRuntimeState.
+
+        Returns:
+            The restored state.
+        """
+        return InkRuntimeState.from_dict(self.root, data, self.list_defs, container_index=self.index, output_retention=output_retention)
+
+
+def compile_story(story_json: dict[str, Any]) -> CompiledStory:
+    """Load a compiled story's tree, LIST definitions and path index.
+
+    Args:
+        story_json: The parsed top-level compiled-Ink JSON object.
+
+    Returns:
+        The CompiledStory.
+
+    Raises:
+        InkPathError: If the JSON has no "root" key.
+    """
+    root = load_story_root(story_json)
+    return CompiledStory(root=root, list_defs=load_list_defs(story_json), index=ContainerIndex(root))
+
+
 GLUE = "<>"
 NEWLINE = "\n"
 
@@ -1155,6 +1319,64 @@ def _split_head_tail_whitespace(text: str) -> list[str] | None:
     return pieces
 
 
+def _is_content_token(token: str) -> bool:
+    """
+    Return whether an output token is real text (not glue, a newline or inline whitespace).
+
+    Args:
+        token: An OutputStream token.
+
+    Returns:
+        True for text that "closes" glue and ends a whitespace run.
+    """
+    return token not in (GLUE, NEWLINE) and not _is_whitespace_only(token)
+
+
+def _clean_output_whitespace(joined: str) -> str:
+    """
+    Return joined output text with inline whitespace runs collapsed.
+
+    Ports Runtime.State.CleanOutputWhitespace from the C# reference: a
+    second, display-time pass over the joined text that collapses any
+    run of inline spaces/tabs down to a single space, unless it sits at
+    the very start of a line (immediately after a newline). This is
+    distinct from — and runs after — OutputStream's push-time
+    glue/newline logic: two text pieces glued together each carrying
+    their own adjacent space (e.g. "One " <> " Two ") would otherwise
+    leave a double space at the join point, which real Ink output never
+    shows. Each line is cleaned independently of the others, so text
+    split at a newline can be cleaned piece by piece.
+
+    Args:
+        joined: Concatenated token text, glue markers already omitted.
+
+    Returns:
+        The whitespace-cleaned text.
+    """
+
+    output: list[str] = []
+    whitespace_start = -1
+    line_start = 0
+    for i, char in enumerate(joined):
+        is_inline_whitespace = char in (" ", "\t")
+
+        if is_inline_whitespace and whitespace_start == -1:
+            whitespace_start = i
+
+        if not is_inline_whitespace:
+            if char != NEWLINE and whitespace_start > 0 and whitespace_start != line_start:
+                output.append(" ")
+            whitespace_start = -1
+
+        if char == NEWLINE:
+            line_start = i + 1
+
+        if not is_inline_whitespace:
+            output.append(char)
+
+    return "".join(output)
+
+
 class OutputStream:
     """Assembles visible turn text from leaf tokens using Ink's real
     glue/newline-suppression rules (Section 2 scope only).
@@ -1163,31 +1385,51 @@ class OutputStream:
     function-call-frame whitespace trimming, which needs a real call
     stack (Section 5/6). Only glue-triggered trimming and story-level
     newline dedup/no-leading-newline are implemented here.
+
+    The glue/newline/content state push() consults is kept up to date as
+    tokens are added and removed, instead of rescanning the token list on
+    every push — the backward glue scan alone made a long playthrough's
+    turns slower the longer the game ran.
+
+    A stream created with retain_paragraphs (a story's main output) also
+    stays bounded: once real text follows a newline and no glue is open,
+    nothing before that newline can change any more, so the completed
+    paragraphs are flushed out of tokens as cleaned text into paragraphs,
+    a ring buffer keeping the newest retain_paragraphs of them. Text of
+    the turn in progress is kept across flushes (begin_turn()/turn_text()).
+
+    Args:
+        retain_paragraphs: Completed paragraphs to keep once flushed (0
+            keeps none), or None (the default — string captures, tag
+            buffers) to never flush, keeping every token in tokens.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, retain_paragraphs: int | None = None) -> None:
         self.tokens: list[str] = []
+        self.retain_paragraphs = retain_paragraphs
+        self.paragraphs: deque[str] = deque(maxlen=retain_paragraphs or 0)
+        self.flushed_token_count = 0
+        self._glue_indices: list[int] = []
+        self._newline_indices: list[int] = []
+        self._last_content_index = -1
+        self._has_content = False
+        self._ends_in_newline = False
+        self._turn_start = 0
+        self._turn_chunks: list[str] = []
 
     @property
     def ends_in_newline(self) -> bool:
         """
         Return whether the stream currently ends in a newline.
 
-        Mirrors StoryState.outputStreamEndsInNewline: scans backward
-        past glue, stopping at the first non-whitespace text.
+        Mirrors StoryState.outputStreamEndsInNewline: the most recent
+        token that is neither glue nor inline whitespace is a newline.
 
         Returns:
             True if the most recent non-glue text token is exactly a
             newline; False otherwise (including when the stream is empty).
         """
-        for token in reversed(self.tokens):
-            if token == GLUE:
-                continue
-            if token == NEWLINE:
-                return True
-            if not _is_whitespace_only(token):
-                break
-        return False
+        return self._ends_in_newline
 
     @property
     def contains_content(self) -> bool:
@@ -1197,7 +1439,93 @@ class OutputStream:
         Returns:
             True if at least one token is real (non-whitespace) text.
         """
-        return any(token != GLUE and not _is_whitespace_only(token) and token != NEWLINE for token in self.tokens)
+        return self._has_content
+
+    @property
+    def position(self) -> int:
+        """
+        Return how many tokens have been added so far, flushed ones included.
+
+        Returns:
+            flushed_token_count plus the tokens still held.
+        """
+        return self.flushed_token_count + len(self.tokens)
+
+    def _append(self, token: str) -> None:
+        """Append one token as-is, updating the tracked stream state."""
+        index = len(self.tokens)
+        if token == GLUE:
+            self._glue_indices.append(index)
+        elif token == NEWLINE:
+            self._newline_indices.append(index)
+            self._ends_in_newline = True
+        elif not _is_whitespace_only(token):
+            self._last_content_index = index
+            self._has_content = True
+            self._ends_in_newline = False
+        self.tokens.append(token)
+
+    def load_tokens(self, tokens: list[str]) -> None:
+        """Replace the stream's tokens with already-assembled ones.
+
+        For tokens that went through push() before (a saved stream, or a
+        slice of one) — they're appended as they are, not re-run through
+        the glue/newline rules. A stream that flushes flushes whatever of
+        them is already complete.
+
+        Args:
+            tokens: The tokens, oldest first.
+        """
+        self.tokens = []
+        self._glue_indices = []
+        self._newline_indices = []
+        self._last_content_index = -1
+        self._has_content = False
+        self._ends_in_newline = False
+        for token in tokens:
+            self._append(token)
+        self._flush_completed()
+
+    def _flush_completed(self) -> None:
+        """Flush the completed paragraphs out of tokens, if this stream flushes.
+
+        Everything up to the last newline that real text follows is final
+        while no glue is open: glue trims only trailing newlines/whitespace
+        and removes only trailing glue, and neither can reach back past
+        real text.
+        """
+        if self.retain_paragraphs is None or self._glue_indices:
+            return
+        newline_count = bisect_left(self._newline_indices, self._last_content_index)
+        if newline_count == 0:
+            return
+        end = self._newline_indices[newline_count - 1] + 1
+        flushed = self.tokens[:end]
+        turn_from = self._turn_start - self.flushed_token_count
+        if turn_from < end:
+            self._turn_chunks.append(_clean_output_whitespace("".join(flushed[max(turn_from, 0) :])))
+        self.paragraphs.append(_clean_output_whitespace("".join(flushed)))
+        del self.tokens[:end]
+        self.flushed_token_count += end
+        self._newline_indices = [index - end for index in self._newline_indices[newline_count:]]
+        self._last_content_index -= end
+
+    def begin_turn(self) -> None:
+        """Mark the current end of the stream as the start of a new turn (see turn_text())."""
+        self._turn_start = self.position
+        self._turn_chunks = []
+
+    def turn_text(self) -> str:
+        """
+        Return the assembled visible text pushed since begin_turn().
+
+        Returns:
+            The turn's text, cleaned like get_text(), including paragraphs
+            flushed out of tokens since the turn began.
+        """
+        turn_from = max(self._turn_start - self.flushed_token_count, 0)
+        tail = "".join(token for token in self.tokens[turn_from:] if token != GLUE)
+        return "".join(self._turn_chunks) + _clean_output_whitespace(tail)
 
     def _remove_existing_glue(self) -> None:
         """Drop trailing glue tokens, per RemoveExistingGlue in the C# source.
@@ -1208,6 +1536,7 @@ class OutputStream:
         """
         while self.tokens and self.tokens[-1] == GLUE:
             self.tokens.pop()
+            self._glue_indices.pop()
 
     def _trim_newlines_from_end(self) -> None:
         """Remove a trailing run of newline/whitespace text, per
@@ -1227,25 +1556,32 @@ class OutputStream:
                 break
         if remove_from >= 0:
             del self.tokens[remove_from:]
+            while self._newline_indices and self._newline_indices[-1] >= remove_from:
+                self._newline_indices.pop()
+            self._ends_in_newline = False
+            for token in reversed(self.tokens):
+                if token == GLUE:
+                    continue
+                if token == NEWLINE:
+                    self._ends_in_newline = True
+                if not _is_whitespace_only(token):
+                    break
 
     def _latest_glue_index(self) -> int:
         """Find the index of the most recent still-active glue token.
 
-        Ports the backward scan in PushToOutputStreamIndividual: walks
-        back from the end of the stream and returns the index of the
-        first glue token encountered. Section 2 has no ControlCommand
-        tokens in the stream (those are opaque/out of scope), so unlike
-        the C# source this never has a BeginString boundary to stop at.
+        Ports the backward scan in PushToOutputStreamIndividual: the index
+        of the most recent glue token in the stream. Section 2 has no
+        ControlCommand tokens in the stream (those are opaque/out of
+        scope), so unlike the C# source this never has a BeginString
+        boundary to stop at.
 
         Returns:
             The index of the most recent glue token, or -1 if the stream
             has no trailing glue (i.e. it was already closed off by real
             text, or none was ever pushed).
         """
-        for i in range(len(self.tokens) - 1, -1, -1):
-            if self.tokens[i] == GLUE:
-                return i
-        return -1
+        return self._glue_indices[-1] if self._glue_indices else -1
 
     def push(self, token: str) -> None:
         """Push one leaf token (text, newline, or glue) onto the stream.
@@ -1264,7 +1600,7 @@ class OutputStream:
         """
         if token == GLUE:
             self._trim_newlines_from_end()
-            self.tokens.append(GLUE)
+            self._append(GLUE)
             return
 
         glue_index = self._latest_glue_index()
@@ -1273,16 +1609,19 @@ class OutputStream:
                 return
             if not _is_whitespace_only(token):
                 self._remove_existing_glue()
-            self.tokens.append(token)
+            self._append(token)
+            self._flush_completed()
             return
 
         if token == NEWLINE:
             if self.ends_in_newline or not self.contains_content:
                 return
-            self.tokens.append(NEWLINE)
+            self._append(NEWLINE)
             return
 
-        self.tokens.append(token)
+        self._append(token)
+        if _is_content_token(token):
+            self._flush_completed()
 
     def push_text(self, text: str) -> None:
         """Push a raw leaf text token, splitting head/tail newline runs first.
@@ -1303,43 +1642,16 @@ class OutputStream:
         """
         Return the assembled visible text for everything pushed so far.
 
-        Ports Runtime.State.CleanOutputWhitespace from the C# reference: a
-        second, display-time pass over the joined text that collapses any
-        run of inline spaces/tabs down to a single space, unless it sits
-        at the very start of a line (immediately after a newline). This is
-        distinct from — and runs after — the push-time glue/newline logic
-        above: two text pieces glued together each carrying their own
-        adjacent space (e.g. "One " <> " Two ") would otherwise leave a
-        double space at the join point, which real Ink output never shows.
+        Whitespace-cleaned by _clean_output_whitespace(). For a stream
+        that flushes, only the paragraphs still retained are included.
 
         Returns:
             The fully assembled and whitespace-cleaned visible text, with
             glue markers omitted (a glue token that survived to this point
             had nothing to suppress and contributes no text of its own).
         """
-        joined = "".join(token for token in self.tokens if token != GLUE)
-
-        output: list[str] = []
-        whitespace_start = -1
-        line_start = 0
-        for i, char in enumerate(joined):
-            is_inline_whitespace = char in (" ", "\t")
-
-            if is_inline_whitespace and whitespace_start == -1:
-                whitespace_start = i
-
-            if not is_inline_whitespace:
-                if char != NEWLINE and whitespace_start > 0 and whitespace_start != line_start:
-                    output.append(" ")
-                whitespace_start = -1
-
-            if char == NEWLINE:
-                line_start = i + 1
-
-            if not is_inline_whitespace:
-                output.append(char)
-
-        return "".join(output)
+        tail = "".join(token for token in self.tokens if token != GLUE)
+        return "".join(self.paragraphs) + _clean_output_whitespace(tail)
 
 
 DONE_COMMANDS = frozenset({"done", "end"})
@@ -1930,6 +2242,148 @@ class CallFrame:
     temps: dict[str, Any] = field(default_factory=dict)
 
 
+# Version of the dict InkRuntimeState.to_dict() writes (its "format" key).
+# 1 (no "format" key): every field written out, and QuickBBS's undo target
+# stored as a complete nested copy of the previous turn's dict.
+# 2: fields still holding from_dict()'s own fallback value are left out
+# (_STATE_DICT_DEFAULTS), and undo targets are stored as state_delta()s.
+SAVE_FORMAT_VERSION = 2
+
+# to_dict() fields whose value equals what from_dict() falls back to when the
+# key is missing — left out of a format 2 dict. story_seed (its fallback is a
+# fresh random seed) and string_capture_eval_depth (its fallback depends on
+# eval_run_depth) are always written.
+_STATE_DICT_DEFAULTS: dict[str, Any] = {
+    "pointer": None,
+    "previous_pointer": None,
+    "output_tokens": [],
+    "output_history": [],
+    "current_choices": [],
+    "visit_counts": {},
+    "visit_turns": {},
+    "current_tags": [],
+    "done": False,
+    "globals": {},
+    "temps": {},
+    "eval_stack": [],
+    "tunnel_stack": [],
+    "call_stack": [],
+    "turn_count": -1,
+    "previous_random": 0,
+    "eval_run_depth": 0,
+    "pending_thread": False,
+    "in_tag": False,
+    "tag_buffer_tokens": [],
+    "string_capture_stack": [],
+    "last_turn_text": "",
+}
+
+
+def upgrade_state_dict(data: dict[str, Any]) -> dict[str, Any]:
+    """Read a to_dict() result of any format version as a current-format dict.
+
+    The migration reader for saves written before SAVE_FORMAT_VERSION 2:
+    field names and value shapes are unchanged between versions, so an
+    old dict only loses its default-valued fields. Keys to_dict() doesn't
+    write itself (QuickBBS's "transcript"/"previous_state") pass through
+    untouched — converting the nested "previous_state" chain is the
+    caller's job, since only the caller knows what it holds.
+
+    Args:
+        data: A to_dict() result, format 1 or 2.
+
+    Returns:
+        data itself if already current, else a new format 2 dict.
+    """
+    if data.get("format") == SAVE_FORMAT_VERSION:
+        return data
+    upgraded = {key: value for key, value in data.items() if key not in _STATE_DICT_DEFAULTS or value != _STATE_DICT_DEFAULTS[key]}
+    upgraded["format"] = SAVE_FORMAT_VERSION
+    return upgraded
+
+
+def _list_slice_delta(base: list[Any], target: list[Any]) -> list[Any] | None:
+    """Express target as [head, count] meaning head + base[:count], if it can be.
+
+    Matches a list that only gained or lost items at its end, or also lost
+    a few from its front — a capped transcript one turn earlier holds one
+    more oldest entry and one fewer newest entry than the current one.
+
+    Args:
+        base: The list target is expressed relative to.
+        target: The list to express.
+
+    Returns:
+        [head, count], or None if no non-empty prefix of base is shared.
+    """
+    if not base:
+        return None
+    for head_len in range(len(target)):
+        count = len(target) - head_len
+        if count > len(base):
+            continue
+        if target[head_len] == base[0] and target[head_len:] == base[:count]:
+            return [target[:head_len], count]
+    return None
+
+
+def state_delta(base: dict[str, Any], target: dict[str, Any]) -> dict[str, Any]:
+    """Return the changes that turn base into target (see apply_state_delta()).
+
+    Used for undo snapshots: the turn before the current one differs from
+    it in a handful of fields, so storing only those (and only the changed
+    part of a list that grew by a turn) keeps each undo step small instead
+    of a full copy of the previous state nested inside the current one.
+
+    Args:
+        base: A JSON-safe dict (the current turn's state).
+        target: A JSON-safe dict (the state to be able to return to).
+
+    Returns:
+        {"set": {key: value}, "slices": {key: [head, count]}, "unset":
+        [key]}, each part left out when empty.
+    """
+    set_values: dict[str, Any] = {}
+    slices: dict[str, list[Any]] = {}
+    for key, value in target.items():
+        if key in base and base[key] == value:
+            continue
+        base_value = base.get(key)
+        if isinstance(value, list) and isinstance(base_value, list):
+            list_delta = _list_slice_delta(base_value, value)
+            if list_delta is not None:
+                slices[key] = list_delta
+                continue
+        set_values[key] = value
+    unset = [key for key in base if key not in target]
+    delta: dict[str, Any] = {}
+    if set_values:
+        delta["set"] = set_values
+    if slices:
+        delta["slices"] = slices
+    if unset:
+        delta["unset"] = unset
+    return delta
+
+
+def apply_state_delta(base: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Rebuild the target dict a state_delta() was taken towards.
+
+    Args:
+        base: The same dict state_delta() was given as base.
+        delta: The state_delta() result.
+
+    Returns:
+        A new dict equal to state_delta()'s target (base is not modified).
+    """
+    unset = set(delta.get("unset", ()))
+    result = {key: value for key, value in base.items() if key not in unset}
+    for key, (head, count) in delta.get("slices", {}).items():
+        result[key] = list(head) + list(base.get(key, [])[:count])
+    result.update(delta.get("set", {}))
+    return result
+
+
 class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
     """Tracks one story's playthrough position, output, and choices.
 
@@ -1956,14 +2410,27 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         list_defs: The story's LIST definitions (from load_list_defs()),
             {list_name: {item_name: int_value}}. Defaults to {} for
             stories with no LIST declarations.
+        container_index: A ContainerIndex over root shared with other
+            states of the same story (CompiledStory passes its own);
+            built here when omitted, since visit counting needs the
+            container ordinals it assigns.
+        output_retention: Completed paragraphs the main output stream
+            keeps once flushed (OutputStream's retain_paragraphs).
     """
 
-    def __init__(self, root: Container, list_defs: dict[str, dict[str, int]] | None = None) -> None:
+    def __init__(
+        self,
+        root: Container,
+        list_defs: dict[str, dict[str, int]] | None = None,
+        container_index: ContainerIndex | None = None,
+        output_retention: int = DEFAULT_OUTPUT_RETENTION,
+    ) -> None:
         self.root = root
         self.list_defs = list_defs or {}
+        self.container_index = container_index if container_index is not None else ContainerIndex(root)
         self.pointer: Pointer | None = Pointer.start_of(root)
         self.previous_pointer: Pointer | None = None
-        self.output = OutputStream()
+        self.output = OutputStream(retain_paragraphs=output_retention)
         self.current_choices: list[Choice] = []
         self.visit_counts: dict[int, int] = {}
         self.visit_turns: dict[int, int] = {}
@@ -2035,7 +2502,7 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
             The number of times _record_visit() has been called for this
             container, or 0 if never visited.
         """
-        return self.visit_counts.get(id(container), 0)
+        return self.visit_counts.get(container.ordinal, 0)
 
     def _record_visit(self, container: Container, at_start: bool = True) -> None:
         """Increment container's visit count and/or record this turn's
@@ -2064,9 +2531,9 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         if container.counting_at_start_only and not at_start:
             return
         if container.visits_should_be_counted:
-            self.visit_counts[id(container)] = self._visit_count(container) + 1
+            self.visit_counts[container.ordinal] = self._visit_count(container) + 1
         if container.turn_index_should_be_counted:
-            self.visit_turns[id(container)] = self.turn_count
+            self.visit_turns[container.ordinal] = self.turn_count
 
     def _run_global_decl(self) -> None:
         """Run the compiled "global decl" container once, if present.
@@ -2992,10 +3459,10 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         -1/unknown") reaches the same shape.
         """
         target = self._pop_resolved_divert_target()
-        if target is None or id(target) not in self.visit_turns:
+        if target is None or target.ordinal not in self.visit_turns:
             self.eval_stack.append(-1)
             return
-        self.eval_stack.append(self.turn_count - self.visit_turns[id(target)])
+        self.eval_stack.append(self.turn_count - self.visit_turns[target.ordinal])
 
     def _push_read_count(self) -> None:
         """Handle a bare "readc" (ReadCount) command.
@@ -3085,7 +3552,7 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         """
         assert self.pointer is not None and self.pointer.container is not None
         try:
-            path_str = _container_path(self.pointer.container)
+            path_str = self.container_index.path_of(self.pointer.container)
         except InkPathError:
             # A malformed/unreachable container tree shape shouldn't
             # occur for any container load_story_root() produces (see
@@ -3482,15 +3949,11 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         # story once callers like interactive_fiction.views._current_image_urls()
         # iterate the accumulated list each turn.
         self.current_tags = []
-        start_length = len(self.output.tokens)
+        self.output.begin_turn()
         while not self.done:
             if self._step():
                 break
-        new_tokens = self.output.tokens[start_length:]
-        turn_stream = OutputStream()
-        for token in new_tokens:
-            turn_stream.tokens.append(token)
-        self.last_turn_text = turn_stream.get_text()
+        self.last_turn_text = self.output.turn_text()
         return self.last_turn_text
 
     def choose(self, index: int) -> None:
@@ -3524,7 +3987,7 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         """
         if pointer is None or pointer.container is None:
             return None
-        return {"path": _container_path(pointer.container), "index": pointer.index}
+        return {"path": self.container_index.path_of(pointer.container), "index": pointer.index}
 
     def _deserialize_pointer(self, data: dict[str, Any] | None) -> Pointer | None:
         """Convert a _serialize_pointer() dict back to a live Pointer.
@@ -3541,8 +4004,8 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         """
         if data is None:
             return None
-        target = resolve_path(self.root, Path.parse(str(data["path"])))
-        if not isinstance(target, Container):
+        target = self.container_index.container_at(str(data["path"]))
+        if target is None:
             return None
         return Pointer(container=target, index=int(data["index"]))
 
@@ -3585,7 +4048,7 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         if isinstance(value, ResolvedDivertTarget):
             return {
                 "$type": "divert_target",
-                "path": _container_path(value.container) if value.container is not None else None,
+                "path": self.container_index.path_of(value.container) if value.container is not None else None,
             }
         # else: an opaque/unexpected value type — degrades to None rather
         # than raising, matching this module's standing philosophy; no
@@ -3634,75 +4097,41 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         path = data["path"]
         if path is None:
             return ResolvedDivertTarget(container=None)
-        target = resolve_path(self.root, Path.parse(str(path)))
-        return ResolvedDivertTarget(container=target if isinstance(target, Container) else None)
-
-    def _container_by_id_index(self) -> dict[int, Container]:
-        """Build an id(Container) -> Container index for the whole tree.
-
-        visit_counts/visit_turns are keyed by id(container) (an
-        in-process identity, meaningless across a save/load boundary),
-        not by container reference — this walk is what lets
-        _id_keyed_dict_to_path_keyed() look up the actual Container for
-        each key to compute its path string. Rebuilt fresh each call
-        rather than cached, since it's only used by to_dict() (once per
-        turn at most, not a hot path worth memoizing against the risk of
-        a stale cache if this were ever called before the tree finished
-        loading).
-
-        Returns:
-            {id(container): container} for every Container reachable
-            from self.root, including named-only (terminator-dict-only)
-            children.
-        """
-        index: dict[int, Container] = {}
+        return ResolvedDivertTarget(container=self.container_index.container_at(str(path)))
 
-        def walk(container: Container) -> None:
-            index[id(container)] = container
-            for item in container.content:
-                if isinstance(item, Container):
-                    walk(item)
-            for item in container.named_content.values():
-                if isinstance(item, Container) and id(item) not in index:
-                    walk(item)
-
-        walk(self.root)
-        return index
-
-    def _id_keyed_dict_to_path_keyed(self, id_keyed: dict[int, int]) -> dict[str, int]:
-        """Convert an id(Container)-keyed dict (visit_counts/visit_turns'
+    def _ordinal_keyed_dict_to_path_keyed(self, ordinal_keyed: dict[int, int]) -> dict[str, int]:
+        """Convert a Container.ordinal-keyed dict (visit_counts/visit_turns'
         own storage shape) to a path-keyed dict, for serialization.
 
         Args:
-            id_keyed: {id(container): int_value}.
+            ordinal_keyed: {container.ordinal: int_value}.
 
         Returns:
-            {path_string: int_value}, one entry per id_keyed key whose
-            container is still reachable from self.root (an id whose
-            container no longer exists — should not happen within one
-            InkRuntimeState's lifetime, since containers are never
-            removed from the tree after loading — is silently dropped
-            rather than raised, matching this module's degrade-not-crash
+            {path_string: int_value}, one entry per ordinal_keyed key whose
+            container has a path (a pathless container — should not
+            happen for a container with count flags, since the compiler
+            only flags named/addressable ones — is silently dropped rather
+            than raised, matching this module's degrade-not-crash
             philosophy).
         """
-        by_id = self._container_by_id_index()
+        paths = self.container_index.paths
         result: dict[str, int] = {}
-        for container_id, value in id_keyed.items():
-            container = by_id.get(container_id)
-            if container is not None:
-                result[_container_path(container)] = value
+        for ordinal, value in ordinal_keyed.items():
+            path_str = paths[ordinal]
+            if path_str is not None:
+                result[path_str] = value
         return result
 
-    def _path_keyed_dict_to_id_keyed(self, path_keyed: dict[str, int]) -> dict[int, int]:
+    def _path_keyed_dict_to_ordinal_keyed(self, path_keyed: dict[str, int]) -> dict[int, int]:
         """Convert a path-keyed dict (to_dict()'s serialized form) back to
-        the id(Container)-keyed shape visit_counts/visit_turns actually
+        the Container.ordinal-keyed shape visit_counts/visit_turns actually
         use at runtime.
 
         Args:
             path_keyed: {path_string: int_value}.
 
         Returns:
-            {id(container): int_value}, one entry per path that still
+            {container.ordinal: int_value}, one entry per path that still
             resolves against self.root (a path a story re-upload removed
             is silently dropped — the save-compatibility repair path,
             Step 4, is what's meant to handle that case holistically, not
@@ -3710,18 +4139,19 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         """
         result: dict[int, int] = {}
         for path_str, value in path_keyed.items():
-            target = resolve_path(self.root, Path.parse(path_str))
-            if isinstance(target, Container):
-                result[id(target)] = value
+            target = self.container_index.container_at(path_str)
+            if target is not None:
+                result[target.ordinal] = value
         return result
 
     def to_dict(self) -> dict[str, Any]:
         """Serialize this state to a plain, JSON-safe dict.
 
         Every Container/Pointer reference is converted to a path string
-        (via _container_path()/resolve_path(), Section 8's shuffle-seed
-        helper repurposed here as the general container-addressing
-        mechanism), so the result contains only
+        (via the ContainerIndex — path strings rather than
+        Container.ordinal, so a save still resumes after the story is
+        recompiled with containers added elsewhere), so the result
+        contains only
         dicts/lists/str/int/float/bool/None — safe to round-trip through
         `json.dumps`/`json.loads` or a Django JSONField with no custom
         encoder, matching the plan's "Interpreter state shape" design.
@@ -3744,16 +4174,20 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         CONTROL_COMMAND_MARKERS branch instead of _handle_eval_run_command's
         real EVAL_OUTPUT handling.
 
+        Written in SAVE_FORMAT_VERSION's shape: fields still at
+        from_dict()'s own fallback value are left out (upgrade_state_dict()).
+
         Returns:
             The serialized state.
         """
-        return {
+        data = {
             "pointer": self._serialize_pointer(self.pointer),
             "previous_pointer": self._serialize_pointer(self.previous_pointer),
             "output_tokens": list(self.output.tokens),
-            "current_choices": [{"text": choice.text, "target_path": _container_path(choice.target)} for choice in self.current_choices],
-            "visit_counts": self._id_keyed_dict_to_path_keyed(self.visit_counts),
-            "visit_turns": self._id_keyed_dict_to_path_keyed(self.visit_turns),
+            "output_history": list(self.output.paragraphs),
+            "current_choices": [{"text": choice.text, "target_path": self.container_index.path_of(choice.target)} for choice in self.current_choices],
+            "visit_counts": self._ordinal_keyed_dict_to_path_keyed(self.visit_counts),
+            "visit_turns": self._ordinal_keyed_dict_to_path_keyed(self.visit_turns),
             "current_tags": list(self.current_tags),
             "done": self.done,
             "globals": {name: self._serialize_value(value) for name, value in self.globals.items()},
@@ -3778,9 +4212,17 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
             "string_capture_eval_depth": list(self._string_capture_eval_depth),
             "last_turn_text": self.last_turn_text,
         }
+        return upgrade_state_dict(data)
 
     @classmethod
-    def from_dict(cls, root: Container, data: dict[str, Any], list_defs: dict[str, dict[str, int]] | None = None) -> "InkRuntimeState":
+    def from_dict(
+        cls,
+        root: Container,
+        data: dict[str, Any],
+        list_defs: dict[str, dict[str, int]] | None = None,
+        container_index: ContainerIndex | None = None,
+        output_retention: int = DEFAULT_OUTPUT_RETENTION,
+    ) -> "InkRuntimeState":
         """Rebuild an InkRuntimeState from a to_dict() result.
 
         Args:
@@ -3791,7 +4233,9 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
                 not attempt any of that itself, matching to_dict()'s own
                 "path that no longer resolves is silently dropped"
                 degradation rather than raising).
-            data: A to_dict() result.
+            data: A to_dict() result, of any format version (the
+                fields format 2 leaves out fall back to the same values
+                the reads below already default to).
             list_defs: The story's LIST definitions, same as the
                 InkRuntimeState(root, list_defs) constructor's own
                 parameter — passed through so __init__'s normal
@@ -3799,22 +4243,28 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
                 _run_global_decl()) runs identically to a fresh
                 construction, before this method overwrites the fields
                 that actually hold save data.
+            container_index: A ContainerIndex over root, same as the
+                constructor's own parameter.
+            output_retention: Same as the constructor's own parameter. A
+                save from before output was flushed holds every token of
+                the playthrough; the completed part is flushed on load.
 
         Returns:
             A new InkRuntimeState with every field from data restored.
         """
-        state = cls(root, list_defs)
+        state = cls(root, list_defs, container_index, output_retention)
         state.pointer = state._deserialize_pointer(data.get("pointer"))
         state.previous_pointer = state._deserialize_pointer(data.get("previous_pointer"))
-        state.output = OutputStream()
-        state.output.tokens = list(data.get("output_tokens", []))
+        state.output = OutputStream(retain_paragraphs=output_retention)
+        state.output.paragraphs.extend(data.get("output_history", []))
+        state.output.load_tokens(list(data.get("output_tokens", [])))
         state.current_choices = []
         for choice_data in data.get("current_choices", []):
-            target = resolve_path(state.root, Path.parse(str(choice_data["target_path"])))
-            if isinstance(target, Container):
+            target = state.container_index.container_at(str(choice_data["target_path"]))
+            if target is not None:
                 state.current_choices.append(Choice(text=str(choice_data["text"]), target=target))
-        state.visit_counts = state._path_keyed_dict_to_id_keyed(data.get("visit_counts", {}))
-        state.visit_turns = state._path_keyed_dict_to_id_keyed(data.get("visit_turns", {}))
+        state.visit_counts = state._path_keyed_dict_to_ordinal_keyed(data.get("visit_counts", {}))
+        state.visit_turns = state._path_keyed_dict_to_ordinal_keyed(data.get("visit_turns", {}))
         state.current_tags = list(data.get("current_tags", []))
         state.done = bool(data.get("done", False))
         state.globals = {name: state._deserialize_value(value) for name, value in data.get("globals", {}).items()}
@@ -3841,11 +4291,11 @@ class InkRuntimeState:  # pylint: disable=too-many-instance-attributes
         state._pending_thread = bool(data.get("pending_thread", False))
         state._in_tag = bool(data.get("in_tag", False))
         state._tag_buffer = OutputStream()
-        state._tag_buffer.tokens = list(data.get("tag_buffer_tokens", []))
+        state._tag_buffer.load_tokens(list(data.get("tag_buffer_tokens", [])))
         state._string_capture_stack = []
         for tokens in data.get("string_capture_stack", []):
             capture = OutputStream()
-            capture.tokens = list(tokens)
+            capture.load_tokens(list(tokens))
             state._string_capture_stack.append(capture)
         # Falls back to _eval_run_depth (post-restore) for any entry a
         # pre-fix save blob doesn't have, rather than 0 — an all-zero
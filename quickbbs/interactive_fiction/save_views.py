@@ -21,7 +21,7 @@ from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_POST
 
 from interactive_fiction.models import CurrentGame, SaveState, Story, user_can_access
-from interactive_fiction.views import _load_game_state, _render_play_content
+from interactive_fiction.views import _can_undo, _load_game_state, _render_play_content
 
 
 @login_required
@@ -104,7 +104,7 @@ def saves_load(request: WSGIRequest, slug: str, slot: int) -> HttpResponse:
     left untouched, matching the plan's "loading never mutates the slot"
     design; only a subsequent explicit save overwrites it. Writes
     save_state.state verbatim (not state.to_dict()) so Step 8's
-    transcript/previous_state keys — which live alongside the engine's own
+    transcript/undo keys — which live alongside the engine's own
     serialized fields but aren't known to InkRuntimeState itself — survive
     the load instead of being silently dropped.
 
@@ -133,9 +133,7 @@ def saves_load(request: WSGIRequest, slug: str, slot: int) -> HttpResponse:
     current_game.save(update_fields=["state", "turn_count", "updated_at"])
 
     return HttpResponse(
-        _render_play_content(
-            request, story, state, transcript=save_state.state.get("transcript", []), can_undo=bool(save_state.state.get("previous_state"))
-        )
+        _render_play_content(request, story, state, transcript=save_state.state.get("transcript", []), can_undo=_can_undo(save_state.state))
     )
 
 
@@ -129,7 +129,7 @@ def story_cover(request: WSGIRequest, slug: str) -> HttpResponse:
 
     try:
         response = cover.file_index.new_ftnail.send_thumbnail(
-            filename_override=f"{story.slug}-cover.jpg", size="small", index_data_item=cover.file_index
+            filename_override=f"{story.slug}-cover.jpg", size="small", index_data_item=cover.file_index, accept=request.headers.get("Accept")
         )
     except ThumbnailGenerationError:
         return HttpResponse(status=404)
@@ -0,0 +1,128 @@
+"""Compiled story tree cache tests (interactive_fiction.engine.compile_story,
+ContainerIndex, interactive_fiction.views.get_compiled_story).
+
+One CompiledStory backs every game of a story in the process, so the
+properties that matter are that states created from it never see each
+other's playthrough, that ContainerIndex lookups agree with the
+parent-chain/resolve_path() answers they replace, and that the view-level
+cache rebuilds when the Story row changes.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path as FilePath
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from interactive_fiction import views
+from interactive_fiction.engine import (
+    Container,
+    ContainerIndex,
+    InkRuntimeState,
+    Path,
+    _container_path,
+    compile_story,
+    load_story_root,
+    resolve_path,
+)
+from interactive_fiction.models import Story
+
+FIXTURES = FilePath(__file__).parent / "fixtures"
+
+
+def _load(name: str) -> dict:
+    with open(FIXTURES / name, encoding="utf-8") as fixture_file:
+        return json.load(fixture_file)
+
+
+def _containers(container: Container):
+    yield container
+    for item in list(container.content) + list(container.named_content.values()):
+        if isinstance(item, Container):
+            yield from _containers(item)
+
+
+class ContainerIndexTests(SimpleTestCase):
+    """ContainerIndex answers match _container_path()/resolve_path()."""
+
+    def test_every_container_round_trips_through_its_path(self):
+        """path_of() matches _container_path() for every container, and
+        container_at() of that path returns the same container."""
+        root = load_story_root(_load("section5_tunnel_choice.ink.json"))
+        index = ContainerIndex(root)
+        for container in _containers(root):
+            path_str = index.path_of(container)
+            self.assertEqual(path_str, _container_path(container))
+            self.assertIs(index.container_at(path_str), resolve_path(root, Path.parse(path_str)))
+
+    def test_unknown_path_is_none(self):
+        """A path addressing nothing returns None rather than raising."""
+        index = ContainerIndex(load_story_root(_load("section1_simple.ink.json")))
+        self.assertIsNone(index.container_at("does_not_exist"))
+
+
+class CompiledStoryTests(SimpleTestCase):
+    """States created from one CompiledStory are independent."""
+
+    def test_shared_tree_keeps_playthroughs_apart(self):
+        """Choosing in one state leaves a second state of the same
+        CompiledStory at the opening choice point."""
+        compiled = compile_story(_load("section3_choices.ink.json"))
+        first = compiled.new_state()
+        second = compiled.new_state()
+        first.continue_story()
+        second.continue_story()
+
+        first.choose(0)
+        first_text = first.continue_story()
+
+        self.assertIn("north", first_text)
+        self.assertEqual(len(second.current_choices), 2)
+        self.assertIs(first.container_index, second.container_index)
+
+    def test_load_state_matches_from_dict(self):
+        """load_state() restores the same state as a from_dict() rebuild
+        against a freshly loaded tree."""
+        data = _load("section4_variables.ink.json")
+        compiled = compile_story(data)
+        state = compiled.new_state()
+        state.continue_story()
+        snapshot = json.loads(json.dumps(state.to_dict()))
+
+        restored = compiled.load_state(snapshot)
+        control = InkRuntimeState.from_dict(load_story_root(data), snapshot)
+
+        self.assertEqual(restored.to_dict(), control.to_dict())
+
+
+class GetCompiledStoryTests(TestCase):
+    """views.get_compiled_story() caches per (pk, updated_at, source_sha256)."""
+
+    def setUp(self):
+        views.compiled_story_cache.clear()
+        self.addCleanup(views.compiled_story_cache.clear)
+        owner = get_user_model().objects.create_user(username="ifcompiler", password="pw")
+        Story.objects.create(owner=owner, title="Choices", slug="compiled-story", compiled_json=_load("section3_choices.ink.json"))
+        self.story = Story.objects.defer("compiled_json").get(slug="compiled-story")
+
+    def test_hit_reuses_tree_without_loading_json(self):
+        """A second lookup returns the same CompiledStory without touching
+        the deferred compiled_json field."""
+        compiled = views.get_compiled_story(self.story)
+        again = Story.objects.defer("compiled_json").get(pk=self.story.pk)
+
+        with self.assertNumQueries(0):
+            self.assertIs(views.get_compiled_story(again), compiled)
+
+    def test_saved_story_is_rebuilt(self):
+        """Saving the Story row changes updated_at and so the cache key."""
+        compiled = views.get_compiled_story(self.story)
+        self.story.title = "Renamed"
+        self.story.save(update_fields=["title", "updated_at"])
+
+        with mock.patch.object(views, "compile_story", wraps=compile_story) as compile_mock:
+            self.assertIsNot(views.get_compiled_story(self.story), compiled)
+        compile_mock.assert_called_once()
@@ -0,0 +1,62 @@
+"""
+Tests for the Ink engine benchmark harness (interactive_fiction/benchmarks/).
+
+Runs the synthetic story generator and a short soak, so the harness keeps
+working as the engine changes.
+"""
+
+from __future__ import annotations
+
+from django.test import SimpleTestCase
+
+from interactive_fiction.benchmarks.if_engine_benchmarks import (
+    generate_story,
+    percentile,
+    run_benchmarks,
+)
+from interactive_fiction.engine import compile_story
+
+
+class SyntheticStoryTests(SimpleTestCase):
+    """generate_story() builds a playable story of the requested shape."""
+
+    def test_turn_runs_variables_tunnels_and_choices(self):
+        state = compile_story(generate_story(knots=5, choices=2, variables=1, tunnel_depth=2)).new_state()
+
+        text = state.continue_story()
+
+        assert text.splitlines() == ["Room 0.", "Counter 1", "Passing tunnel 0.", "Passing tunnel 1."]
+        assert [choice.text for choice in state.current_choices] == ["Go to room 0", "Go to room 1"]
+        assert not state.call_stack[1:]
+
+    def test_same_seed_builds_same_story(self):
+        assert generate_story(20, 3, 4, 1, seed=7) == generate_story(20, 3, 4, 1, seed=7)
+        assert generate_story(20, 3, 4, 1, seed=7) != generate_story(20, 3, 4, 1, seed=8)
+
+    def test_no_variables_or_tunnels(self):
+        state = compile_story(generate_story(knots=2, choices=1, variables=0, tunnel_depth=0)).new_state()
+
+        assert state.continue_story() == "Room 0.\n"
+        assert len(state.current_choices) == 1
+
+
+class RunBenchmarksTests(SimpleTestCase):
+    """run_benchmarks() soaks the story and reports comparable results."""
+
+    def test_short_soak(self):
+        results = run_benchmarks(knots=10, choices=2, variables=3, tunnel_depth=2, turns=30, load_iterations=2)
+
+        assert results["total"]["requests"] == 30
+        assert results["total"]["failures"] == 0
+        assert set(results["endpoints"]) == {"load", "restore", "choose", "step", "save"}
+        assert results["endpoints"]["load"]["requests"] == 2
+        assert results["story"]["containers"] > 10
+        assert results["memory"]["soak_peak_bytes"] > 0
+        assert results["memory"]["save_last_bytes"] > 0
+
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 0.95) == 95.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.5) == 0.0
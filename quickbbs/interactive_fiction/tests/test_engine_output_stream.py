@@ -178,3 +178,53 @@ class RealCompiledStoryTests(SimpleTestCase):
             "One Two Three, three glues on one line.\n"
         )
         self.assertEqual(stream.get_text(), expected)
+
+
+class FlushingStreamTests(SimpleTestCase):
+    """A stream created with retain_paragraphs flushes completed
+    paragraphs out of its tokens without changing the text it produces."""
+
+    TOKENS = ["One.", NEWLINE, "Two ", GLUE, NEWLINE, " joined.", NEWLINE, "  Three   spaced.", NEWLINE, "Four."]
+
+    def test_same_text_as_an_unbounded_stream(self):
+        """get_text() with every paragraph retained matches a stream that
+        never flushes, while tokens only holds the open paragraph."""
+        unbounded = OutputStream()
+        flushing = OutputStream(retain_paragraphs=10)
+        _push_all(unbounded, self.TOKENS)
+        _push_all(flushing, self.TOKENS)
+
+        self.assertEqual(flushing.get_text(), unbounded.get_text())
+        self.assertEqual(flushing.tokens, ["Four."])
+        self.assertEqual(flushing.position, len(unbounded.tokens))
+
+    def test_ring_buffer_keeps_newest_paragraphs(self):
+        """Only the newest retain_paragraphs flushed paragraphs are kept."""
+        stream = OutputStream(retain_paragraphs=1)
+        _push_all(stream, self.TOKENS)
+        self.assertEqual(list(stream.paragraphs), ["Three spaced.\n"])
+
+    def test_turn_text_spans_flushed_paragraphs(self):
+        """turn_text() covers everything since begin_turn(), including
+        paragraphs already flushed out of tokens (with none retained)."""
+        unbounded = OutputStream()
+        flushing = OutputStream(retain_paragraphs=0)
+        _push_all(unbounded, self.TOKENS[:2])
+        _push_all(flushing, self.TOKENS[:2])
+        start = len(unbounded.tokens)
+        flushing.begin_turn()
+        _push_all(unbounded, self.TOKENS[2:])
+        _push_all(flushing, self.TOKENS[2:])
+
+        turn_stream = OutputStream()
+        turn_stream.load_tokens(unbounded.tokens[start:])
+        self.assertEqual(flushing.turn_text(), turn_stream.get_text())
+        self.assertEqual(list(flushing.paragraphs), [])
+
+    def test_glue_still_trims_the_unflushed_newline(self):
+        """A paragraph's closing newline stays in tokens until real text
+        follows it, so glue arriving first can still remove it."""
+        stream = OutputStream(retain_paragraphs=10)
+        _push_all(stream, ["One.", NEWLINE, "Two", NEWLINE, GLUE, " more."])
+        self.assertEqual(stream.get_text(), "One.\nTwo more.")
+        self.assertEqual(list(stream.paragraphs), ["One.\n"])
@@ -18,11 +18,16 @@ from pathlib import Path as FilePath
 from django.test import SimpleTestCase
 
 from interactive_fiction.engine import (
+    SAVE_FORMAT_VERSION,
+    ContainerIndex,
     InkRuntimeState,
     ListValue,
     ResolvedDivertTarget,
+    apply_state_delta,
     load_list_defs,
     load_story_root,
+    state_delta,
+    upgrade_state_dict,
 )
 
 FIXTURES = FilePath(__file__).parent / "fixtures"
@@ -188,3 +193,70 @@ class MissingContainerDegradationTests(SimpleTestCase):
         root = load_story_root(data)
         state = InkRuntimeState.from_dict(root, {"current_choices": [{"text": "Ghost choice", "target_path": "does_not_exist"}]})
         self.assertEqual(state.current_choices, [])
+
+
+class ContainerOrdinalTests(SimpleTestCase):
+    """Visit counters are keyed by Container.ordinal, which is the same
+    number for the same container in every load of the same JSON."""
+
+    def test_ordinals_match_across_separate_loads(self):
+        """Two independently loaded trees number their containers
+        identically, path for path."""
+        data = _load("section5_tunnel_choice.ink.json")
+        first = ContainerIndex(load_story_root(data))
+        second = ContainerIndex(load_story_root(data))
+        self.assertEqual(first.paths, second.paths)
+        self.assertEqual([container.ordinal for container in first.containers], list(range(len(first.containers))))
+
+    def test_visit_counts_round_trip_through_paths(self):
+        """Ordinal-keyed visit counts serialize by path and restore onto
+        the same ordinals of a freshly loaded tree."""
+        data = _load("section3_gather_loop.ink.json")
+        state = InkRuntimeState(load_story_root(data))
+        state.continue_story()
+        state.choose(0)
+        state.continue_story()
+
+        restored = _round_trip(state, load_story_root(data))
+
+        self.assertTrue(state.visit_counts)
+        self.assertEqual(restored.visit_counts, state.visit_counts)
+        self.assertEqual(set(state.to_dict()["visit_counts"]), {state.container_index.paths[o] for o in state.visit_counts})
+
+
+class SaveFormatTests(SimpleTestCase):
+    """to_dict()'s format 2 shape, the format 1 reader and undo deltas."""
+
+    def test_default_valued_fields_are_left_out(self):
+        """A fresh state's dict carries the format version and omits the
+        fields still holding from_dict()'s fallback values."""
+        data = InkRuntimeState(load_story_root(_load("section1_simple.ink.json"))).to_dict()
+        self.assertEqual(data["format"], SAVE_FORMAT_VERSION)
+        self.assertNotIn("eval_stack", data)
+        self.assertNotIn("call_stack", data)
+        self.assertIn("story_seed", data)
+
+    def test_format_1_dict_resumes_identically(self):
+        """A dict with every field written out (format 1) upgrades to
+        exactly the format 2 dict and resumes to the same choices."""
+        data = _load("section3_choices.ink.json")
+        state = InkRuntimeState(load_story_root(data))
+        state.continue_story()
+        current = state.to_dict()
+        legacy = {**{key: value for key, value in current.items() if key != "format"}, "eval_stack": [], "temps": {}, "call_stack": []}
+
+        self.assertEqual(upgrade_state_dict(legacy), current)
+        resumed = InkRuntimeState.from_dict(load_story_root(data), legacy)
+        self.assertEqual([choice.text for choice in resumed.current_choices], [choice.text for choice in state.current_choices])
+
+    def test_delta_round_trips_shifted_list(self):
+        """A capped transcript one turn older (one more oldest entry, one
+        fewer newest) is stored as a slice, not a copy."""
+        current = {"turn_count": 5, "transcript": ["b", "c", "d", "e"], "done": True}
+        previous = {"turn_count": 4, "transcript": ["a", "b", "c", "d"], "temps": {"x": 1}}
+
+        delta = state_delta(current, previous)
+
+        self.assertEqual(delta["slices"], {"transcript": [["a"], 3]})
+        self.assertEqual(delta["unset"], ["done"])
+        self.assertEqual(apply_state_delta(current, delta), previous)
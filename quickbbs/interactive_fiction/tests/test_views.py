@@ -794,6 +794,83 @@ class PlayUndoRestartTranscriptTests(TestCase):
         self.assertIn(b"Hello, traveler.", response.content)
 
 
+class UndoChainFormatTests(TestCase):
+    """CurrentGame.state["undo"] delta chain, MAX_UNDO_TURNS, and reading
+    rows saved in the nested "previous_state" format."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(username="undochainuser", password="pw")
+        with open(FIXTURES / "section3_gather_loop.ink.json", encoding="utf-8") as f:
+            compiled_json = json.load(f)
+        self.story = Story.objects.create(owner=self.user, title="Loop", slug="loop-story", compiled_json=compiled_json, is_public=True)
+        self.client.force_login(self.user)
+        self.client.get(f"/if/{self.story.slug}/", secure=True)
+
+    def _choose_first(self):
+        current_game = CurrentGame.objects.get(user=self.user, story=self.story)
+        return self.client.post(f"/if/{self.story.slug}/play/", {"choice": 0, "turn_count": current_game.turn_count}, secure=True)
+
+    def _undo(self):
+        return self.client.post(f"/if/{self.story.slug}/undo/", secure=True)
+
+    def test_undo_walks_back_through_every_turn(self):
+        """Two turns played store delta undo steps (no nested full copy),
+        and two undos walk back to the opening turn."""
+        self._choose_first()
+        self._choose_first()
+        stored = CurrentGame.objects.get(user=self.user, story=self.story).state
+        self.assertNotIn("previous_state", stored)
+        self.assertNotIn("transcript", stored["undo"].get("set", {}))
+
+        self.assertEqual(self._undo().status_code, 200)
+        response = self._undo()
+
+        self.assertIn(b"Look around", response.content)
+        self.assertEqual(self._undo().status_code, 400)
+
+    def test_submit_response_carries_only_the_latest_turn(self):
+        """play_submit() renders the new turn plus the one it supersedes
+        (appended to the transcript out of band), not every past turn."""
+        first = self._choose_first()
+        second = self._choose_first()
+
+        self.assertIn(b'id="if-story-transcript-slot" hx-swap-oob="true"', first.content)
+        self.assertIn(b'hx-swap-oob="beforeend:#if-story-transcript"', second.content)
+        self.assertEqual(second.content.count(b"You are in a room."), 1)
+        self.assertIn(b"You step outside.", second.content)
+        self.assertNotIn(b'id="if-play-content"', second.content)
+
+    @override_settings(MAX_UNDO_TURNS=1)
+    def test_undo_chain_is_capped(self):
+        """Only MAX_UNDO_TURNS turns can be undone."""
+        self._choose_first()
+        self._choose_first()
+
+        self.assertEqual(self._undo().status_code, 200)
+        self.assertEqual(self._undo().status_code, 400)
+
+    def test_nested_previous_state_row_is_still_undoable(self):
+        """A row in the pre-format-2 shape (every field written, the undo
+        target a full nested copy) resumes and undoes to its opening turn."""
+        self._choose_first()
+        current_game = CurrentGame.objects.get(user=self.user, story=self.story)
+        opening = self.client.post(f"/if/{self.story.slug}/undo/", secure=True)
+        self.assertEqual(opening.status_code, 200)
+        opening_state = CurrentGame.objects.get(pk=current_game.pk).state
+        legacy_opening = {key: value for key, value in opening_state.items() if key != "format"}
+        legacy_opening.setdefault("eval_stack", [])
+        legacy_state = {key: value for key, value in current_game.state.items() if key not in ("format", "undo")}
+        CurrentGame.objects.filter(pk=current_game.pk).update(state={**legacy_state, "previous_state": legacy_opening})
+
+        self.assertEqual(self.client.get(f"/if/{self.story.slug}/", secure=True).status_code, 200)
+        response = self._undo()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Look around", response.content)
+        self.assertEqual(CurrentGame.objects.get(pk=current_game.pk).state["format"], 2)
+
+
 class PreferencesViewTests(TestCase):
     """GET/POST /if/preferences/ — Step 8: reader display preferences."""
 
@@ -12,8 +12,8 @@ play_submit() enforces the concurrent-tab guard described in the plan (a
 stale tab's submitted turn_count no longer matching the stored row is
 rejected rather than silently applied). play_undo()/play_restart() (Step 8)
 and the library's play-status annotations (Step 7) build on the same
-CurrentGame.state shape, with "transcript"/"previous_state" layered on top
-of InkRuntimeState's own serialized fields (see _build_current_game_state()).
+CurrentGame.state shape, with "transcript"/"undo" layered on top of
+InkRuntimeState's own serialized fields (see _build_current_game_state()).
 
 Story upload/authoring (Step 4/5: upload(), edit(), story_image(),
 story_cover()) lives in story_views.py; named save-slot management (Step 3:
@@ -39,7 +39,15 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views.decorators.http import require_POST
 
-from interactive_fiction.engine import InkRuntimeState, load_list_defs, load_story_root
+from interactive_fiction.engine import (
+    SAVE_FORMAT_VERSION,
+    CompiledStory,
+    InkRuntimeState,
+    apply_state_delta,
+    compile_story,
+    state_delta,
+    upgrade_state_dict,
+)
 from interactive_fiction.ingestion import find_inkj_file_by_path
 from interactive_fiction.models import (
     CurrentGame,
@@ -49,6 +57,7 @@ from interactive_fiction.models import (
     user_can_access,
 )
 from quickbbs.common import require_login_if_configured
+from quickbbs.MonitoredCache import create_cache
 from user_preferences.models import UserPreferences
 
 # Mirrors UserPreferences.if_font_size/if_text_width's own `choices=`
@@ -63,6 +72,34 @@ _VALID_IF_TEXT_WIDTHS = {"narrow", "medium", "wide"}
 if TYPE_CHECKING:
     from django.contrib.auth.models import AbstractUser, AnonymousUser
 
+# Compiled story trees (CompiledStory: container tree, LIST definitions, path
+# index), shared read-only by every request and thread of this process.
+# Cache key: (story.pk, story.updated_at, story.source_sha256) — every edit or
+# re-ingest saves a new updated_at, so an outdated tree is never looked up again.
+compiled_story_cache = create_cache(settings.COMPILED_STORY_CACHE_SIZE, "compiled_story", monitored=settings.CACHE_MONITORING)
+
+
+def get_compiled_story(story: Story) -> CompiledStory:
+    """Return a story's CompiledStory, parsing compiled_json only on a cache miss.
+
+    Play views fetch Story with compiled_json deferred, so a hit costs no
+    JSON decoding at all; a miss loads the field and builds the tree once
+    for this process.
+
+    Args:
+        story: The story (compiled_json may be deferred).
+
+    Returns:
+        The shared CompiledStory. Callers must keep all per-game state on
+        the InkRuntimeState it creates, never on the tree.
+    """
+    key = (story.pk, story.updated_at, story.source_sha256)
+    compiled = compiled_story_cache.get(key)
+    if compiled is None:
+        compiled = compile_story(story.compiled_json)
+        compiled_story_cache[key] = compiled
+    return compiled
+
 
 def _new_game_state(story: Story) -> InkRuntimeState:
     """Build a fresh InkRuntimeState for a story, run to its first stop point.
@@ -74,9 +111,7 @@ def _new_game_state(story: Story) -> InkRuntimeState:
         A new InkRuntimeState, already advanced through its first
         continue_story() call so it's ready to display.
     """
-    root = load_story_root(story.compiled_json)
-    list_defs = load_list_defs(story.compiled_json)
-    state = InkRuntimeState(root, list_defs)
+    state = get_compiled_story(story).new_state(output_retention=settings.STORY_OUTPUT_RETENTION_PARAGRAPHS)
     state.continue_story()
     return state
 
@@ -90,7 +125,7 @@ def _load_game_state(story: Story, saved: CurrentGame | SaveState | dict[str, An
         saved: The stored row (either model — both carry a `state`
             JSONField holding an InkRuntimeState.to_dict() result in the
             identical shape) or a raw state dict directly (Step 8's
-            play_undo() passes CurrentGame.state["previous_state"] this way
+            play_undo() passes _previous_game_state()'s result this way
             — it's already the same shape, with no row to wrap it in).
 
     Returns:
@@ -101,10 +136,8 @@ def _load_game_state(story: Story, saved: CurrentGame | SaveState | dict[str, An
         (detecting this and recovering to the nearest valid point) is
         Step 4 scope, not attempted here.
     """
-    root = load_story_root(story.compiled_json)
-    list_defs = load_list_defs(story.compiled_json)
     raw_state = saved if isinstance(saved, dict) else saved.state
-    return InkRuntimeState.from_dict(root, raw_state, list_defs)
+    return get_compiled_story(story).load_state(raw_state, output_retention=settings.STORY_OUTPUT_RETENTION_PARAGRAPHS)
 
 
 _MEDIA_TAG_URL_NAMES = {"image:": "if_story_image", "video:": "if_story_video"}
@@ -166,7 +199,7 @@ def _play_content_context(
         transcript: Step 8's rolling turn history (oldest first), or None
             if the caller has none to show (e.g. a fresh CurrentGame row
             that hasn't been through _build_current_game_state() yet).
-        can_undo: Whether a "previous_state" exists to undo back to
+        can_undo: Whether an "undo" target exists to go back to
             (Step 8) — False for a story's very first turn.
 
     Returns:
@@ -213,26 +246,58 @@ def _render_play_content(
     )
 
 
+def _render_play_turn(request: WSGIRequest, story: Story, state: InkRuntimeState, *, transcript: list[dict[str, object]], can_undo: bool) -> str:
+    """Render only what the latest turn changed (play_submit()'s response).
+
+    The new turn replaces the current-turn block, and the turn it
+    supersedes is appended to the page's transcript out of band — the
+    past turns already on the page are not rendered or sent again.
+
+    Args:
+        request: The incoming request.
+        story: The story being played.
+        state: The InkRuntimeState after the turn.
+        transcript: The updated transcript (its last entry is this turn).
+        can_undo: See _play_content_context().
+
+    Returns:
+        The rendered partial HTML.
+    """
+    return render_to_string(
+        "interactive_fiction/play_turn_delta.jinja",
+        _play_content_context(request, story, state, transcript=transcript, can_undo=can_undo),
+        request=request,
+        using="Jinja2",
+    )
+
+
 def _build_current_game_state(
     state: InkRuntimeState, previous_raw_state: dict[str, Any] | None, transcript: list[dict[str, object]]
 ) -> dict[str, Any]:
     """Build the dict written into CurrentGame.state, layering Step 8's
     presentation-history keys on top of InkRuntimeState.to_dict().
 
-    "transcript" and "previous_state" are QuickBBS-level bookkeeping, not
-    engine state — InkRuntimeState.to_dict()/from_dict() know nothing about
-    them (from_dict() ignores unrecognized keys via its own data.get()
-    reads, and to_dict() naturally omits them), so this function is the one
+    "transcript" and "undo" are QuickBBS-level bookkeeping, not engine
+    state — InkRuntimeState.to_dict()/from_dict() know nothing about them
+    (from_dict() ignores unrecognized keys via its own data.get() reads,
+    and to_dict() naturally omits them), so this function is the one
     place that layers them onto the engine's own serialized dict before it
     goes to the database, and _load_game_state()/the views read them back
     out of the same dict by key.
 
+    "undo" holds the previous turn's dict as a state_delta() against this
+    one rather than a full copy: a full copy nested its own previous turn,
+    and so on back to the start, so every turn played re-wrote the whole
+    history (each level with its own transcript). The delta carries the
+    previous turn's own "undo" along, so undo still walks back one turn at
+    a time, up to MAX_UNDO_TURNS turns.
+
     Args:
         state: The current InkRuntimeState, already advanced to this turn.
         previous_raw_state: The raw dict CurrentGame.state held *before*
             this turn was applied (i.e. before calling state.choose()) —
-            stored verbatim so Undo can restore it exactly, including its
-            own transcript/previous_state keys. None for a fresh game (no
+            kept (as a delta) so Undo can restore it exactly, including
+            its own transcript/undo keys. None for a fresh game (no
             undo target yet).
         transcript: The rolling list of past turns (see
             _append_transcript_entry()), already capped.
@@ -242,10 +307,98 @@ def _build_current_game_state(
     """
     data = state.to_dict()
     data["transcript"] = transcript
-    data["previous_state"] = previous_raw_state
+    if previous_raw_state:
+        data["undo"] = _cap_undo_chain(state_delta(data, _upgrade_game_state(previous_raw_state)))
     return data
 
 
+def _cap_undo_chain(delta: dict[str, Any]) -> dict[str, Any]:
+    """Drop the undo steps past MAX_UNDO_TURNS from a new turn's undo delta.
+
+    Each delta holds the next older one as its "undo" value; the chain is
+    copied down to the cut rather than edited in place, since its older
+    levels are shared with the dict being replaced.
+
+    Args:
+        delta: The state_delta() back to the previous turn.
+
+    Returns:
+        The delta, with at most MAX_UNDO_TURNS - 1 older levels below it.
+    """
+    capped = dict(delta)
+    level = capped
+    for _ in range(settings.MAX_UNDO_TURNS - 1):
+        older = level.get("set", {}).get("undo")
+        if older is None:
+            return capped
+        level["set"] = {**level["set"], "undo": dict(older)}
+        level = level["set"]["undo"]
+    if "undo" in level.get("set", {}):
+        level["set"] = {key: value for key, value in level["set"].items() if key != "undo"}
+    return capped
+
+
+def _upgrade_game_state(raw_state: dict[str, Any]) -> dict[str, Any]:
+    """Read a CurrentGame/SaveState.state dict of any save format as the current one.
+
+    The migration reader for rows written before SAVE_FORMAT_VERSION 2,
+    which kept the undo target as a full copy of the previous turn's dict
+    under "previous_state" (holding its own, one level deeper per turn
+    played). That chain is walked iteratively — it can be hundreds of
+    levels deep — and rebuilt oldest first as "undo" deltas, keeping the
+    newest MAX_UNDO_TURNS turns.
+
+    Args:
+        raw_state: The stored dict, format 1 or 2.
+
+    Returns:
+        raw_state itself if already current, else a new format 2 dict.
+    """
+    if raw_state.get("format") == SAVE_FORMAT_VERSION:
+        return raw_state
+    chain = []
+    level: dict[str, Any] | None = raw_state
+    while level and len(chain) <= settings.MAX_UNDO_TURNS:
+        chain.append(level)
+        level = level.get("previous_state")
+    upgraded: dict[str, Any] = {}
+    for level in reversed(chain):
+        body = upgrade_state_dict({key: value for key, value in level.items() if key != "previous_state"})
+        if upgraded:
+            body["undo"] = state_delta(body, upgraded)
+        upgraded = body
+    return upgraded
+
+
+def _previous_game_state(raw_state: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the stored dict of the turn before raw_state's, for Undo.
+
+    Args:
+        raw_state: A CurrentGame/SaveState.state dict, format 1 or 2.
+
+    Returns:
+        The previous turn's dict (with its own "undo", if any), or None
+        if there is nothing to undo.
+    """
+    raw_state = _upgrade_game_state(raw_state)
+    delta = raw_state.get("undo")
+    if delta is None:
+        return None
+    return apply_state_delta({key: value for key, value in raw_state.items() if key != "undo"}, delta)
+
+
+def _can_undo(raw_state: dict[str, Any]) -> bool:
+    """Return whether a stored game dict has a turn to undo back to.
+
+    Args:
+        raw_state: A CurrentGame/SaveState.state dict, format 1 or 2.
+
+    Returns:
+        True if it holds an undo delta (or, format 1, a previous_state).
+    """
+    return raw_state.get("undo") is not None or bool(raw_state.get("previous_state"))
+
+
 def _append_transcript_entry(transcript: list[dict[str, object]], text: str, chosen_label: str | None) -> list[dict[str, object]]:
     """Append one turn to a transcript list, capped at MAX_TRANSCRIPT_TURNS.
 
@@ -395,7 +548,7 @@ def play(request: WSGIRequest, slug: str) -> HttpResponse:
     Raises:
         Http404: If no accessible Story matches slug (via get_object_or_404).
     """
-    story = get_object_or_404(Story, slug=slug, is_available=True)
+    story = get_object_or_404(Story.objects.defer("compiled_json"), slug=slug, is_available=True)
     if not user_can_access(story, request.user):
         return HttpResponse(status=403)
 
@@ -414,9 +567,7 @@ def play(request: WSGIRequest, slug: str) -> HttpResponse:
         transcript = current_game.state.get("transcript", [])
 
     user_prefs, _created = UserPreferences.objects.get_or_create(user=request.user)
-    context = _play_content_context(
-        request, story, state, transcript=transcript, can_undo=bool(current_game and current_game.state.get("previous_state"))
-    )
+    context = _play_content_context(request, story, state, transcript=transcript, can_undo=bool(current_game and _can_undo(current_game.state)))
     context["if_font_size"] = user_prefs.if_font_size
     context["if_text_width"] = user_prefs.if_text_width
     context["gallery_item_sha256"] = _source_gallery_item_sha256(story)
@@ -446,7 +597,8 @@ def play_submit(request: WSGIRequest, slug: str) -> HttpResponse:
         slug: The story's slug.
 
     Returns:
-        The rendered play-content partial for the new turn, a 409
+        The rendered turn-delta partial for the new turn (see
+        _render_play_turn()), a 409
         Conflict partial if the concurrent-tab guard rejects the
         submission, or a plain error response for a malformed/out-of
         -range choice.
@@ -454,7 +606,7 @@ def play_submit(request: WSGIRequest, slug: str) -> HttpResponse:
     Raises:
         Http404: If no accessible Story matches slug.
     """
-    story = get_object_or_404(Story, slug=slug, is_available=True)
+    story = get_object_or_404(Story.objects.defer("compiled_json"), slug=slug, is_available=True)
     if not user_can_access(story, request.user):
         return HttpResponse(status=403)
 
@@ -490,7 +642,7 @@ def play_submit(request: WSGIRequest, slug: str) -> HttpResponse:
         current_game.turn_count = state.turn_count
         current_game.save(update_fields=["state", "turn_count", "updated_at"])
 
-    return HttpResponse(_render_play_content(request, story, state, transcript=transcript, can_undo=True))
+    return HttpResponse(_render_play_turn(request, story, state, transcript=transcript, can_undo=True))
 
 
 @login_required
@@ -498,13 +650,13 @@ def play_submit(request: WSGIRequest, slug: str) -> HttpResponse:
 def play_undo(request: WSGIRequest, slug: str) -> HttpResponse:
     """Undo the last choice, restoring CurrentGame to its previous turn (Step 8).
 
-    One level only — the restored row's own "previous_state" (whatever it
-    held before *that* turn) becomes the new undo target, so a second
+    One level only — the restored row's own "undo" (whatever it held
+    before *that* turn) becomes the new undo target, so a second
     consecutive undo continues walking backward one turn at a time rather
-    than jumping straight back to the start; there is no bounded history
-    stack. A game with no previous_state (the very first turn) has nothing
-    to undo, so the request is rejected with 400 rather than silently
-    doing nothing.
+    than jumping straight back to the start, as far back as
+    MAX_UNDO_TURNS turns. A game with no undo target (the very first
+    turn) has nothing to undo, so the request is rejected with 400 rather
+    than silently doing nothing.
 
     Args:
         request: The incoming request.
@@ -517,14 +669,14 @@ def play_undo(request: WSGIRequest, slug: str) -> HttpResponse:
     Raises:
         Http404: If no accessible Story or CurrentGame exists.
     """
-    story = get_object_or_404(Story, slug=slug, is_available=True)
+    story = get_object_or_404(Story.objects.defer("compiled_json"), slug=slug, is_available=True)
     if not user_can_access(story, request.user):
         return HttpResponse(status=403)
 
     with transaction.atomic():
         current_game = get_object_or_404(CurrentGame.objects.select_for_update(), user=request.user, story=story)
-        previous_raw_state = current_game.state.get("previous_state")
-        if not previous_raw_state:
+        previous_raw_state = _previous_game_state(current_game.state)
+        if previous_raw_state is None:
             return HttpResponse(status=400)
 
         state = _load_game_state(story, previous_raw_state)
@@ -533,9 +685,7 @@ def play_undo(request: WSGIRequest, slug: str) -> HttpResponse:
         current_game.save(update_fields=["state", "turn_count", "updated_at"])
 
     return HttpResponse(
-        _render_play_content(
-            request, story, state, transcript=previous_raw_state.get("transcript", []), can_undo=bool(previous_raw_state.get("previous_state"))
-        )
+        _render_play_content(request, story, state, transcript=previous_raw_state.get("transcript", []), can_undo=_can_undo(previous_raw_state))
     )
 
 
@@ -560,7 +710,7 @@ def play_restart(request: WSGIRequest, slug: str) -> HttpResponse:
     Raises:
         Http404: If no accessible Story matches slug.
     """
-    story = get_object_or_404(Story, slug=slug, is_available=True)
+    story = get_object_or_404(Story.objects.defer("compiled_json"), slug=slug, is_available=True)
     if not user_can_access(story, request.user):
         return HttpResponse(status=403)
 
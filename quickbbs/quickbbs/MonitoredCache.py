@@ -107,6 +107,20 @@ class _ThreadSafeCacheMixin(Cache):
         with self._rlock:
             return iter(list(super().__iter__()))
 
+    def peek_items(self) -> list[tuple[Any, Any]]:
+        """
+        Snapshot all (key, value) pairs without side effects (atomic).
+
+        Reads through cachetools' base Cache.__getitem__, bypassing the LRU
+        recency update and the MonitoredLRUCache hit counter, so scanning a
+        cache for invalidation does not make every entry look freshly used.
+
+        Returns:
+            List of (key, value) tuples
+        """
+        with self._rlock:
+            return [(key, Cache.__getitem__(self, key)) for key in super().__iter__()]
+
     # -- compound operations (check-then-act) --------------------------
 
     def get(self, key: Any, default: Any = None) -> Any:
@@ -5,13 +5,22 @@ import time
 from dbtasks.models import ScheduledTask
 from django.contrib import admin
 from django.db import transaction
+from django.db.models import F
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 from django.tasks import TaskResultStatus
 from django.utils import timezone
 from django.utils.html import format_html
 
-from quickbbs.models import DirectoryIndex, Favorite, FileIndex, Owners
+from quickbbs.models import (
+    DirectoryIndex,
+    DirectoryRollup,
+    Favorite,
+    FileIndex,
+    MediaProbe,
+    Owners,
+    SearchDocument,
+)
 from quickbbs.tasks import get_vacuum_candidates
 from thumbnails.models import ThumbnailFiles
 
@@ -88,6 +97,7 @@ class AdminMasterIndex(admin.ModelAdmin):
                 obj.new_ftnail.small_thumb,
                 obj.new_ftnail.medium_thumb,
                 obj.new_ftnail.large_thumb,
+                obj.new_ftnail.blobs_in_store,
             ]
         ):
             return True
@@ -208,6 +218,8 @@ class AdminMasterDirs(admin.ModelAdmin):
                 small_thumb=None,
                 medium_thumb=None,
                 large_thumb=None,
+                blobs_in_store=False,
+                generation=F("generation") + 1,
             )
 
             # Mark the directories as invalidated in the cache system with one
@@ -240,6 +252,36 @@ class AdminFavorite(admin.ModelAdmin):
     readonly_fields = ("created",)
 
 
+@admin.register(MediaProbe)
+class AdminMediaProbe(admin.ModelAdmin):
+    """Admin configuration for MediaProbe (stored video/audio stream metadata)."""
+
+    list_display = ("file_sha256", "duration", "width", "height", "video_codec", "audio_codec", "probe_failed")
+    list_filter = ["probe_failed", "video_codec", "audio_codec"]
+    search_fields = ["file_sha256"]
+    ordering = ["-duration"]
+
+
+@admin.register(DirectoryRollup)
+class AdminDirectoryRollup(admin.ModelAdmin):
+    """Admin configuration for DirectoryRollup (precomputed recursive directory totals)."""
+
+    list_display = ("directory", "filetype", "file_count", "total_bytes", "newest_mtime", "direct_count")
+    list_filter = ["filetype"]
+    search_fields = ["directory__fqpndirectory"]
+    raw_id_fields = ("directory",)
+
+
+@admin.register(SearchDocument)
+class AdminSearchDocument(admin.ModelAdmin):
+    """Admin configuration for SearchDocument (indexed file text and metadata)."""
+
+    list_display = ("file_sha256", "title", "author", "extract_failed", "indexed_at")
+    list_filter = ["extract_failed"]
+    search_fields = ["file_sha256", "title", "author", "keywords"]
+    exclude = ("search_vector",)
+
+
 _original_admin_index = admin.site.index
 
 
@@ -27,7 +27,8 @@ class QuickbbsConfig(AppConfig):
         Only runs for server commands (runserver/runserver_plus dev reloader
         child, or production ASGI/WSGI workers), not for management commands
         like migrate/shell/scan — mirrors the gating used in
-        cache_watcher.apps.cache_startup.ready().
+        cache_watcher.apps.cache_startup.ready(). Test runs never start the
+        cache bus listener.
 
         Returns:
             None
@@ -38,8 +39,15 @@ class QuickbbsConfig(AppConfig):
         is_manage_py = sys.argv[0].endswith("manage.py") and len(sys.argv) > 1
         is_dev_server_cmd = is_manage_py and sys.argv[1] in ("runserver", "runserver_plus")
         is_other_management_cmd = is_manage_py and not is_dev_server_cmd
+        is_test_run = "pytest" in sys.modules
 
         if is_other_management_cmd:
+            # The taskrunner is long-lived and holds its own caches, so it
+            # listens for invalidations like a web worker; one-shot commands
+            # (scan, migrate, shell) only ever publish.
+            if sys.argv[1] == "taskrunner":
+                self._start_cache_bus()
+                self._select_cli_sha_backend()
             return
 
         if is_dev_server_cmd:
@@ -49,6 +57,11 @@ class QuickbbsConfig(AppConfig):
 
         self._check_ssl_cert_expiry()
         self._reconcile_cache_statistics()
+        # Tests serve no requests from other processes; a listener there only
+        # holds a LISTEN connection and logs reconnect errors at teardown.
+        # Bus tests start their own InvalidationBus instances.
+        if not is_test_run:
+            self._start_cache_bus()
 
     @staticmethod
     def _register_scheduled_task_admin() -> None:
@@ -107,6 +120,40 @@ class QuickbbsConfig(AppConfig):
         except Exception:  # pylint: disable=broad-exception-caught
             logger.exception("SSL certificate startup check failed")
 
+    @staticmethod
+    def _start_cache_bus() -> None:
+        """Start this process's cross-process cache invalidation listener.
+
+        Every web worker runs its own listener (unlike the watchdog, which
+        runs in exactly one worker) — each worker holds its own LRU caches.
+        Starting the listener thread touches no database connection: the
+        PostgreSQL transport opens its dedicated LISTEN connection on the
+        listener thread itself.
+        """
+        from quickbbs.cache_bus import (  # pylint: disable=import-outside-toplevel
+            invalidation_bus,
+        )
+
+        try:
+            invalidation_bus.start()
+        except (RuntimeError, OSError):
+            logger.exception("Cache invalidation bus failed to start")
+
+    @staticmethod
+    def _select_cli_sha_backend() -> None:
+        """Hash with settings.SHA256_CLI_BACKEND in the taskrunner.
+
+        Taskrunner tasks run on non-daemon pool threads, which may start the
+        "process" backend's worker pool; web workers keep SHA256_BACKEND.
+        """
+        from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+        from quickbbs.common import (  # pylint: disable=import-outside-toplevel
+            set_sha_backend,
+        )
+
+        set_sha_backend(settings.SHA256_CLI_BACKEND)
+
     @classmethod
     def _reconcile_cache_statistics(cls) -> None:
         """Arrange for stale cache_statistics_tracking rows to be dropped once.
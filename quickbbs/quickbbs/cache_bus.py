@@ -0,0 +1,463 @@
+"""
+Cross-process cache invalidation bus for QuickBBS.
+
+Every LRU cache in quickbbs.cache_registry (and the per-module caches listed
+in _MONITORED_CACHE_LOCATIONS) lives inside ONE process. The watchdog runs in
+a single web worker, and the scan command / taskrunner run in their own
+processes, so before this bus an invalidation only reached the process that
+issued it — every other Granian/Hypercorn worker kept serving stale layouts
+until LRU eviction happened to drop the entry.
+
+The bus broadcasts the *keys* that were invalidated (directory PKs, directory
+SHA256s, file SHA256s, a search generation bump, or "everything") and every
+listening process evicts the same keys locally within milliseconds of the
+sender. Only keys travel — cached values are never shipped between processes.
+
+Transports:
+    - "postgres": PostgreSQL LISTEN/NOTIFY on CACHE_BUS_CHANNEL. Publishing
+      runs pg_notify() on the caller's Django connection, so a NOTIFY issued
+      inside transaction.atomic() is delivered only when that transaction
+      commits — listeners never evict ahead of the write they race against.
+      Each listening process holds one dedicated autocommit psycopg
+      connection (outside the Django pool).
+    - "socket": Unix datagram sockets in CACHE_BUS_SOCKET_DIR, one per
+      listening process. Single-host only; used automatically if the
+      default database connection is not PostgreSQL, and handy for tests
+      since it needs no database at all.
+
+IMPORTANT - threading.Lock Usage:
+The listener runs on a daemon OS thread (blocking socket / psycopg reads),
+never inside Django's ASGI event loop, so the state below is guarded with
+threading.Lock. Evictions are applied through the thread-safe caches from
+quickbbs.MonitoredCache, which already serialize their own access.
+
+Message format (JSON, one object per NOTIFY payload / datagram):
+    {"origin": "<host>:<pid>", "dirs": [pk, ...], "dir_shas": [...],
+     "file_shas": [...], "search": false, "all": false}
+Large invalidations are split into several messages so each stays below
+PostgreSQL's 8000-byte NOTIFY payload limit.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from cachetools.keys import hashkey
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more; leave headroom
+# for the JSON envelope so a chunk never hits the limit after encoding.
+_MAX_PAYLOAD_BYTES = 7500
+
+# Seconds a listener blocks waiting for a message before re-checking its stop
+# flag — bounds how long stop() waits for the thread to exit.
+_LISTEN_POLL_SECONDS = 1.0
+
+# Seconds to wait before reconnecting after the listener's connection drops.
+_RECONNECT_DELAY_SECONDS = 5.0
+
+
+def _origin_id() -> str:
+    """
+    Identify the current process on the bus.
+
+    Computed at call time rather than import time: servers that fork workers
+    after importing Django (gunicorn --preload) would otherwise share one id
+    across every worker and drop each other's messages as self-echoes.
+
+    Returns:
+        "<hostname>:<pid>" string unique to this process on this host
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _resolve_backend() -> str:
+    """
+    Pick the transport for this process.
+
+    Returns:
+        "postgres" when CACHE_BUS_BACKEND asks for it and the default
+        database really is PostgreSQL, otherwise "socket"
+    """
+    if settings.CACHE_BUS_BACKEND == "postgres" and connection.vendor == "postgresql":
+        return "postgres"
+    return "socket"
+
+
+def encode_messages(
+    directory_ids: Iterable[int] = (),
+    directory_shas: Iterable[str] = (),
+    file_shas: Iterable[str] = (),
+    search: bool = False,
+    clear_all: bool = False,
+) -> list[str]:
+    """
+    Encode one invalidation into one or more JSON payloads.
+
+    Each key list is split across as many payloads as needed so no payload
+    exceeds _MAX_PAYLOAD_BYTES.
+
+    Args:
+        directory_ids: DirectoryIndex PKs whose layout/count caches changed
+        directory_shas: dir_fqpn_sha256 values whose directoryindex_cache entries changed
+        file_shas: file_sha256 values whose FileIndex cache entries changed
+        search: When True, receivers bump their search generation
+        clear_all: When True, receivers clear every registered cache
+
+    Returns:
+        List of JSON strings (empty when there is nothing to send)
+    """
+    origin = _origin_id()
+    if clear_all:
+        return [json.dumps({"origin": origin, "all": True})]
+
+    payloads: list[str] = []
+    if search:
+        payloads.append(json.dumps({"origin": origin, "search": True}))
+    for field, values in (("dirs", directory_ids), ("dir_shas", directory_shas), ("file_shas", file_shas)):
+        chunk: list[Any] = []
+        chunk_bytes = 0
+        for value in values:
+            if value is None:
+                continue
+            # +4 covers the quotes/comma json.dumps adds around each item
+            item_bytes = len(str(value)) + 4
+            if chunk and chunk_bytes + item_bytes > _MAX_PAYLOAD_BYTES:
+                payloads.append(json.dumps({"origin": origin, field: chunk}))
+                chunk, chunk_bytes = [], 0
+            chunk.append(value)
+            chunk_bytes += item_bytes
+        if chunk:
+            payloads.append(json.dumps({"origin": origin, field: chunk}))
+    return payloads
+
+
+def apply_message(message: dict[str, Any]) -> int:
+    """
+    Evict the keys named in a bus message from this process's caches.
+
+    Imports are deferred: cache_registry, directoryindex and fileindex all
+    import this module (directly or via cache_registry), so importing them
+    at module level here would be a genuine cycle.
+
+    Args:
+        message: Decoded bus message (see module docstring for the format)
+
+    Returns:
+        Number of cache entries evicted
+    """
+    # pylint: disable=import-outside-toplevel
+    from quickbbs.cache_registry import (
+        bump_search_generation,
+        clear_fileindex_cache_for_shas,
+        clear_layout_cache_for_directories,
+        resolve_monitored_caches,
+    )
+    from quickbbs.directoryindex import directoryindex_cache
+
+    # pylint: enable=import-outside-toplevel
+
+    if message.get("all"):
+        count = 0
+        for _label, cache in resolve_monitored_caches():
+            if isinstance(cache, Exception):
+                continue
+            count += len(cache)
+            cache.clear()
+        return count
+
+    if message.get("search"):
+        bump_search_generation(broadcast=False)
+
+    count = 0
+    directory_ids = {int(pk) for pk in message.get("dirs", ())}
+    if directory_ids:
+        count += clear_layout_cache_for_directories(directory_ids, broadcast=False)
+        # directoryindex_cache is keyed by SHA, so PK-only messages match on
+        # the cached record instead. Values are (found, DirectoryIndex) tuples.
+        for key, value in directoryindex_cache.peek_items():
+            record = value[1] if isinstance(value, tuple) and len(value) == 2 else None
+            if record is not None and record.pk in directory_ids:
+                directoryindex_cache.pop(key, None)
+                count += 1
+
+    for sha in message.get("dir_shas", ()):
+        if directoryindex_cache.pop(hashkey(sha), None) is not None:
+            count += 1
+
+    count += clear_fileindex_cache_for_shas(set(message.get("file_shas", ())), broadcast=False)
+
+    return count
+
+
+class InvalidationBus:
+    """
+    Publisher and (optional) background listener for cache invalidations.
+
+    One module-level instance, ``invalidation_bus``, is shared by the whole
+    process. Publishing works whether or not the listener is running, so
+    short-lived management commands (scan, add_files) notify the long-lived
+    web workers and taskrunner without listening themselves.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an idle bus (no listener thread yet)."""
+        # MUST be threading.Lock (see module docstring for why)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._socket: socket.socket | None = None
+        self._socket_path: str | None = None
+        self.received = 0
+        self.evicted = 0
+
+    # -- publishing ----------------------------------------------------
+
+    def publish(
+        self,
+        directory_ids: Iterable[int] = (),
+        directory_shas: Iterable[str] = (),
+        file_shas: Iterable[str] = (),
+        search: bool = False,
+        clear_all: bool = False,
+    ) -> int:
+        """
+        Broadcast an invalidation to every other listening process.
+
+        Never raises: a failed broadcast leaves other processes stale (the
+        pre-bus behavior) but must not break the write that triggered it.
+
+        Args:
+            directory_ids: DirectoryIndex PKs whose layout/count caches changed
+            directory_shas: dir_fqpn_sha256 values to evict from directoryindex_cache
+            file_shas: file_sha256 values to evict from the FileIndex caches
+            search: When True, receivers retire their cached search results
+                (bump_search_generation)
+            clear_all: When True, receivers clear every registered cache
+
+        Returns:
+            Number of payloads sent
+        """
+        if not settings.CACHE_BUS_ENABLED:
+            return 0
+        payloads = encode_messages(directory_ids, directory_shas, file_shas, search, clear_all)
+        if not payloads:
+            return 0
+        try:
+            if _resolve_backend() == "postgres":
+                return self._publish_postgres(payloads)
+            return self._publish_socket(payloads)
+        except (DatabaseError, OSError) as e:
+            logger.warning("Cache invalidation broadcast failed: %s", e)
+            return 0
+
+    @staticmethod
+    def _publish_postgres(payloads: list[str]) -> int:
+        """
+        Send payloads with pg_notify() on the current Django connection.
+
+        Args:
+            payloads: Encoded JSON messages
+
+        Returns:
+            Number of payloads sent
+        """
+        with connection.cursor() as cursor:
+            for payload in payloads:
+                cursor.execute("SELECT pg_notify(%s, %s)", [settings.CACHE_BUS_CHANNEL, payload])
+        return len(payloads)
+
+    def _publish_socket(self, payloads: list[str]) -> int:
+        """
+        Send payloads to every listener socket in CACHE_BUS_SOCKET_DIR.
+
+        Sockets whose owning process has exited are unlinked on the way.
+
+        Args:
+            payloads: Encoded JSON messages
+
+        Returns:
+            Number of payloads sent (counted once per payload, not per peer)
+        """
+        peers = [path for path in glob.glob(os.path.join(settings.CACHE_BUS_SOCKET_DIR, "*.sock")) if path != self._socket_path]
+        if not peers:
+            return 0
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for peer in peers:
+                try:
+                    for payload in payloads:
+                        sender.sendto(payload.encode("utf-8"), peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Listener died without cleaning up — drop its socket
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                except BlockingIOError:
+                    logger.warning("Cache bus peer %s is not draining its socket; message dropped", peer)
+        return len(payloads)
+
+    # -- listening -----------------------------------------------------
+
+    @property
+    def is_listening(self) -> bool:
+        """Return True while the listener thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start the background listener thread (idempotent).
+
+        For the socket transport the listening socket is bound here, before
+        the thread starts, so a publish issued right after start() returns is
+        never missed.
+
+        Returns:
+            True if a listener is running after the call, False if the bus
+            is disabled or the listener could not be started
+        """
+        if not settings.CACHE_BUS_ENABLED:
+            return False
+        with self._lock:
+            if self.is_listening:
+                return True
+            self._stop_event.clear()
+            backend = _resolve_backend()
+            if backend == "socket":
+                try:
+                    self._bind_socket()
+                except OSError as e:
+                    logger.error("Cache bus could not bind listener socket: %s", e)
+                    return False
+                target = self._listen_socket
+            else:
+                target = self._listen_postgres
+            self._thread = threading.Thread(target=target, name="quickbbs-cache-bus", daemon=True)
+            self._thread.start()
+        logger.info("Cache invalidation bus listening (%s, PID %s)", backend, os.getpid())
+        return True
+
+    def stop(self) -> None:
+        """Stop the listener thread and release its socket/connection."""
+        with self._lock:
+            thread = self._thread
+            self._stop_event.set()
+        if thread is not None:
+            thread.join(timeout=_LISTEN_POLL_SECONDS * 3)
+        with self._lock:
+            self._thread = None
+            self._close_socket()
+
+    def _bind_socket(self) -> None:
+        """Create and bind this process's datagram socket."""
+        os.makedirs(settings.CACHE_BUS_SOCKET_DIR, exist_ok=True)
+        path = os.path.join(settings.CACHE_BUS_SOCKET_DIR, f"{os.getpid()}.sock")
+        if os.path.exists(path):
+            os.unlink(path)  # Left behind by a previous process with a recycled PID
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.settimeout(_LISTEN_POLL_SECONDS)
+        self._socket = sock
+        self._socket_path = path
+
+    def _close_socket(self) -> None:
+        """Close and unlink the listening socket, if any."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._socket_path is not None:
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+            self._socket_path = None
+
+    def _listen_socket(self) -> None:
+        """Receive loop for the socket transport (runs on the listener thread)."""
+        sock = self._socket
+        while sock is not None and not self._stop_event.is_set():
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break  # Socket closed by stop()
+            self._dispatch(data.decode("utf-8", errors="replace"))
+
+    def _listen_postgres(self) -> None:
+        """
+        Receive loop for the PostgreSQL transport (runs on the listener thread).
+
+        Uses a dedicated autocommit psycopg connection — LISTEN state is per
+        connection, so a pooled Django connection would lose it on return to
+        the pool. Reconnects after _RECONNECT_DELAY_SECONDS if the server
+        goes away; anything published while disconnected is lost, which only
+        degrades to the pre-bus behavior (stale until LRU eviction).
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import psycopg
+        from psycopg import sql  # pylint: disable=import-outside-toplevel
+
+        db = settings.DATABASES["default"]
+        conninfo = {
+            "dbname": connection.settings_dict["NAME"],
+            "user": db.get("USER") or None,
+            "password": db.get("PASSWORD") or None,
+            "host": db.get("HOST") or None,
+            "port": db.get("PORT") or None,
+        }
+        while not self._stop_event.is_set():
+            try:
+                with psycopg.connect(autocommit=True, **{k: v for k, v in conninfo.items() if v is not None}) as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(settings.CACHE_BUS_CHANNEL)))
+                    while not self._stop_event.is_set():
+                        for notify in conn.notifies(timeout=_LISTEN_POLL_SECONDS):
+                            self._dispatch(notify.payload)
+            except psycopg.Error as e:
+                logger.warning("Cache bus listener connection lost (%s); reconnecting in %ss", e, _RECONNECT_DELAY_SECONDS)
+                self._stop_event.wait(_RECONNECT_DELAY_SECONDS)
+
+    def _dispatch(self, payload: str) -> None:
+        """
+        Decode one payload and apply it, ignoring this process's own messages.
+
+        Args:
+            payload: JSON message text
+        """
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Discarding malformed cache bus payload: %.80s", payload)
+            return
+        if not isinstance(message, dict) or message.get("origin") == _origin_id():
+            return
+        started = time.perf_counter()
+        try:
+            evicted = apply_message(message)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Listener thread must survive a bad message or a cache error
+            logger.exception("Failed to apply cache bus message from %s", message.get("origin"))
+            return
+        self.received += 1
+        self.evicted += evicted
+        logger.debug(
+            "Applied cache bus message from %s: %d entries evicted in %.2fms",
+            message.get("origin"),
+            evicted,
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+# Global bus instance (one per process)
+invalidation_bus = InvalidationBus()
@@ -13,12 +13,16 @@ from __future__ import annotations
 
 import importlib
 from collections.abc import Set as AbstractSet
+from functools import partial
 
 from cachetools import LRUCache
 from cachetools.keys import hashkey
 from django.conf import settings
+from django.db import transaction
 
-from quickbbs.MonitoredCache import create_cache
+from quickbbs.cache_bus import invalidation_bus
+from quickbbs.MonitoredCache import ThreadSafeTTLCache, create_cache
+from quickbbs.shared_sha_lists import shared_sha_lists
 
 # ---------------------------------------------------------------------------
 # Cache instances
@@ -79,6 +83,52 @@ sibling_dirs_cache = create_cache(
 )
 
 
+# Complete ordered search results (frontend/views.py _get_search_hits)
+# Cache key: hashkey(normalized_query, sort, search_generation())
+# Cache value: (directory hits, file hits), each a tuple of (pk, searched text)
+search_results_cache = ThreadSafeTTLCache(
+    maxsize=settings.SEARCH_RESULTS_CACHE_SIZE,
+    ttl=settings.SEARCH_RESULTS_CACHE_TTL,
+)
+
+# Bumped by bump_search_generation() — locally or from a bus message — only
+# when data a search can match changes: a file or directory is created,
+# deleted or renamed (a rename is a delete plus a create to the sync), or
+# search documents are indexed or pruned. Thumbnail, favorite and mtime-only
+# changes leave it alone. Keying search results on it retires every entry at
+# once, including one computed by a search that was still running when the
+# change committed (it is stored under the generation read before its
+# queries ran).
+_search_generation = 0
+
+
+def search_generation() -> int:
+    """
+    Return the current search generation (see search_results_cache).
+
+    Returns:
+        Counter that changes whenever searchable names or content change
+    """
+    return _search_generation
+
+
+def bump_search_generation(broadcast: bool = True) -> None:
+    """
+    Retire every cached search result, in this process and (by default) all others.
+
+    Args:
+        broadcast: Publish the bump to other processes (default True). The
+            bus listener passes False when applying a received message so
+            bumps are not re-broadcast in a loop.
+    """
+    global _search_generation  # pylint: disable=global-statement
+
+    # A lost increment from a concurrent bump still changes the value.
+    _search_generation += 1
+    if broadcast:
+        invalidation_bus.publish(search=True)
+
+
 # ---------------------------------------------------------------------------
 # Cache registry (for stats snapshots, bulk clearing, and cross-process
 # invalidation signaling)
@@ -95,6 +145,7 @@ _MONITORED_CACHE_LOCATIONS: list[tuple[str, str, str | None]] = [
     ("quickbbs.cache_registry", "dir_counts_cache", None),
     ("quickbbs.cache_registry", "file_counts_cache", None),
     ("quickbbs.cache_registry", "sibling_dirs_cache", None),
+    ("quickbbs.cache_registry", "search_results_cache", None),
     ("quickbbs.directoryindex", "directoryindex_cache", None),
     ("quickbbs.directoryindex", "get_view_url_cache", None),
     ("quickbbs.fileindex", "fileindex_cache", None),
@@ -106,6 +157,8 @@ _MONITORED_CACHE_LOCATIONS: list[tuple[str, str, str | None]] = [
     ("quickbbs.common", "normalized_paths_cache", None),
     ("quickbbs.fileindex", "_encoding_cache", "FileIndex"),
     ("quickbbs.fileindex", "_alias_cache", "FileIndex"),
+    ("interactive_fiction.views", "compiled_story_cache", None),
+    ("thumbnails.models", "transcoded_thumbnail_cache", None),
 ]
 
 
@@ -140,27 +193,48 @@ def resolve_monitored_caches() -> list[tuple[str, LRUCache | Exception]]:
 # ---------------------------------------------------------------------------
 
 
-def clear_layout_cache_for_directories(directory_ids: AbstractSet[int | None]) -> int:  # pylint: disable=too-many-branches
+def clear_layout_cache_for_directories(directory_ids: AbstractSet[int | None], broadcast: bool = True) -> int:  # pylint: disable=too-many-branches
     """
     Clear layout_manager_cache, distinct_files_cache, all_files_shas_cache,
     dir_counts_cache, file_counts_cache, and sibling_dirs_cache entries for
-    one or more directories.
+    one or more directories. Cached search results are not touched: callers
+    that change searchable data call bump_search_generation().
 
     Shared function to ensure consistent cache clearing across:
     - Cache watcher during filesystem invalidation
     - Management commands after file membership changes (add/delete/move)
 
+    The same directory PKs are broadcast on the cache invalidation bus
+    (quickbbs.cache_bus) so every other web worker and the taskrunner evict
+    them too — these caches are per-process. The directories' host-wide
+    shared SHA list files (quickbbs.shared_sha_lists) are unlinked as well,
+    after the surrounding transaction (if any) commits.
+
     Args:
         directory_ids: Set of directory PKs to clear cache for. None values
             (e.g. from orphaned FileIndex.home_directory) are ignored.
+        broadcast: Publish the PKs to other processes (default True). The
+            bus listener passes False when applying a received message so
+            invalidations are not re-broadcast in a loop.
 
     Returns:
-        Number of cache entries cleared (combined from all caches)
+        Number of cache entries cleared in THIS process (combined from all caches)
     """
     directory_ids = {pk for pk in directory_ids if pk is not None}
     if not directory_ids:
         return 0
 
+    if broadcast:
+        invalidation_bus.publish(directory_ids=directory_ids)
+        # The shared SHA list files are host-wide, so only the originating
+        # process removes them; bus receivers just drop their local mappings
+        # (distinct_files_cache/all_files_shas_cache below). Removed once the
+        # surrounding transaction commits, like the NOTIFY above: removed
+        # earlier, a concurrent reader could rebuild a file from the
+        # pre-commit rows and share that stale list until the next change.
+        if shared_sha_lists.enabled:
+            transaction.on_commit(partial(shared_sha_lists.discard_directories, directory_ids))
+
     count = 0
 
     for pk in directory_ids:
@@ -204,3 +278,43 @@ def clear_layout_cache_for_directories(directory_ids: AbstractSet[int | None]) -
             continue
 
     return count
+
+
+def clear_fileindex_cache_for_shas(file_shas: AbstractSet[str | None], broadcast: bool = True) -> int:
+    """
+    Clear fileindex_cache and fileindex_download_cache entries for file SHA256s.
+
+    Both caches are keyed hashkey(sha_value, unique, select_related), where
+    sha_value is a unique_sha256 when unique=True — so entries are matched on
+    the cached record's file_sha256 as well as on the key itself.
+
+    Args:
+        file_shas: Set of file_sha256 values whose FileIndex rows changed.
+            None values are ignored.
+        broadcast: Publish the SHAs on the cache invalidation bus (default
+            True); the bus listener passes False when applying a message.
+
+    Returns:
+        Number of cache entries cleared in THIS process
+    """
+    # Deferred: quickbbs.fileindex imports this module (genuine cycle)
+    # pylint: disable-next=import-outside-toplevel
+    from quickbbs.fileindex import fileindex_cache, fileindex_download_cache
+
+    file_shas = {sha for sha in file_shas if sha is not None}
+    if not file_shas:
+        return 0
+
+    if broadcast:
+        invalidation_bus.publish(file_shas=file_shas)
+
+    count = 0
+    for cache in (fileindex_cache, fileindex_download_cache):
+        for key, value in cache.peek_items():
+            try:
+                if key[0] in file_shas or getattr(value, "file_sha256", None) in file_shas:
+                    cache.pop(key, None)
+                    count += 1
+            except (IndexError, TypeError):
+                continue
+    return count
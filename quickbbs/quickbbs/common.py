@@ -3,11 +3,13 @@
 import atexit
 import hashlib
 import logging
+import multiprocessing
 import os
 import pathlib
 import sys
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import TYPE_CHECKING, Callable, TypeVar
 
 from cachetools import cached
@@ -16,7 +18,9 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.db import models
 
+from quickbbs.io_scheduler import run_per_device
 from quickbbs.MonitoredCache import create_cache
+from quickbbs.sha_hashing import hash_file, hash_file_or_error
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import AbstractUser, AnonymousUser
@@ -210,8 +214,10 @@ def get_file_sha(fqfn: str) -> tuple[str | None, str | None]:
     Return the SHA256 hashes of the file as hexdigest strings.
 
     Generates both a file-content hash and a unique hash that includes
-    the file path. Uses hashlib.file_digest() for optimal performance
-    (Python 3.11+).
+    the file path. The read itself is done by quickbbs.sha_hashing.hash_file()
+    (sequential read-ahead advice, SHA256_READ_BUFFER_SIZE reads), which the
+    "process" SHA256 backend's workers also use, so both backends produce
+    identical values.
 
     Args:
         fqfn: The fully qualified filename of the file to be hashed
@@ -223,106 +229,196 @@ def get_file_sha(fqfn: str) -> tuple[str | None, str | None]:
                         (makes hash unique to both content and location)
     """
     try:
-        with open(fqfn, "rb") as filehandle:
-            # Use file_digest for better performance (Python 3.11+)
-            digest = hashlib.file_digest(filehandle, "sha256")
-            file_sha256 = digest.hexdigest()
-            # Create unique hash by adding filepath to content hash
-            digest.update(str(fqfn).title().encode("utf-8"))
-            unique_sha256 = digest.hexdigest()
-        return file_sha256, unique_sha256
+        return hash_file(fqfn, settings.SHA256_READ_BUFFER_SIZE)
     except (FileNotFoundError, OSError, IOError) as exc:
         logger.error("Error producing SHA 256 for: %s - %s", fqfn, exc)
         return None, None
 
 
-# Module-level singleton ThreadPoolExecutor for SHA256 computation.
-# Using a persistent pool avoids the overhead of spawning new threads on every call.
-# ThreadPoolExecutor (not ProcessPoolExecutor) is used because:
-#   - get_file_sha() does not touch Django ORM, so thread-safety is not a concern
-#   - ThreadPoolExecutor works from daemon threads (ASGI sync_to_async context)
-#   - ProcessPoolExecutor cannot spawn child processes from daemon threads
-# Thread-safe initialization and proper cleanup on exit.
-_sha_executor: ThreadPoolExecutor | None = None
+# SHA256 hashing backends used by _batch_compute_file_shas():
+#   "thread"  - ThreadPoolExecutor running get_file_sha(). Works from daemon
+#               threads (ASGI sync_to_async context), where spawning child
+#               processes is forbidden, so it is the default for web workers.
+#               hashlib releases the GIL while digesting, but per-read Python
+#               overhead still serializes on it.
+#   "process" - ProcessPoolExecutor of spawned interpreters running
+#               quickbbs.sha_hashing.hash_file_or_error(). The workers import
+#               only the standard library (no Django, no DB connections) and
+#               stay alive for the life of the pool. Selected by management
+#               commands (scan) and the taskrunner via set_sha_backend(); falls
+#               back to "thread" if the pool can't start.
+# One persistent executor per backend; thread-safe initialization and proper
+# cleanup on exit.
+SHA_BACKENDS = ("thread", "process")
+
+_sha_backend: str | None = None
+_sha_executors: dict[str, Executor] = {}
 _sha_executor_lock = threading.Lock()
 
 
-def _get_sha_executor() -> ThreadPoolExecutor:
+def set_sha_backend(backend: str | None) -> None:
     """
-    Get or create the singleton ThreadPoolExecutor for SHA256 computation.
+    Select the SHA256 hashing backend for this process.
 
-    Thread-safe lazy initialization of a module-level thread pool.
-    The pool is reused across all calls to improve performance by avoiding
-    repeated thread spawning overhead.
+    Call from a process's main thread before hashing starts (management
+    command handle(), taskrunner startup). Web workers never call it and use
+    settings.SHA256_BACKEND.
+
+    Args:
+        backend: "thread", "process", or None to restore the settings default
+
+    Raises:
+        ValueError: If backend is not one of SHA_BACKENDS
+    """
+    global _sha_backend  # pylint: disable=global-statement
+
+    if backend is not None and backend not in SHA_BACKENDS:
+        raise ValueError(f"Unknown SHA256 backend {backend!r}; expected one of {SHA_BACKENDS}")
+    _sha_backend = backend
 
-    Uses ThreadPoolExecutor rather than ProcessPoolExecutor so that it works
-    from daemon threads (e.g. ASGI sync_to_async context), where spawning
-    child processes is forbidden by Python's multiprocessing constraints.
+
+def get_sha_backend() -> str:
+    """
+    Return the SHA256 hashing backend in effect for this process.
 
     Returns:
-        ThreadPoolExecutor configured for SHA256 hashing operations
+        The backend chosen by set_sha_backend(), else settings.SHA256_BACKEND
     """
-    global _sha_executor  # pylint: disable=global-statement
+    return _sha_backend or settings.SHA256_BACKEND
 
-    if _sha_executor is None:
+
+def _get_sha_executor(backend: str | None = None) -> Executor:
+    """
+    Get or create the persistent executor for a SHA256 backend.
+
+    Thread-safe lazy initialization of one module-level pool per backend.
+    Pools are reused across all calls to avoid repeated thread/process
+    startup overhead.
+
+    Args:
+        backend: "thread" or "process"; defaults to get_sha_backend()
+
+    Returns:
+        ThreadPoolExecutor or ProcessPoolExecutor sized to
+        min(cpu_count, SHA256_MAX_WORKERS)
+    """
+    backend = backend or get_sha_backend()
+    executor = _sha_executors.get(backend)
+    if executor is None:
         with _sha_executor_lock:
             # Double-check locking pattern
-            if _sha_executor is None:
+            executor = _sha_executors.get(backend)
+            if executor is None:
                 cpu_count = os.cpu_count() or 4
                 max_workers = min(cpu_count, settings.SHA256_MAX_WORKERS)
-                _sha_executor = ThreadPoolExecutor(max_workers=max_workers)
-                logger.info("Initialized SHA256 ThreadPoolExecutor with %d workers", max_workers)
+                if backend == "process":
+                    # spawn, not fork: forking a process that holds DB
+                    # connections and running threads is unsafe
+                    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    executor = ThreadPoolExecutor(max_workers=max_workers)
+                if not _sha_executors:
+                    # Register cleanup handler to ensure workers are terminated
+                    atexit.register(_cleanup_sha_executor)
+                _sha_executors[backend] = executor
+                logger.info("Initialized SHA256 %s with %d workers", type(executor).__name__, max_workers)
 
-                # Register cleanup handler to ensure threads are terminated
-                atexit.register(_cleanup_sha_executor)
-
-    return _sha_executor
+    return executor
 
 
 def _cleanup_sha_executor() -> None:
     """
-    Clean up the SHA256 ThreadPoolExecutor on program exit.
+    Clean up the SHA256 executors on program exit.
 
-    Ensures all worker threads are properly terminated and cleaned up.
-    Called automatically via atexit registration.
+    Ensures all worker threads and processes are properly terminated and
+    cleaned up. Called automatically via atexit registration.
     """
-    global _sha_executor  # pylint: disable=global-statement
-
-    if _sha_executor is not None:
+    while _sha_executors:
+        _, executor = _sha_executors.popitem()
+        name = type(executor).__name__
         if not sys.is_finalizing() and not getattr(sys.stdout, "closed", False) and not getattr(sys.stderr, "closed", False):
             handlers = list(logger.handlers) + list(logging.getLogger().handlers)
             if not any(getattr(getattr(h, "stream", None), "closed", False) for h in handlers):
-                logger.info("Shutting down SHA256 ThreadPoolExecutor")
+                logger.info("Shutting down SHA256 %s", name)
         try:
             # Wait for pending tasks but don't accept new ones
             # cancel_futures=True is Python 3.9+
-            _sha_executor.shutdown(wait=True, cancel_futures=True)
+            executor.shutdown(wait=True, cancel_futures=True)
         except Exception as e:  # pylint: disable=broad-exception-caught
             if not sys.is_finalizing() and not getattr(sys.stdout, "closed", False) and not getattr(sys.stderr, "closed", False):
                 handlers = list(logger.handlers) + list(logging.getLogger().handlers)
                 if not any(getattr(getattr(h, "stream", None), "closed", False) for h in handlers):
-                    logger.error("Error shutting down SHA256 ThreadPoolExecutor: %s", e)
-        finally:
-            _sha_executor = None
+                    logger.error("Error shutting down SHA256 %s: %s", name, e)
+
+
+def _hash_with_executor(
+    executor: Executor,
+    file_paths: list[str],
+    results: dict[str, tuple[str | None, str | None]],
+    is_process_pool: bool = False,
+) -> None:
+    """
+    Hash file_paths on executor through the per-volume I/O scheduler.
+
+    quickbbs.io_scheduler.run_per_device() groups the paths by st_dev, orders
+    each group by (directory, inode), and keeps every volume under its
+    IO_DEVICE_LIMITS cap — a spinning disk is read by e.g. 1-2 workers instead
+    of seeking between SHA256_MAX_WORKERS files, while the remaining workers
+    keep serving other volumes.
+
+    Results are written into results as each file completes, so a broken
+    process pool leaves only the unfinished paths for the caller's fallback.
+    is_process_pool selects the picklable hash_file_or_error() entry point.
+
+    Raises:
+        BrokenProcessPool: If a process-pool worker died
+    """
+    buffer_size = settings.SHA256_READ_BUFFER_SIZE
+
+    def submit(path: str) -> Future:
+        if is_process_pool:
+            return executor.submit(hash_file_or_error, path, buffer_size)
+        return executor.submit(get_file_sha, path)
+
+    def collect(path: str, future: Future) -> None:
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            raise
+        except (OSError, IOError, ValueError) as e:
+            logger.error("Error computing SHA256 for %s: %s", path, e)
+            results[path] = (None, None)
+            return
+        if is_process_pool:
+            file_sha256, unique_sha256, error = result
+            if error is not None:
+                logger.error("Error producing SHA 256 for: %s - %s", path, error)
+            result = (file_sha256, unique_sha256)
+        results[path] = result
+
+    run_per_device(file_paths, submit, collect)
 
 
 def _batch_compute_file_shas(file_paths: list[str], max_workers: int | None = None) -> dict[str, tuple[str | None, str | None]]:
     """
-    Compute SHA256 hashes in parallel using a persistent thread pool.
+    Compute SHA256 hashes in parallel using the persistent pool for this process's backend.
 
-    Uses a module-level singleton ThreadPoolExecutor to:
-    - Improve performance by reusing worker threads across calls
+    Uses the module-level executor selected by get_sha_backend() to:
+    - Improve performance by reusing workers across calls
     - Ensure proper cleanup via atexit handlers
-    - Work correctly from daemon threads (ASGI sync_to_async context)
+    - Work correctly from daemon threads (ASGI sync_to_async context) with
+      the default "thread" backend
 
     DJANGO-SAFE: Does not touch Django ORM - only computes file hashes.
-    ThreadPoolExecutor is safe here because get_file_sha() has no shared state.
 
     ASYNC-SAFE: This is a sync function. When called from async contexts,
     it should be wrapped with sync_to_async() (see update_database_from_disk).
-    The blocking ThreadPoolExecutor calls will run in a thread pool via
+    The blocking executor calls will run in a thread pool via
     sync_to_async, preventing event loop blocking.
 
+    If the "process" pool can't start or a worker dies, this process
+    switches to the "thread" backend and hashes the unfinished files there.
+
     Args:
         file_paths: List of fully qualified file paths to hash.
         max_workers: Ignored (kept for backward compatibility).
@@ -339,33 +435,34 @@ def _batch_compute_file_shas(file_paths: list[str], max_workers: int | None = No
 
     results = {}
 
-    # For small batches, don't bother with thread pool overhead
+    # For small batches, don't bother with pool overhead
     if len(file_paths) < settings.SHA256_PARALLEL_THRESHOLD:
         for path in file_paths:
             results[path] = get_file_sha(path)
         return results
 
-    # Use singleton ThreadPoolExecutor for parallel SHA256 computation
-    # This is safe because get_file_sha() doesn't touch the database
+    if get_sha_backend() == "process":
+        try:
+            _hash_with_executor(_get_sha_executor("process"), file_paths, results, is_process_pool=True)
+            return results
+        except (BrokenProcessPool, OSError, RuntimeError, AssertionError) as e:
+            logger.warning("SHA256 process pool unavailable, switching to threads: %s", e)
+            with _sha_executor_lock:
+                broken = _sha_executors.pop("process", None)
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            set_sha_backend("thread")
+            file_paths = [path for path in file_paths if path not in results]
+
+    # The thread backend is safe because get_file_sha() doesn't touch the database
     try:
-        executor = _get_sha_executor()
-
-        # Submit all tasks to the persistent pool
-        future_to_path = {executor.submit(get_file_sha, path): path for path in file_paths}
-
-        # Collect results as they complete
-        for future in as_completed(future_to_path):
-            path = future_to_path[future]
-            try:
-                results[path] = future.result()
-            except (OSError, IOError, ValueError) as e:
-                logger.error("Error computing SHA256 for %s: %s", path, e)
-                results[path] = (None, None)
-
+        _hash_with_executor(_get_sha_executor("thread"), file_paths, results)
     except (OSError, RuntimeError, AssertionError) as e:
         logger.error("Error in batch SHA256 computation: %s", e)
         # Fallback to sequential processing
         for path in file_paths:
+            if path in results:
+                continue
             try:
                 results[path] = get_file_sha(path)
             except (OSError, IOError, ValueError) as path_error:
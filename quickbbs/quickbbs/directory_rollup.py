@@ -0,0 +1,334 @@
+"""
+DirectoryRollup Model - precomputed recursive totals for each directory
+
+get_file_counts()/get_dir_counts()/get_count_breakdown() only count a
+directory's direct children, on demand. A directory's recursive file count,
+byte total or newest file meant walking the whole subtree.
+
+This table holds one row per (directory, filetype) with two sets of totals:
+    - file_count/total_bytes/newest_mtime — everything in the subtree
+    - direct_count/direct_bytes/direct_newest_mtime — files directly in the
+      directory; the baseline the next sync diffs against
+
+Kept current incrementally: after sync_files() changes a directory,
+refresh_directory() recounts that directory's own files, diffs them against
+the stored direct_* values, and adds the difference to the directory and all
+of its ancestors (the ids read from tree_path) in a single UPDATE. Deleting
+a subtree (DirectoryIndex.delete_subtrees()) subtracts the subtree's totals
+from the ancestors above it the same way; the subtree's own rows go with
+their directories (DB_CASCADE).
+
+newest_mtime is a high-water mark: deleting the newest file does not lower it
+until the next rebuild(). Writes made outside directory sync (and directory
+moves) are not propagated either — "manage.py rebuild_rollups" recomputes
+every row from FileIndex and repairs any drift.
+
+Requires Django 6.1+ for `models.DB_CASCADE` (see directoryindex.py).
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.db.models.functions import Greatest
+
+if TYPE_CHECKING:
+    from .directoryindex import DirectoryIndex
+
+logger = logging.getLogger(__name__)
+
+# (file count, bytes, newest mtime) for one filetype
+_Totals = tuple[int, int, float]
+
+
+class DirectoryRollup(models.Model):
+    """
+    Recursive and direct file totals of one filetype within one directory.
+
+    A directory with no files anywhere below it has no rows. Rows whose
+    counts have dropped to zero are left in place by incremental updates
+    and removed by rebuild().
+    """
+
+    directory = models.ForeignKey(
+        "DirectoryIndex",
+        on_delete=models.DB_CASCADE,
+        related_name="rollups",
+    )
+    # filetypes.fileext (e.g. ".jpg"); a plain string, not an FK, so the
+    # delta UPDATE can match on it without a join
+    filetype = models.CharField(max_length=10)
+    file_count = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    newest_mtime = models.FloatField(default=0.0)  # Unix timestamp, 0 if never any files
+    direct_count = models.BigIntegerField(default=0)
+    direct_bytes = models.BigIntegerField(default=0)
+    direct_newest_mtime = models.FloatField(default=0.0)
+
+    class Meta:
+        """Model metadata: one row per directory and filetype."""
+
+        verbose_name = "Directory Rollup"
+        verbose_name_plural = "Directory Rollups"
+        constraints = [
+            # Its index leads on directory_id, so it also serves the per-directory
+            # reads and the directory_id IN (...) delta UPDATEs.
+            models.UniqueConstraint(fields=["directory", "filetype"], name="directoryrollup_directory_filetype_uniq"),
+        ]
+
+    @staticmethod
+    def summary(directory: DirectoryIndex) -> dict[str, Any]:
+        """
+        Return a directory's recursive totals in one query.
+
+        Args:
+            directory: The directory to summarize
+
+        Returns:
+            Dict with "files" (int), "bytes" (int), "newest_mtime" (float,
+            0.0 if no files) and "by_filetype" (fileext → file count, only
+            types with at least one file)
+        """
+        result: dict[str, Any] = {"files": 0, "bytes": 0, "newest_mtime": 0.0, "by_filetype": {}}
+        for filetype, count, size, newest in DirectoryRollup.objects.filter(directory_id=directory.pk).values_list(
+            "filetype", "file_count", "total_bytes", "newest_mtime"
+        ):
+            if count:
+                result["by_filetype"][filetype] = count
+            result["files"] += count
+            result["bytes"] += size
+            result["newest_mtime"] = max(result["newest_mtime"], newest)
+        return result
+
+    @staticmethod
+    def refresh_directory(directory: DirectoryIndex) -> bool:
+        """
+        Bring the rollups up to date with this directory's own files.
+
+        Called after sync_files() has written a directory's changes. Counts
+        the directory's live files by filetype, diffs the result against the
+        stored direct_* totals, and applies the difference to the directory
+        and every ancestor. The directory's DirectoryIndex row is locked
+        first, so two syncs of the same directory can't both apply the same
+        delta — locking the rollup rows alone would not serialize a first
+        sync (or a new filetype), where there are no rows to lock yet.
+
+        Args:
+            directory: The directory whose files just changed
+
+        Returns:
+            True if any totals changed
+        """
+        # pylint: disable=import-outside-toplevel
+        from .directoryindex import DirectoryIndex
+        from .fileindex import FileIndex
+
+        with transaction.atomic():
+            # Held until commit; serializes refreshes of this directory
+            list(DirectoryIndex.objects.select_for_update().filter(pk=directory.pk).values_list("pk", flat=True))
+            stored: dict[str, _Totals] = {
+                filetype: (count, size, newest)
+                for filetype, count, size, newest in DirectoryRollup.objects.filter(directory_id=directory.pk).values_list(
+                    "filetype", "direct_count", "direct_bytes", "direct_newest_mtime"
+                )
+                if count
+            }
+            current: dict[str, _Totals] = {
+                row["filetype_id"]: (row["count"], row["size"] or 0, row["newest"] or 0.0)
+                for row in FileIndex.objects.filter(home_directory=directory.pk, delete_pending=False)
+                .values("filetype_id")
+                .annotate(count=Count("id"), size=Sum("size"), newest=Max("lastmod"))
+            }
+            if current == stored:
+                return False
+
+            zero: _Totals = (0, 0, 0.0)
+            filetypes = set(current) | set(stored)
+            deltas = {}
+            for filetype in filetypes:
+                new, old = current.get(filetype, zero), stored.get(filetype, zero)
+                deltas[filetype] = (new[0] - old[0], new[1] - old[1], new[2])
+            DirectoryRollup._propagate(_chain_ids(directory), deltas)
+            DirectoryRollup.objects.filter(directory_id=directory.pk, filetype__in=filetypes).update(
+                direct_count=_by_filetype({ft: current.get(ft, zero)[0] for ft in filetypes}, Value(0)),
+                direct_bytes=_by_filetype({ft: current.get(ft, zero)[1] for ft in filetypes}, Value(0)),
+                direct_newest_mtime=_by_filetype({ft: current.get(ft, zero)[2] for ft in filetypes}, Value(0.0)),
+            )
+        return True
+
+    @staticmethod
+    def detach_subtrees(roots: list[DirectoryIndex]) -> None:
+        """
+        Subtract the totals of subtrees about to be deleted from their ancestors.
+
+        Must run before the DirectoryIndex rows are deleted (the roots'
+        rollup rows are read here and cascade away with them). A root that
+        lies inside another root's subtree is skipped — its totals are
+        already part of the outer one's.
+
+        Args:
+            roots: The directories whose subtrees are being deleted
+        """
+        paths = [root.tree_path for root in roots if root.tree_path]
+        for root in roots:
+            if root.tree_path and any(path != root.tree_path and root.tree_path.startswith(path) for path in paths):
+                continue
+            ancestors = _chain_ids(root)[:-1]
+            if not ancestors:
+                continue
+            deltas = {
+                filetype: (-count, -size, 0.0)
+                for filetype, count, size in DirectoryRollup.objects.filter(directory_id=root.pk).values_list("filetype", "file_count", "total_bytes")
+                if count or size
+            }
+            if deltas:
+                DirectoryRollup._propagate(ancestors, deltas)
+
+    @staticmethod
+    def _propagate(directory_ids: list[int], deltas: dict[str, _Totals]) -> None:
+        """
+        Add per-filetype deltas to a chain of directories in one UPDATE.
+
+        Rows missing for any (directory, filetype) pair are created first
+        (all zeros), so the UPDATE always has a row to land on.
+
+        Args:
+            directory_ids: The directory and its ancestors
+            deltas: fileext → (count delta, bytes delta, newest mtime); the
+                mtime only ever raises newest_mtime
+        """
+        DirectoryRollup.objects.bulk_create(
+            [DirectoryRollup(directory_id=pk, filetype=filetype) for pk in directory_ids for filetype in deltas],
+            batch_size=settings.DIRECTORY_SYNC_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        DirectoryRollup.objects.filter(directory_id__in=directory_ids, filetype__in=deltas).update(
+            file_count=F("file_count") + _by_filetype({ft: delta[0] for ft, delta in deltas.items()}, Value(0)),
+            total_bytes=F("total_bytes") + _by_filetype({ft: delta[1] for ft, delta in deltas.items()}, Value(0)),
+            newest_mtime=Greatest(F("newest_mtime"), _by_filetype({ft: delta[2] for ft, delta in deltas.items()}, Value(0.0))),
+        )
+
+    @staticmethod
+    def rebuild(dry_run: bool = False) -> int:
+        """
+        Recompute every rollup row from FileIndex and repair drift.
+
+        Reads the direct per-filetype totals of every directory in one
+        GROUP BY query, rolls them up the tree in memory, and compares the
+        result with the stored rows: missing rows are created, wrong ones
+        updated, and rows for subtrees that no longer hold any file of
+        their type deleted. Also resets newest_mtime high-water marks left
+        behind by deletions.
+
+        Args:
+            dry_run: Count the rows that would change without writing
+
+        Returns:
+            Number of rows created, updated or deleted (or that would be)
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .directoryindex import DirectoryIndex, _tree_path_ids
+
+        # pylint: disable-next=import-outside-toplevel
+        from .fileindex import FileIndex
+
+        parent_of: dict[int, int | None] = {}
+        tree_paths: dict[int, str] = {}
+        for pk, parent_id, tree_path in DirectoryIndex.objects.values_list("pk", "parent_directory_id", "tree_path").iterator(
+            chunk_size=settings.DIRECTORY_SYNC_CHUNK_SIZE
+        ):
+            parent_of[pk] = parent_id
+            tree_paths[pk] = tree_path
+
+        def chain_of(pk: int) -> list[int]:
+            if tree_paths[pk]:
+                return _tree_path_ids(tree_paths[pk])
+            ids: list[int] = []
+            current: int | None = pk
+            while current is not None and current in parent_of and current not in ids:
+                ids.append(current)
+                current = parent_of[current]
+            return ids[::-1]
+
+        # (directory, filetype) → [count, bytes, newest, direct count, direct bytes, direct newest]
+        expected: dict[tuple[int, str], list[Any]] = defaultdict(lambda: [0, 0, 0.0, 0, 0, 0.0])
+        for row in (
+            FileIndex.objects.filter(delete_pending=False, home_directory__isnull=False)
+            .values("home_directory_id", "filetype_id")
+            .annotate(count=Count("id"), size=Sum("size"), newest=Max("lastmod"))
+            .iterator(chunk_size=settings.DIRECTORY_SYNC_CHUNK_SIZE)
+        ):
+            pk, filetype = row["home_directory_id"], row["filetype_id"]
+            if pk not in parent_of:
+                continue
+            size, newest = row["size"] or 0, row["newest"] or 0.0
+            expected[(pk, filetype)][3:] = [row["count"], size, newest]
+            for ancestor in chain_of(pk):
+                totals = expected[(ancestor, filetype)]
+                totals[0] += row["count"]
+                totals[1] += size
+                totals[2] = max(totals[2], newest)
+
+        fields = ["file_count", "total_bytes", "newest_mtime", "direct_count", "direct_bytes", "direct_newest_mtime"]
+        to_update: list[DirectoryRollup] = []
+        to_delete: list[int] = []
+        for rollup_pk, pk, filetype, *values in DirectoryRollup.objects.values_list("pk", "directory_id", "filetype", *fields).iterator(
+            chunk_size=settings.DIRECTORY_SYNC_CHUNK_SIZE
+        ):
+            totals = expected.pop((pk, filetype), None)
+            if totals is None:
+                to_delete.append(rollup_pk)
+            elif totals != values:
+                to_update.append(DirectoryRollup(pk=rollup_pk, **dict(zip(fields, totals))))
+        to_create = [DirectoryRollup(directory_id=pk, filetype=filetype, **dict(zip(fields, totals))) for (pk, filetype), totals in expected.items()]
+
+        changed = len(to_create) + len(to_update) + len(to_delete)
+        if changed and not dry_run:
+            batch_size = settings.DIRECTORY_SYNC_BATCH_SIZE
+            with transaction.atomic():
+                DirectoryRollup.objects.filter(pk__in=to_delete).delete()
+                DirectoryRollup.objects.bulk_update(to_update, fields, batch_size=batch_size)
+                DirectoryRollup.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+            logger.info("Rollup rebuild: %d created, %d updated, %d deleted", len(to_create), len(to_update), len(to_delete))
+        return changed
+
+
+def _chain_ids(directory: DirectoryIndex) -> list[int]:
+    """
+    Return the pks of a directory's ancestors followed by its own.
+
+    Read from tree_path when set; a row without one falls back to a
+    get_ancestors() query.
+
+    Args:
+        directory: The directory
+
+    Returns:
+        Ancestor pks, albums root first, then directory.pk
+    """
+    if directory.tree_path:
+        return [*directory.ancestor_ids, directory.pk]
+    return list(directory.get_ancestors(include_self=True).values_list("pk", flat=True))
+
+
+def _by_filetype(values: dict[str, Any], default: Value) -> Case:
+    """
+    Build a CASE expression choosing a value by the row's filetype.
+
+    Args:
+        values: fileext → value for rows of that filetype
+        default: Value for any other row
+
+    Returns:
+        The Case expression
+    """
+    return Case(
+        *[When(filetype=filetype, then=Value(value, output_field=default.output_field)) for filetype, value in values.items()],
+        default=default,
+        output_field=default.output_field,
+    )
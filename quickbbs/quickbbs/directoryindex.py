@@ -14,7 +14,8 @@ from __future__ import annotations
 import logging
 import os
 import time
-from collections.abc import Sequence
+from collections.abc import Callable, Iterable, Sequence
+from itertools import chain, islice
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 from urllib.parse import quote, unquote
@@ -25,22 +26,27 @@ from django.conf import settings
 from django.contrib.postgres.indexes import GinIndex
 from django.db import DatabaseError, close_old_connections, models, transaction
 from django.db.models import Case, Count, Q, Value, When
+from django.db.models.functions import Concat, Length, Substr
 from django.db.models.query import QuerySet
 from django.urls import reverse
 
 from filetypes.models import filetypes, get_ftype_dict
-from frontend.file_listings import return_disk_listing_sync
+from frontend.file_listings import iter_disk_listing, return_disk_listing_sync
+from quickbbs.cache_bus import invalidation_bus
 from quickbbs.common import (
     DIR_SORT_MATRIX,
     SORT_MATRIX,
-    _batch_compute_file_shas,
     get_dir_sha,
     normalize_fqpn,
     normalize_string_title,
 )
-from quickbbs.MonitoredCache import create_cache
+from quickbbs.file_hash_cache import FileHashCache
+from quickbbs.MonitoredCache import ThreadSafeTTLCache, create_cache
 from quickbbs.natsort_model import NaturalSortField
+from quickbbs.packed_shas import PackedShaList
 from quickbbs.quickbbs_settings import get_directory_cover_queries
+from quickbbs.shared_sha_lists import shared_sha_lists
+from thumbnails.models import versioned_thumbnail_url
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +58,12 @@ directoryindex_cache = create_cache(settings.DIRECTORYINDEX_CACHE_SIZE, "directo
 # Kept separate from directoryindex_cache to avoid key-type confusion with SHA-based keys.
 get_view_url_cache = create_cache(settings.GET_VIEW_URL_CACHE_SIZE, "get_view_url", monitored=settings.CACHE_MONITORING)
 
+# PKs of large directories whose streaming sync this process handed to the
+# task runner (update_database_from_disk(defer_large=True)), so repeat page
+# views don't list the directory and queue the sync again while it runs.
+# Expires so a sync task that failed is queued again.
+deferred_sync_cache = ThreadSafeTTLCache(maxsize=1000, ttl=settings.STREAMING_SYNC_DEFER_TTL)
+
 # These caches live in quickbbs.cache_registry (shared across apps).
 # Imported here for use by @cached decorators on get_distinct_file_shas(),
 # get_all_file_shas(), get_dir_counts(), get_file_counts(), and
@@ -59,6 +71,7 @@ get_view_url_cache = create_cache(settings.GET_VIEW_URL_CACHE_SIZE, "get_view_ur
 # Must come after module-level cache creation above to avoid a cyclic import.
 from quickbbs.cache_registry import (  # noqa: E402  # pylint: disable=wrong-import-position
     all_files_shas_cache,
+    bump_search_generation,
     clear_layout_cache_for_directories,
     dir_counts_cache,
     distinct_files_cache,
@@ -95,6 +108,21 @@ DIRECTORYINDEX_SR_FILETYPE_THUMB_PARENT = ("filetype", "thumbnail", "parent_dire
 # For parent navigation only
 DIRECTORYINDEX_SR_PARENT = ("parent_directory",)
 
+# Stage 1 sync fields — the lightweight FileIndex.values() row shape that
+# _file_needs_check() reads (shared by sync_files and sync_files_streaming)
+_SYNC_CANDIDATE_FIELDS = (
+    "id",
+    "name",
+    "lastmod",
+    "size",
+    "file_sha256",
+    "duration",
+    "is_animated",
+    "filetype__fileext",
+    "filetype__is_movie",
+    "filetype__is_link",
+)
+
 
 def _clear_directoryindex_cache(directories: list["DirectoryIndex"]) -> None:
     """
@@ -124,10 +152,45 @@ def _clear_directoryindex_cache(directories: list["DirectoryIndex"]) -> None:
 
         logger.debug("Cleared %d DirectoryIndex cache entries for %d directories", cleared_count, len(directories))
 
+        # Other processes hold their own directoryindex_cache — evict there too
+        invalidation_bus.publish(directory_shas=[d.dir_fqpn_sha256 for d in directories if d and d.dir_fqpn_sha256])
+
     except (KeyError, AttributeError, models.ObjectDoesNotExist) as e:
         logger.error("Error clearing DirectoryIndex cache for directories: %s", e)
 
 
+def _tree_path_ids(tree_path: str) -> list[int]:
+    """
+    Return the pks held in a DirectoryIndex.tree_path, albums root first.
+
+    Args:
+        tree_path: A tree_path value, e.g. "/1/5/42/" ("" yields []).
+
+    Returns:
+        The pks, e.g. [1, 5, 42] — the last one is the row's own pk.
+    """
+    return [int(part) for part in tree_path.split("/") if part]
+
+
+def _evict_deleted_directories(rows: list[tuple[int, str | None]]) -> None:
+    """
+    Drop every cached entry for DirectoryIndex rows that were just deleted.
+
+    _clear_directoryindex_cache() refreshes the cached instances it pops,
+    which a deleted row can't do, so deletions evict directly.
+
+    Args:
+        rows: (pk, dir_fqpn_sha256) pairs of the deleted rows.
+    """
+    shas = [sha for _, sha in rows if sha]
+    for sha in shas:
+        directoryindex_cache.pop(hashkey(sha), None)
+    clear_layout_cache_for_directories({pk for pk, _ in rows})
+    invalidation_bus.publish(directory_shas=shas)
+    if rows:
+        bump_search_generation()
+
+
 class DirectoryIndex(models.Model):
     """
     The master index for directories/folders in the gallery filesystem.
@@ -206,6 +269,14 @@ class DirectoryIndex(models.Model):
         default=None,
         related_name="parent_dir",
     )
+    # Materialized path of pks from the albums root down to this row,
+    # "/<root pk>/.../<own pk>/", kept in step with parent_directory by
+    # add_directory(). A whole subtree is one indexed prefix scan
+    # (get_descendants()) and the ancestors are read out of the string
+    # (get_ancestors(), depth) instead of walking parent links level by
+    # level. "" on rows written before the column existed, until
+    # add_directory() touches them or rebuild_tree_paths() runs.
+    tree_path = models.CharField(max_length=512, default="", blank=True)
     # lastscan/lastmod are never filtered standalone (sorts always follow a
     # parent_directory filter), so they carry no index (pg_stat, 2026-07-04).
     lastscan = models.FloatField(default=None)  # Stored as Unix TimeStamp (ms)
@@ -259,6 +330,9 @@ class DirectoryIndex(models.Model):
             # (frontend/views.py _safe_regex_search) — previously a ~108 ms seq
             # scan over 52k rows per search query.
             GinIndex(fields=["fqpndirectory"], name="directoryindex_fqpn_trgm_idx", opclasses=["gin_trgm_ops"]),
+            # Pattern-ops btree: serves tree_path__startswith (LIKE 'prefix%')
+            # subtree scans, which a plain btree can't under a non-C collation.
+            models.Index(fields=["tree_path"], name="directoryindex_tree_path_idx", opclasses=["varchar_pattern_ops"]),
         ]
 
     @staticmethod
@@ -330,7 +404,8 @@ class DirectoryIndex(models.Model):
         # recursion and link-target resolution were paying that write even
         # when nothing had changed. parent_directory_id is compared (not just
         # assumed) so records with a NULL/incorrect parent link still fall
-        # through to update_or_create for repair.
+        # through to update_or_create for repair; tree_path likewise, so rows
+        # from before the column existed pick it up on their next visit.
         # search_for_directory_by_sha reads through directoryindex_cache;
         # its entry is popped by the invalidation methods below whenever a
         # scan touches this directory, so a cached lastmod is trustworthy here.
@@ -341,6 +416,7 @@ class DirectoryIndex(models.Model):
             and existing.fqpndirectory == fqpn_directory
             and existing.lastmod == stat_info.st_mtime
             and existing.parent_directory_id == (parent_dir_link.pk if parent_dir_link else None)
+            and existing.tree_path == DirectoryIndex._child_tree_path(parent_dir_link, existing.pk)
         ):
             return True, existing
 
@@ -356,17 +432,66 @@ class DirectoryIndex(models.Model):
         }
 
         # Use update_or_create with dir_fqpn_sha256 as the unique lookup field
-        new_rec, _created = DirectoryIndex.objects.update_or_create(
+        new_rec, created = DirectoryIndex.objects.update_or_create(
             dir_fqpn_sha256=defaults["dir_fqpn_sha256"],
             defaults=defaults,
             create_defaults=defaults,
         )
+        if created:
+            bump_search_generation()
+        # A new row's pk (and so its tree_path) only exists after the INSERT;
+        # the parent's own tree_path was settled by the recursive call above.
+        tree_path = DirectoryIndex._child_tree_path(parent_dir_link, new_rec.pk)
+        if new_rec.tree_path != tree_path:
+            new_rec._set_tree_path(tree_path)
         # The write leaves any cached copy of this record stale — pop it so
         # the fast path above compares against the fresh row on the next call
         # instead of falling through to a redundant rewrite.
         directoryindex_cache.pop(hashkey(dir_sha256), None)
         return True, new_rec
 
+    @staticmethod
+    def _child_tree_path(parent: "DirectoryIndex | None", pk: int) -> str:
+        """
+        Return the tree_path a row with this pk should hold under parent.
+
+        Args:
+            parent: The row's parent_directory (None for the albums root).
+            pk: The row's own pk.
+
+        Returns:
+            The parent's tree_path with pk appended ("/<pk>/" with no parent).
+        """
+        prefix = parent.tree_path if parent is not None and parent.tree_path else "/"
+        return f"{prefix}{pk}/"
+
+    def _set_tree_path(self, tree_path: str) -> None:
+        """
+        Store a new tree_path for this row, carrying its subtree along.
+
+        A row whose tree_path changes from one non-empty value to another
+        was re-parented (add_directory() repairing a NULL or wrong parent
+        link), so every descendant's path is rewritten in the same single
+        UPDATE by swapping the old prefix for the new one.
+
+        Args:
+            tree_path: The new tree_path.
+        """
+        old_path = self.tree_path
+        moved: list[tuple[int, str | None]] = []
+        with transaction.atomic():
+            DirectoryIndex.objects.filter(pk=self.pk).update(tree_path=tree_path)
+            if old_path:
+                subtree = DirectoryIndex.objects.filter(tree_path__startswith=old_path).exclude(pk=self.pk)
+                moved = list(subtree.values_list("pk", "dir_fqpn_sha256"))
+                subtree.update(tree_path=Concat(Value(tree_path), Substr("tree_path", len(old_path) + 1), output_field=models.CharField()))
+        self.tree_path = tree_path
+        # Cached descendants hold the old prefix — get_descendants() on one
+        # of them would scan the wrong subtree
+        for _, sha in moved:
+            if sha:
+                directoryindex_cache.pop(hashkey(sha), None)
+
     def invalidate_thumb(self) -> None:
         """
         Invalidate the thumbnail for the directory.  This is used when the directory
@@ -625,6 +750,9 @@ class DirectoryIndex(models.Model):
             updated_count = DirectoryIndex.objects.all().update(cache_invalidated=True)
             logger.info("Invalidated %d cache records", updated_count)
             directoryindex_cache.clear()
+            if shared_sha_lists.enabled:
+                shared_sha_lists.clear()
+            invalidation_bus.publish(clear_all=True)
             return updated_count
         except DatabaseError as e:
             logger.error("Error clearing all cache records: %s", e)
@@ -633,10 +761,12 @@ class DirectoryIndex(models.Model):
     @staticmethod
     def get_all_parent_shas(sha_list: Sequence[str], select_related: Sequence[str]) -> set[str]:
         """
-        Get all parent directory SHAs using optimized batch queries.
+        Get all parent directory SHAs, reading the ancestors out of tree_path.
 
-        Pure Django ORM with no external dependencies. Uses iterative batch fetching
-        instead of recursive CTE, but still much more efficient than N*M approach.
+        Two queries however deep the tree: one for the input rows'
+        tree_paths, one for the SHAs of every pk those paths name. Input
+        rows without a tree_path yet (see rebuild_tree_paths()) fall back
+        to the level-by-level parent walk, _walk_parent_shas().
 
         Args:
             sha_list: Sequence of directory SHA256 hashes to find parents for
@@ -645,11 +775,6 @@ class DirectoryIndex(models.Model):
         Returns:
             Set containing all input SHAs plus all ancestor SHAs
 
-        Performance:
-            - Queries: O(D) where D = max directory depth (typically 5-10)
-            - Old approach: O(N + N*M) where N = dirs, M = avg depth
-            - Improvement: Batches all directories per level vs per-directory traversal
-
         Example:
             Input: ["sha_of_/albums/photos/2024", "sha_of_/albums/videos"]
             Output: {"sha_of_/", "sha_of_/albums", "sha_of_/albums/photos",
@@ -661,7 +786,42 @@ class DirectoryIndex(models.Model):
             return set()
 
         all_shas = set(sha_list)
-        current_level_shas = set(sha_list)
+        ancestor_ids: set[int] = set()
+        unpathed_shas: set[str] = set()
+        rows = DirectoryIndex.objects.filter(dir_fqpn_sha256__in=all_shas, delete_pending=False).values_list("dir_fqpn_sha256", "tree_path")
+        for sha, tree_path in rows:
+            if tree_path:
+                ancestor_ids.update(_tree_path_ids(tree_path)[:-1])
+            elif sha is not None:
+                unpathed_shas.add(sha)
+
+        if ancestor_ids:
+            ancestor_shas = DirectoryIndex.objects.filter(pk__in=ancestor_ids).values_list("dir_fqpn_sha256", flat=True)
+            # dir_fqpn_sha256 is nullable in the schema; drop any NULLs so the
+            # set[str] return contract holds.
+            all_shas.update(sha for sha in ancestor_shas if sha is not None)
+        if unpathed_shas:
+            all_shas |= DirectoryIndex._walk_parent_shas(unpathed_shas, select_related)
+
+        return all_shas
+
+    @staticmethod
+    def _walk_parent_shas(sha_list: Iterable[str], select_related: Sequence[str]) -> set[str]:
+        """
+        Get all parent directory SHAs by walking parent links, one query per level.
+
+        The fallback for rows without a tree_path. Batches all directories
+        per level, so queries are O(D) where D = max directory depth.
+
+        Args:
+            sha_list: Directory SHA256 hashes to find parents for
+            select_related: Sequence of related fields to select
+
+        Returns:
+            Set containing all input SHAs plus all ancestor SHAs
+        """
+        all_shas = set(sha_list)
+        current_level_shas = set(all_shas)
         max_iterations = settings.MAX_DIRECTORY_DEPTH  # Prevent infinite loops (reasonable max directory depth)
 
         for iteration in range(max_iterations):
@@ -695,10 +855,160 @@ class DirectoryIndex(models.Model):
 
         return all_shas
 
+    @property
+    def ancestor_ids(self) -> list[int]:
+        """
+        Return the pks of this directory's ancestors, albums root first.
+
+        Read from tree_path — no query. Empty for the albums root, and for
+        a row whose tree_path hasn't been filled in yet.
+
+        Returns:
+            List of ancestor pks (this row's own pk excluded)
+        """
+        return _tree_path_ids(self.tree_path)[:-1]
+
+    @property
+    def depth(self) -> int:
+        """
+        Return how many levels below the albums root this directory is.
+
+        Returns:
+            0 for the albums root, 1 for its subdirectories, and so on
+        """
+        if self.tree_path:
+            return len(_tree_path_ids(self.tree_path)) - 1
+        return max(0, self.fqpndirectory.count("/") - DirectoryIndex.get_albums_root().count("/"))
+
+    def get_ancestors(self, include_self: bool = False) -> QuerySet["DirectoryIndex"]:
+        """
+        Return this directory's ancestors, albums root first, in one query.
+
+        Args:
+            include_self: Also include this directory (last)
+
+        Returns:
+            QuerySet of DirectoryIndex rows ordered from the root down
+        """
+        if self.tree_path:
+            ids = _tree_path_ids(self.tree_path)
+            lookup = Q(pk__in=ids if include_self else ids[:-1])
+        else:
+            # No tree_path yet: the ancestors' paths are this path's own prefixes
+            albums_root = DirectoryIndex.get_albums_root()
+            prefixes = [str(parent).rstrip("/") + "/" for parent in Path(self.fqpndirectory).parents]
+            prefixes = [prefix for prefix in prefixes if DirectoryIndex.is_in_albums_tree(prefix, albums_root)]
+            if include_self:
+                prefixes.append(self.fqpndirectory)
+            lookup = Q(fqpndirectory__in=prefixes)
+        return DirectoryIndex.objects.filter(lookup).order_by(Length("fqpndirectory"))
+
+    def get_descendants(self, include_self: bool = False) -> QuerySet["DirectoryIndex"]:
+        """
+        Return every directory below this one, at any depth, in one query.
+
+        A prefix scan on tree_path (directoryindex_tree_path_idx); rows
+        without a tree_path yet fall back to the equivalent fqpndirectory
+        prefix scan.
+
+        Args:
+            include_self: Also include this directory
+
+        Returns:
+            QuerySet of DirectoryIndex rows (unordered)
+        """
+        if self.tree_path:
+            subtree = DirectoryIndex.objects.filter(tree_path__startswith=self.tree_path)
+        else:
+            subtree = DirectoryIndex.objects.filter(fqpndirectory__startswith=self.fqpndirectory)
+        return subtree if include_self else subtree.exclude(pk=self.pk)
+
+    @staticmethod
+    def delete_subtrees(directories: QuerySet["DirectoryIndex"]) -> int:
+        """
+        Delete directories together with every directory below them.
+
+        Once a directory is gone from disk so is everything under it; deleting
+        only the row itself (parent_directory is DB_SET_NULL) would leave its
+        subdirectories behind as parentless rows. Their FileIndex rows are
+        orphaned, not deleted, exactly as for the directory itself (see
+        delete_directory_record()). The subtrees' totals are subtracted from
+        the surviving ancestors' DirectoryRollup rows first.
+
+        Args:
+            directories: The subtree roots to delete
+
+        Returns:
+            Number of DirectoryIndex rows deleted
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .directory_rollup import DirectoryRollup
+
+        roots = list(directories.only("pk", "tree_path", "fqpndirectory"))
+        subtree = Q()
+        for root in roots:
+            subtree |= Q(tree_path__startswith=root.tree_path) if root.tree_path else Q(fqpndirectory__startswith=root.fqpndirectory)
+        if not subtree:
+            return 0
+
+        DirectoryRollup.detach_subtrees(roots)
+        rows = list(DirectoryIndex.objects.filter(subtree).values_list("pk", "dir_fqpn_sha256"))
+        deleted, _ = DirectoryIndex.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        _evict_deleted_directories(rows)
+        return deleted
+
+    @staticmethod
+    def rebuild_tree_paths(dry_run: bool = False) -> int:
+        """
+        Recompute every row's tree_path from parent_directory and repair drift.
+
+        Backfills rows written before the column existed and corrects any
+        path that no longer matches its parent chain. Reads (pk, parent,
+        tree_path) for the whole table in one pass and rebuilds the paths in
+        memory, so it costs one SELECT plus batched UPDATEs for the rows
+        that changed.
+
+        Args:
+            dry_run: Count the rows that would change without writing
+
+        Returns:
+            Number of rows whose tree_path was (or would be) changed
+        """
+        parent_of: dict[int, int | None] = {}
+        stored: dict[int, str] = {}
+        for pk, parent_id, tree_path in DirectoryIndex.objects.values_list("pk", "parent_directory_id", "tree_path").iterator(
+            chunk_size=settings.DIRECTORY_SYNC_CHUNK_SIZE
+        ):
+            parent_of[pk] = parent_id
+            stored[pk] = tree_path
+
+        expected: dict[int, str] = {}
+        for pk in parent_of:
+            # Climb to the nearest row with a known path, then fill in on the way down
+            chain = []
+            current: int | None = pk
+            while current is not None and current not in expected and current not in chain:
+                chain.append(current)
+                current = parent_of.get(current)
+            if current is not None and current in chain:
+                logger.warning("parent_directory cycle at DirectoryIndex pk %d; treating it as a root", current)
+                current = None
+            prefix = expected[current] if current is not None else "/"
+            for row_pk in reversed(chain):
+                prefix = f"{prefix}{row_pk}/"
+                expected[row_pk] = prefix
+
+        changed = [DirectoryIndex(pk=pk, tree_path=path) for pk, path in expected.items() if stored[pk] != path]
+        if changed and not dry_run:
+            DirectoryIndex.objects.bulk_update(changed, ["tree_path"], batch_size=settings.DIRECTORY_SYNC_BATCH_SIZE)
+            directoryindex_cache.clear()
+            invalidation_bus.publish(clear_all=True)
+        return len(changed)
+
     @staticmethod
     def delete_directory_record(index_dir: "DirectoryIndex", cache_only: bool = False) -> None:
         """
-        Delete the Directory_Index record and ensure cache cleanup.
+        Delete the Directory_Index record (and its subdirectories) and ensure cache cleanup.
 
         Optimized version that accepts a DirectoryIndex record directly,
         avoiding redundant database lookups.
@@ -724,13 +1034,13 @@ class DirectoryIndex(models.Model):
         index_dir.invalidate_cache()
 
         if not cache_only:
-            # Delete the directory record (cascades to related records)
-            index_dir.delete()
+            # Delete the directory record and everything below it
+            DirectoryIndex.delete_subtrees(DirectoryIndex.objects.filter(pk=index_dir.pk))
 
     @staticmethod
     def delete_directory(fqpn_directory: str, cache_only: bool = False) -> None:
         """
-        Delete the Directory_Index data for the fqpn_directory.
+        Delete the Directory_Index data for the fqpn_directory (and its subdirectories).
 
         FileIndex records are NOT deleted with the directory: home_directory
         uses on_delete=DB_SET_NULL, so the directory's files survive as orphans
@@ -749,7 +1059,7 @@ class DirectoryIndex(models.Model):
         dir_sha256 = get_dir_sha(normalize_fqpn(fqpn_directory))
         DirectoryIndex.invalidate_cache_by_sha(dir_sha256)
         if not cache_only:
-            DirectoryIndex.objects.filter(dir_fqpn_sha256=dir_sha256).delete()
+            DirectoryIndex.delete_subtrees(DirectoryIndex.objects.filter(dir_fqpn_sha256=dir_sha256))
 
     def do_files_exist(self, additional_filters: dict[str, Any] | None = None) -> bool:
         """
@@ -826,6 +1136,23 @@ class DirectoryIndex(models.Model):
 
         return totals
 
+    def get_rollup(self) -> dict[str, Any]:
+        """
+        Return the recursive totals of everything below this directory.
+
+        Read from the precomputed DirectoryRollup rows (one query) rather
+        than walking the subtree; see quickbbs/directory_rollup.py for how
+        they are kept current.
+
+        Returns: dictionary with "files" and "bytes" (recursive totals),
+        "newest_mtime" (Unix timestamp of the newest file, 0.0 if none) and
+        "by_filetype" (filetype → recursive file count)
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .directory_rollup import DirectoryRollup
+
+        return DirectoryRollup.summary(self)
+
     @staticmethod
     def search_for_directory_by_sha(sha_256: str) -> tuple[bool, "DirectoryIndex | None"]:
         """
@@ -1173,7 +1500,7 @@ class DirectoryIndex(models.Model):
     @cached(
         distinct_files_cache, key=lambda self, sort=0, user=None: hashkey(self, sort, user.pk if user is not None and user.is_authenticated else None)
     )
-    def get_distinct_file_shas(self, sort: int = 0, user: "AbstractBaseUser | AnonymousUser | None" = None) -> list[str]:
+    def get_distinct_file_shas(self, sort: int = 0, user: "AbstractBaseUser | AnonymousUser | None" = None) -> Sequence[str]:
         """
         Get distinct file SHA256s for this directory with caching.
 
@@ -1192,8 +1519,11 @@ class DirectoryIndex(models.Model):
           inside the outer SHA256 values_list query, so no FileIndex objects,
           joined rows, or PK lists are materialized in Python
         - Subsequent calls: Returns cached list (instant, no DB query)
-        - Memory: ~64KB per 1,000 files (just SHA256 strings), multiplied by
+        - Memory: ~32KB per 1,000 files (packed 32-byte digests, see
+          _compact_sha_list) plus a lazily built position table, multiplied by
           active authenticated-user count now that the key includes user.pk
+          — and by worker count, unless SHARED_SHA_LISTS_ENABLED stores one
+          copy per host
 
         Cache Invalidation:
         Automatically cleared by clear_layout_cache_for_directories() when:
@@ -1209,36 +1539,42 @@ class DirectoryIndex(models.Model):
                 to the query before this parameter existed.
 
         Returns:
-            List of unique_sha256 strings for distinct files in the directory,
-            sorted according to sort order
-        """
-        # Two-step distinct design (see _distinct_file_pks): the outer query
-        # reads only the unique_sha256 column with the user's sort order, with
-        # the deduplicated PKs as an inline subquery — one round-trip, no
-        # FileIndex objects, joined rows, or PK lists materialized in Python.
-        # Import here to avoid circular import at module level
-        # pylint: disable-next=import-outside-toplevel
-        # pylint: disable-next=import-outside-toplevel
-        from .favorite import Favorite
-        from .fileindex import FileIndex as FileIndexModel
+            Sequence of unique_sha256 strings for distinct files in the
+            directory, sorted according to sort order — a PackedShaList
+            (ShaListView when SHARED_SHA_LISTS_ENABLED), or a plain list
+            when the values can't be packed (see _compact_sha_list)
+        """
+
+        def build() -> list[str]:
+            # Two-step distinct design (see _distinct_file_pks): the outer query
+            # reads only the unique_sha256 column with the user's sort order, with
+            # the deduplicated PKs as an inline subquery — one round-trip, no
+            # FileIndex objects, joined rows, or PK lists materialized in Python.
+            # Import here to avoid circular import at module level
+            # pylint: disable-next=import-outside-toplevel
+            # pylint: disable-next=import-outside-toplevel
+            from .favorite import Favorite
+            from .fileindex import FileIndex as FileIndexModel
 
-        distinct_pks = self._distinct_file_pks(sort, user=user)
-        queryset = FileIndexModel.objects.filter(pk__in=distinct_pks)
-        queryset = Favorite.annotate_is_favorited(queryset, user, target_field="file")
-        # cast: unique_sha256 is nullable in the schema (django-stubs types the
-        # values_list element as str | None), but scanned files carry a SHA and
-        # existing behavior keeps any transient NULL rows in the list rather
-        # than silently changing pagination counts.
-        return cast(
-            "list[str]",
-            list(queryset.order_by(*SORT_MATRIX[sort]).values_list("unique_sha256", flat=True)),
-        )
+            distinct_pks = self._distinct_file_pks(sort, user=user)
+            queryset = FileIndexModel.objects.filter(pk__in=distinct_pks)
+            queryset = Favorite.annotate_is_favorited(queryset, user, target_field="file")
+            # cast: unique_sha256 is nullable in the schema (django-stubs types the
+            # values_list element as str | None), but scanned files carry a SHA and
+            # existing behavior keeps any transient NULL rows in the list rather
+            # than silently changing pagination counts.
+            return cast(
+                "list[str]",
+                list(queryset.order_by(*SORT_MATRIX[sort]).values_list("unique_sha256", flat=True)),
+            )
+
+        return self._compact_sha_list("distinct", sort, user, build)
 
     # Same key normalization as get_distinct_file_shas — see the note there.
     @cached(
         all_files_shas_cache, key=lambda self, sort=0, user=None: hashkey(self, sort, user.pk if user is not None and user.is_authenticated else None)
     )
-    def get_all_file_shas(self, sort: int = 0, user: "AbstractBaseUser | AnonymousUser | None" = None) -> list[str]:
+    def get_all_file_shas(self, sort: int = 0, user: "AbstractBaseUser | AnonymousUser | None" = None) -> Sequence[str]:
         """
         Get all file SHA256s for this directory (duplicates included) with caching.
 
@@ -1260,19 +1596,68 @@ class DirectoryIndex(models.Model):
                 to the query before this parameter existed.
 
         Returns:
-            List of unique_sha256 strings for all non-deleted files in the
-            directory, sorted according to sort order
+            Sequence of unique_sha256 strings for all non-deleted files in the
+            directory, sorted according to sort order (same sequence types
+            as get_distinct_file_shas)
         """
-        # pylint: disable-next=import-outside-toplevel
-        from .favorite import Favorite
 
-        queryset = self.FileIndex_entries.filter(delete_pending=False)
-        queryset = Favorite.annotate_is_favorited(queryset, user, target_field="file")
-        # cast: same nullable unique_sha256 rationale as get_distinct_file_shas.
-        return cast(
-            "list[str]",
-            list(queryset.order_by(*SORT_MATRIX[sort]).values_list("unique_sha256", flat=True)),
-        )
+        def build() -> list[str]:
+            # pylint: disable-next=import-outside-toplevel
+            from .favorite import Favorite
+
+            queryset = self.FileIndex_entries.filter(delete_pending=False)
+            queryset = Favorite.annotate_is_favorited(queryset, user, target_field="file")
+            # cast: same nullable unique_sha256 rationale as get_distinct_file_shas.
+            return cast(
+                "list[str]",
+                list(queryset.order_by(*SORT_MATRIX[sort]).values_list("unique_sha256", flat=True)),
+            )
+
+        return self._compact_sha_list("all", sort, user, build)
+
+    def _compact_sha_list(
+        self,
+        kind: str,
+        sort: int,
+        user: "AbstractBaseUser | AnonymousUser | None",
+        build: Callable[[], list[str]],
+    ) -> Sequence[str]:
+        """
+        Return an ordered SHA list in packed form, shared across workers when enabled.
+
+        The result is what distinct_files_cache/all_files_shas_cache hold:
+        a PackedShaList (32 bytes per entry, O(1) index() for
+        build_context_info's position lookup) instead of a list of 64-char
+        strings. With SHARED_SHA_LISTS_ENABLED, a list another worker already
+        built for this directory's current cache_lastscan is mapped zero-copy
+        instead of re-querying; otherwise build() runs and its result is
+        published for the other workers. Falls back to the plain list from
+        build() when the values can't be packed (non-hex SHA values).
+
+        Args:
+            kind: "distinct" or "all" — which list this is
+            sort: Sort order (0-2)
+            user: Requesting user (only user.pk is used, matching the cache keys)
+            build: Callable running the ordered values_list query
+
+        Returns:
+            PackedShaList / ShaListView, or the list from build()
+        """
+        if not shared_sha_lists.enabled:
+            shas = build()
+            packed = PackedShaList.from_shas(shas)
+            return packed if packed is not None else shas
+
+        user_pk = user.pk if user is not None and user.is_authenticated else None
+        view = shared_sha_lists.load(self.pk, kind, sort, user_pk, self.cache_lastscan)
+        if view is not None:
+            return view
+        shas = build()
+        view = shared_sha_lists.save(self.pk, kind, sort, user_pk, self.cache_lastscan, shas)
+        if view is not None:
+            return view
+        packed = PackedShaList.from_shas(shas)
+        return packed if packed is not None else shas
 
     def get_cover_image(self) -> FileIndex | None:
         """
@@ -1403,12 +1788,15 @@ class DirectoryIndex(models.Model):
         Generate the URL for the thumbnail of the current item
         The argument is unused, included for API compt. between FileIndex & DirectoryIndex
 
+        Directories loaded with thumbnail_version_annotations("thumbnail__")
+        get a ?v= token naming the cover's thumbnail generation.
+
         Returns
         -------
             Django URL object
 
         """
-        return reverse(r"thumbnail_dir", args=(self.dir_fqpn_sha256,))
+        return versioned_thumbnail_url(reverse(r"thumbnail_dir", args=(self.dir_fqpn_sha256,)), self)
 
     @staticmethod
     def _make_sibling_link(fqpn: str) -> dict[str, str]:
@@ -1483,7 +1871,7 @@ class DirectoryIndex(models.Model):
         Handle case where this directory doesn't exist on filesystem.
 
         Called during filesystem synchronization when directory is missing.
-        - Deletes this directory record from database
+        - Deletes this directory record (and its subdirectories) from database
         - Clears cache for parent directory
 
         This is a sync method — all operations are direct Django ORM calls.
@@ -1552,7 +1940,7 @@ class DirectoryIndex(models.Model):
         Synchronize my subdirectories with filesystem entries.
 
         Compares database records of subdirectories against filesystem and:
-        - Marks missing subdirectories for deletion
+        - Deletes missing subdirectories, with everything below them
         - Updates modification times for changed directories
         - Creates new subdirectories found in filesystem
 
@@ -1658,7 +2046,7 @@ class DirectoryIndex(models.Model):
         if deleted_dirs:
             logger.info("Directories to delete: %d", len(deleted_dirs))
             with transaction.atomic():
-                all_dirs_queryset.filter(fqpndirectory__in=deleted_dirs).delete()
+                DirectoryIndex.delete_subtrees(all_dirs_queryset.filter(fqpndirectory__in=deleted_dirs))
                 self.invalidate_cache()
 
         return bool(updated_records or new_dirs or deleted_dirs)
@@ -1738,6 +2126,8 @@ class DirectoryIndex(models.Model):
         - Updates modified files (size, timestamps, SHA256)
         - Creates new files found in filesystem
         - Uses bulk operations for efficiency
+        - Applies the net change to the DirectoryRollup totals of this
+          directory and its ancestors
 
         IMPORTANT - Simplification Notes:
         Removed complex chunking logic that was causing multiple QuerySet evaluations.
@@ -1773,6 +2163,9 @@ class DirectoryIndex(models.Model):
             database already matched the filesystem.
         """
         # Inline import to avoid circular dependency: .fileindex → .models → .directoryindex
+        # pylint: disable-next=import-outside-toplevel
+        from .directory_rollup import DirectoryRollup
+
         # pylint: disable-next=import-outside-toplevel
         from .fileindex import FileIndex
 
@@ -1787,20 +2180,7 @@ class DirectoryIndex(models.Model):
         # Stage 1: lightweight dict-row fetch (no ORM instantiation, no JOIN
         # materialization) carrying just enough fields to decide whether each
         # matched file might need a full check_for_updates() pass.
-        candidate_rows = list(
-            FileIndex.objects.filter(home_directory=self.pk, delete_pending=False).values(
-                "id",
-                "name",
-                "lastmod",
-                "size",
-                "file_sha256",
-                "duration",
-                "is_animated",
-                "filetype__fileext",
-                "filetype__is_movie",
-                "filetype__is_link",
-            )
-        )
+        candidate_rows = list(FileIndex.objects.filter(home_directory=self.pk, delete_pending=False).values(*_SYNC_CANDIDATE_FIELDS))
         all_db_filenames = {row["name"] for row in candidate_rows}
 
         # Find files that exist in both DB and filesystem (case-insensitive match)
@@ -1809,6 +2189,61 @@ class DirectoryIndex(models.Model):
         # dict.keys() is a set-like view (keys are inherently unique) — supports & directly
         matching_lower_names = fs_names_lower_map.keys() & db_names_lower_set
 
+        records_to_update = self._collect_file_updates(candidate_rows, matching_lower_names, fs_names_lower_map, fs_file_names_dict)
+
+        # Get files to delete - case-insensitive: db files NOT matching any fs file
+        # Find DB files whose lowercase name is NOT in the filesystem (case-insensitive comparison)
+        #
+        # NOTE: Must compare at lowercase level to avoid false deletions on case-preserving filesystems.
+        # The DB may store "MyFile.txt" while filesystem returns "Myfile.Txt" (title-cased by return_disk_listing).
+        # Comparing original cases directly would incorrectly mark the file for deletion.
+        # Instead, we compare lowercase sets, then map back to original DB names.
+        db_names_not_in_fs_lower = db_names_lower_set - matching_lower_names
+        db_names_not_in_fs = {name for name in all_db_filenames if name.lower() in db_names_not_in_fs_lower}
+        files_to_delete_ids = list(
+            FileIndex.objects.filter(home_directory=self.pk, name__in=db_names_not_in_fs, delete_pending=False).values_list("id", flat=True)
+        )
+
+        # Process new files - case-insensitive: fs files NOT matching any db file
+        # Filesystem files whose lowercase name is NOT in database (case-insensitive)
+        fs_file_names_for_creation = [name for name in fs_file_names if name.lower() not in db_names_lower_set]
+        creation_fs_file_names_dict = {name: fs_file_names_dict[name] for name in fs_file_names_for_creation}
+        records_to_create = self._collect_new_files(creation_fs_file_names_dict)
+
+        # Execute batch operations with transactions
+        FileIndex.bulk_sync(records_to_update, records_to_create, files_to_delete_ids, bulk_size)
+
+        changed = bool(records_to_update or records_to_create or files_to_delete_ids)
+        if changed:
+            DirectoryRollup.refresh_directory(self)
+        return changed
+
+    def _collect_file_updates(
+        self,
+        candidate_rows: list[Any],
+        matching_lower_names: set[str] | Any,
+        fs_names_lower_map: dict[str, str],
+        fs_file_names_dict: dict[str, Any],
+    ) -> list[FileIndex]:
+        """
+        Run the two-stage update detection for matched files and return changed records.
+
+        Shared by sync_files() (whole directory) and sync_files_streaming()
+        (one chunk at a time). See sync_files() for the Stage 1 / Stage 2
+        design.
+
+        Args:
+            candidate_rows: Dict rows (_SYNC_CANDIDATE_FIELDS) for the DB files
+                under consideration.
+            matching_lower_names: Lowercased filenames present in both DB and
+                filesystem.
+            fs_names_lower_map: Maps lowercased filesystem name -> original
+                cased filesystem name.
+            fs_file_names_dict: Maps original cased filesystem name -> entry.
+
+        Returns:
+            Unsaved FileIndex records whose fields check_for_updates() changed.
+        """
         # Stage 1 delta filter: only rows that are both matched by filesystem
         # name and flagged by _file_needs_check() go on to Stage 2.
         changed_ids = self._find_changed_ids(candidate_rows, matching_lower_names, fs_names_lower_map, fs_file_names_dict)
@@ -1841,7 +2276,7 @@ class DirectoryIndex(models.Model):
         sha_results = {}
         if files_needing_hash:
             paths_to_hash = [path for _, path in files_needing_hash]
-            sha_results = _batch_compute_file_shas(paths_to_hash)
+            sha_results = FileHashCache.compute_file_shas(paths_to_hash)
 
         # Single pass through files needing updates
         records_to_update = []
@@ -1856,25 +2291,19 @@ class DirectoryIndex(models.Model):
             )
             if updated_record:
                 records_to_update.append(updated_record)
+        return records_to_update
 
-        # Get files to delete - case-insensitive: db files NOT matching any fs file
-        # Find DB files whose lowercase name is NOT in the filesystem (case-insensitive comparison)
-        #
-        # NOTE: Must compare at lowercase level to avoid false deletions on case-preserving filesystems.
-        # The DB may store "MyFile.txt" while filesystem returns "Myfile.Txt" (title-cased by return_disk_listing).
-        # Comparing original cases directly would incorrectly mark the file for deletion.
-        # Instead, we compare lowercase sets, then map back to original DB names.
-        db_names_not_in_fs_lower = db_names_lower_set - matching_lower_names
-        db_names_not_in_fs = {name for name in all_db_filenames if name.lower() in db_names_not_in_fs_lower}
-        files_to_delete_ids = list(
-            FileIndex.objects.filter(home_directory=self.pk, name__in=db_names_not_in_fs, delete_pending=False).values_list("id", flat=True)
-        )
+    def _collect_new_files(self, creation_fs_file_names_dict: dict[str, Any]) -> list[FileIndex]:
+        """
+        Hash and build unsaved FileIndex records for files not yet in the database.
 
-        # Process new files - case-insensitive: fs files NOT matching any db file
-        # Filesystem files whose lowercase name is NOT in database (case-insensitive)
-        fs_file_names_for_creation = [name for name in fs_file_names if name.lower() not in db_names_lower_set]
-        creation_fs_file_names_dict = {name: fs_file_names_dict[name] for name in fs_file_names_for_creation}
+        Args:
+            creation_fs_file_names_dict: Maps original cased filesystem name ->
+                entry for files with no matching DB row.
 
+        Returns:
+            Unsaved FileIndex instances (see process_new_files()).
+        """
         # Batch compute SHA256 for new files (excluding links/archives which are handled individually)
         new_file_paths = []
         for fs_entry in creation_fs_file_names_dict.values():
@@ -1885,17 +2314,136 @@ class DirectoryIndex(models.Model):
                     if fileext not in [".link", ".alias"]:
                         new_file_paths.append(str(fs_entry))
 
-        # Parallel SHA256 computation for new files
+        # Parallel SHA256 computation for new files; FileHashCache answers
+        # files whose (device, inode, size, mtime_ns) and path were already
+        # hashed (re-added directories, regenerated records) with a stat.
         new_sha_results = {}
         if new_file_paths:
-            new_sha_results = _batch_compute_file_shas(new_file_paths)
+            new_sha_results = FileHashCache.compute_file_shas(new_file_paths)
 
-        records_to_create = self.process_new_files(creation_fs_file_names_dict, new_sha_results)
+        return self.process_new_files(creation_fs_file_names_dict, new_sha_results)
 
-        # Execute batch operations with transactions
-        FileIndex.bulk_sync(records_to_update, records_to_create, files_to_delete_ids, bulk_size)
+    def sync_files_streaming(self, entries: Iterable[tuple[str, Any]], bulk_size: int, chunk_size: int) -> tuple[bool, bool, int]:
+        """
+        Synchronize subdirectories and files from a lazily-read listing, in bounded chunks.
+
+        Streaming counterpart of sync_subdirectories() + sync_files() for
+        directories larger than STREAMING_SYNC_THRESHOLD entries. Instead of
+        materializing the whole listing, every DB row, and every new FileIndex
+        object before a single bulk_sync(), each chunk of chunk_size files is
+        stat-compared (Stage 1), hashed, and written with its own bulk_sync()
+        call — so the per-request working set is one chunk, and rows become
+        visible to other requests as each chunk commits.
+
+        What is still held for the whole directory: the DB (id, lowercased
+        name) index and the set of names seen on disk (needed to detect
+        deletions, which can only be decided after the listing is
+        exhausted), plus subdirectory entries for sync_subdirectories().
+        Those are short strings, not ORM objects or stat results.
+
+        Args:
+            entries: Iterable of (title_cased_name, Path) tuples, normally
+                frontend.file_listings.iter_disk_listing().
+            bulk_size: Size of batches for bulk operations (updates/creates).
+            chunk_size: Number of file entries processed per chunk.
+
+        Returns:
+            (dirs_changed, files_changed, entry_count) — the first two match
+            sync_subdirectories()/sync_files() return values; entry_count is
+            the number of listing entries processed.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .directory_rollup import DirectoryRollup
+
+        # pylint: disable-next=import-outside-toplevel
+        from .fileindex import FileIndex
+
+        db_ids_by_lower: dict[str, list[int]] = {}
+        for pk, name in (
+            FileIndex.objects.filter(home_directory=self.pk, delete_pending=False)
+            .values_list("id", "name")
+            .iterator(chunk_size=settings.DIRECTORY_SYNC_CHUNK_SIZE)
+        ):
+            db_ids_by_lower.setdefault(name.lower(), []).append(pk)
+
+        seen_lower: set[str] = set()
+        dir_entries: dict[str, Any] = {}
+        chunk: dict[str, Any] = {}
+        files_changed = False
+        entry_count = 0
+        files_processed = 0
+        stream_start = time.perf_counter()
+
+        def flush() -> bool:
+            changed = self._sync_file_chunk(chunk, db_ids_by_lower, bulk_size)
+            logger.info(
+                "Streaming sync %s: %d files processed (%.1fs elapsed)",
+                self.fqpndirectory,
+                files_processed,
+                time.perf_counter() - stream_start,
+            )
+            chunk.clear()
+            return changed
+
+        for name, entry in entries:
+            entry_count += 1
+            if entry.is_dir():
+                dir_entries[name] = entry
+                continue
+            name_lower = name.lower()
+            # A case-variant of a name already handled in an earlier chunk
+            # would otherwise be created a second time (db_ids_by_lower only
+            # reflects rows that existed before the sync started).
+            if name_lower in seen_lower:
+                continue
+            seen_lower.add(name_lower)
+            chunk[name] = entry
+            files_processed += 1
+            if len(chunk) >= chunk_size:
+                files_changed |= flush()
+        if chunk:
+            files_changed |= flush()
+
+        dirs_changed = self.sync_subdirectories(dir_entries)
+
+        # Deletions need the complete listing: DB names never seen on disk.
+        files_to_delete_ids = [pk for name_lower, pks in db_ids_by_lower.items() if name_lower not in seen_lower for pk in pks]
+        if files_to_delete_ids:
+            FileIndex.bulk_sync([], [], files_to_delete_ids, bulk_size)
+            files_changed = True
+
+        if files_changed:
+            DirectoryRollup.refresh_directory(self)
+        return dirs_changed, files_changed, entry_count
+
+    def _sync_file_chunk(self, fs_file_names_dict: dict[str, Any], db_ids_by_lower: dict[str, list[int]], bulk_size: int) -> bool:
+        """
+        Apply updates and creations for one chunk of a streaming sync.
+
+        Args:
+            fs_file_names_dict: Maps original cased filesystem name -> entry
+                for this chunk's files.
+            db_ids_by_lower: Lowercased DB filename -> FileIndex ids, for the
+                whole directory as it was before the sync started.
+            bulk_size: Size of batches for bulk operations.
 
-        return bool(records_to_update or records_to_create or files_to_delete_ids)
+        Returns:
+            True if any record in the chunk was updated or created.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .fileindex import FileIndex
+
+        fs_names_lower_map = {name.lower(): name for name in fs_file_names_dict}
+        matching_lower_names = {name_lower for name_lower in fs_names_lower_map if name_lower in db_ids_by_lower}
+        matched_ids = [pk for name_lower in matching_lower_names for pk in db_ids_by_lower[name_lower]]
+        candidate_rows = list(FileIndex.objects.filter(id__in=matched_ids).values(*_SYNC_CANDIDATE_FIELDS)) if matched_ids else []
+
+        records_to_update = self._collect_file_updates(candidate_rows, matching_lower_names, fs_names_lower_map, fs_file_names_dict)
+        creation_fs_file_names_dict = {name: entry for name, entry in fs_file_names_dict.items() if name.lower() not in db_ids_by_lower}
+        records_to_create = self._collect_new_files(creation_fs_file_names_dict)
+
+        FileIndex.bulk_sync(records_to_update, records_to_create, [], bulk_size)
+        return bool(records_to_update or records_to_create)
 
 
 # The lambda is required (not key=hashkey): it rebinds keyword-argument calls
@@ -1951,7 +2499,7 @@ def get_ordered_sibling_dirs(parent_pk: int, sort: int) -> list[tuple[str, str]]
     )
 
 
-def update_database_from_disk(directory_record: "DirectoryIndex") -> "DirectoryIndex | None":
+def update_database_from_disk(directory_record: "DirectoryIndex", defer_large: bool = False) -> "DirectoryIndex | None":
     """
     Update database entries to match filesystem state for a given directory.
 
@@ -1960,10 +2508,16 @@ def update_database_from_disk(directory_record: "DirectoryIndex") -> "DirectoryI
 
     Args:
         directory_record: DirectoryIndex record for the directory to synchronize.
+        defer_large: Web views pass True. A directory above
+            STREAMING_SYNC_THRESHOLD entries is then not synced here: its
+            streaming sync is queued on the task runner (sync_large_directory)
+            and the record returned as-is, so the request renders what is in
+            the database now and later views show the chunks as they commit.
 
     Returns:
-        The directory_record on success, None on early exit (already cached,
-        deleted concurrently, or missing from the filesystem).
+        The directory_record on success or when its sync was deferred, None
+        on early exit (already cached, deleted concurrently, or missing from
+        the filesystem).
 
     Example:
         >>> success, directory = DirectoryIndex.search_for_directory_by_sha(sha)
@@ -2007,6 +2561,10 @@ def update_database_from_disk(directory_record: "DirectoryIndex") -> "DirectoryI
         logger.debug("Directory %s was re-cached during reload, skipping sync.", dirpath)
         return None
 
+    if defer_large and directory_record.pk in deferred_sync_cache:
+        logger.debug("Sync of large directory %s is queued, skipping.", dirpath)
+        return directory_record
+
     logger.debug("Rescanning directory: %s", dirpath)
 
     # Timed separately from start_time above: start_time also covers the
@@ -2018,18 +2576,61 @@ def update_database_from_disk(directory_record: "DirectoryIndex") -> "DirectoryI
     # in production since the only timing was this function's DEBUG-level log).
     rescan_start = time.perf_counter()
 
-    # Get filesystem entries using the directory path from the record
-    success, fs_entries = return_disk_listing_sync(dirpath)
+    # Get filesystem entries using the directory path from the record.
+    # Read lazily: up to STREAMING_SYNC_THRESHOLD entries are buffered, and a
+    # directory that fits is synced exactly as before from the full dict. A
+    # larger one switches to sync_files_streaming(), which continues the same
+    # scandir iterator in bounded chunks instead of materializing it all.
+    streaming_threshold = settings.STREAMING_SYNC_THRESHOLD
+    if streaming_threshold:
+        listing = iter_disk_listing(dirpath)
+        try:
+            head = list(islice(listing, streaming_threshold + 1))
+            success = True
+        except OSError:
+            success, head = False, []
+        stream = success and len(head) > streaming_threshold
+        fs_entries = {} if stream else dict(head)
+    else:
+        stream = False
+        success, fs_entries = return_disk_listing_sync(dirpath)
     if not success:
         logger.warning("File path doesn't exist, removing from cache and database: %s", dirpath)
         directory_record.handle_missing()
         return None
 
-    # Direct sync calls — no boundary crossings needed.
-    # Evaluate both (avoid short-circuit) so files still sync when
-    # subdirectories already changed.
-    dirs_changed = directory_record.sync_subdirectories(fs_entries)
-    files_changed = directory_record.sync_files(fs_entries, bulk_size)
+    if stream and defer_large:
+        # Hand the whole sync to the task runner instead of holding this
+        # request worker for it. Inline import: quickbbs.tasks imports
+        # quickbbs.fileindex, which imports this module.
+        # pylint: disable-next=import-outside-toplevel
+        from quickbbs.tasks import sync_large_directory
+
+        deferred_sync_cache[directory_record.pk] = True
+        sync_large_directory.using(priority=50).enqueue(directory_record.pk)
+        logger.info("Queued streaming sync of large directory (> %d entries): %s", streaming_threshold, dirpath)
+        return directory_record
+
+    if stream:
+        logger.info("Streaming sync of large directory (> %d entries): %s", streaming_threshold, dirpath)
+        try:
+            dirs_changed, files_changed, entry_count = directory_record.sync_files_streaming(
+                chain(head, listing), bulk_size, settings.STREAMING_SYNC_CHUNK_SIZE
+            )
+        except OSError as e:
+            # The directory vanished or became unreadable part-way through.
+            # Chunks already written stay; the record is left invalidated
+            # (no mark_scanned) so the next request/scan retries from scratch.
+            logger.error("Streaming sync of %s aborted: %s", dirpath, e)
+            close_old_connections()
+            return None
+    else:
+        # Direct sync calls — no boundary crossings needed.
+        # Evaluate both (avoid short-circuit) so files still sync when
+        # subdirectories already changed.
+        dirs_changed = directory_record.sync_subdirectories(fs_entries)
+        files_changed = directory_record.sync_files(fs_entries, bulk_size)
+        entry_count = len(fs_entries)
 
     # A newly-appeared .inkj file gets its FileIndex row from sync_files()
     # above, same as any other file type, but still needs turning into a
@@ -2052,10 +2653,13 @@ def update_database_from_disk(directory_record: "DirectoryIndex") -> "DirectoryI
         logger.info("Cached directory: %s", dirpath)
     # INFO-level and production-visible (unlike the total-duration DEBUG log
     # below, which includes the short-circuit checks): this is the actual
-    # scan cost, proportional to directory size and file count, with no
-    # current upper bound. Kept as a plain log line rather than a metrics
-    # counter since no metrics backend is wired up in this codebase yet.
-    logger.info("Directory rescan took %.4fs: %s (%d files)", rescan_elapsed, dirpath, len(fs_entries))
+    # scan cost, proportional to directory size and file count. Memory is
+    # bounded for directories above STREAMING_SYNC_THRESHOLD (streaming
+    # sync, with per-chunk progress lines), and web views defer those to
+    # the task runner (defer_large); wall time is not bounded. Kept as a plain
+    # log line rather than a metrics counter since no metrics backend is
+    # wired up in this codebase yet.
+    logger.info("Directory rescan took %.4fs: %s (%d files)", rescan_elapsed, dirpath, entry_count)
     logger.debug("Elapsed time (sync database from disk): %.4fs", time.perf_counter() - start_time)
 
     # Close connections that have exceeded CONN_MAX_AGE (may have gone stale during sync)
@@ -0,0 +1,242 @@
+"""
+FileHashCache Model - Persistent (device, inode, size, mtime_ns) → SHA256 cache
+
+Every new-file discovery in DirectoryIndex.sync_files() (and so every
+`scan --add_files`) hashes whole files via _batch_compute_file_shas(). When a
+FileIndex row is recreated for a file whose bytes have not changed — a
+directory deleted from the index and re-added, a database regeneration, a
+record that lost its SHA — that is a full re-read of data that was already
+hashed, which on a multi-TB gallery is hours of disk I/O.
+
+This table remembers the hashes computed for a file identity: the stat()
+tuple (st_dev, st_ino, st_size, st_mtime_ns). A later hash request for a path
+whose stat() still matches is answered from the table — one stat plus one
+batched query instead of a full read.
+
+Path dependency:
+    unique_sha256 is SHA256(file bytes + title-cased path) (see
+    quickbbs.common.get_file_sha), so it can only be reused when the cached
+    row was computed for the same path. A file that was moved or renamed
+    keeps its identity row, but still needs one read to produce the
+    unique_sha256 for its new location; the row is then re-pointed at the
+    new path. SHA256 does not expose the mid-hash state that would let the
+    new unique_sha256 be derived from stored data, and changing the
+    unique_sha256 formula would change every file's URL on the next
+    database regeneration.
+
+Correctness:
+    A hit requires all four stat fields to match, so any write to the file
+    (new mtime or size) or replacement by another file (new inode) misses.
+    Each miss is stat()ed again after hashing and only stored if the
+    identity did not change while it was being read.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, models, transaction
+
+from quickbbs.common import _batch_compute_file_shas
+
+logger = logging.getLogger(__name__)
+
+_UINT64_SIGN_BIT = 1 << 63
+
+
+def _signed64(value: int) -> int:
+    """
+    Map an unsigned 64-bit stat field onto PostgreSQL's signed bigint range.
+
+    st_ino and st_dev are unsigned and can exceed 2**63 - 1 on some
+    filesystems; the two's-complement mapping is deterministic, so equality
+    lookups still work.
+    """
+    return value - (1 << 64) if value >= _UINT64_SIGN_BIT else value
+
+
+def _file_identity(path: str) -> tuple[int, int, int, int] | None:
+    """
+    Return the (device, inode, size, mtime_ns) identity of a file, or None if it can't be stat()ed.
+    """
+    try:
+        fs_stat = os.stat(path)
+    except OSError:
+        return None
+    return (_signed64(fs_stat.st_dev), _signed64(fs_stat.st_ino), fs_stat.st_size, fs_stat.st_mtime_ns)
+
+
+class FileHashCache(models.Model):
+    """
+    One row per file identity whose SHA256 hashes have been computed.
+
+    fqfn is the path the hashes were computed for; unique_sha256 is only
+    valid for that path (see module docstring).
+    """
+
+    device = models.BigIntegerField()
+    inode = models.BigIntegerField(db_index=True)
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    fqfn = models.TextField()
+    file_sha256 = models.CharField(max_length=64)
+    unique_sha256 = models.CharField(max_length=64)
+    # Unix timestamp of the last store or hit; prune() drops rows idle for
+    # FILE_HASH_CACHE_RETAIN_DAYS
+    last_used = models.FloatField(default=time.time, db_index=True)
+
+    class Meta:
+        """Model metadata: one row per stat identity."""
+
+        verbose_name = "File Hash Cache"
+        verbose_name_plural = "File Hash Cache"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device", "inode", "size", "mtime_ns"],
+                name="unique_file_hash_cache_identity",
+            ),
+        ]
+
+    @classmethod
+    def compute_file_shas(cls, file_paths: list[str]) -> dict[str, tuple[str | None, str | None]]:
+        """
+        Drop-in replacement for _batch_compute_file_shas() that consults the cache first.
+
+        Args:
+            file_paths: List of fully qualified file paths to hash.
+
+        Returns:
+            Dictionary mapping each file path to its (file_sha256,
+            unique_sha256) tuple; (None, None) for files that could not be
+            read — same contract as _batch_compute_file_shas().
+        """
+        if not file_paths or not settings.FILE_HASH_CACHE_ENABLED:
+            return _batch_compute_file_shas(file_paths)
+
+        identities = {}
+        for path in file_paths:
+            identity = _file_identity(path)
+            if identity is not None:
+                identities[path] = identity
+
+        results: dict[str, tuple[str | None, str | None]] = {}
+        try:
+            hit_pks = cls._lookup(identities, results)
+        except DatabaseError as e:
+            logger.warning("File hash cache lookup failed, hashing %d files from disk: %s", len(file_paths), e)
+            return _batch_compute_file_shas(file_paths)
+
+        misses = [path for path in file_paths if path not in results]
+        computed = _batch_compute_file_shas(misses)
+        results.update(computed)
+
+        if hit_pks or computed:
+            logger.debug("File hash cache: %d hits, %d files hashed", len(hit_pks), len(misses))
+        cls._store(computed, identities, hit_pks)
+        return results
+
+    @classmethod
+    def _lookup(cls, identities: dict[str, tuple[int, int, int, int]], results: dict[str, tuple[str | None, str | None]]) -> list[int]:
+        """
+        Fill results with cached hashes for paths whose identity and path both match.
+
+        Returns:
+            Primary keys of the rows that produced a hit.
+        """
+        if not identities:
+            return []
+        paths_by_identity: dict[tuple[int, int, int, int], list[str]] = {}
+        for path, identity in identities.items():
+            paths_by_identity.setdefault(identity, []).append(path)
+
+        inodes = sorted({identity[1] for identity in identities.values()})
+        batch_size = settings.BATCH_SIZES["db_read"]
+        hit_pks = []
+        for start in range(0, len(inodes), batch_size):
+            rows = cls.objects.filter(inode__in=inodes[start : start + batch_size]).values_list(
+                "pk", "device", "inode", "size", "mtime_ns", "fqfn", "file_sha256", "unique_sha256"
+            )
+            for pk, device, inode, size, mtime_ns, fqfn, file_sha256, unique_sha256 in rows:
+                for path in paths_by_identity.get((device, inode, size, mtime_ns), ()):
+                    # unique_sha256 hashes the title-cased path, so paths that
+                    # differ only in case produce the same value
+                    if fqfn.title() == path.title():
+                        results[path] = (file_sha256, unique_sha256)
+                        hit_pks.append(pk)
+        return hit_pks
+
+    @classmethod
+    def _store(
+        cls,
+        computed: dict[str, tuple[str | None, str | None]],
+        identities: dict[str, tuple[int, int, int, int]],
+        hit_pks: list[int],
+    ) -> None:
+        """
+        Upsert rows for freshly hashed files and touch last_used on hits.
+
+        A file is only stored if its identity is unchanged after hashing (it
+        was not being written while read). Failures are logged, never raised:
+        the cache is an optimization, the hashes are already computed.
+        """
+        now = time.time()
+        new_rows = []
+        for path, (file_sha256, unique_sha256) in computed.items():
+            identity = identities.get(path)
+            if file_sha256 is None or unique_sha256 is None or identity is None:
+                continue
+            if _file_identity(path) != identity:
+                continue
+            device, inode, size, mtime_ns = identity
+            new_rows.append(
+                cls(
+                    device=device,
+                    inode=inode,
+                    size=size,
+                    mtime_ns=mtime_ns,
+                    fqfn=path,
+                    file_sha256=file_sha256,
+                    unique_sha256=unique_sha256,
+                    last_used=now,
+                )
+            )
+        if not new_rows and not hit_pks:
+            return
+        try:
+            # Savepoint: callers may already be inside a transaction, which a
+            # failed statement must not poison.
+            with transaction.atomic():
+                if new_rows:
+                    # update_conflicts re-points an existing identity row at
+                    # the file's new path after a move/rename.
+                    cls.objects.bulk_create(
+                        new_rows,
+                        batch_size=settings.BATCH_SIZES["db_write"],
+                        update_conflicts=True,
+                        unique_fields=["device", "inode", "size", "mtime_ns"],
+                        update_fields=["fqfn", "file_sha256", "unique_sha256", "last_used"],
+                    )
+                if hit_pks:
+                    cls.objects.filter(pk__in=hit_pks).update(last_used=now)
+        except DatabaseError as e:
+            logger.warning("Could not update file hash cache: %s", e)
+
+    @classmethod
+    def prune(cls, retain_days: int | None = None) -> int:
+        """
+        Delete rows that have been neither stored nor hit for retain_days.
+
+        Args:
+            retain_days: Idle age in days; defaults to FILE_HASH_CACHE_RETAIN_DAYS.
+
+        Returns:
+            Number of rows deleted.
+        """
+        if retain_days is None:
+            retain_days = settings.FILE_HASH_CACHE_RETAIN_DAYS
+        cutoff = time.time() - retain_days * 86400
+        deleted, _ = cls.objects.filter(last_used__lt=cutoff).delete()
+        return deleted
@@ -36,11 +36,12 @@ from quickbbs.common import (
     normalize_fqpn,
     normalize_string_title,
 )
+from quickbbs.mediaprobe import MediaProbe
 from quickbbs.MonitoredCache import create_cache
 from quickbbs.natsort_model import NaturalSortField
 from thumbnails.engine import get_video_info as _get_video_info
 from thumbnails.exceptions import MediaProcessingError
-from thumbnails.models import ThumbnailFiles
+from thumbnails.models import ThumbnailFiles, versioned_thumbnail_url
 
 # Cyclic import: .models imports from .fileindex, so this must come after the
 # module-level code above to avoid an ImportError at load time.
@@ -420,7 +421,10 @@ class FileIndex(models.Model):
         """
         # Deferred: quickbbs.cache_registry imports back into this module chain (genuine cycle)
         # pylint: disable-next=import-outside-toplevel
-        from quickbbs.cache_registry import clear_layout_cache_for_directories
+        from quickbbs.cache_registry import (
+            clear_fileindex_cache_for_shas,
+            clear_layout_cache_for_directories,
+        )
 
         # Get directory IDs BEFORE update (same pattern as link_to_thumbnail)
         directory_ids = set()
@@ -437,6 +441,11 @@ class FileIndex(models.Model):
         # Update all files with this SHA256
         updated_count = cls.objects.filter(file_sha256=file_sha256).update(is_generic_icon=is_generic)
 
+        # Cached FileIndex instances (here and in other processes) still hold
+        # the old is_generic_icon value
+        if updated_count > 0:
+            clear_fileindex_cache_for_shas({file_sha256})
+
         # Clear layout cache for affected directories
         if directory_ids and updated_count > 0:
             cleared_count = clear_layout_cache_for_directories(directory_ids)
@@ -465,7 +474,10 @@ class FileIndex(models.Model):
         """
         # Import here to avoid circular dependency
         # pylint: disable-next=import-outside-toplevel
-        from quickbbs.cache_registry import clear_layout_cache_for_directories
+        from quickbbs.cache_registry import (
+            clear_fileindex_cache_for_shas,
+            clear_layout_cache_for_directories,
+        )
 
         # Get affected directories BEFORE updating for cache clearing
         # This also determines if there are any unlinked records (replaces separate .exists() query)
@@ -490,6 +502,9 @@ class FileIndex(models.Model):
             # Clear layout caches for affected directories
             if affected_dirs and updated_count > 0:
                 clear_layout_cache_for_directories(set(affected_dirs))
+            # Cached FileIndex instances still point at no thumbnail
+            if updated_count > 0:
+                clear_fileindex_cache_for_shas({file_sha256})
 
         return has_unlinked, updated_count
 
@@ -615,7 +630,10 @@ class FileIndex(models.Model):
         """
         # Import here to avoid circular dependency
         # pylint: disable-next=import-outside-toplevel
-        from quickbbs.cache_registry import clear_layout_cache_for_directories
+        from quickbbs.cache_registry import (
+            bump_search_generation,
+            clear_layout_cache_for_directories,
+        )
 
         try:
             # Collect affected directory PKs for cache clearing.
@@ -701,6 +719,9 @@ class FileIndex(models.Model):
             if affected_directory_ids:
                 cleared_count = clear_layout_cache_for_directories(affected_directory_ids)
                 logger.info("Cleared %d layout cache entries for %d affected directories", cleared_count, len(affected_directory_ids))
+            # Files appeared or went (a rename is both); updates only touch size/mtime/hashes
+            if records_to_create or records_to_delete_ids:
+                bump_search_generation()
 
         except Exception as e:
             logger.error("Database operation failed: %s", e)
@@ -953,7 +974,9 @@ class FileIndex(models.Model):
 
         Returns:
             URL string for this item's thumbnail. Link files delegate to
-            their virtual_directory's thumbnail URL.
+            their virtual_directory's thumbnail URL. Records loaded with
+            thumbnail_version_annotations() get a ?v= version token, which
+            makes the thumbnail response cacheable as immutable.
         """
         if size not in settings.IMAGE_SIZE and size is not None:
             size = None
@@ -963,7 +986,7 @@ class FileIndex(models.Model):
         if self.virtual_directory:
             return self.virtual_directory.get_thumbnail_url(size=size)
         url = reverse(r"thumbnail_file", args=(self.file_sha256,)) + f"?size={size}"
-        return url
+        return versioned_thumbnail_url(url, self)
 
     def get_download_url(self) -> str:
         """Generate the URL for downloading the current database item.
@@ -1197,14 +1220,21 @@ class FileIndex(models.Model):
                     self.size = fs_stat.st_size
                     update_needed = True
 
-                # Movie duration loading - check each file individually
+                # Movie duration loading - check each file individually.
+                # A duration already in the media probe table (same content)
+                # costs one indexed query instead of a probe subprocess.
                 if filetype.is_movie and self.duration is None:
-                    try:
-                        video_details = _get_video_info(str(fs_entry))
-                        self.duration = video_details.get("duration", None)
+                    media_probe = MediaProbe.for_sha(self.file_sha256)
+                    if media_probe is not None and media_probe.duration is not None:
+                        self.duration = int(media_probe.duration)
                         update_needed = True
-                    except (OSError, ValueError, RuntimeError, MediaProcessingError) as e:
-                        logger.error("Error getting duration for %s: %s", fs_entry, e)
+                    else:
+                        try:
+                            video_details = _get_video_info(str(fs_entry))
+                            self.duration = video_details.get("duration", None)
+                            update_needed = True
+                        except (OSError, ValueError, RuntimeError, MediaProcessingError) as e:
+                            logger.error("Error getting duration for %s: %s", fs_entry, e)
 
                 # Animated GIF detection - only check if not previously checked
                 if filetype.is_image and fext == ".gif" and not self.is_animated:
@@ -0,0 +1,195 @@
+"""
+Per-volume I/O scheduling for bulk file reads (SHA256 hashing, thumbnail sources).
+
+The albums tree usually spans several volumes: SSD-backed active galleries
+and HDD-backed archives. Without scheduling, SHA256_MAX_WORKERS hashing
+workers and every taskrunner thread generating thumbnails read whichever
+files come next, so a spinning disk seeks between many half-read files and
+delivers a fraction of its sequential throughput, while an SSD would happily
+take more readers than it gets.
+
+This module schedules reads by the physical device a path lives on:
+
+    - Grouping: work is keyed by st_dev, so each volume is scheduled on its
+      own and a slow archive disk never holds up an SSD.
+    - Ordering: within a device, paths are read in (directory, inode) order.
+      Inode numbers on HFS+/APFS/ext4/XFS roughly follow allocation order, so
+      this approximates on-disk order and turns random reads into mostly
+      forward seeks.
+    - Limits: IO_DEVICE_LIMITS (mount path → maximum concurrent reads) caps a
+      volume; other volumes use IO_DEFAULT_DEVICE_LIMIT (0 = no per-volume cap,
+      only the pool/worker count).
+
+Two entry points:
+
+    run_per_device()  - for a batch submitted to an executor (SHA256 hashing):
+                        keeps each device under its limit while the rest of
+                        the pool serves other devices.
+    device_slot()     - a per-device semaphore for work that is already spread
+                        across threads (thumbnail generation in taskrunner
+                        workers and web requests). It bounds readers within
+                        one process; separate processes are not coordinated.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Device key for paths that can't be stat()ed. They are still scheduled (the
+# read reports the error) but never share a limit with a real volume.
+UNKNOWN_DEVICE = -1
+
+
+def _path_identity(path: str) -> tuple[int, int]:
+    """Return (st_dev, st_ino) for path, or (UNKNOWN_DEVICE, 0) if it can't be stat()ed."""
+    try:
+        fs_stat = os.stat(path)
+    except OSError:
+        return UNKNOWN_DEVICE, 0
+    return fs_stat.st_dev, fs_stat.st_ino
+
+
+def group_by_device(paths: Iterable[str]) -> dict[int, list[str]]:
+    """
+    Group paths by device, each group in (directory, inode) read order.
+
+    Args:
+        paths: File paths
+
+    Returns:
+        Dictionary mapping st_dev to that device's paths in read order.
+    """
+    keyed: dict[int, list[tuple[str, int, str]]] = {}
+    for path in paths:
+        device, inode = _path_identity(path)
+        keyed.setdefault(device, []).append((os.path.dirname(path), inode, path))
+    return {device: [path for _, _, path in sorted(entries)] for device, entries in keyed.items()}
+
+
+def order_for_reading(paths: Iterable[str]) -> list[str]:
+    """
+    Return paths in read order: grouped by device, (directory, inode) within each.
+
+    For callers that process one file at a time (a single thumbnail task).
+    """
+    return [path for group in group_by_device(paths).values() for path in group]
+
+
+def device_limits() -> dict[int, int]:
+    """
+    Map st_dev → maximum concurrent reads from settings.IO_DEVICE_LIMITS.
+
+    Mount paths that can't be stat()ed (volume not mounted) are skipped.
+    """
+    limits = {}
+    for mount_path, limit in settings.IO_DEVICE_LIMITS.items():
+        try:
+            limits[os.stat(mount_path).st_dev] = max(1, int(limit))
+        except OSError:
+            continue
+    return limits
+
+
+def limit_for_device(device: int, limits: dict[int, int] | None = None) -> int | None:
+    """
+    Return the concurrent-read limit for a device, or None if it is unlimited.
+
+    Args:
+        device: st_dev value
+        limits: Result of device_limits(), to avoid re-stat()ing mount paths per call
+    """
+    if limits is None:
+        limits = device_limits()
+    limit = limits.get(device) or settings.IO_DEFAULT_DEVICE_LIMIT
+    return limit if limit > 0 else None
+
+
+def run_per_device(
+    paths: Iterable[str],
+    submit: Callable[[str], Future],
+    on_done: Callable[[str, Future], None],
+) -> None:
+    """
+    Submit reads so no device exceeds its limit, refilling as reads complete.
+
+    Devices are filled round-robin in their read order. on_done is called in
+    the calling thread for each completed future, in completion order; an
+    exception it raises stops scheduling (already-submitted reads keep
+    running in the executor).
+
+    Args:
+        paths: File paths to read
+        submit: Starts the read for one path and returns its Future
+        on_done: Called with (path, future) once the future is done
+    """
+    limits = device_limits()
+    pending_by_device = {device: deque(group) for device, group in group_by_device(paths).items()}
+    device_caps = {device: limit_for_device(device, limits) for device in pending_by_device}
+    in_flight_by_device = dict.fromkeys(pending_by_device, 0)
+    future_to_path: dict[Future, tuple[str, int]] = {}
+
+    def submit_ready() -> None:
+        for device, pending in pending_by_device.items():
+            cap = device_caps[device]
+            while pending and (cap is None or in_flight_by_device[device] < cap):
+                path = pending.popleft()
+                future_to_path[submit(path)] = (path, device)
+                in_flight_by_device[device] += 1
+
+    submit_ready()
+    while future_to_path:
+        done, _ = wait(future_to_path, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, device = future_to_path.pop(future)
+            in_flight_by_device[device] -= 1
+            on_done(path, future)
+        submit_ready()
+
+
+class DeviceSlots:
+    """
+    Process-wide per-device semaphores bounding concurrent reads across threads.
+
+    Semaphores are created lazily per (device, limit), so a changed limit
+    (settings override) gets a fresh semaphore instead of resizing one that
+    threads may be holding.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._semaphores: dict[tuple[int, int], threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, device: int, limit: int) -> threading.BoundedSemaphore:
+        key = (device, limit)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(key, threading.BoundedSemaphore(limit))
+        return semaphore
+
+    @contextmanager
+    def slot(self, path: str) -> Iterator[None]:
+        """
+        Hold one of path's device read slots for the duration of the block.
+
+        Returns immediately for unlimited devices and paths that can't be
+        stat()ed.
+        """
+        device, _ = _path_identity(path)
+        limit = None if device == UNKNOWN_DEVICE else limit_for_device(device)
+        if limit is None:
+            yield
+            return
+        with self._semaphore(device, limit):
+            yield
+
+
+device_slots = DeviceSlots()
+device_slot = device_slots.slot
@@ -3,19 +3,21 @@ Function to add missing thumbnails for files in the database.
 
 This module scans FileIndex for files missing thumbnails and generates them.
 Only processes files with non-generic filetypes (images, videos, PDFs).
+Video and audio files are probed into the MediaProbe table first, so video
+thumbnail generation finds its seek offset there.
 """
 
 from __future__ import annotations
 
 import time
-from itertools import batched
+from itertools import batched, groupby
 
 from django.db import close_old_connections
 from django.db.models import Q
 
-from quickbbs.models import FileIndex
-from quickbbs.tasks import generate_missing_thumbnails
-from thumbnails.models import ThumbnailFiles
+from quickbbs.models import FileIndex, MediaProbe
+from thumbnails.generation_queue import QUEUE_PRIORITY_BACKGROUND, enqueue_thumbnails
+from thumbnails.models import THUMBNAIL_MISSING_Q, ThumbnailFiles
 
 # Batch size for bulk_create and bulk_update operations
 BULK_UPDATE_BATCH_SIZE = 250
@@ -94,11 +96,60 @@ def _bulk_link_fileindex_to_thumbnails(sha256_list: list[str]) -> int:
     return len(files_to_update)
 
 
+def add_media_probes(max_count: int = 0) -> int:
+    """
+    Probe video and audio files that have no MediaProbe row yet.
+
+    Files are probed one directory at a time (one stored row per distinct
+    SHA256), through the long-lived decoder helpers when PyAV is installed.
+
+    Args:
+        max_count: Maximum number of files to probe (0 = unlimited)
+
+    Returns:
+        Number of MediaProbe rows created
+    """
+    print("\nPASS 0: Probing video and audio files...")
+    rows = (
+        FileIndex.objects.filter(
+            Q(delete_pending=False)
+            & Q(file_sha256__isnull=False)
+            & Q(home_directory__isnull=False)
+            & Q(filetype__is_link=False)
+            & (Q(filetype__is_movie=True) | Q(filetype__is_audio=True))
+        )
+        .exclude(file_sha256__in=MediaProbe.objects.values("file_sha256"))
+        .order_by("home_directory_id", "name")
+        .values_list("home_directory_id", "file_sha256", "home_directory__fqpndirectory", "name")
+    )
+
+    start_time = time.time()
+    created = 0
+    probed = 0
+    for _, directory_rows in groupby(rows.iterator(), key=lambda row: row[0]):
+        files: dict[str, str] = {}
+        for _, file_sha256, fqpndirectory, name in directory_rows:
+            files.setdefault(file_sha256, fqpndirectory + name)
+        if max_count > 0:
+            files = dict(list(files.items())[: max_count - probed])
+        created += MediaProbe.probe_files(files)
+        probed += len(files)
+        if max_count > 0 and probed >= max_count:
+            break
+
+    if probed:
+        print(f"Pass 0 complete: Probed {probed} files, stored {created} MediaProbe rows ({time.time() - start_time:.1f}s)")
+    else:
+        print("All video and audio files are already probed")
+    close_old_connections()
+    return created
+
+
 def add_thumbnails(max_count: int = 0) -> None:
     """
     Scan FileIndex for files missing thumbnails and generate them.
 
-    Two-pass approach:
+    Two-pass approach, after probing new video/audio files (add_media_probes):
     1. Ensure all thumbnailable files have a ThumbnailFiles record (uses bulk operations)
     2. Generate thumbnails for records with empty thumbnail data
 
@@ -124,6 +175,8 @@ def add_thumbnails(max_count: int = 0) -> None:
     print("Adding missing thumbnails for files in database")
     print("=" * 60)
 
+    add_media_probes(max_count=max_count)
+
     # ========================================================================
     # PASS 1: Ensure all thumbnailable files have a ThumbnailFiles record
     # Uses bulk_create and bulk_update for efficiency
@@ -194,7 +247,7 @@ def add_thumbnails(max_count: int = 0) -> None:
     # not a link/alias file. Mirrors Pass 1 exclusions so ineligible records are
     # never reported as needing generation.
     empty_thumbnails_qs = ThumbnailFiles.objects.filter(
-        small_thumb__isnull=True,
+        THUMBNAIL_MISSING_Q,
         FileIndex__delete_pending=False,
         FileIndex__filetype__is_link=False,
     ).filter(Q(FileIndex__filetype__is_image=True) | Q(FileIndex__filetype__is_pdf=True) | Q(FileIndex__filetype__is_movie=True))
@@ -228,25 +281,21 @@ def add_thumbnails(max_count: int = 0) -> None:
     total_shas = list(non_generic_shas) + list(generic_shas)
     total_count = len(total_shas)
 
-    # Enqueue thumbnail generation tasks via dbtasks
-    print(f"\nEnqueuing {total_count} thumbnails to dbtasks...")
+    # Queue at background priority: gallery views queue ahead of this work,
+    # and hashes a view already queued are not queued twice
+    print(f"\nQueuing {total_count} thumbnails for generation...")
     enqueued = 0
-    task_count = 0
+    queued = 0
 
     for sha_batch in batched(total_shas, BULK_UPDATE_BATCH_SIZE):
-        batch_size = len(sha_batch)
-        generate_missing_thumbnails.using(priority=0).enqueue(
-            files_needing_thumbnails=list(sha_batch),
-            batch_size=batch_size,
-        )
-        enqueued += batch_size
-        task_count += 1
+        queued += enqueue_thumbnails(sha_batch, QUEUE_PRIORITY_BACKGROUND)
+        enqueued += len(sha_batch)
 
         if enqueued % 1000 == 0 or enqueued == total_count:
-            print(f"  Enqueued {enqueued}/{total_count} thumbnails...")
+            print(f"  Queued {enqueued}/{total_count} thumbnails...")
 
     print("=" * 60)
-    print(f"Enqueued {enqueued} thumbnails in {task_count} tasks")
+    print(f"Queued {queued} thumbnails ({total_count - queued} were already queued)")
     print("Thumbnails will be generated asynchronously by dbtasks workers.")
     print("Start a worker with: python manage.py taskrunner")
     print("=" * 60)
@@ -5,6 +5,7 @@ Usage:
     python manage.py clear_caches
     python manage.py clear_caches --cache webpaths breadcrumbs
     python manage.py clear_caches --list
+    python manage.py clear_caches --all-processes
 """
 
 from __future__ import annotations
@@ -12,6 +13,7 @@ from __future__ import annotations
 from cachetools import LRUCache
 from django.core.management.base import BaseCommand
 
+from quickbbs.cache_bus import invalidation_bus
 from quickbbs.cache_registry import resolve_monitored_caches
 
 
@@ -50,12 +52,19 @@ class Command(BaseCommand):
             action="store_true",
             help="List all known caches and their current sizes, then exit.",
         )
+        parser.add_argument(
+            "--all-processes",
+            action="store_true",
+            help="Also tell every running web worker and taskrunner to clear all of their caches (via the cache invalidation bus).",
+        )
 
     def handle(self, *args, **options):
         """List caches (--list) or clear all/matching in-process LRU caches.
 
-        Note: this clears the caches of THIS process only — a running web
-        server or taskrunner keeps its own in-process caches.
+        Note: without --all-processes this clears the caches of THIS process
+        only — a running web server or taskrunner keeps its own in-process
+        caches. --all-processes broadcasts a clear-everything message on the
+        cache invalidation bus, so it cannot be combined with --cache.
 
         Args:
             *args: Unused positional arguments from Django.
@@ -74,6 +83,10 @@ class Command(BaseCommand):
 
         filter_names = options.get("cache") or []
 
+        if options["all_processes"] and filter_names:
+            self.stderr.write("--all-processes clears every cache; it cannot be combined with --cache.")
+            return
+
         cleared = 0
         for label, cache in caches:
             if isinstance(cache, Exception):
@@ -88,6 +101,12 @@ class Command(BaseCommand):
             self.stdout.write(f"  CLEAR {label}  ({size_before} entries removed)")
             cleared += 1
 
+        if options["all_processes"]:
+            if invalidation_bus.publish(clear_all=True):
+                self.stdout.write("  BROADCAST clear-all sent to other processes")
+            else:
+                self.stderr.write("  Cache invalidation bus is disabled or has no reachable listeners; other processes were not cleared")
+
         if filter_names and cleared == 0:
             self.stderr.write(f"No caches matched: {filter_names}")
         else:
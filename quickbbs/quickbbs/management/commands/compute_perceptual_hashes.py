@@ -0,0 +1,109 @@
+"""
+Fill ThumbnailFiles.perceptual_hash for thumbnails generated before it existed.
+
+New thumbnails get their perceptual hash (thumbnails/engine/perceptual_hash.py)
+when their blobs are stored. This command computes it for every generated
+thumbnail that has none yet, from the stored small blob (database column or
+blob store) — no source file is read.
+
+Usage:
+    python manage.py compute_perceptual_hashes
+    python manage.py compute_perceptual_hashes --max-count 5000
+    python manage.py compute_perceptual_hashes --dry-run
+
+Every chunk is one short UPDATE; interrupted runs simply resume (hashed rows
+no longer match). A small blob that can't be decoded stays NULL and is
+counted as failed.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from itertools import batched
+
+from django.core.management.base import BaseCommand
+
+from thumbnails.engine import perceptual_hash
+from thumbnails.models import THUMBNAIL_GENERATED_Q, ThumbnailFiles
+
+# Rows loaded (with their small blob) per chunk
+CHUNK_SIZE = 500
+
+
+def compute_perceptual_hashes(chunk_size: int = CHUNK_SIZE, max_count: int = 0, dry_run: bool = False) -> Counter[str]:
+    """
+    Hash every generated thumbnail whose perceptual_hash is NULL.
+
+    Args:
+        chunk_size: Rows per chunk
+        max_count: Maximum rows to hash (0 = all)
+        dry_run: Only count the rows that would be hashed
+
+    Returns:
+        Counter with "rows", "hashed" and "failed" totals
+    """
+    totals: Counter[str] = Counter()
+    pks = list(ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q, perceptual_hash__isnull=True).order_by("pk").values_list("pk", flat=True))
+    if max_count > 0:
+        pks = pks[:max_count]
+    totals["rows"] = len(pks)
+    if dry_run:
+        return totals
+
+    for pk_chunk in batched(pks, chunk_size):
+        thumbnails = list(ThumbnailFiles.objects.filter(pk__in=pk_chunk).only("id", "sha256_hash", "small_thumb", "blobs_in_store"))
+        hashed = []
+        for thumbnail in thumbnails:
+            thumbnail.perceptual_hash = perceptual_hash(thumbnail.retrieve_sized_tnail("small"))
+            if thumbnail.perceptual_hash is None:
+                totals["failed"] += 1
+            else:
+                hashed.append(thumbnail)
+        ThumbnailFiles.objects.bulk_update(hashed, ["perceptual_hash"])
+        totals["hashed"] += len(hashed)
+    return totals
+
+
+class Command(BaseCommand):
+    """Compute the perceptual hash of thumbnails generated before hashing was added."""
+
+    help = "Compute ThumbnailFiles.perceptual_hash from the stored small thumbnails where it is missing"
+
+    def add_arguments(self, parser):
+        """Register --dry-run, --max-count and --chunk-size.
+
+        Args:
+            parser: The argparse parser supplied by Django.
+        """
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many thumbnails would be hashed, without changing anything.",
+        )
+        parser.add_argument(
+            "--max-count",
+            type=int,
+            default=0,
+            help="Hash at most this many thumbnails (default: all).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Rows per chunk (default: {CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        """Hash the pending thumbnails and print the totals.
+
+        Args:
+            *args: Unused positional arguments from Django.
+            **options: Parsed command-line options.
+        """
+        totals = compute_perceptual_hashes(chunk_size=options["chunk_size"], max_count=options["max_count"], dry_run=options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(f"Would hash {totals['rows']} thumbnails.")
+            return
+        self.stdout.write(f"Hashed {totals['hashed']} of {totals['rows']} thumbnails.")
+        if totals["failed"]:
+            self.stdout.write(f"Left {totals['failed']} undecodable thumbnails without a hash.")
@@ -0,0 +1,188 @@
+"""
+Move existing thumbnail blobs between PostgreSQL and the on-disk blob store.
+
+THUMBNAIL_BLOB_STORE_SIZES (see thumbnails/blob_store.py) decides where newly
+generated thumbnails are written. This command brings existing rows in line
+with it: sizes listed in the setting are written to the blob store and their
+bytea column set to NULL; unlisted sizes found in the store are read back
+into their column and the file removed. Rows whose store file has gone
+missing are invalidated so they regenerate.
+
+Usage:
+    python manage.py migrate_thumbnail_blobs
+    python manage.py migrate_thumbnail_blobs --dry-run
+    python manage.py migrate_thumbnail_blobs --prune
+
+PostgreSQL does not hand freed TOAST space back to the OS on its own; run
+VACUUM FULL (or pg_repack) on thumbnails_thumbnailfiles afterwards.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from itertools import batched
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from thumbnails.blob_store import THUMBNAIL_SIZES, stored_sizes, thumbnail_blob_store
+from thumbnails.models import THUMBNAIL_BLOB_FIELDS, ThumbnailFiles
+
+# Rows loaded (with their blobs) per transaction
+CHUNK_SIZE = 500
+
+
+def _rows_to_migrate(to_store: frozenset[str]) -> list[int]:
+    """
+    Return the pks of rows with at least one blob on the wrong side of the setting.
+
+    Args:
+        to_store: Sizes that belong in the blob store
+    """
+    wrong_side = Q(pk__in=[])
+    for size in THUMBNAIL_SIZES:
+        if size in to_store:
+            wrong_side |= Q(**{f"{size}_thumb__isnull": False})
+        else:
+            wrong_side |= Q(blobs_in_store=True, **{f"{size}_thumb__isnull": True})
+    return list(ThumbnailFiles.objects.filter(wrong_side).order_by("pk").values_list("pk", flat=True))
+
+
+def migrate_thumbnail_blobs(chunk_size: int = CHUNK_SIZE, dry_run: bool = False) -> Counter[str]:
+    """
+    Move every blob to the side THUMBNAIL_BLOB_STORE_SIZES selects.
+
+    Each chunk is updated in one transaction; store files of sizes moved
+    back into the database are only removed after that transaction commits.
+
+    Args:
+        chunk_size: Rows per transaction
+        dry_run: Count what would move without writing anything
+
+    Returns:
+        Counter with "rows", "to_store", "to_database" and "invalidated" totals.
+    """
+    to_store = stored_sizes()
+    totals: Counter[str] = Counter()
+    pks = _rows_to_migrate(to_store)
+    totals["rows"] = len(pks)
+    if dry_run:
+        for size in THUMBNAIL_SIZES:
+            if size in to_store:
+                totals["to_store"] += ThumbnailFiles.objects.filter(**{f"{size}_thumb__isnull": False}).count()
+            else:
+                totals["to_database"] += ThumbnailFiles.objects.filter(blobs_in_store=True, **{f"{size}_thumb__isnull": True}).count()
+        return totals
+
+    for pk_chunk in batched(pks, chunk_size):
+        thumbnails = list(ThumbnailFiles.objects.filter(pk__in=pk_chunk).only("id", *THUMBNAIL_BLOB_FIELDS, "sha256_hash"))
+        files_to_remove: list[tuple[str, str]] = []
+        for thumbnail in thumbnails:
+            sha256 = thumbnail.sha256_hash
+            if not sha256:
+                continue
+            missing = False
+            moved_back: list[tuple[str, str]] = []
+            for size in THUMBNAIL_SIZES:
+                field = f"{size}_thumb"
+                blobdata = getattr(thumbnail, field)
+                if size in to_store and blobdata:
+                    thumbnail_blob_store.write(sha256, size, blobdata)
+                    setattr(thumbnail, field, None)
+                    totals["to_store"] += 1
+                elif size not in to_store and not blobdata and thumbnail.blobs_in_store:
+                    stored = thumbnail_blob_store.read(sha256, size)
+                    if stored is None:
+                        missing = True
+                        break
+                    setattr(thumbnail, field, stored)
+                    moved_back.append((sha256, size))
+                    totals["to_database"] += 1
+            if missing:
+                thumbnail.invalidate_thumb()
+                totals["invalidated"] += 1
+                continue
+            thumbnail.blobs_in_store = any(getattr(thumbnail, f"{size}_thumb") is None for size in THUMBNAIL_SIZES)
+            files_to_remove.extend(moved_back)
+
+        with transaction.atomic():
+            ThumbnailFiles.objects.bulk_update(thumbnails, THUMBNAIL_BLOB_FIELDS)
+        for sha256, size in files_to_remove:
+            thumbnail_blob_store.delete(sha256, size)
+    return totals
+
+
+def prune_thumbnail_blobs(chunk_size: int = 1000) -> int:
+    """
+    Remove store files no row refers to (deleted, invalidated, or moved-back thumbnails).
+
+    Returns:
+        Number of files removed
+    """
+    removed = 0
+    for size in THUMBNAIL_SIZES:
+        for sha_chunk in batched(thumbnail_blob_store.iter_hashes(size), chunk_size):
+            referenced = set(
+                ThumbnailFiles.objects.filter(sha256_hash__in=sha_chunk, blobs_in_store=True, **{f"{size}_thumb__isnull": True}).values_list(
+                    "sha256_hash", flat=True
+                )
+            )
+            for sha256 in sha_chunk:
+                if sha256 not in referenced and thumbnail_blob_store.delete(sha256, size):
+                    removed += 1
+    return removed
+
+
+class Command(BaseCommand):
+    """Move thumbnail blobs to match THUMBNAIL_BLOB_STORE_SIZES, optionally pruning unreferenced files."""
+
+    help = "Move existing thumbnail blobs between the database and the blob store per THUMBNAIL_BLOB_STORE_SIZES"
+
+    def add_arguments(self, parser):
+        """Register --dry-run, --prune and --chunk-size.
+
+        Args:
+            parser: The argparse parser supplied by Django.
+        """
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many blobs would move, without changing anything.",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Afterwards, delete blob store files that no thumbnail row refers to.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Rows per transaction (default: {CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        """Migrate blobs, then prune when --prune is given.
+
+        Args:
+            *args: Unused positional arguments from Django.
+            **options: Parsed command-line options.
+        """
+        to_store = stored_sizes()
+        self.stdout.write(f"Blob store sizes: {', '.join(sorted(to_store)) or '(none — all sizes in the database)'}")
+        self.stdout.write(f"Blob store path:  {thumbnail_blob_store.root}")
+
+        totals = migrate_thumbnail_blobs(chunk_size=options["chunk_size"], dry_run=options["dry_run"])
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(
+            f"{verb} {totals['to_store']} blobs to the store and {totals['to_database']} to the database ({totals['rows']} thumbnail rows)."
+        )
+        if totals["invalidated"]:
+            self.stdout.write(f"Invalidated {totals['invalidated']} thumbnails whose store files were missing; they will regenerate.")
+
+        if options["prune"] and not options["dry_run"]:
+            self.stdout.write(f"Pruned {prune_thumbnail_blobs()} unreferenced blob store files.")
+
+        if totals["to_store"] and not options["dry_run"]:
+            self.stdout.write("Run VACUUM FULL (or pg_repack) on thumbnails_thumbnailfiles to return the freed TOAST space to the OS.")
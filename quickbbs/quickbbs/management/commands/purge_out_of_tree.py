@@ -18,7 +18,10 @@ from collections import Counter
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
-from quickbbs.cache_registry import clear_layout_cache_for_directories
+from quickbbs.cache_registry import (
+    bump_search_generation,
+    clear_layout_cache_for_directories,
+)
 from quickbbs.directoryindex import directoryindex_cache
 from quickbbs.models import DirectoryIndex, FileIndex
 
@@ -115,6 +118,7 @@ class Command(BaseCommand):
 
         # Evict any cached copies of the deleted rows.
         clear_layout_cache_for_directories(set(dir_pks))
+        bump_search_generation()
         directoryindex_cache.clear()
 
         self.stdout.write(f"Deleted {deleted_dirs} DirectoryIndex rows and {deleted_files} related FileIndex rows.")
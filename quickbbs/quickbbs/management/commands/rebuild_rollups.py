@@ -0,0 +1,55 @@
+"""
+Verify and repair the DirectoryRollup table.
+
+The recursive per-directory totals (file count, bytes, per-filetype counts,
+newest mtime) are kept current incrementally by directory sync. Files
+written by other paths, directory moves, and deletions of a directory's
+newest file leave them stale; this command recomputes every row from
+FileIndex and repairs the ones that differ. Also the way to fill the table
+for the first time.
+
+Usage:
+    python manage.py rebuild_rollups --dry-run   # report drifted rows only
+    python manage.py rebuild_rollups
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from quickbbs.models import DirectoryRollup
+
+
+class Command(BaseCommand):
+    """Recompute every DirectoryRollup row and repair the ones that differ."""
+
+    help = "Verify / repair the recursive directory rollups from FileIndex"
+
+    def add_arguments(self, parser) -> None:
+        """Register the --dry-run option.
+
+        Args:
+            parser: The argparse parser supplied by Django.
+        """
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many rows have drifted without saving anything.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Rebuild the rollups and report how many rows changed.
+
+        Args:
+            *args: Unused positional arguments from Django.
+            **options: Parsed command-line options ('dry_run').
+        """
+        dry_run: bool = options["dry_run"]
+        changed = DirectoryRollup.rebuild(dry_run=dry_run)
+
+        if dry_run:
+            self.stdout.write(f"[dry-run] {changed} DirectoryRollup rows are missing, stale or obsolete")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {changed} DirectoryRollup rows"))
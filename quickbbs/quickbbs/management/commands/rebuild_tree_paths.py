@@ -0,0 +1,55 @@
+"""
+Backfill and verify DirectoryIndex.tree_path.
+
+tree_path (the materialized "/<root pk>/.../<own pk>/" path behind
+get_descendants()/get_ancestors()) is kept in step with parent_directory by
+add_directory(). Rows written before the column existed start out with an
+empty path; this command fills those in and repairs any path that has
+drifted from its parent chain.
+
+Usage:
+    python manage.py rebuild_tree_paths --dry-run   # report drifted rows only
+    python manage.py rebuild_tree_paths
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from quickbbs.models import DirectoryIndex
+
+
+class Command(BaseCommand):
+    """Recompute every DirectoryIndex.tree_path and repair the ones that differ."""
+
+    help = "Backfill / repair DirectoryIndex.tree_path from the parent_directory chain"
+
+    def add_arguments(self, parser) -> None:
+        """Register the --dry-run option.
+
+        Args:
+            parser: The argparse parser supplied by Django.
+        """
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many rows are out of date without saving anything.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Rebuild the tree paths and report how many rows changed.
+
+        Args:
+            *args: Unused positional arguments from Django.
+            **options: Parsed command-line options ('dry_run').
+        """
+        dry_run: bool = options["dry_run"]
+        changed = DirectoryIndex.rebuild_tree_paths(dry_run=dry_run)
+        total = DirectoryIndex.objects.count()
+
+        if dry_run:
+            self.stdout.write(f"[dry-run] {changed} of {total} DirectoryIndex rows have a missing or stale tree_path")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired tree_path on {changed} of {total} DirectoryIndex rows"))
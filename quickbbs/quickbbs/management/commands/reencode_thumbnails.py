@@ -0,0 +1,278 @@
+"""
+Convert existing thumbnails to another output encoding (JPEG, WebP, AVIF).
+
+THUMBNAIL_ENCODING (see thumbnails/engine/encoders.py) decides the encoding
+of newly generated thumbnails. This command converts rows written in any
+other encoding: each stored blob is decoded and re-encoded, written back
+where it lives (bytea column or blob store), and the row's generation bumped
+so versioned URLs and ETags change with the bytes.
+
+Re-encoding a lossy blob adds a second generation of loss; thumbnails
+regenerated from their source files (invalidate them instead) avoid it, at
+the cost of re-reading every source file.
+
+While converting, the command measures what the change buys: total bytes
+before and after, and the time spent encoding each blob in the new encoding
+next to the time a JPEG encode of the same pixels takes.
+
+Usage:
+    python manage.py reencode_thumbnails
+    python manage.py reencode_thumbnails --encoding WEBP --max-count 2000
+    python manage.py reencode_thumbnails --dry-run
+    python manage.py reencode_thumbnails --pause 0.5
+
+Runs alongside the web server: every chunk is one short transaction, and
+--pause sleeps between chunks to leave I/O for live requests. Interrupted
+runs simply resume (converted rows no longer match). Rows are re-encoded
+outside the transaction and updated only if their generation is unchanged,
+so a thumbnail invalidated or regenerated meanwhile is skipped rather than
+overwritten; blob-store files are rewritten after the update commits.
+"""
+
+from __future__ import annotations
+
+import io
+import time
+from collections import Counter
+from functools import partial
+from itertools import batched
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from thumbnails.blob_store import THUMBNAIL_SIZES, thumbnail_blob_store
+from thumbnails.engine import encoding_available, get_encoder
+from thumbnails.models import (
+    BASELINE_ENCODING,
+    THUMBNAIL_BLOB_FIELDS,
+    THUMBNAIL_GENERATED_Q,
+    ThumbnailFiles,
+    thumbnail_encoding,
+    thumbnail_quality,
+)
+
+# Rows loaded (with their blobs) per transaction
+CHUNK_SIZE = 200
+
+
+def _reencode_blobs(blobs: dict[str, bytes], encoding: str, totals: Counter[str]) -> dict[str, bytes]:
+    """
+    Re-encode one row's blobs, adding sizes and encode times to totals.
+
+    Each blob is decoded once, then encoded in the target encoding and (for
+    the timing comparison only) as JPEG.
+    """
+    encoder = get_encoder(encoding)
+    baseline = get_encoder(BASELINE_ENCODING)
+    quality = thumbnail_quality(encoding)
+    baseline_quality = thumbnail_quality(BASELINE_ENCODING)
+    reencoded = {}
+    for size, blob in blobs.items():
+        with Image.open(io.BytesIO(blob)) as img:
+            img.load()
+            start = time.perf_counter_ns()
+            reencoded[size] = encoder.encode(img, quality)
+            totals["encode_ns"] += time.perf_counter_ns() - start
+            start = time.perf_counter_ns()
+            baseline.encode(img, baseline_quality)
+            totals["baseline_encode_ns"] += time.perf_counter_ns() - start
+        totals["blobs"] += 1
+        totals["bytes_before"] += len(blob)
+        totals["bytes_after"] += len(reencoded[size])
+    return reencoded
+
+
+def _update_if_unchanged(thumbnail: ThumbnailFiles, loaded_generation: int) -> bool:
+    """
+    Save a row's THUMBNAIL_BLOB_FIELDS unless its generation moved on since it was loaded.
+
+    Returns:
+        True if the row was updated
+    """
+    fields = {field: getattr(thumbnail, field) for field in THUMBNAIL_BLOB_FIELDS}
+    return bool(ThumbnailFiles.objects.filter(pk=thumbnail.pk, generation=loaded_generation).update(**fields))
+
+
+def _write_store_files(thumbnail: ThumbnailFiles, unwritten: dict[str, bytes], totals: Counter[str]) -> None:
+    """
+    Write a converted row's blob-store files after its update committed.
+
+    A failed write leaves files in the old encoding under a row naming the
+    new one, so the row is invalidated to regenerate from source instead.
+    """
+    try:
+        for size, blob in unwritten.items():
+            thumbnail_blob_store.write(thumbnail.sha256_hash, size, blob)
+    except OSError as e:
+        print(f"Could not write re-encoded thumbnail {thumbnail.sha256_hash}: {e}")
+        loaded_generation = thumbnail.generation
+        thumbnail.invalidate_thumb()
+        if _update_if_unchanged(thumbnail, loaded_generation):
+            totals["converted"] -= 1
+            totals["invalidated"] += 1
+
+
+def reencode_thumbnails(
+    encoding: str,
+    chunk_size: int = CHUNK_SIZE,
+    max_count: int = 0,
+    dry_run: bool = False,
+    pause: float = 0.0,
+) -> Counter[str]:
+    """
+    Convert every generated thumbnail not already in encoding.
+
+    Args:
+        encoding: Target encoder name (must be available here)
+        chunk_size: Rows per transaction
+        max_count: Maximum rows to convert (0 = all)
+        dry_run: Count the rows that would be converted, by current encoding
+        pause: Seconds to sleep between chunks
+
+    Returns:
+        Counter with "rows", "converted", "invalidated", "failed", "changed", "blobs",
+        "bytes_before", "bytes_after", "encode_ns" and "baseline_encode_ns"
+        totals (dry runs: "rows" and one "from_<ENCODING>" count per encoding).
+    """
+    totals: Counter[str] = Counter()
+    pending = ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q).exclude(encoding=encoding)
+    if dry_run:
+        for stored_encoding in pending.values_list("encoding", flat=True).order_by():
+            totals["rows"] += 1
+            totals[f"from_{stored_encoding}"] += 1
+        return totals
+
+    pks = list(pending.order_by("pk").values_list("pk", flat=True))
+    if max_count > 0:
+        pks = pks[:max_count]
+    totals["rows"] = len(pks)
+
+    for chunk_number, pk_chunk in enumerate(batched(pks, chunk_size)):
+        if chunk_number and pause:
+            time.sleep(pause)
+        thumbnails = list(ThumbnailFiles.objects.filter(pk__in=pk_chunk).only("id", "sha256_hash", *THUMBNAIL_BLOB_FIELDS))
+        # (thumbnail, generation it was loaded with, outcome, size/time totals, blob-store files to write)
+        updates: list[tuple[ThumbnailFiles, int, str, Counter[str], dict[str, bytes]]] = []
+        for thumbnail in thumbnails:
+            loaded_generation = thumbnail.generation
+            blobs = {size: thumbnail.retrieve_sized_tnail(size) for size in THUMBNAIL_SIZES}
+            if not all(blobs.values()):
+                # A size is missing (blob store file gone): regenerate from source
+                thumbnail.invalidate_thumb()
+                updates.append((thumbnail, loaded_generation, "invalidated", Counter(), {}))
+                continue
+            row_totals: Counter[str] = Counter()
+            try:
+                reencoded = _reencode_blobs(blobs, encoding, row_totals)
+            except (OSError, ValueError) as e:
+                # Undecodable blob: leave the row as it is
+                print(f"Could not re-encode thumbnail {thumbnail.sha256_hash}: {e}")
+                totals["failed"] += 1
+                continue
+            unwritten = thumbnail.store_blobs(reencoded, encoding, write_store=False)
+            thumbnail.generation += 1
+            updates.append((thumbnail, loaded_generation, "converted", row_totals, unwritten))
+
+        with transaction.atomic():
+            for thumbnail, loaded_generation, outcome, row_totals, unwritten in updates:
+                # The generation guard skips rows invalidated or regenerated
+                # since they were loaded, rather than restoring the old image
+                if not _update_if_unchanged(thumbnail, loaded_generation):
+                    totals["changed"] += 1
+                    continue
+                totals[outcome] += 1
+                totals.update(row_totals)
+                if unwritten:
+                    # Files change only once the row naming their encoding has committed
+                    transaction.on_commit(partial(_write_store_files, thumbnail, unwritten, totals))
+    return totals
+
+
+def _format_bytes(count: int) -> str:
+    """Return a byte count in MB with one decimal."""
+    return f"{count / 1_000_000:.1f} MB"
+
+
+class Command(BaseCommand):
+    """Re-encode existing thumbnails in THUMBNAIL_ENCODING (or --encoding), reporting size and encode-time deltas."""
+
+    help = "Convert existing thumbnails to THUMBNAIL_ENCODING (or --encoding), reporting size and encode-time deltas"
+
+    def add_arguments(self, parser):
+        """Register --encoding, --dry-run, --max-count, --chunk-size and --pause.
+
+        Args:
+            parser: The argparse parser supplied by Django.
+        """
+        parser.add_argument(
+            "--encoding",
+            help="Target encoding (JPEG, WEBP, AVIF). Default: THUMBNAIL_ENCODING.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many thumbnails would be converted, without changing anything.",
+        )
+        parser.add_argument(
+            "--max-count",
+            type=int,
+            default=0,
+            help="Convert at most this many thumbnails (default: all).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Rows per transaction (default: {CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        """Convert thumbnails and print the size and encode-time comparison.
+
+        Args:
+            *args: Unused positional arguments from Django.
+            **options: Parsed command-line options.
+        """
+        if options["encoding"]:
+            if not encoding_available(options["encoding"]):
+                raise CommandError(f"Encoding {options['encoding']!r} is unknown or not supported by this Pillow installation")
+            encoding = get_encoder(options["encoding"]).name
+        else:
+            encoding = thumbnail_encoding()
+        self.stdout.write(f"Target encoding: {encoding} (quality {thumbnail_quality(encoding)})")
+
+        totals = reencode_thumbnails(
+            encoding,
+            chunk_size=options["chunk_size"],
+            max_count=options["max_count"],
+            dry_run=options["dry_run"],
+            pause=options["pause"],
+        )
+        if options["dry_run"]:
+            by_encoding = ", ".join(f"{key[5:]}: {count}" for key, count in sorted(totals.items()) if key.startswith("from_"))
+            self.stdout.write(f"Would convert {totals['rows']} thumbnails ({by_encoding or 'none'}).")
+            return
+
+        self.stdout.write(f"Converted {totals['converted']} of {totals['rows']} thumbnails ({totals['blobs']} blobs).")
+        if totals["blobs"]:
+            before, after = totals["bytes_before"], totals["bytes_after"]
+            change = (after - before) / before * 100 if before else 0.0
+            self.stdout.write(f"Size: {_format_bytes(before)} -> {_format_bytes(after)} ({change:+.1f}%)")
+            encode_ms = totals["encode_ns"] / totals["blobs"] / 1e6
+            baseline_ms = totals["baseline_encode_ns"] / totals["blobs"] / 1e6
+            self.stdout.write(
+                f"Encode time per blob: {encoding} {encode_ms:.2f} ms, {BASELINE_ENCODING} {baseline_ms:.2f} ms ({encode_ms - baseline_ms:+.2f} ms)"
+            )
+        if totals["invalidated"]:
+            self.stdout.write(f"Invalidated {totals['invalidated']} thumbnails with missing or unwritable blobs; they will regenerate.")
+        if totals["changed"]:
+            self.stdout.write(f"Skipped {totals['changed']} thumbnails changed during the run; run again to convert them.")
+        if totals["failed"]:
+            self.stdout.write(f"Left {totals['failed']} undecodable thumbnails unchanged.")
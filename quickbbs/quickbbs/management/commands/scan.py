@@ -28,7 +28,8 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import close_old_connections, transaction
 
 from interactive_fiction.ingestion import ingest_stories, verify_stories
-from quickbbs.common import normalize_fqpn
+from quickbbs.cache_registry import bump_search_generation
+from quickbbs.common import normalize_fqpn, set_sha_backend
 from quickbbs.directoryindex import directoryindex_cache, update_database_from_disk
 from quickbbs.management.commands.add_directories import add_directories
 from quickbbs.management.commands.add_files import add_files
@@ -38,8 +39,13 @@ from quickbbs.management.commands.management_helper import (
     invalidate_directories_with_null_virtual_directory,
     invalidate_empty_directories,
 )
-from quickbbs.models import DirectoryIndex, FileIndex
-from thumbnails.models import ThumbnailFiles, is_all_white_thumbnail
+from quickbbs.models import DirectoryIndex, FileIndex, SearchDocument
+from thumbnails.blob_store import thumbnail_blob_store
+from thumbnails.models import (
+    THUMBNAIL_BLOB_FIELDS,
+    ThumbnailFiles,
+    is_all_white_thumbnail,
+)
 
 # Batch size for chunked processing operations
 BULK_UPDATE_BATCH_SIZE = 250
@@ -77,6 +83,7 @@ def _process_directory_verification_chunk(
     if missing_dirs:
         DirectoryIndex.invalidate_caches(missing_dirs)
         DirectoryIndex.objects.filter(pk__in=[d.pk for d in missing_dirs]).delete()
+        bump_search_generation()
         deleted_count += len(missing_dirs)
 
     return deleted_count
@@ -384,6 +391,12 @@ def verify_thumbnails(max_count: int = 0):
         .filter(blob_size__gt=0, blob_size__lt=safeguard_size)
         .values_list("pk", flat=True)
     )
+    # Small thumbnails kept in the blob store (THUMBNAIL_BLOB_STORE_SIZES) have
+    # no column to measure; their file size is checked instead.
+    for pk, sha256 in ThumbnailFiles.objects.filter(small_thumb__isnull=True, blobs_in_store=True).values_list("pk", "sha256_hash"):
+        stored_size = thumbnail_blob_store.blob_size(sha256, "small") if sha256 else None
+        if stored_size and stored_size < safeguard_size:
+            suspect_pks.append(pk)
     suspect_count = len(suspect_pks)
     pk_time = time.time() - pk_start
     print(f"Found {suspect_count} suspect thumbnails out of {total_thumbnails} ({pk_time:.1f}s)")
@@ -408,7 +421,7 @@ def verify_thumbnails(max_count: int = 0):
     # Process suspect PKs in chunks
     for pk_chunk in batched(suspect_pks, chunk_size):
         # Load only needed fields for this chunk
-        thumbnails = list(ThumbnailFiles.objects.filter(pk__in=pk_chunk).only("id", "sha256_hash", "small_thumb"))
+        thumbnails = list(ThumbnailFiles.objects.filter(pk__in=pk_chunk).only("id", "sha256_hash", "small_thumb", "blobs_in_store"))
 
         # Single query per chunk: map sha256 -> a linked FileIndex name (used for
         # both the orphan check and the filename display if corrupted).
@@ -431,7 +444,7 @@ def verify_thumbnails(max_count: int = 0):
                 # Shared detector (thumbnails.models) — also handles empty/None blobs.
                 # This scan is unconditional; settings.MAC_OPTIMIZATION_WHITECHECK
                 # only gates the creation-time check, not this repair pass.
-                if is_all_white_thumbnail(thumbnail.small_thumb):
+                if is_all_white_thumbnail(thumbnail.retrieve_sized_tnail("small")):
                     corrupted_count += 1
                     fi_name = fileindex_names.get(thumbnail.sha256_hash, "unknown")
                     print(f"  Found potential issue: SHA256={thumbnail.sha256_hash[:16]}... file={fi_name}")
@@ -439,7 +452,7 @@ def verify_thumbnails(max_count: int = 0):
                     # Invalidate immediately
                     with transaction.atomic():
                         thumbnail.invalidate_thumb()
-                        thumbnail.save(update_fields=["small_thumb", "medium_thumb", "large_thumb"])
+                        thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
 
                         # Get files using this thumbnail and collect directory IDs only
                         file_dir_ids = (
@@ -572,6 +585,19 @@ def _report_story_ingestion(ingested: int) -> None:
         print(f"Interactive Fiction: {ingested} new .inkj stories ingested")
 
 
+def _report_search_indexing(indexed: int) -> None:
+    """Print a summary line for SearchDocument.index_pending()'s result, if anything was indexed.
+
+    Args:
+        indexed: The number of new SearchDocument rows created.
+
+    Returns:
+        None.
+    """
+    if indexed:
+        print(f"Search index: {indexed} new files indexed")
+
+
 class Command(BaseCommand):
     """
     Django management command for file system integrity and maintenance.
@@ -667,6 +693,9 @@ class Command(BaseCommand):
             CommandError: If --start is outside the albums root, missing,
                 or not a directory.
         """
+        # The scan runs in the main thread, so it can hash on a process pool
+        set_sha_backend(settings.SHA256_CLI_BACKEND)
+
         # Clean up stale records before any scan operation
         deleted_count, _ = FileIndex.objects.filter(delete_pending=True).delete()
         if deleted_count:
@@ -710,6 +739,8 @@ class Command(BaseCommand):
         if options["add_files"]:
             add_files(max_count=max_count, start_path=start_path)
             _report_story_ingestion(ingest_stories())
+            # After story ingestion: .inkj files are indexed by their Story title
+            _report_search_indexing(SearchDocument.index_pending(max_count=max_count))
         if options["add_thumbnails"]:
             add_thumbnails(max_count=max_count)
         if options["verify_thumbnails"]:
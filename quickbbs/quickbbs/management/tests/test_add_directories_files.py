@@ -16,10 +16,12 @@ from quickbbs.management.commands.add_files import add_files
 from quickbbs.management.commands.add_thumbnails import (
     _bulk_create_thumbnail_records,
     _bulk_link_fileindex_to_thumbnails,
+    add_media_probes,
     add_thumbnails,
 )
-from quickbbs.models import DirectoryIndex, FileIndex
-from thumbnails.models import ThumbnailFiles
+from quickbbs.models import DirectoryIndex, FileIndex, MediaProbe
+from thumbnails.generation_queue import QUEUE_PRIORITY_BACKGROUND
+from thumbnails.models import ThumbnailFiles, ThumbnailQueueEntry
 
 pytestmark = pytest.mark.api
 
@@ -199,8 +201,63 @@ class TestBulkLinkFileindexToThumbnails(AddCommandsTestBase):
         assert linked_count == 0
 
 
+class TestAddMediaProbes(AddCommandsTestBase):
+    """Tests for add_media_probes() — probe_media is mocked, so no file is decoded."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        _, self.directory = DirectoryIndex.add_directory(self.albums_root + os.sep)
+        assert self.directory is not None
+        self._probe_patcher = mock.patch("quickbbs.mediaprobe.probe_media", return_value={"duration": 5.0, "width": 640, "height": 360})
+        self.mock_probe = self._probe_patcher.start()
+
+    def tearDown(self) -> None:
+        self._probe_patcher.stop()
+        super().tearDown()
+
+    def _add_file(self, name: str, sha: str, fileext: str = ".mp4", directory: DirectoryIndex | None = None) -> FileIndex:
+        return FileIndex.objects.create(
+            home_directory=directory or self.directory,
+            name=name,
+            file_sha256=sha,
+            unique_sha256=_sha("u" + name.encode().hex()[:12]),
+            lastscan=0.0,
+            lastmod=0.0,
+            filetype=_get_ft(fileext),
+            delete_pending=False,
+        )
+
+    def test_probes_each_new_hash_once(self):
+        """Copies share one probe; images and already-probed hashes are skipped."""
+        _, other = DirectoryIndex.add_directory(os.path.join(self.albums_root, "other") + os.sep)
+        self._add_file("a.mp4", _sha("a1"))
+        self._add_file("a copy.mp4", _sha("a1"))
+        self._add_file("song.mp3", _sha("b1"), fileext=".mp3")
+        self._add_file("c.mp4", _sha("c1"), directory=other)
+        self._add_file("photo.jpg", _sha("d1"), fileext=".jpg")
+        self._add_file("done.mp4", _sha("e1"))
+        MediaProbe.objects.create(file_sha256=_sha("e1"), duration=1.0)
+
+        created = add_media_probes()
+
+        probed = sorted(os.path.basename(call.args[0]) for call in self.mock_probe.call_args_list)
+        assert created == 3
+        assert probed == ["a copy.mp4", "c.mp4", "song.mp3"]
+        assert add_media_probes() == 0
+
+    def test_max_count(self):
+        """max_count caps the number of files probed."""
+        for index in range(3):
+            self._add_file(f"clip{index}.mp4", _sha(f"a{index}"))
+
+        add_media_probes(max_count=2)
+
+        assert self.mock_probe.call_count == 2
+        assert MediaProbe.objects.count() == 2
+
+
 class TestAddThumbnailsCommand(AddCommandsTestBase):
-    """Tests for add_thumbnails() — enqueue() is mocked to avoid real background tasks."""
+    """Tests for add_thumbnails() — the queue drain task is mocked to avoid real background tasks."""
 
     def setUp(self) -> None:
         super().setUp()
@@ -223,16 +280,18 @@ class TestAddThumbnailsCommand(AddCommandsTestBase):
             is_generic_icon=False,
         )
 
-        with mock.patch("quickbbs.management.commands.add_thumbnails.generate_missing_thumbnails") as mock_task:
+        with mock.patch("quickbbs.tasks.process_thumbnail_queue") as mock_task:
             add_thumbnails()
 
         assert ThumbnailFiles.objects.filter(sha256_hash=sha).exists()
-        mock_task.using.assert_called_once()
+        assert ThumbnailQueueEntry.objects.get(sha256_hash=sha).priority == QUEUE_PRIORITY_BACKGROUND
+        mock_task.using.assert_called_once_with(priority=0)
         mock_task.using.return_value.enqueue.assert_called_once()
 
     def test_no_thumbnailable_files_skips_enqueue(self):
         """When there are no thumbnailable files, add_thumbnails does not enqueue anything."""
-        with mock.patch("quickbbs.management.commands.add_thumbnails.generate_missing_thumbnails") as mock_task:
+        with mock.patch("quickbbs.tasks.process_thumbnail_queue") as mock_task:
             add_thumbnails()
 
         mock_task.using.assert_not_called()
+        assert not ThumbnailQueueEntry.objects.exists()
@@ -0,0 +1,196 @@
+"""
+MediaProbe Model - persisted stream metadata for video and audio files
+
+Apart from FileIndex.duration, nothing about a media file's streams was
+stored: directory sync probed each new movie for its duration, and video
+thumbnailing probed it again to pick the seek offset — a subprocess per file
+each time. Dimensions, codecs, bitrate and audio streams were never kept.
+
+This table holds one row per distinct file content (file_sha256, shared by
+every copy of the file, as with ThumbnailFiles). It is filled in batches by
+"manage.py scan --add_thumbnails", one directory at a time, through
+thumbnails.engine.probe_media — the long-lived PyAV decoder helpers when
+PyAV is installed (no process per file), ffprobe otherwise. A file that
+can't be probed gets a row with probe_failed set so it is not retried on
+every scan.
+
+Consumers:
+    - Thumbnail generation passes seek_info() to the video backends, which
+      then skip their own probe.
+    - FileIndex.check_for_updates() takes a missing duration from here
+      before probing the file itself.
+    - The item view shows the row; gallery querysets annotate
+      media_probe_annotations() to show each video's resolution.
+    - duration is indexed, so files can be sorted or filtered by it.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.db import models
+from django.db.models import BigIntegerField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+from thumbnails.engine import MediaProcessingError, probe_media
+
+logger = logging.getLogger(__name__)
+
+
+class MediaProbe(models.Model):
+    """
+    Stream metadata for one video or audio file content, keyed by file_sha256.
+
+    Every value except file_sha256 may be NULL/empty: audio files have no
+    frame size, silent videos no audio stream, and probe_failed rows nothing
+    at all.
+    """
+
+    file_sha256 = models.CharField(max_length=64, unique=True)
+    duration = models.FloatField(null=True, db_index=True)  # seconds
+    width = models.PositiveIntegerField(null=True)
+    height = models.PositiveIntegerField(null=True)
+    fps = models.FloatField(null=True)
+    video_codec = models.CharField(max_length=32, blank=True, default="")
+    audio_codec = models.CharField(max_length=32, blank=True, default="")
+    audio_channels = models.PositiveSmallIntegerField(null=True)
+    sample_rate = models.PositiveIntegerField(null=True)
+    bit_rate = models.BigIntegerField(null=True)  # bits per second, whole container
+    container = models.CharField(max_length=64, blank=True, default="")
+    # The file could not be probed; kept so scans don't retry it every run
+    probe_failed = models.BooleanField(default=False)
+    # Unix timestamp of the probe
+    probed_at = models.FloatField(default=time.time)
+
+    class Meta:
+        """Model metadata: admin display names."""
+
+        verbose_name = "Media Probe"
+        verbose_name_plural = "Media Probes"
+
+    @property
+    def resolution(self) -> str:
+        """Frame size as "WIDTHxHEIGHT", or "" for audio-only files."""
+        return f"{self.width}x{self.height}" if self.width and self.height else ""
+
+    @classmethod
+    def from_probe(cls, file_sha256: str, info: dict[str, Any]) -> MediaProbe:
+        """
+        Build an unsaved row from a thumbnails.engine.probe_media() result.
+
+        Args:
+            file_sha256: Content hash of the probed file
+            info: probe_media() dictionary
+        """
+        return cls(
+            file_sha256=file_sha256,
+            duration=info.get("duration"),
+            width=info.get("width"),
+            height=info.get("height"),
+            fps=info.get("fps"),
+            video_codec=(info.get("codec") or "")[:32],
+            audio_codec=(info.get("audio_codec") or "")[:32],
+            audio_channels=info.get("audio_channels"),
+            sample_rate=info.get("sample_rate"),
+            bit_rate=info.get("bit_rate"),
+            container=(info.get("format") or "")[:64],
+        )
+
+    @classmethod
+    def probe_files(cls, files: dict[str, str]) -> int:
+        """
+        Probe files and store one row per hash.
+
+        Files that have disappeared are skipped (directory sync will mark
+        them); files that can't be probed are stored with probe_failed.
+        Existing rows are left untouched. FileIndex rows of the probed
+        hashes that have no duration yet get it from the new rows.
+
+        Args:
+            files: file_sha256 → path of one copy of the file, ideally all in
+                one directory so reads stay local
+
+        Returns:
+            Number of rows created (including probe_failed rows)
+        """
+        rows = []
+        for file_sha256, path in files.items():
+            try:
+                rows.append(cls.from_probe(file_sha256, probe_media(path)))
+            except FileNotFoundError:
+                continue
+            except (MediaProcessingError, OSError, ValueError) as e:
+                logger.debug("Could not probe %s: %s", path, e)
+                rows.append(cls(file_sha256=file_sha256, probe_failed=True))
+        if not rows:
+            return 0
+        cls.objects.bulk_create(rows, ignore_conflicts=True)
+        cls.backfill_durations([row.file_sha256 for row in rows])
+        return len(rows)
+
+    @classmethod
+    def backfill_durations(cls, sha256_list: Iterable[str]) -> int:
+        """
+        Copy probed durations into FileIndex.duration where it is still NULL.
+
+        Returns:
+            Number of FileIndex rows updated
+        """
+        # Inline: quickbbs.fileindex imports this module
+        # pylint: disable-next=import-outside-toplevel
+        from quickbbs.fileindex import FileIndex
+
+        with_duration = list(cls.objects.filter(file_sha256__in=list(sha256_list), duration__isnull=False).values_list("file_sha256", flat=True))
+        if not with_duration:
+            return 0
+        probed_duration = cls.objects.filter(file_sha256=OuterRef("file_sha256")).values("duration")[:1]
+        return FileIndex.objects.filter(file_sha256__in=with_duration, duration__isnull=True).update(
+            duration=Cast(Subquery(probed_duration), BigIntegerField())
+        )
+
+    @classmethod
+    def for_sha(cls, file_sha256: str | None) -> MediaProbe | None:
+        """Return the successful probe row for a content hash, or None."""
+        if not file_sha256:
+            return None
+        return cls.objects.filter(file_sha256=file_sha256, probe_failed=False).first()
+
+    @classmethod
+    def seek_info(cls, sha256_list: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """
+        Return the media_info the video thumbnail backends accept, per hash (one query).
+
+        Only hashes with a probed duration and frame size are included, so
+        the backend never seeks by a partial result.
+        """
+        rows = cls.objects.filter(
+            file_sha256__in=list(sha256_list),
+            duration__isnull=False,
+            width__isnull=False,
+            height__isnull=False,
+        ).values_list("file_sha256", "duration", "width", "height")
+        return {sha256: {"duration": duration, "width": width, "height": height} for sha256, duration, width, height in rows}
+
+
+def media_probe_annotations(prefix: str = "") -> dict[str, Subquery]:
+    """
+    Return FileIndex queryset annotations carrying the probed frame size.
+
+    Adds probe_width and probe_height (NULL when not probed). Each is a
+    correlated lookup on MediaProbe's unique file_sha256 index, so annotate
+    only page-sized querysets.
+
+    Args:
+        prefix: Lookup path to the FileIndex, "" for a FileIndex queryset
+
+    Example:
+        >>> files = FileIndex.objects.filter(...).annotate(**media_probe_annotations())
+    """
+    probe = MediaProbe.objects.filter(file_sha256=OuterRef(f"{prefix}file_sha256"), probe_failed=False)
+    return {
+        "probe_width": Subquery(probe.values("width")[:1]),
+        "probe_height": Subquery(probe.values("height")[:1]),
+    }
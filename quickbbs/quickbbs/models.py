@@ -48,6 +48,12 @@ from .cache_registry import (  # noqa: E402  # pylint: disable=wrong-import-posi
     distinct_files_cache,
 )
 
+# DirectoryRollup only references DirectoryIndex as a lazy FK string and
+# imports the other models inside method bodies, like favorite.py below.
+from .directory_rollup import (  # noqa: E402  # pylint: disable=wrong-import-position
+    DirectoryRollup,
+)
+
 # These imports must come after the class definitions above because .directoryindex,
 # .cache_registry, and .fileindex all import from this module, creating a cyclic
 # dependency that would cause an ImportError if placed at the top of the file.
@@ -65,17 +71,32 @@ from .directoryindex import (  # noqa: E402  # pylint: disable=wrong-import-posi
 from .favorite import Favorite  # noqa: E402  # pylint: disable=wrong-import-position
 
 # Import and re-export main models (allows: from quickbbs.models import DirectoryIndex, FileIndex)
+from .file_hash_cache import (  # noqa: E402  # pylint: disable=wrong-import-position
+    FileHashCache,
+)
 from .fileindex import (  # noqa: E402  # pylint: disable=wrong-import-position
     FileIndex,
     fileindex_cache,
     fileindex_download_cache,
 )
+from .mediaprobe import (  # noqa: E402  # pylint: disable=wrong-import-position
+    MediaProbe,
+    media_probe_annotations,
+)
+from .search_document import (  # noqa: E402  # pylint: disable=wrong-import-position
+    SearchDocument,
+)
 
 __all__ = [
     "Owners",
     "Favorite",
     "DirectoryIndex",
+    "DirectoryRollup",
     "FileIndex",
+    "FileHashCache",
+    "MediaProbe",
+    "media_probe_annotations",
+    "SearchDocument",
     "directoryindex_cache",
     "get_view_url_cache",
     "fileindex_cache",
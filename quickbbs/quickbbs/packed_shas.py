@@ -0,0 +1,230 @@
+"""
+Compact ordered SHA256 lists for gallery pagination and item-view navigation.
+
+DirectoryIndex.get_distinct_file_shas() / get_all_file_shas() are cached per
+(directory, sort, user) and read on every gallery page and item view. As
+plain lists of 64-char hex strings they cost ~121 bytes per entry (8-byte
+list slot + 113-byte str object), and build_context_info's
+all_shas.index(sha) was a linear string-compare scan on every item view.
+
+PackedShaList stores the same ordered list as concatenated 32-byte raw
+digests (32 bytes per entry) and answers index() in O(1) expected time
+through an open-addressing position table — an array of uint32 positions
+keyed by the digest's leading 8 bytes. SHA256 output is already uniformly
+distributed, so the prefix needs no further hashing. The table is built
+lazily on the first index()/`in` call (gallery pages only slice the list and
+never pay for it) and adds ~5-11 bytes per entry, keeping a cached directory
+at roughly a third of the plain list's footprint.
+
+Only lowercase 64-char hex strings (and None — transient NULL unique_sha256
+rows, stored as an all-zero digest) can be packed; pack_shas() returns None
+for anything else and callers keep the plain list.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import overload
+
+DIGEST_SIZE = 32
+
+# Stand-in for a NULL unique_sha256. Never inserted into the position table;
+# index(None) falls back to a scan.
+NULL_DIGEST = bytes(DIGEST_SIZE)
+
+# Maximum position-table load factor (entries / slots) — keeps linear-probe
+# chains short while the table stays at 4 bytes per slot.
+_MAX_LOAD_NUMERATOR, _MAX_LOAD_DENOMINATOR = 3, 4
+
+
+def pack_shas(shas: Iterable[str | None]) -> bytes | None:
+    """
+    Pack hex SHA256 strings into concatenated 32-byte digests.
+
+    Args:
+        shas: Ordered hex SHA256 strings (None allowed)
+
+    Returns:
+        Packed bytes, or None if any entry is not a 64-char lowercase hex
+        string (the caller then keeps the plain list).
+    """
+    parts = []
+    for sha in shas:
+        if sha is None:
+            parts.append(NULL_DIGEST)
+            continue
+        try:
+            digest = bytes.fromhex(sha)
+        except (TypeError, ValueError):
+            return None
+        # digest.hex() must reproduce the stored string exactly (lowercase),
+        # or reads would hand back a SHA the database does not contain
+        if len(digest) != DIGEST_SIZE or digest == NULL_DIGEST or digest.hex() != sha:
+            return None
+        parts.append(digest)
+    return b"".join(parts)
+
+
+class PackedShaList(Sequence):
+    """
+    Read-only sequence of hex SHA256 strings stored as packed 32-byte digests.
+
+    Supports the list operations layout_manager and build_context_info use:
+    len(), integer indexing (including negative), slicing (returns a list),
+    index(), membership tests, and equality with a plain list. Items are
+    decoded to hex on access.
+
+    data may be any buffer supporting slicing and find() — bytes for the
+    per-process lists, an mmap for the shared ones (ShaListView) — with the
+    digests starting at offset.
+    """
+
+    __slots__ = ("_count", "_data", "_offset", "_positions")
+
+    def __init__(self, data: bytes, count: int, offset: int = 0) -> None:
+        self._data = data
+        self._count = count
+        self._offset = offset
+        self._positions: array | None = None
+
+    @classmethod
+    def from_shas(cls, shas: Sequence[str | None]) -> PackedShaList | None:
+        """
+        Build a packed list from hex strings.
+
+        Returns:
+            PackedShaList, or None if the values can't be packed (see pack_shas)
+        """
+        packed = pack_shas(shas)
+        if packed is None:
+            return None
+        return cls(packed, len(shas))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _digest_at(self, index: int) -> bytes:
+        start = self._offset + index * DIGEST_SIZE
+        return self._data[start : start + DIGEST_SIZE]
+
+    @staticmethod
+    def _decode(digest: bytes) -> str | None:
+        return None if digest == NULL_DIGEST else digest.hex()
+
+    @overload
+    def __getitem__(self, index: int) -> str | None: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str | None]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(self._digest_at(i)) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self._decode(self._digest_at(index))
+
+    def __iter__(self) -> Iterator[str | None]:
+        for i in range(self._count):
+            yield self._decode(self._digest_at(i))
+
+    def __contains__(self, value: object) -> bool:
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def _build_positions(self) -> array:
+        """
+        Build the open-addressing table mapping digest prefix → position + 1.
+
+        Slot values are position + 1 so 0 can mean "empty". The first
+        occurrence of a digest wins, matching list.index().
+        """
+        size = 8
+        while size * _MAX_LOAD_NUMERATOR < self._count * _MAX_LOAD_DENOMINATOR:
+            size <<= 1
+        mask = size - 1
+        table = array("I", bytes(4 * size))
+        for position in range(self._count):
+            digest = self._digest_at(position)
+            if digest == NULL_DIGEST:
+                continue
+            slot = int.from_bytes(digest[:8], "little") & mask
+            while table[slot]:
+                if self._digest_at(table[slot] - 1) == digest:
+                    break
+                slot = (slot + 1) & mask
+            else:
+                table[slot] = position + 1
+        return table
+
+    def _lookup(self, digest: bytes) -> int | None:
+        """Return the first position of digest via the position table, or None."""
+        table = self._positions
+        if table is None:
+            # Benign race: two threads may both build; either result is correct.
+            table = self._positions = self._build_positions()
+        mask = len(table) - 1
+        slot = int.from_bytes(digest[:8], "little") & mask
+        while entry := table[slot]:
+            if self._digest_at(entry - 1) == digest:
+                return entry - 1
+            slot = (slot + 1) & mask
+        return None
+
+    def _scan(self, digest: bytes, start: int, stop: int) -> int | None:
+        """Return the first position of digest in [start, stop) via find(), or None."""
+        begin = self._offset + start * DIGEST_SIZE
+        end = self._offset + stop * DIGEST_SIZE
+        while (pos := self._data.find(digest, begin, end)) >= 0:
+            # Only 32-byte-aligned matches are entries; a digest whose bytes
+            # happen to straddle two entries is skipped.
+            if (pos - self._offset) % DIGEST_SIZE == 0:
+                return (pos - self._offset) // DIGEST_SIZE
+            begin = pos + 1
+        return None
+
+    def index(self, value: object, start: int = 0, stop: int | None = None) -> int:
+        """
+        Return the position of a hex SHA256 in the list.
+
+        O(1) expected for whole-list lookups (the position table); a start/
+        stop window or a None value falls back to a C-level find() scan.
+
+        Raises:
+            ValueError: If value is not in the list (same contract as list.index)
+        """
+        if value is None:
+            digest = NULL_DIGEST
+        else:
+            try:
+                digest = bytes.fromhex(value)  # type: ignore[arg-type]
+            except (TypeError, ValueError):
+                raise ValueError(f"{value!r} is not in list") from None
+            if len(digest) != DIGEST_SIZE:
+                raise ValueError(f"{value!r} is not in list")
+
+        if start == 0 and stop is None and digest != NULL_DIGEST:
+            position = self._lookup(digest)
+        else:
+            start = max(start + self._count if start < 0 else start, 0)
+            stop = self._count if stop is None else min(stop + self._count if stop < 0 else stop, self._count)
+            position = self._scan(digest, start, stop)
+        if position is None:
+            raise ValueError(f"{value!r} is not in list")
+        return position
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple, PackedShaList)):
+            return len(other) == self._count and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} count={self._count}>"
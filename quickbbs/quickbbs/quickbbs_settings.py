@@ -95,6 +95,30 @@ PIL_IMAGE_QUALITY = 85  # Quality for PIL/Pillow thumbnail generation
 # calibration reference for SMALL_THUMBNAIL_SAFEGUARD_SIZE (all-white JPEGs at q=55).
 CORE_IMAGE_QUALITY = 55  # Quality for Core Image thumbnail generation (macOS)
 
+# Thumbnail output encoding (thumbnails/engine/encoders.py): "JPEG", "WEBP",
+# or "AVIF" (Pillow 11.2+ built with libavif, or pillow-avif-plugin). Each
+# ThumbnailFiles row records its encoding; a client whose Accept header
+# doesn't list image/webp or image/avif is sent a JPEG transcoded on the fly.
+# Changing this only affects thumbnails generated from then on — run
+# "manage.py reencode_thumbnails" to convert existing ones.
+# THUMBNAIL_ENCODING_QUALITY overrides PIL_IMAGE_QUALITY per encoding: WebP
+# and AVIF reach JPEG q=85 appearance at lower settings.
+THUMBNAIL_ENCODING = "JPEG"
+THUMBNAIL_ENCODING_QUALITY = {"WEBP": 80, "AVIF": 60}
+
+# Near-duplicate report (reports/near_duplicate_files.html). Images whose
+# thumbnails' perceptual hashes (ThumbnailFiles.perceptual_hash, a 64-bit
+# dHash) differ in at most NEAR_DUPLICATE_MAX_DISTANCE bits are grouped as
+# visually similar; ?distance= overrides it per request, up to
+# NEAR_DUPLICATE_DISTANCE_LIMIT. Larger distances find more re-edited copies
+# but also more false matches, and compare more hashes: the finder splits the
+# 64 bits into distance + 1 chunks, and below ~7 bits per chunk its buckets
+# grow toward comparing every pair, so the limit stays at 8. Thumbnails generated
+# before hashing was added need "manage.py compute_perceptual_hashes" once.
+NEAR_DUPLICATE_MAX_DISTANCE = 4
+NEAR_DUPLICATE_DISTANCE_LIMIT = 8
+NEAR_DUPLICATE_REPORT_MAX_GROUPS = 500  # Largest groups shown
+
 # Master switch for the macOS hardware-accelerated thumbnail backends:
 # CoreImage (images), AVFoundation (videos), PDFKit (PDFs).
 # When False, the cross-platform backends are used instead (PIL, FFmpeg, PyMuPDF).
@@ -120,6 +144,37 @@ MAC_OPTIMIZATION_WHITECHECK = False
 # real photo thumbnails are typically 3-15KB+.
 SMALL_THUMBNAIL_SAFEGUARD_SIZE = 2500
 
+# Thumbnail render process pool (thumbnails/render_pool.py).
+# generate_missing_thumbnails decodes and resizes PIL/PyMuPDF/FFmpeg
+# thumbnails for a batch on THUMBNAIL_PROCESS_WORKERS spawned processes
+# (0 = one per CPU) before its sequential ORM loop. Batches with fewer than
+# THUMBNAIL_PROCESS_POOL_THRESHOLD renderable files render in-process.
+# macOS-accelerated backends (MACINTOSH_OPTIMIZATIONS) always run in-process.
+THUMBNAIL_PROCESS_POOL_ENABLED = True
+THUMBNAIL_PROCESS_WORKERS = 0
+THUMBNAIL_PROCESS_POOL_THRESHOLD = 4
+
+# Video frame decoder helpers (thumbnails/engine/video_decoder.py).
+# With PyAV ("av") installed, the FFmpeg video backend decodes frames on up to
+# VIDEO_DECODER_WORKERS long-lived helper processes per Python process instead
+# of starting ffprobe + ffmpeg for every video (0 = always use the ffmpeg CLI).
+# A helper is replaced after VIDEO_DECODER_MAX_FILES files, and killed when a
+# single file takes longer than VIDEO_DECODER_TIMEOUT seconds.
+VIDEO_DECODER_WORKERS = 2
+VIDEO_DECODER_MAX_FILES = 500
+VIDEO_DECODER_TIMEOUT = 30
+
+# Thumbnail blob store (thumbnails/blob_store.py).
+# Sizes listed in THUMBNAIL_BLOB_STORE_SIZES ("small", "medium", "large") are
+# written as content-addressed files under THUMBNAIL_BLOB_STORE_PATH
+# (<size>/<sha[0:2]>/<sha[2:4]>/<sha>.jpg) instead of the ThumbnailFiles bytea
+# columns, and served straight from disk (sendfile where the server supports
+# it). Unlisted sizes stay in PostgreSQL. The setting applies to thumbnails
+# generated from then on — run "manage.py migrate_thumbnail_blobs" to move
+# existing ones (in either direction).
+THUMBNAIL_BLOB_STORE_SIZES = ()
+THUMBNAIL_BLOB_STORE_PATH = f"{THUMBNAILS_PATH}/blobs"
+
 # ALIAS_MAPPING (macOS alias target -> gallery path overrides) is imported from
 # secrets.py, since the mapped paths are specific to this deployment's drives.
 from quickbbs.secrets import (  # noqa: E402  # pylint: disable=wrong-import-position,unused-import
@@ -160,14 +215,73 @@ DIRECTORY_SHA_CACHE_SIZE = 1000  # Directory SHA256 hash computations (common.py
 NORMALIZED_PATHS_CACHE_SIZE = 1000  # Normalized path lookups (common.py)
 ENCODING_CACHE_SIZE = 1000  # Text file encoding detection results (fileindex.py)
 ALIAS_CACHE_SIZE = 250  # macOS alias resolution results (fileindex.py)
+COMPILED_STORY_CACHE_SIZE = 8  # Compiled Ink story trees, each a full container tree (interactive_fiction/views.py)
+TRANSCODED_THUMBNAIL_CACHE_SIZE = 500  # JPEG fallbacks of WebP/AVIF thumbnails for clients without support (thumbnails/models.py)
+
+# Cross-process cache invalidation bus (cache_bus.py). Every LRU cache above
+# is per-process; the bus broadcasts invalidated directory PKs / SHAs so every
+# web worker and the taskrunner evict the same keys, not just the process that
+# noticed the change. With the bus enabled the sizes above can be raised
+# without serving stale layouts from the other workers until LRU eviction.
+# CACHE_BUS_BACKEND: "postgres" (LISTEN/NOTIFY; falls back to "socket"
+# automatically when the database is not PostgreSQL) or "socket" (Unix
+# datagram sockets in CACHE_BUS_SOCKET_DIR — single host only).
+CACHE_BUS_ENABLED = True
+CACHE_BUS_BACKEND = "postgres"
+CACHE_BUS_CHANNEL = "quickbbs_cache_invalidation"
+CACHE_BUS_SOCKET_DIR = "/tmp/quickbbs_cache_bus"
+
+# Host-wide shared SHA lists (shared_sha_lists.py). When enabled, the ordered
+# per-directory SHA lists behind gallery pagination and item-view navigation
+# (get_distinct_file_shas / get_all_file_shas) are written once per host as
+# packed 32-byte digests and mmap()ed read-only by every worker, instead of
+# each worker querying and holding its own list of 64-char strings. Files are
+# versioned by DirectoryIndex.cache_lastscan, so rescans invalidate them on
+# every worker. Point SHARED_SHA_LISTS_DIR at a tmpfs (/dev/shm on Linux)
+# when available. Off by default: single-worker deployments gain nothing.
+SHARED_SHA_LISTS_ENABLED = False
+SHARED_SHA_LISTS_DIR = "/tmp/quickbbs_sha_lists"
 
 # TTL cache settings
 USER_PREF_CACHE_SIZE = 64  # Max cached user preference lookups (views.py)
 USER_PREF_CACHE_TTL = 10  # Seconds before user preference cache entries expire
 
+# Search result cache (frontend/views.py). Holds each search's complete ordered
+# (pk, name) lists per (normalized query, sort), so paging through results and
+# refining a query (adding to the text) are answered from memory instead of
+# re-running the regex scan. Entries are dropped whenever a scan changes any
+# directory (search generation, quickbbs/cache_registry.py) and after the TTL.
+# Searches matching more than SEARCH_RESULTS_CACHE_MAX_ITEMS rows are not
+# cached; they page through the database as before.
+SEARCH_RESULTS_CACHE_SIZE = 32
+SEARCH_RESULTS_CACHE_TTL = 300  # seconds
+SEARCH_RESULTS_CACHE_MAX_ITEMS = 10000
+
+# Full-text search index (quickbbs/search_document.py). Image metadata
+# (EXIF/IPTC/XMP), PDF metadata and text, text/markdown/HTML bodies and Ink
+# story titles are indexed once per file content by "manage.py scan
+# --add_files" and the periodic index_search_documents task (at most
+# SEARCH_INDEX_TASK_BATCH new hashes per run, 0 = unlimited). Search adds the
+# ranked content matches after the name matches. SEARCH_INDEX_CONFIG is the
+# PostgreSQL text search configuration (stemming/stop words).
+SEARCH_INDEX_CONFIG = "english"
+SEARCH_INDEX_MAX_BODY_CHARS = 100000  # Characters of body text kept per file
+SEARCH_INDEX_BATCH_SIZE = 200  # Files extracted per bulk insert
+SEARCH_INDEX_TASK_BATCH = 2000
+
 # HTTP Cache-Control header settings
 HTTP_CACHE_MAX_AGE = 300  # seconds (5 minutes) for file response Cache-Control headers
 STATIC_ASSET_CACHE_MAX_AGE = 300  # seconds (5 minutes) for resources/static CSS/JS/icon Cache-Control headers
+# max-age for thumbnail requests whose ?v= token matches the served generation
+# (sent with "immutable"); unversioned thumbnail URLs use HTTP_CACHE_MAX_AGE.
+THUMBNAIL_IMMUTABLE_MAX_AGE = 31536000  # seconds (1 year)
+
+# Multipart gallery thumbnails: when enabled, a gallery page loads the small
+# thumbnails of all its files with one thumbnail_multipart request (parsed by
+# quickbbs-optimized.js) instead of one request per item. Directories, links
+# and thumbnails not generated yet keep their individual URLs.
+THUMBNAIL_MULTIPART_ENABLED = False
+THUMBNAIL_MULTIPART_MAX_ITEMS = 200  # Maximum thumbnails in one multipart response
 
 # Search and view limits
 DEFAULT_SORT_ORDER = 0  # Default sort order index (maps to SORT_MATRIX keys)
@@ -175,6 +289,14 @@ MAX_SEARCH_RESULTS = 10000  # Maximum combined search results returned
 THUMBNAIL_BATCH_LIMIT = 100  # Maximum thumbnails to enqueue per gallery page load
 ITEM_VIEW_THUMBNAIL_BATCH_LIMIT = 50  # Maximum thumbnails to enqueue per item view
 
+# Thumbnail generation queue (thumbnails/generation_queue.py).
+# Views queue missing thumbnails (the viewed page's files first) in a table;
+# process_thumbnail_queue workers claim THUMBNAIL_QUEUE_BATCH_SIZE rows at a
+# time with SELECT ... FOR UPDATE SKIP LOCKED. A claim not completed within
+# THUMBNAIL_QUEUE_CLAIM_TIMEOUT seconds (worker died) is claimed again.
+THUMBNAIL_QUEUE_BATCH_SIZE = 10
+THUMBNAIL_QUEUE_CLAIM_TIMEOUT = 600
+
 # Text file display limits
 ENCODING_DETECT_READ_SIZE = 4096  # Bytes to read for charset detection
 MAX_TEXT_FILE_DISPLAY_SIZE = 1024 * 1024  # Maximum text file size to display (1MB)
@@ -189,9 +311,51 @@ MAX_DIRECTORY_DEPTH = 15  # Maximum parent directory traversal depth
 DIRECTORY_SYNC_CHUNK_SIZE = 250  # Iterator chunk size for directory sync queries
 DIRECTORY_SYNC_BATCH_SIZE = 250  # Batch size for bulk_update during directory sync
 
+# Streaming directory sync (update_database_from_disk). Directories with more
+# than STREAMING_SYNC_THRESHOLD listing entries are synced chunk by chunk —
+# stat compare, SHA256, and bulk write per STREAMING_SYNC_CHUNK_SIZE files —
+# instead of building the whole listing, every DB row and every new FileIndex
+# object in memory first. Each chunk commits on its own and logs progress.
+# Web views don't run a streaming sync themselves: they queue it on the task
+# runner (quickbbs.tasks.sync_large_directory) and render what's already in
+# the database. STREAMING_SYNC_DEFER_TTL is how long a web process waits
+# before queueing the same directory again (i.e. if the task failed).
+# Set STREAMING_SYNC_THRESHOLD = 0 to always use the single-pass sync.
+STREAMING_SYNC_THRESHOLD = 5000
+STREAMING_SYNC_CHUNK_SIZE = 1000
+STREAMING_SYNC_DEFER_TTL = 300  # seconds
+
 # SHA256 parallel processing configuration
 SHA256_MAX_WORKERS = 8  # Maximum worker processes for parallel SHA256 computation
 SHA256_PARALLEL_THRESHOLD = 5  # Minimum file count to use parallel processing
+SHA256_READ_BUFFER_SIZE = 1024 * 1024  # Bytes per read when hashing (sha_hashing.py)
+
+# SHA256 hashing backend (common.set_sha_backend). Web workers hash on a
+# thread pool (SHA256_BACKEND) — they run in daemon threads, which can't spawn
+# processes. Management commands (scan) and the taskrunner hash in their main
+# thread and switch to SHA256_CLI_BACKEND; "process" hashes on a pool of
+# spawned interpreters that don't share the GIL. Either: "thread" / "process".
+SHA256_BACKEND = "thread"
+SHA256_CLI_BACKEND = "process"
+
+# Per-volume I/O scheduling (io_scheduler.py) for SHA256 hashing and
+# thumbnail source reads. Reads are grouped by device and ordered by
+# directory, then inode, within each. IO_DEVICE_LIMITS maps a mount path to
+# the maximum files read at once on that volume — spinning disks lose most of
+# their throughput to seeks when many readers interleave; 1-2 keeps reads
+# sequential. Volumes not listed use IO_DEFAULT_DEVICE_LIMIT (0 = bounded
+# only by SHA256_MAX_WORKERS / the number of task workers).
+# e.g. {"/Volumes/Archive": 1, "/Volumes/Photos HDD": 2}
+IO_DEVICE_LIMITS = {}
+IO_DEFAULT_DEVICE_LIMIT = 0
+
+# Persistent SHA256 cache (file_hash_cache.py). Files whose (device, inode,
+# size, mtime_ns) and path were already hashed — re-added directories,
+# regenerated records — cost a stat instead of a full read. Rows idle for
+# FILE_HASH_CACHE_RETAIN_DAYS are removed by the daily_prune_file_hash_cache
+# periodic task.
+FILE_HASH_CACHE_ENABLED = True
+FILE_HASH_CACHE_RETAIN_DAYS = 365
 
 # PostgreSQL maintenance thresholds
 # Dead-to-live tuple ratio that flags a table as needing a vacuum. Shared by
@@ -376,6 +540,14 @@ STORY_COVER_THUMB_SIZE = {"cover": (300, 300)}
 # needs a bound to keep that row from growing unboundedly over a very long
 # playthrough.
 MAX_TRANSCRIPT_TURNS = 200
+# How many turns back Undo can walk (CurrentGame.state["undo"] chain). Each
+# step is stored as a delta against the turn after it (a few hundred bytes),
+# not a full copy, but the chain still needs a bound for the same reason.
+MAX_UNDO_TURNS = 100
+# Completed paragraphs of story output an in-progress game keeps (and saves)
+# beyond the current turn — older output is dropped from the engine's output
+# stream once flushed (the transcript above is the player-facing history).
+STORY_OUTPUT_RETENTION_PARAGRAPHS = 20
 # Username of the dedicated account that owns every scanner-ingested story
 # (Step 9) — keeps scanned content administratively separate from any
 # person's account. Must be created as a one-time deploy step; ingestion
@@ -0,0 +1,586 @@
+"""
+SearchDocument Model - full-text index of gallery file contents and metadata
+
+Search matched file and directory names only. This table holds the text
+found inside files, one row per distinct file content (file_sha256, shared by
+every copy of the file, as with MediaProbe):
+
+    - Images: EXIF (description, artist, Windows XP title/subject/keywords/
+      comment, user comment), IPTC (object name, keywords, by-line, caption)
+      and XMP (dc:title, dc:creator, dc:subject, dc:description) via Pillow.
+      XMP needs defusedxml installed; without it Image.getxmp() returns
+      nothing and only EXIF/IPTC are indexed.
+    - PDFs: title/author/subject/keywords and the page text via PyMuPDF.
+    - Text, markdown and HTML files: the body, decoded with the same cached
+      encoding detection the item view uses (HTML with its tags stripped).
+    - Compiled Ink stories (.inkj): the story title.
+
+Each row's text is folded into a weighted tsvector (title A, author and
+keywords B, body C) with a GIN index, so search_viewresults can add ranked
+content matches after its name matches (SearchDocument.ranked_shas()).
+
+Indexing is incremental: index_pending() only extracts hashes that have no
+row yet, so a new file, or one whose file_sha256 changed, is picked up and
+nothing else is re-read. It runs from
+"manage.py scan --add_files" and the periodic index_search_documents task;
+rows whose hash no longer exists are pruned by the same task. A file that
+can't be read still gets a row (extract_failed) so it is not retried.
+
+The tsvector is PostgreSQL-only. On other databases the column stays NULL
+and ranked_shas() falls back to icontains over the stored text, the same way
+name search falls back from iregex.
+"""
+
+from __future__ import annotations
+
+import html
+import logging
+import os
+import time
+from collections.abc import Iterable
+from itertools import batched
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from django.utils.html import strip_tags
+
+from quickbbs.cache_registry import bump_search_generation
+
+if TYPE_CHECKING:
+    from .fileindex import FileIndex
+
+logger = logging.getLogger(__name__)
+
+# EXIF tags holding free text, by the SearchDocument field they feed. The
+# 0x9C9B.. tags are the Windows "XP" properties, stored as UTF-16LE bytes.
+_EXIF_TEXT_TAGS: dict[int, str] = {
+    0x010E: "body",  # ImageDescription
+    0x013B: "author",  # Artist
+    0x9C9B: "title",  # XPTitle
+    0x9C9C: "body",  # XPComment
+    0x9C9D: "author",  # XPAuthor
+    0x9C9E: "keywords",  # XPKeywords
+    0x9C9F: "keywords",  # XPSubject
+}
+_EXIF_IFD = 0x8769
+_EXIF_USER_COMMENT = 0x9286
+
+# IPTC-IIM (record, dataset) → SearchDocument field
+_IPTC_FIELDS: dict[tuple[int, int], str] = {
+    (2, 5): "title",  # Object Name
+    (2, 25): "keywords",  # Keywords (repeatable)
+    (2, 80): "author",  # By-line
+    (2, 105): "title",  # Headline
+    (2, 120): "body",  # Caption/Abstract
+}
+
+# XMP (Dublin Core) element → SearchDocument field
+_XMP_FIELDS: dict[str, str] = {
+    "title": "title",
+    "creator": "author",
+    "subject": "keywords",
+    "description": "body",
+}
+
+# Whether defusedxml is installed (checked on first use). Without it
+# Image.getxmp() returns {} and warns on every call.
+_xmp_available: bool | None = None
+
+
+def _check_xmp_available() -> bool:
+    """Check if Pillow can parse XMP, i.e. defusedxml is installed (cached after first call)."""
+    global _xmp_available  # pylint: disable=global-statement
+    if _xmp_available is None:
+        try:
+            import defusedxml  # noqa: F401  # pylint: disable=import-outside-toplevel,unused-import
+
+            _xmp_available = True
+        except ImportError:
+            _xmp_available = False
+    return _xmp_available
+
+
+class SearchDocument(models.Model):
+    """
+    Indexed text of one file content, keyed by file_sha256.
+
+    Every text column may be empty: most photos carry no metadata, and
+    extract_failed rows nothing at all.
+    """
+
+    file_sha256 = models.CharField(max_length=64, unique=True)
+    title = models.CharField(max_length=512, blank=True, default="")
+    author = models.CharField(max_length=512, blank=True, default="")
+    keywords = models.TextField(blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    # The file could not be read; kept so the indexer doesn't retry it every run
+    extract_failed = models.BooleanField(default=False)
+    # Unix timestamp of the extraction
+    indexed_at = models.FloatField(default=time.time)
+    # Weighted tsvector of the text columns (PostgreSQL only, NULL elsewhere)
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        """Model metadata: admin display names and the GIN index for full-text queries."""
+
+        verbose_name = "Search Document"
+        verbose_name_plural = "Search Documents"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="searchdocument_vector_gin"),
+        ]
+
+    @classmethod
+    def candidates(cls) -> models.QuerySet[FileIndex]:
+        """
+        Return the live files whose content has no SearchDocument row yet.
+
+        Images, PDFs, text/markdown/HTML files, and .inkj files that have
+        been ingested as a Story (an .inkj not ingested yet has no title to
+        index, and would otherwise be stored empty for good).
+
+        Returns:
+            FileIndex queryset, unordered
+        """
+        # Inline: quickbbs.fileindex imports this module; interactive_fiction
+        # imports quickbbs.models (quickbbs -> interactive_fiction is a reverse dependency)
+        # pylint: disable=import-outside-toplevel
+        from interactive_fiction.models import Story
+        from quickbbs.fileindex import FileIndex
+
+        # pylint: enable=import-outside-toplevel
+
+        indexable = (
+            Q(filetype__is_image=True)
+            | Q(filetype__is_pdf=True)
+            | Q(filetype__is_text=True)
+            | Q(filetype__is_markdown=True)
+            | Q(filetype__is_html=True)
+            | Q(filetype_id=".inkj", file_sha256__in=Story.objects.values("source_sha256"))
+        )
+        return FileIndex.objects.filter(
+            indexable,
+            delete_pending=False,
+            file_sha256__isnull=False,
+            home_directory__isnull=False,
+            filetype__is_link=False,
+        ).exclude(file_sha256__in=cls.objects.values("file_sha256"))
+
+    @classmethod
+    def index_pending(cls, max_count: int = 0) -> int:
+        """
+        Extract and store the text of every file content not indexed yet.
+
+        Files are read in directory order (files of a directory together),
+        one extraction per distinct file_sha256, and the rows written in
+        batches of SEARCH_INDEX_BATCH_SIZE.
+
+        Args:
+            max_count: Maximum number of hashes to index (0 = unlimited)
+
+        Returns:
+            Number of SearchDocument rows created
+        """
+        rows = (
+            cls.candidates()
+            .select_related("filetype", "home_directory")
+            .order_by("home_directory_id", "name")
+            .iterator(chunk_size=settings.SEARCH_INDEX_BATCH_SIZE)
+        )
+        created = 0
+        seen: set[str] = set()
+        for chunk in batched(rows, settings.SEARCH_INDEX_BATCH_SIZE):
+            files = []
+            for file_index in chunk:
+                if file_index.file_sha256 not in seen and (max_count <= 0 or len(seen) < max_count):
+                    seen.add(file_index.file_sha256)
+                    files.append(file_index)
+            created += cls.index_files(files)
+            if 0 < max_count <= len(seen):
+                break
+        return created
+
+    @classmethod
+    def index_files(cls, files: list[FileIndex]) -> int:
+        """
+        Extract the text of the given files and store one row per hash.
+
+        Existing rows are left untouched.
+
+        Args:
+            files: FileIndex rows with filetype and home_directory loaded,
+                one per file_sha256
+
+        Returns:
+            Number of rows created
+        """
+        if not files:
+            return 0
+        story_titles = _story_titles(file.file_sha256 for file in files if file.filetype_id == ".inkj")
+        documents = []
+        for file_index in files:
+            try:
+                fields = extract_search_text(file_index, story_titles)
+            except FileNotFoundError:
+                continue  # directory sync will mark it
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Decoders raise anything on a corrupt file; one bad file must not stop the batch
+                logger.debug("Could not extract search text from %s: %s", file_index.full_filepathname, e)
+                documents.append(cls(file_sha256=file_index.file_sha256, extract_failed=True))
+                continue
+            documents.append(cls(file_sha256=file_index.file_sha256, **fields))
+        if not documents:
+            return 0
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(documents, ignore_conflicts=True)
+        except DatabaseError as e:
+            # One row the database rejects must not fail the batch: index_pending()
+            # would pick the same batch up again on every run
+            logger.warning("Search document batch insert failed (%s); inserting row by row", e)
+            documents = cls._create_each(documents)
+        cls.update_vectors([document.file_sha256 for document in documents])
+        bump_search_generation()
+        return len(documents)
+
+    @classmethod
+    def _create_each(cls, documents: list[SearchDocument]) -> list[SearchDocument]:
+        """
+        Insert documents one at a time, storing a rejected one as extract_failed.
+
+        The extract_failed row keeps the indexer from retrying the file, as
+        for a file that can't be read.
+
+        Args:
+            documents: Unsaved SearchDocument rows
+
+        Returns:
+            The rows as stored
+        """
+        stored = []
+        for document in documents:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create([document], ignore_conflicts=True)
+            except DatabaseError as e:
+                logger.warning("Could not store search text for %s: %s", document.file_sha256, e)
+                document = cls(file_sha256=document.file_sha256, extract_failed=True)
+                cls.objects.bulk_create([document], ignore_conflicts=True)
+            stored.append(document)
+        return stored
+
+    @classmethod
+    def update_vectors(cls, sha256_list: Iterable[str]) -> int:
+        """
+        Recompute search_vector from the text columns (PostgreSQL only).
+
+        Args:
+            sha256_list: Hashes of the rows to update
+
+        Returns:
+            Number of rows updated (0 on other databases)
+        """
+        if connection.vendor != "postgresql":
+            return 0
+        config = settings.SEARCH_INDEX_CONFIG
+        vector = (
+            SearchVector("title", weight="A", config=config)
+            + SearchVector("author", "keywords", weight="B", config=config)
+            + SearchVector("body", weight="C", config=config)
+        )
+        return cls.objects.filter(file_sha256__in=list(sha256_list)).update(search_vector=vector)
+
+    @classmethod
+    def prune(cls) -> int:
+        """
+        Delete rows whose file_sha256 no longer belongs to any FileIndex row.
+
+        Returns:
+            Number of rows deleted
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from quickbbs.fileindex import FileIndex
+
+        deleted, _ = cls.objects.filter(~Exists(FileIndex.objects.filter(file_sha256=OuterRef("file_sha256")))).delete()
+        if deleted:
+            bump_search_generation()
+        return deleted
+
+    @classmethod
+    def ranked_shas(cls, text: str, limit: int) -> list[str]:
+        """
+        Return the hashes of the documents matching text, best match first.
+
+        PostgreSQL parses text with websearch_to_tsquery() ("quoted
+        phrases", -excluded, or) and ranks by ts_rank over the weighted
+        vector. Other databases match the whole text with icontains against
+        each column, ranking title matches first.
+
+        Args:
+            text: The search text as entered
+            limit: Maximum number of hashes to return
+
+        Returns:
+            file_sha256 values, in rank order
+        """
+        text = (text or "").strip()
+        if not text:
+            return []
+        if connection.vendor == "postgresql":
+            query = SearchQuery(text, search_type="websearch", config=settings.SEARCH_INDEX_CONFIG)
+            ranked = cls.objects.filter(search_vector=query).annotate(rank=SearchRank(F("search_vector"), query)).order_by("-rank", "file_sha256")
+        else:
+            ranked = cls.objects.filter(
+                Q(title__icontains=text) | Q(author__icontains=text) | Q(keywords__icontains=text) | Q(body__icontains=text)
+            ).order_by(Case(When(title__icontains=text, then=Value(0)), default=Value(1)), "file_sha256")
+        return list(ranked.values_list("file_sha256", flat=True)[:limit])
+
+
+def extract_search_text(file_index: FileIndex, story_titles: dict[str, str] | None = None) -> dict[str, str]:
+    """
+    Extract the indexable text of one file, by filetype.
+
+    Args:
+        file_index: The file (filetype and home_directory loaded)
+        story_titles: file_sha256 → Story title for .inkj files
+
+    Returns:
+        SearchDocument field values: title, author, keywords, body (each
+        possibly empty), truncated to the column limits, with NUL characters
+        removed (PostgreSQL text columns reject them)
+
+    Raises:
+        FileNotFoundError: The file is gone from disk
+    """
+    filetype = file_index.filetype
+    if filetype.fileext == ".inkj":
+        fields = {"title": (story_titles or {}).get(file_index.file_sha256, "")}
+    elif filetype.is_image:
+        fields = _extract_image_text(file_index.full_filepathname)
+    elif filetype.is_pdf:
+        fields = _extract_pdf_text(file_index.full_filepathname)
+    else:
+        fields = {"body": _extract_text_body(file_index)}
+    max_body = settings.SEARCH_INDEX_MAX_BODY_CHARS
+    return {
+        "title": fields.get("title", "").replace("\x00", "")[:512],
+        "author": fields.get("author", "").replace("\x00", "")[:512],
+        "keywords": fields.get("keywords", "").replace("\x00", "")[:max_body],
+        "body": fields.get("body", "").replace("\x00", "")[:max_body],
+    }
+
+
+def _extract_image_text(path: str) -> dict[str, str]:
+    """
+    Read EXIF, IPTC and XMP text from an image file via Pillow.
+
+    Only the header is parsed; no pixel data is decoded.
+
+    Args:
+        path: Path of the image
+
+    Returns:
+        Field name → text (multiple values joined with newlines)
+    """
+    # Deferred like the thumbnail backends: Pillow is only needed by the indexer
+    # pylint: disable-next=import-outside-toplevel
+    from PIL import Image, IptcImagePlugin
+
+    values: dict[str, list[str]] = {"title": [], "author": [], "keywords": [], "body": []}
+    with Image.open(path) as image:
+        exif = image.getexif()
+        for tag, field in _EXIF_TEXT_TAGS.items():
+            values[field].append(_exif_text(exif.get(tag), utf16=tag >= 0x9C9B))
+        values["body"].append(_exif_user_comment(exif.get_ifd(_EXIF_IFD).get(_EXIF_USER_COMMENT)))
+
+        for key, value in (IptcImagePlugin.getiptcinfo(image) or {}).items():
+            field = _IPTC_FIELDS.get(key)
+            if field:
+                for item in value if isinstance(value, list) else [value]:
+                    values[field].append(item.decode("utf-8", errors="replace"))
+
+        xmp = image.getxmp() if _check_xmp_available() and hasattr(image, "getxmp") else {}
+        for name, field in _XMP_FIELDS.items():
+            values[field].extend(_xmp_values(xmp, name))
+
+    # dict.fromkeys: drop blanks and repeats (the same caption is often in EXIF, IPTC and XMP)
+    return {field: "\n".join(dict.fromkeys(text.strip() for text in texts if text and text.strip())) for field, texts in values.items()}
+
+
+def _exif_text(value: Any, utf16: bool = False) -> str:
+    """
+    Decode an EXIF text value.
+
+    Args:
+        value: str, bytes, or a tuple of byte values (None if absent)
+        utf16: The value is a Windows XP tag (UTF-16LE)
+
+    Returns:
+        The text, "" if absent
+    """
+    if value is None:
+        return ""
+    if isinstance(value, tuple):
+        value = bytes(value)
+    if isinstance(value, bytes):
+        value = value.decode("utf-16-le" if utf16 else "utf-8", errors="replace")
+    return str(value).rstrip("\x00")
+
+
+def _exif_user_comment(value: Any) -> str:
+    """
+    Decode an EXIF UserComment (8-byte character code prefix, then the text).
+
+    Args:
+        value: Raw tag value (None if absent)
+
+    Returns:
+        The comment, "" if absent
+    """
+    if not isinstance(value, bytes) or len(value) <= 8:
+        return value if isinstance(value, str) else ""
+    prefix, text = value[:8], value[8:]
+    encoding = "utf-16" if prefix.startswith(b"UNICODE") else "utf-8"
+    return text.decode(encoding, errors="replace").rstrip("\x00 ")
+
+
+def _xmp_values(node: Any, name: str) -> list[str]:
+    """
+    Collect the text under every XMP element called name.
+
+    Image.getxmp() returns the RDF as nested dicts/lists, with alternative
+    and bag containers ("Alt"/"Bag"/"Seq" → "li") in between the element
+    and its text. Language attributes are skipped.
+
+    Args:
+        node: A getxmp() dict (or any part of it)
+        name: Element local name, e.g. "title"
+
+    Returns:
+        The text values found
+    """
+    found: list[str] = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == name:
+                found.extend(_xmp_text(value))
+            else:
+                found.extend(_xmp_values(value, name))
+    elif isinstance(node, list):
+        for item in node:
+            found.extend(_xmp_values(item, name))
+    return found
+
+
+def _xmp_text(node: Any) -> list[str]:
+    """
+    Return every text leaf of an XMP element, skipping language attributes.
+
+    Args:
+        node: The element's getxmp() value
+
+    Returns:
+        The text values
+    """
+    if isinstance(node, str):
+        return [node]
+    if isinstance(node, dict):
+        return [text for key, value in node.items() if key != "lang" for text in _xmp_text(value)]
+    if isinstance(node, list):
+        return [text for item in node for text in _xmp_text(item)]
+    return []
+
+
+def _extract_pdf_text(path: str) -> dict[str, str]:
+    """
+    Read a PDF's document information and page text via PyMuPDF.
+
+    Pages are read until SEARCH_INDEX_MAX_BODY_CHARS characters have been
+    collected. An encrypted PDF yields its metadata only.
+
+    Args:
+        path: Path of the PDF
+
+    Returns:
+        Field name → text
+    """
+    # Deferred like the thumbnail backends (PyMuPDF is only needed by the indexer)
+    import fitz  # pylint: disable=import-outside-toplevel
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    max_body = settings.SEARCH_INDEX_MAX_BODY_CHARS
+    with fitz.open(path) as document:
+        metadata = document.metadata or {}
+        pages: list[str] = []
+        length = 0
+        if not document.needs_pass:
+            for page in document:
+                text = page.get_text()
+                pages.append(text)
+                length += len(text)
+                if length >= max_body:
+                    break
+    return {
+        "title": metadata.get("title") or "",
+        "author": metadata.get("author") or "",
+        "keywords": "\n".join(value for value in (metadata.get("subject"), metadata.get("keywords")) if value),
+        "body": "".join(pages),
+    }
+
+
+def _extract_text_body(file_index: FileIndex) -> str:
+    """
+    Return a text, markdown or HTML file's body as plain text.
+
+    Read like FileIndex.process_text_content() reads it for the item view
+    (same size limit, same cached encoding detection), but kept as text:
+    process_text_content() returns display HTML and error messages. Files
+    over MAX_TEXT_FILE_DISPLAY_SIZE are not read: the item view doesn't
+    show them either.
+
+    Args:
+        file_index: The file (filetype loaded)
+
+    Returns:
+        The body text ("" for oversized files)
+
+    Raises:
+        FileNotFoundError: The file is gone from disk
+        UnicodeDecodeError: The file isn't text in the detected encoding
+    """
+    path = file_index.full_filepathname
+    if os.stat(path).st_size > settings.MAX_TEXT_FILE_DISPLAY_SIZE:
+        return ""
+    with open(path, "r", encoding=file_index.get_text_encoding_cached()) as f:
+        content = f.read()
+    if file_index.filetype.is_html:
+        return html.unescape(strip_tags(content))
+    return content
+
+
+def _story_titles(sha256_list: Iterable[str]) -> dict[str, str]:
+    """
+    Return the Story title of each ingested .inkj file content.
+
+    Args:
+        sha256_list: file_sha256 values of .inkj files
+
+    Returns:
+        file_sha256 → title, for hashes with a Story
+    """
+    sha256_list = list(sha256_list)
+    if not sha256_list:
+        return {}
+    # pylint: disable-next=import-outside-toplevel
+    from interactive_fiction.models import Story
+
+    return dict(Story.objects.filter(source_sha256__in=sha256_list).values_list("source_sha256", "title"))
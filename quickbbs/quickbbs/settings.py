@@ -450,6 +450,11 @@ TASKS = {
                 "quickbbs.tasks.daily_cleanup_finished_jobs": Periodic("0 0 * * *"),
                 "quickbbs.tasks.weekly_vacuum_check": Periodic("0 6 * * 0"),
                 "quickbbs.tasks.check_ssl_cert_expiry": Periodic("0 6 * * *"),
+                "quickbbs.tasks.daily_prune_file_hash_cache": Periodic("30 0 * * *"),
+                # Picks up thumbnail queue rows whose worker died mid-batch
+                "quickbbs.tasks.process_thumbnail_queue": Periodic("*/15 * * * *"),
+                # Indexes the text and metadata of files added since the last run
+                "quickbbs.tasks.index_search_documents": Periodic("*/15 * * * *"),
             },
         },
     },
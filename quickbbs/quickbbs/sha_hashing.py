@@ -0,0 +1,78 @@
+"""
+Dependency-free SHA256 file hashing shared by the thread and process backends.
+
+quickbbs.common.get_file_sha() and the "process" SHA256 backend
+(quickbbs.common.set_sha_backend) both hash through hash_file(). This module
+imports only the standard library so spawned hashing workers start without
+loading Django, the settings module, or any database driver — a worker is a
+bare interpreter that opens, reads, and digests files.
+
+Read path:
+    - os.posix_fadvise(POSIX_FADV_SEQUENTIAL) asks the kernel for aggressive
+      read-ahead on the whole file (Linux/BSD; a no-op where unavailable —
+      macOS already reads ahead on sequential access).
+    - Files are read unbuffered into one reusable bytearray of buffer_size
+      bytes (SHA256_READ_BUFFER_SIZE) via readinto(), so a 1 MiB buffer is one
+      syscall per MiB with no per-read bytes allocation. hashlib releases the
+      GIL for updates larger than 2 KiB, so thread-backend workers hash
+      concurrently.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+DEFAULT_READ_BUFFER_SIZE = 1024 * 1024
+
+_FADVISE = getattr(os, "posix_fadvise", None)
+
+
+def hash_file(fqfn: str, buffer_size: int = DEFAULT_READ_BUFFER_SIZE) -> tuple[str, str]:
+    """
+    Return the (file_sha256, unique_sha256) hex digests for a file.
+
+    file_sha256 hashes the file contents; unique_sha256 continues the same
+    digest with the title-cased path, making it unique to content and
+    location. The values are identical to what quickbbs has always stored.
+
+    Args:
+        fqfn: Fully qualified filename
+        buffer_size: Read size in bytes
+
+    Raises:
+        OSError: If the file can't be opened or read
+    """
+    digest = hashlib.sha256()
+    with open(fqfn, "rb", buffering=0) as filehandle:
+        if _FADVISE is not None:
+            try:
+                _FADVISE(filehandle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                # Advice only — some filesystems (e.g. FUSE, SMB) reject it
+                pass
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        while read := filehandle.readinto(buffer):
+            digest.update(view[:read])
+    file_sha256 = digest.hexdigest()
+    digest.update(str(fqfn).title().encode("utf-8"))
+    return file_sha256, digest.hexdigest()
+
+
+def hash_file_or_error(fqfn: str, buffer_size: int = DEFAULT_READ_BUFFER_SIZE) -> tuple[str | None, str | None, str | None]:
+    """
+    Process-pool entry point: hash_file() with the error returned instead of raised.
+
+    Hashing workers have no logging configured, so read errors travel back
+    to the parent process as text and are logged there.
+
+    Returns:
+        (file_sha256, unique_sha256, None) on success, or
+        (None, None, error_message) if the file could not be read.
+    """
+    try:
+        file_sha256, unique_sha256 = hash_file(fqfn, buffer_size)
+    except OSError as exc:
+        return None, None, str(exc)
+    return file_sha256, unique_sha256, None
@@ -0,0 +1,222 @@
+"""
+Host-wide shared-memory store for per-directory ordered SHA256 lists.
+
+DirectoryIndex.get_distinct_file_shas() and get_all_file_shas() back every
+gallery page (layout_manager) and every item view (build_context_info). Their
+results are cached per process, so an 8-worker deployment holds 8 copies of
+the same 10k-entry lists — each entry a 64-char Python str (~113 bytes with
+object overhead) — and runs the same ordered query 8 times to warm them.
+
+With SHARED_SHA_LISTS_ENABLED the first worker to build a list writes it to a
+file in SHARED_SHA_LISTS_DIR as fixed-width 32-byte binary digests, and every
+worker (including the writer) mmap()s that file read-only. The kernel page
+cache holds ONE copy per host; the per-process LRU caches only hold a small
+ShaListView (a PackedShaList — see quickbbs.packed_shas) over the mapping.
+Hex strings are produced on demand for the handful of entries a request
+actually touches (page slice, prev/next).
+
+File layout (little-endian):
+    header:  8-byte magic | float64 generation | uint64 count
+    body:    count * 32-byte raw SHA256 digests, in sort order
+
+Invalidation:
+    - generation is the directory's cache_lastscan at build time. A reader
+      whose DirectoryIndex row carries a different cache_lastscan treats the
+      file as stale and rebuilds it — rescans always write a new
+      cache_lastscan (mark_scanned / invalidate_caches), so a rescan
+      invalidates the shared list on every worker without any signaling.
+    - Changes that do not touch cache_lastscan (favorite toggles, thumbnail
+      and file-membership changes routed through
+      clear_layout_cache_for_directories) unlink the directory's files, so the
+      next reader on any worker rebuilds.
+
+Files are written to a temporary name and os.replace()d into place, so a
+reader never maps a half-written list; a reader that already holds a mapping
+of an unlinked/replaced file keeps a consistent (if stale) snapshot until its
+own per-process cache entry is evicted.
+
+Point SHARED_SHA_LISTS_DIR at a tmpfs (/dev/shm on Linux) to keep the lists
+out of disk I/O entirely; on macOS the /tmp default is served from the
+unified buffer cache once warm.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterable, Sequence
+
+from django.conf import settings
+
+from quickbbs.packed_shas import DIGEST_SIZE, PackedShaList, pack_shas
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"QBSHAL1\x00"
+_HEADER = struct.Struct("<8sdQ")
+
+
+class ShaListView(PackedShaList):
+    """
+    PackedShaList whose digests live in a read-only mmap of a shared list file.
+
+    The digests are never copied into the process; the position table that
+    makes index() O(1) is the only per-process allocation (built lazily, as
+    for any PackedShaList).
+    """
+
+    __slots__ = ("generation",)
+
+    def __init__(self, mapped: mmap.mmap, generation: float, count: int) -> None:
+        super().__init__(mapped, count, offset=_HEADER.size)  # type: ignore[arg-type]
+        self.generation = generation
+
+    def __repr__(self) -> str:
+        return f"<ShaListView count={self._count} generation={self.generation}>"
+
+
+class SharedShaListStore:
+    """
+    File-per-list store of ordered SHA256 lists, shared by every process on a host.
+
+    Files are named "<directory_pk>-<kind>-<sort>-<user_pk or 'anon'>.shas"
+    so clear_layout_cache_for_directories() can drop every list for a
+    directory with one glob, without knowing which users/sorts were built.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        """True when SHARED_SHA_LISTS_ENABLED is set (read per call so tests can override)."""
+        return settings.SHARED_SHA_LISTS_ENABLED
+
+    @property
+    def directory(self) -> str:
+        """Directory holding the shared list files."""
+        return settings.SHARED_SHA_LISTS_DIR
+
+    def _path(self, directory_pk: int, kind: str, sort: int, user_pk: int | None) -> str:
+        user_part = "anon" if user_pk is None else str(user_pk)
+        return os.path.join(self.directory, f"{directory_pk}-{kind}-{sort}-{user_part}.shas")
+
+    def load(self, directory_pk: int, kind: str, sort: int, user_pk: int | None, generation: float) -> ShaListView | None:
+        """
+        Map an existing list file if it matches the expected generation.
+
+        Args:
+            directory_pk: DirectoryIndex primary key
+            kind: "distinct" or "all"
+            sort: Sort order (0-2)
+            user_pk: Requesting user's pk, or None for anonymous
+            generation: The directory's current cache_lastscan
+
+        Returns:
+            ShaListView over the file, or None if it is missing, malformed,
+            or was built for a different generation.
+        """
+        path = self._path(directory_pk, kind, sort, user_pk)
+        try:
+            with open(path, "rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: zero-length file (a writer crashed before os.replace
+            # can't produce one, but a stray truncation could)
+            return None
+        except OSError as e:
+            logger.warning("Shared SHA list %s unreadable: %s", path, e)
+            return None
+
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            return None
+        magic, file_generation, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or file_generation != generation or len(mapped) != _HEADER.size + count * DIGEST_SIZE:
+            mapped.close()
+            return None
+        return ShaListView(mapped, file_generation, count)
+
+    def save(self, directory_pk: int, kind: str, sort: int, user_pk: int | None, generation: float, shas: Sequence[str | None]) -> ShaListView | None:
+        """
+        Write a list file atomically and return a mapping of it.
+
+        Args:
+            directory_pk: DirectoryIndex primary key
+            kind: "distinct" or "all"
+            sort: Sort order (0-2)
+            user_pk: Requesting user's pk, or None for anonymous
+            generation: The directory's cache_lastscan the list was built against
+            shas: Ordered hex SHA256 strings
+
+        Returns:
+            ShaListView over the written file, or None if the list could not
+            be packed or written (the caller falls back to the plain list).
+        """
+        body = pack_shas(shas)
+        if body is None:
+            return None
+
+        path = self._path(directory_pk, kind, sort, user_pk)
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Unique per call: threads of one process may save the same list at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+            with os.fdopen(fd, "w+b") as handle:
+                handle.write(_HEADER.pack(_MAGIC, generation, len(shas)))
+                handle.write(body)
+                handle.flush()
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write shared SHA list %s: %s", path, e)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return None
+        return ShaListView(mapped, generation, len(shas))
+
+    def discard_directories(self, directory_ids: Iterable[int]) -> int:
+        """
+        Unlink every shared list file for the given directories.
+
+        Processes that already mapped a file keep their snapshot until their
+        own per-process cache entry is evicted (which the cache bus does).
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        for pk in directory_ids:
+            for path in glob.glob(os.path.join(glob.escape(self.directory), f"{pk}-*.shas")):
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning("Could not remove shared SHA list %s: %s", path, e)
+        return removed
+
+    def clear(self) -> int:
+        """
+        Unlink every shared list file.
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.shas")):
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+shared_sha_lists = SharedShaListStore()
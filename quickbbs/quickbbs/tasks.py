@@ -19,10 +19,27 @@ from quickbbs.cache_registry import (
     clear_layout_cache_for_directories,
     resolve_monitored_caches,
 )
+from quickbbs.directoryindex import DirectoryIndex, update_database_from_disk
+from quickbbs.file_hash_cache import FileHashCache
+from quickbbs.fileindex import FileIndex
+from quickbbs.io_scheduler import order_for_reading
+from quickbbs.mediaprobe import MediaProbe
 from quickbbs.MonitoredCache import MonitoredLRUCache
+from quickbbs.search_document import SearchDocument
 from thumbnails.engine import resolve_backend_name
 from thumbnails.exceptions import OrphanedFileIndex, OrphanedThumbnail
-from thumbnails.models import THUMBNAILFILES_PR_FILEINDEX_FILETYPE, ThumbnailFiles
+from thumbnails.generation_queue import (
+    claim_thumbnail_batch,
+    complete_thumbnail_batch,
+    thumbnail_queue_stats,
+)
+from thumbnails.models import (
+    THUMBNAIL_BLOB_FIELDS,
+    THUMBNAIL_GENERATED_Q,
+    THUMBNAILFILES_PR_FILEINDEX_FILETYPE,
+    ThumbnailFiles,
+)
+from thumbnails.render_pool import thumbnail_render_pool
 
 logger = logging.getLogger(__name__)
 
@@ -55,12 +72,93 @@ def _collect_monitored_caches() -> list[MonitoredLRUCache]:
     return caches
 
 
-@task()
-def generate_missing_thumbnails(
-    files_needing_thumbnails: list[str],
-    directory_pk: int | None = None,
-    batch_size: int = 5,
-) -> dict[str, bool]:
+def _thumbnail_sources(sha256_list: list[str]) -> dict[str, tuple[str, str | None]]:
+    """
+    Look up one source file per SHA256 for read ordering and pre-rendering.
+
+    Args:
+        sha256_list: SHA256 hashes needing thumbnail generation.
+
+    Returns:
+        SHA256 → (source path, media kind). The media kind ("image", "movie",
+        "pdf") is None when the file must not be pre-rendered: links, other
+        file types, and generic-icon files (get_or_create_thumbnail_record
+        decides whether those are retried).
+    """
+    sources: dict[str, tuple[str, str | None]] = {}
+    rows = FileIndex.objects.filter(file_sha256__in=sha256_list, home_directory__isnull=False).values_list(
+        "file_sha256",
+        "home_directory__fqpndirectory",
+        "name",
+        "is_generic_icon",
+        "filetype__is_link",
+        "filetype__is_image",
+        "filetype__is_movie",
+        "filetype__is_pdf",
+    )
+    for sha256, fqpndirectory, name, is_generic_icon, is_link, is_image, is_movie, is_pdf in rows:
+        if sha256 in sources:
+            continue
+        media_kind = None
+        if not is_generic_icon and not is_link:
+            media_kind = "image" if is_image else "movie" if is_movie else "pdf" if is_pdf else None
+        sources[sha256] = (fqpndirectory + name, media_kind)
+    return sources
+
+
+def _order_shas_for_reading(sha256_list: list[str], sources: dict[str, tuple[str, str | None]]) -> list[str]:
+    """
+    Reorder thumbnail SHA256s so their source files are read in per-volume order.
+
+    Each SHA is placed by its source path (grouped by device, then directory
+    and inode — see quickbbs.io_scheduler). SHAs with no resolvable path keep
+    their relative order at the end; generation reports them.
+
+    Args:
+        sha256_list: SHA256 hashes needing thumbnail generation.
+        sources: Result of _thumbnail_sources(sha256_list).
+
+    Returns:
+        The same SHA256s in read order.
+    """
+    sha_for_path = {path: sha256 for sha256, (path, _) in sources.items()}
+    ordered = [sha_for_path[path] for path in order_for_reading(sha_for_path)]
+    return ordered + [sha256 for sha256 in sha256_list if sha256 not in sources]
+
+
+def _prerender_thumbnails(sources: dict[str, tuple[str, str | None]]) -> dict[str, dict[str, bytes]]:
+    """
+    Render a batch's cross-platform thumbnails on the process pool.
+
+    Only worthwhile for at least THUMBNAIL_PROCESS_POOL_THRESHOLD renderable
+    files; smaller batches (a web-triggered handful) render in-process.
+    Videos with a stored MediaProbe row are sent with its seek information.
+
+    Args:
+        sources: Result of _thumbnail_sources().
+
+    Returns:
+        SHA256 → rendered blobs, for the files the pool rendered.
+    """
+    if not thumbnail_render_pool.enabled:
+        return {}
+    backends: dict[str, str | None] = {}
+    jobs = {}
+    for sha256, (path, media_kind) in sources.items():
+        if media_kind is None:
+            continue
+        if media_kind not in backends:
+            backends[media_kind] = thumbnail_render_pool.offload_backend(media_kind)
+        if backends[media_kind] is not None:
+            jobs[sha256] = (path, backends[media_kind])
+    if len(jobs) < settings.THUMBNAIL_PROCESS_POOL_THRESHOLD:
+        return {}
+    movie_shas = [sha256 for sha256 in jobs if sources[sha256][1] == "movie"]
+    media_info = MediaProbe.seek_info(movie_shas) if movie_shas else None
+    return thumbnail_render_pool.render(jobs, media_info=media_info)
+
+
+def _generate_thumbnails(sha256_list: list[str], directory_pks: set[int]) -> dict[str, bool]:
     """
     Batch-create thumbnails for files that are missing them.
 
@@ -70,26 +168,19 @@ def generate_missing_thumbnails(
     ThumbnailFiles.get_or_create_thumbnail_record with suppress_save=True,
     collects the modified thumbnail objects, and writes them all to the
     database in a single bulk_update call. Clears the layout cache for the
-    directory afterward so cached counts reflect the new thumbnails.
-
-    Priority conventions for callers:
-        - Web requests (user-facing): enqueue at priority 50
-        - Bulk maintenance (--add_thumbnails): enqueue at priority 0
+    directories afterward so cached counts reflect the new thumbnails.
 
     Args:
-        files_needing_thumbnails: SHA256 hashes needing thumbnail generation.
-        directory_pk: Primary key of the directory containing these files.
-            When None, cache clearing is skipped (used by bulk maintenance commands).
-        batch_size: Maximum number of thumbnails to process (default: 5).
+        sha256_list: SHA256 hashes needing thumbnail generation.
+        directory_pks: Directories whose layout cache to clear afterwards
+            (empty for bulk maintenance).
 
     Returns:
         Dictionary mapping each SHA256 hash to its success status.
     """
-    if not files_needing_thumbnails:
+    if not sha256_list:
         return {}
 
-    sha256_list = files_needing_thumbnails[:batch_size]
-
     # Pre-filter: skip SHA256s that already have valid thumbnails.
     # Avoids acquiring advisory locks and running get_or_create for
     # thumbnails that already exist (common on rescans/retries).
@@ -99,8 +190,8 @@ def generate_missing_thumbnails(
     existing_shas = {
         sha
         for sha in ThumbnailFiles.objects.filter(
+            THUMBNAIL_GENERATED_Q,
             sha256_hash__in=sha256_list,
-            small_thumb__isnull=False,
         ).values_list("sha256_hash", flat=True)
         if sha is not None
     }
@@ -119,6 +210,10 @@ def generate_missing_thumbnails(
     if not sha256_list:
         return results
 
+    # Read source files in per-volume seek order (directory, then inode)
+    sources = _thumbnail_sources(sha256_list)
+    sha256_list = _order_shas_for_reading(sha256_list, sources)
+
     # resolve_backend_name resolves "auto" exactly as still-image generation
     # will, so the log shows whether the macOS-accelerated frontend is in use.
     # Videos and PDFs are dispatched to their own backends per file, so this
@@ -133,6 +228,12 @@ def generate_missing_thumbnails(
     thumbnails_to_update: list[ThumbnailFiles] = []
     start_time = time.monotonic()
 
+    # Decode/resize on the process pool first; the loop below only does the
+    # ORM work for those files (and renders the rest in-process).
+    prerendered = _prerender_thumbnails(sources)
+    if prerendered:
+        logger.info("Rendered %d thumbnails on the process pool in %.2fs", len(prerendered), time.monotonic() - start_time)
+
     for sha256 in sha256_list:
         try:
             thumbnail = ThumbnailFiles.get_or_create_thumbnail_record(
@@ -140,9 +241,10 @@ def generate_missing_thumbnails(
                 suppress_save=True,
                 prefetch_related_thumbnail=THUMBNAILFILES_PR_FILEINDEX_FILETYPE,
                 select_related_fileindex=("filetype",),
+                prerendered=prerendered.pop(sha256, None),
             )
             # Only queue for bulk_update if thumbnail data was actually generated
-            if thumbnail.small_thumb:
+            if thumbnail.thumbnail_exists("small"):
                 thumbnails_to_update.append(thumbnail)
             results[sha256] = True
         except OrphanedThumbnail as exc:
@@ -168,18 +270,18 @@ def generate_missing_thumbnails(
     if thumbnails_to_update:
         ThumbnailFiles.objects.bulk_update(
             thumbnails_to_update,
-            ["small_thumb", "medium_thumb", "large_thumb"],
-            batch_size=batch_size,
+            THUMBNAIL_BLOB_FIELDS,
         )
 
     successful_count = sum(results.values())
     newly_processed = successful_count - len(existing_shas)
-    if newly_processed > 0 and directory_pk is not None:
-        cleared_count = clear_layout_cache_for_directories({directory_pk})
+    if newly_processed > 0 and directory_pks:
+        cleared_count = clear_layout_cache_for_directories(directory_pks)
         if cleared_count:
             logger.info(
-                "Cleared %d layout cache entries for directory after thumbnail processing",
+                "Cleared %d layout cache entries for %d directories after thumbnail processing",
                 cleared_count,
+                len(directory_pks),
             )
 
     if newly_processed > 0:
@@ -197,6 +299,84 @@ def generate_missing_thumbnails(
     return results
 
 
+@task()
+def generate_missing_thumbnails(
+    files_needing_thumbnails: list[str],
+    directory_pk: int | None = None,
+    batch_size: int = 5,
+) -> dict[str, bool]:
+    """
+    Batch-create thumbnails for files that are missing them.
+
+    Web views and add_thumbnails go through the thumbnail queue
+    (enqueue_thumbnails / process_thumbnail_queue) instead; this task
+    generates an explicit list directly.
+
+    Args:
+        files_needing_thumbnails: SHA256 hashes needing thumbnail generation.
+        directory_pk: Primary key of the directory containing these files.
+            When None, cache clearing is skipped.
+        batch_size: Maximum number of thumbnails to process (default: 5).
+
+    Returns:
+        Dictionary mapping each SHA256 hash to its success status.
+    """
+    return _generate_thumbnails(files_needing_thumbnails[:batch_size], set() if directory_pk is None else {directory_pk})
+
+
+@task()
+def process_thumbnail_queue() -> int:
+    """
+    Drain the thumbnail queue, one small claimed batch at a time.
+
+    Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED (see
+    thumbnails/generation_queue.py), so any number of these tasks can run
+    at once without generating the same thumbnail twice, and a page-priority
+    row queued meanwhile is taken by the next claim. Runs until nothing is
+    left to claim. Queued after every enqueue that changed the queue, and
+    periodically to pick up rows whose claim expired.
+
+    Returns:
+        Number of queue rows processed.
+    """
+    processed = 0
+    while entries := claim_thumbnail_batch():
+        try:
+            _generate_thumbnails(
+                [entry.sha256_hash for entry in entries],
+                {entry.directory_id for entry in entries if entry.directory_id is not None},
+            )
+        finally:
+            complete_thumbnail_batch(entries)
+        processed += len(entries)
+    if processed:
+        stats = thumbnail_queue_stats()
+        logger.info("Thumbnail queue: processed %d entries, %d left (%d claimed)", processed, stats["depth"], stats["claimed"])
+    return processed
+
+
+@task()
+def sync_large_directory(directory_pk: int) -> bool:
+    """
+    Sync a directory too large to sync inside a web request.
+
+    Queued by update_database_from_disk(defer_large=True) when the listing
+    exceeds STREAMING_SYNC_THRESHOLD entries; runs the streaming sync here
+    instead. A directory that was synced (or deleted) in the meantime is
+    skipped by update_database_from_disk()'s own checks.
+
+    Args:
+        directory_pk: Primary key of the DirectoryIndex to sync.
+
+    Returns:
+        True if the directory was synced.
+    """
+    directory = DirectoryIndex.objects.filter(pk=directory_pk).first()
+    if directory is None:
+        return False
+    return update_database_from_disk(directory) is not None
+
+
 def get_vacuum_candidates(
     scale_factor_threshold: float = settings.VACUUM_DEAD_RATIO_THRESHOLD,
     min_live_rows: int = settings.VACUUM_MIN_LIVE_ROWS,
@@ -480,6 +660,52 @@ def daily_cleanup_finished_jobs() -> int:
     return deleted
 
 
+@task()
+def daily_prune_file_hash_cache() -> int:
+    """
+    Delete FileHashCache rows idle for longer than FILE_HASH_CACHE_RETAIN_DAYS.
+
+    Rows are touched whenever they are stored or produce a hit, so this only
+    removes identities of files that have not been re-hashed in that window
+    (typically files since deleted or rewritten).
+
+    Registered as a periodic task via TASKS settings (runs daily at 00:30).
+
+    Returns:
+        Number of rows deleted.
+    """
+    deleted = FileHashCache.prune()
+    if deleted:
+        logger.info(
+            "Pruned %d file hash cache rows idle for more than %d days",
+            deleted,
+            settings.FILE_HASH_CACHE_RETAIN_DAYS,
+        )
+    return deleted
+
+
+@task()
+def index_search_documents() -> int:
+    """
+    Index the text and metadata of file contents that have no SearchDocument yet.
+
+    Prunes rows whose file_sha256 no longer exists first, then extracts at
+    most SEARCH_INDEX_TASK_BATCH new hashes (the rest are picked up by the
+    next run). A file whose file_sha256 changed is re-indexed here and its
+    old row pruned.
+
+    Registered as a periodic task via TASKS settings (runs every 15 minutes).
+
+    Returns:
+        Number of SearchDocument rows created.
+    """
+    pruned = SearchDocument.prune()
+    created = SearchDocument.index_pending(max_count=settings.SEARCH_INDEX_TASK_BATCH)
+    if pruned or created:
+        logger.info("Search index: %d documents indexed, %d pruned", created, pruned)
+    return created
+
+
 def reconcile_cache_statistics_rows() -> list[str]:
     """
     Delete cache_statistics_tracking rows whose cache is no longer registered.
@@ -0,0 +1,217 @@
+"""
+Tests for the cross-process cache invalidation bus in quickbbs/cache_bus.py.
+
+Covers payload chunking, local eviction of received messages, self-echo
+suppression, and an end-to-end round trip over the Unix-socket transport
+(the transport used whenever the database is not PostgreSQL). The
+PostgreSQL LISTEN/NOTIFY transport shares the same encode/dispatch path.
+
+No database access — SimpleTestCase throughout.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from cachetools.keys import hashkey
+from django.test import SimpleTestCase, override_settings
+
+from quickbbs import cache_bus
+from quickbbs.cache_bus import InvalidationBus, apply_message, encode_messages
+from quickbbs.cache_registry import (
+    bump_search_generation,
+    clear_layout_cache_for_directories,
+    dir_counts_cache,
+    file_counts_cache,
+    layout_manager_cache,
+    search_generation,
+)
+from quickbbs.directoryindex import directoryindex_cache
+from quickbbs.fileindex import fileindex_cache
+
+pytestmark = pytest.mark.api
+
+
+class TestEncodeMessages(SimpleTestCase):
+    """Tests for encode_messages() payload construction."""
+
+    def test_empty_invalidation_produces_no_payloads(self):
+        """Nothing to invalidate means nothing to send."""
+        self.assertEqual(encode_messages(), [])
+
+    def test_payloads_stay_below_notify_limit(self):
+        """Large SHA lists are split so every payload fits a NOTIFY."""
+        shas = [f"{i:064x}" for i in range(500)]
+        payloads = encode_messages(directory_shas=shas)
+        self.assertGreater(len(payloads), 1)
+        for payload in payloads:
+            self.assertLess(len(payload.encode("utf-8")), 8000)
+        decoded = [sha for payload in payloads for sha in json.loads(payload)["dir_shas"]]
+        self.assertEqual(decoded, shas)
+
+    def test_clear_all_is_a_single_message(self):
+        """clear_all ignores key lists and sends one message."""
+        payloads = encode_messages(directory_ids=[1, 2], clear_all=True)
+        self.assertEqual(len(payloads), 1)
+        self.assertTrue(json.loads(payloads[0])["all"])
+
+    def test_search_bump_is_its_own_message(self):
+        """search=True adds a message carrying only the search flag."""
+        payloads = encode_messages(directory_ids=[1], search=True)
+        self.assertEqual(len(payloads), 2)
+        self.assertTrue(json.loads(payloads[0])["search"])
+        self.assertNotIn("dirs", json.loads(payloads[0]))
+
+
+class TestApplyMessage(SimpleTestCase):
+    """Tests for apply_message() local eviction."""
+
+    def setUp(self):
+        """Start every test from empty caches."""
+        for cache in (dir_counts_cache, file_counts_cache, layout_manager_cache, directoryindex_cache, fileindex_cache):
+            cache.clear()
+
+    def test_directory_ids_evict_layout_and_count_caches(self):
+        """Directory PKs clear the per-directory caches for those PKs only."""
+        dir_counts_cache[hashkey(7)] = 3
+        file_counts_cache[hashkey(7)] = 10
+        layout_manager_cache[hashkey(1, 7, 0, False, None)] = {"page": 1}
+        layout_manager_cache[hashkey(1, 8, 0, False, None)] = {"page": 1}
+
+        with mock.patch.object(cache_bus.invalidation_bus, "publish") as publish:
+            evicted = apply_message({"origin": "elsewhere", "dirs": [7]})
+
+        self.assertEqual(evicted, 3)
+        self.assertNotIn(hashkey(7), dir_counts_cache)
+        self.assertIn(hashkey(1, 8, 0, False, None), layout_manager_cache)
+        publish.assert_not_called()  # Received messages are never re-broadcast
+
+    def test_directory_ids_evict_directoryindex_records_by_pk(self):
+        """PK-only messages still evict SHA-keyed DirectoryIndex entries."""
+        directoryindex_cache[hashkey("a" * 64)] = (True, SimpleNamespace(pk=7))
+        directoryindex_cache[hashkey("b" * 64)] = (True, SimpleNamespace(pk=8))
+        apply_message({"origin": "elsewhere", "dirs": [7]})
+        self.assertNotIn(hashkey("a" * 64), directoryindex_cache)
+        self.assertIn(hashkey("b" * 64), directoryindex_cache)
+
+    def test_directory_shas_evict_directoryindex_cache(self):
+        """Directory SHAs pop the matching directoryindex_cache keys."""
+        directoryindex_cache[hashkey("a" * 64)] = (True, SimpleNamespace(pk=1))
+        self.assertEqual(apply_message({"origin": "elsewhere", "dir_shas": ["a" * 64]}), 1)
+        self.assertNotIn(hashkey("a" * 64), directoryindex_cache)
+
+    def test_file_shas_match_key_or_cached_record(self):
+        """File SHAs evict entries keyed by file_sha256 or holding that file_sha256."""
+        fileindex_cache[hashkey("f" * 64, False, ("filetype",))] = SimpleNamespace(file_sha256="f" * 64)
+        fileindex_cache[hashkey("u" * 64, True, ("filetype",))] = SimpleNamespace(file_sha256="f" * 64)
+        fileindex_cache[hashkey("x" * 64, True, ("filetype",))] = SimpleNamespace(file_sha256="x" * 64)
+        self.assertEqual(apply_message({"origin": "elsewhere", "file_shas": ["f" * 64]}), 2)
+        self.assertEqual(len(fileindex_cache), 1)
+
+    def test_clear_all_empties_registered_caches(self):
+        """An "all" message clears every registered cache."""
+        dir_counts_cache[hashkey(1)] = 1
+        directoryindex_cache[hashkey("a" * 64)] = (True, None)
+        apply_message({"origin": "elsewhere", "all": True})
+        self.assertEqual(len(dir_counts_cache), 0)
+        self.assertEqual(len(directoryindex_cache), 0)
+
+    def test_search_message_bumps_generation_without_rebroadcast(self):
+        """A "search" message retires local search results and is not re-sent."""
+        before = search_generation()
+        with mock.patch.object(cache_bus.invalidation_bus, "publish") as publish:
+            apply_message({"origin": "elsewhere", "search": True})
+        self.assertNotEqual(search_generation(), before)
+        publish.assert_not_called()
+
+
+class TestPublishHooks(SimpleTestCase):
+    """Local invalidation entry points publish on the bus."""
+
+    def test_clear_layout_cache_broadcasts_directory_ids(self):
+        """clear_layout_cache_for_directories() publishes the PKs it clears."""
+        with mock.patch.object(cache_bus.invalidation_bus, "publish") as publish:
+            clear_layout_cache_for_directories({3, None})
+        publish.assert_called_once_with(directory_ids={3})
+
+    def test_search_bump_broadcasts(self):
+        """bump_search_generation() publishes a search message."""
+        with mock.patch.object(cache_bus.invalidation_bus, "publish") as publish:
+            bump_search_generation()
+        publish.assert_called_once_with(search=True)
+
+    def test_broadcast_false_stays_local(self):
+        """broadcast=False (the receive path) publishes nothing."""
+        with mock.patch.object(cache_bus.invalidation_bus, "publish") as publish:
+            clear_layout_cache_for_directories({3}, broadcast=False)
+        publish.assert_not_called()
+
+    @override_settings(CACHE_BUS_ENABLED=False)
+    def test_disabled_bus_publishes_nothing(self):
+        """CACHE_BUS_ENABLED=False turns publish() into a no-op."""
+        self.assertEqual(InvalidationBus().publish(directory_ids=[1]), 0)
+
+
+class TestSocketTransport(SimpleTestCase):
+    """End-to-end delivery over the Unix datagram socket transport."""
+
+    def setUp(self):
+        """Point the bus at a private socket directory."""
+        self.socket_dir = tempfile.mkdtemp(prefix="qbbs_bus_")
+        self._settings_override = override_settings(CACHE_BUS_BACKEND="socket", CACHE_BUS_SOCKET_DIR=self.socket_dir)
+        self._settings_override.enable()
+        self.bus = InvalidationBus()
+        dir_counts_cache.clear()
+
+    def tearDown(self):
+        """Stop the listener and remove the socket directory."""
+        self.bus.stop()
+        self._settings_override.disable()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def _wait_for(self, predicate, timeout=3.0):
+        """Poll predicate until true or timeout; return its final value."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return predicate()
+
+    def test_listener_applies_messages_from_other_processes(self):
+        """A datagram from another origin evicts the named keys."""
+        self.assertTrue(self.bus.start())
+        dir_counts_cache[hashkey(42)] = 5
+        payload = json.dumps({"origin": "otherhost:1", "dirs": [42]}).encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.sendto(payload, os.path.join(self.socket_dir, f"{os.getpid()}.sock"))
+        self.assertTrue(self._wait_for(lambda: hashkey(42) not in dir_counts_cache))
+        self.assertEqual(self.bus.received, 1)
+
+    def test_own_messages_are_ignored(self):
+        """A process never applies its own broadcast a second time."""
+        self.bus.start()
+        self.bus._dispatch(encode_messages(directory_ids=[1])[0])  # pylint: disable=protected-access
+        self.assertEqual(self.bus.received, 0)
+
+    def test_publish_reaches_peer_sockets_and_drops_stale_ones(self):
+        """publish() sends to live peers and unlinks sockets nobody listens on."""
+        peer_path = os.path.join(self.socket_dir, "peer.sock")
+        stale_path = os.path.join(self.socket_dir, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as stale:
+            stale.bind(stale_path)  # Closed on exit: the file stays, the listener is gone
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as peer:
+            peer.bind(peer_path)
+            peer.settimeout(2)
+            self.assertEqual(self.bus.publish(directory_ids=[9]), 1)
+            message = json.loads(peer.recv(65536))
+        self.assertEqual(message["dirs"], [9])
+        self.assertFalse(os.path.exists(stale_path))
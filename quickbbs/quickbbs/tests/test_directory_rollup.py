@@ -0,0 +1,143 @@
+"""
+Tests for the precomputed recursive directory totals (DirectoryRollup in
+quickbbs/directory_rollup.py): incremental upkeep by directory sync, subtree
+deletion, and the rebuild_rollups drift repair.
+
+All tests use Django's TestCase on a temp albums tree (see SyncTestBase).
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from quickbbs.fileindex import FileIndex
+from quickbbs.models import DirectoryIndex, DirectoryRollup
+from quickbbs.tests.test_sync import SyncTestBase
+
+pytestmark = pytest.mark.api
+
+
+class RollupTestBase(SyncTestBase):
+    """Albums root with a two-level tree: albums/outer/inner."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.outer_path = os.path.join(self.albums_dir, "outer")
+        self.inner_path = os.path.join(self.outer_path, "inner")
+        os.makedirs(self.inner_path)
+        self.write_file("root.txt", b"1234")
+        self.write_file("a.jpg", b"x" * 10, directory=self.outer_path)
+        self.write_file("b.jpg", b"x" * 20, directory=self.inner_path)
+        self.write_file("c.txt", b"x" * 5, directory=self.inner_path)
+        self.sync()
+        self.outer = self.child(self.dir_obj, "outer")
+        self.sync(self.outer)
+        self.inner = self.child(self.outer, "inner")
+        self.sync(self.inner)
+
+    @staticmethod
+    def child(parent: DirectoryIndex, name: str) -> DirectoryIndex:
+        """Return the subdirectory row of *parent* named *name*."""
+        return DirectoryIndex.objects.get(parent_directory=parent, fqpndirectory__iendswith=f"/{name}/")
+
+
+class TestIncrementalRollups(RollupTestBase):
+    """sync_files()/sync_subdirectories() keep the totals current."""
+
+    def test_initial_sync_rolls_up_the_tree(self):
+        """Each level counts everything below it, per filetype."""
+        assert self.inner.get_rollup()["files"] == 2
+        assert self.inner.get_rollup()["bytes"] == 25
+        assert self.outer.get_rollup()["by_filetype"] == {".jpg": 2, ".txt": 1}
+        root = self.dir_obj.get_rollup()
+        assert (root["files"], root["bytes"]) == (4, 39)
+        assert root["by_filetype"] == {".jpg": 2, ".txt": 2}
+        newest = max(FileIndex.objects.values_list("lastmod", flat=True))
+        assert root["newest_mtime"] == newest
+
+    def test_added_and_removed_files_propagate_to_ancestors(self):
+        """A change deep in the tree reaches every ancestor."""
+        self.write_file("d.jpg", b"x" * 100, directory=self.inner_path)
+        os.remove(os.path.join(self.inner_path, "c.txt"))
+        self.sync(self.inner)
+
+        assert self.inner.get_rollup()["by_filetype"] == {".jpg": 2}
+        root = self.dir_obj.get_rollup()
+        assert (root["files"], root["bytes"]) == (4, 134)
+        assert root["by_filetype"] == {".jpg": 3, ".txt": 1}
+
+    def test_unchanged_resync_leaves_rollups_alone(self):
+        """A rescan with nothing changed does not touch the table."""
+        before = list(DirectoryRollup.objects.order_by("pk").values())
+        self.sync(self.inner)
+        assert list(DirectoryRollup.objects.order_by("pk").values()) == before
+
+    def test_vanished_subtree_is_subtracted(self):
+        """Deleting a subdirectory removes its totals from the ancestors."""
+        shutil.rmtree(self.inner_path)
+        self.sync(self.outer)
+
+        assert not DirectoryRollup.objects.filter(directory_id=self.inner.pk).exists()
+        assert self.outer.get_rollup()["files"] == 1
+        root = self.dir_obj.get_rollup()
+        assert (root["files"], root["bytes"]) == (2, 14)
+        assert root["by_filetype"] == {".jpg": 1, ".txt": 1}
+
+    def test_refresh_locks_the_directory_before_reading_rollups(self):
+        """The lock does not depend on rollup rows existing (a first sync has none)."""
+        DirectoryRollup.objects.filter(directory_id=self.inner.pk).delete()
+        with CaptureQueriesContext(connection) as queries:
+            DirectoryRollup.refresh_directory(self.inner)
+
+        statements = [query["sql"] for query in queries.captured_queries if "SAVEPOINT" not in query["sql"]]
+        assert "FOR UPDATE" in statements[0]
+        assert DirectoryIndex._meta.db_table in statements[0]
+
+    @override_settings(STREAMING_SYNC_THRESHOLD=2, STREAMING_SYNC_CHUNK_SIZE=1)
+    def test_streaming_sync_updates_rollups(self):
+        """Large directories (streaming sync) are rolled up the same way."""
+        for i in range(3):
+            self.write_file(f"extra_{i}.txt", b"x", directory=self.inner_path)
+        self.sync(self.inner)
+        assert self.dir_obj.get_rollup()["files"] == 7
+
+
+class TestRebuildRollups(RollupTestBase):
+    """rebuild() / manage.py rebuild_rollups verify and repair drift."""
+
+    def test_consistent_table_needs_no_repair(self):
+        """After incremental upkeep there is nothing to fix."""
+        assert DirectoryRollup.rebuild(dry_run=True) == 0
+
+    def test_repairs_drift(self):
+        """Wrong, missing and obsolete rows are all put right."""
+        expected = self.dir_obj.get_rollup()
+        DirectoryRollup.objects.filter(directory_id=self.dir_obj.pk).update(file_count=99)
+        DirectoryRollup.objects.filter(directory_id=self.outer.pk, filetype=".txt").delete()
+        DirectoryRollup.objects.create(directory_id=self.inner.pk, filetype=".gif", file_count=3)
+
+        out = StringIO()
+        call_command("rebuild_rollups", "--dry-run", stdout=out)
+        assert "[dry-run] 4 DirectoryRollup rows" in out.getvalue()
+        assert self.dir_obj.get_rollup()["files"] == 198
+
+        call_command("rebuild_rollups", stdout=StringIO())
+        assert self.dir_obj.get_rollup() == expected
+        assert self.outer.get_rollup()["by_filetype"] == {".jpg": 2, ".txt": 1}
+        assert self.inner.get_rollup()["by_filetype"] == {".jpg": 1, ".txt": 1}
+        assert DirectoryRollup.rebuild(dry_run=True) == 0
+
+    def test_fills_an_empty_table(self):
+        """Rows written before the table existed are backfilled."""
+        expected = self.dir_obj.get_rollup()
+        DirectoryRollup.objects.all().delete()
+        assert DirectoryRollup.rebuild() > 0
+        assert self.dir_obj.get_rollup() == expected
@@ -38,6 +38,7 @@ from quickbbs.directoryindex import (
     DIRECTORYINDEX_SR_FILETYPE_THUMB_PARENT,
     DIRECTORYINDEX_SR_PARENT,
     DirectoryIndex,
+    directoryindex_cache,
 )
 from quickbbs.fileindex import FileIndex
 
@@ -933,3 +934,92 @@ class TestDeleteDirectoryRecord(DirectoryIndexTestBase):
         pk = self.dir_obj.pk
         DirectoryIndex.delete_directory_record(self.dir_obj, cache_only=True)
         assert DirectoryIndex.objects.filter(pk=pk).exists()
+
+
+# ===========================================================================
+# tree_path: ancestors / descendants / depth
+# ===========================================================================
+
+
+@pytest.mark.django_db
+class TestTreePath(DirectoryIndexTestBase):
+    """Tests for the tree_path materialized path and the helpers built on it."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        _make_dirs(self.temp_dir, "albums/photos/2024/jan")
+        _, self.d_albums = self._add("albums")
+        _, self.d_photos = self._add("albums/photos")
+        _, self.d_2024 = self._add("albums/photos/2024")
+        _, self.d_jan = self._add("albums/photos/2024/jan")
+        _, self.d_videos = self._add("albums/videos")
+
+    def test_add_directory_sets_tree_path(self) -> None:
+        """Each row's tree_path lists the pks from the albums root down to itself."""
+        self.d_jan.refresh_from_db()
+        expected = f"/{self.d_albums.pk}/{self.d_photos.pk}/{self.d_2024.pk}/{self.d_jan.pk}/"
+        assert self.d_jan.tree_path == expected
+        assert self.d_jan.ancestor_ids == [self.d_albums.pk, self.d_photos.pk, self.d_2024.pk]
+        assert (self.d_albums.depth, self.d_photos.depth, self.d_jan.depth) == (0, 1, 3)
+
+    def test_get_descendants(self) -> None:
+        """get_descendants returns the whole subtree and nothing outside it."""
+        assert set(self.d_photos.get_descendants()) == {self.d_2024, self.d_jan}
+        assert set(self.d_photos.get_descendants(include_self=True)) == {self.d_photos, self.d_2024, self.d_jan}
+        assert not self.d_videos.get_descendants().exists()
+
+    def test_get_ancestors_root_first(self) -> None:
+        """get_ancestors returns the chain in root-first order."""
+        assert list(self.d_jan.get_ancestors()) == [self.d_albums, self.d_photos, self.d_2024]
+        assert list(self.d_jan.get_ancestors(include_self=True))[-1] == self.d_jan
+        assert not self.d_albums.get_ancestors().exists()
+
+    def test_helpers_fall_back_without_tree_path(self) -> None:
+        """Rows with no tree_path yet still answer via fqpndirectory prefixes."""
+        DirectoryIndex.objects.update(tree_path="")
+        photos = DirectoryIndex.objects.get(pk=self.d_photos.pk)
+        jan = DirectoryIndex.objects.get(pk=self.d_jan.pk)
+
+        assert set(photos.get_descendants()) == {self.d_2024, self.d_jan}
+        assert list(jan.get_ancestors()) == [self.d_albums, self.d_photos, self.d_2024]
+        assert jan.depth == 3
+        result = DirectoryIndex.get_all_parent_shas([jan.dir_fqpn_sha256], DIRECTORYINDEX_SR_PARENT)
+        assert result == {d.dir_fqpn_sha256 for d in (self.d_albums, self.d_photos, self.d_2024, self.d_jan)}
+
+    def test_get_all_parent_shas_is_two_queries(self) -> None:
+        """Ancestor SHAs come from tree_path, not a query per level."""
+        with self.assertNumQueries(2):
+            result = DirectoryIndex.get_all_parent_shas([self.d_jan.dir_fqpn_sha256], DIRECTORYINDEX_SR_PARENT)
+        assert result == {d.dir_fqpn_sha256 for d in (self.d_albums, self.d_photos, self.d_2024, self.d_jan)}
+
+    def test_reparent_rewrites_subtree(self) -> None:
+        """Repairing a broken parent link carries the subtree's paths along."""
+        DirectoryIndex.objects.filter(pk=self.d_2024.pk).update(parent_directory=None, tree_path=f"/{self.d_2024.pk}/")
+        DirectoryIndex.objects.filter(pk=self.d_jan.pk).update(tree_path=f"/{self.d_2024.pk}/{self.d_jan.pk}/")
+        # The raw UPDATEs above bypass the cache pops a real write does
+        directoryindex_cache.clear()
+
+        _, repaired = self._add("albums/photos/2024")
+
+        self.d_jan.refresh_from_db()
+        assert repaired.parent_directory_id == self.d_photos.pk
+        assert self.d_jan.tree_path == f"/{self.d_albums.pk}/{self.d_photos.pk}/{self.d_2024.pk}/{self.d_jan.pk}/"
+
+    def test_delete_directory_removes_subtree(self) -> None:
+        """Deleting a directory deletes everything below it, not its siblings."""
+        DirectoryIndex.delete_directory(self.d_photos.fqpndirectory)
+
+        remaining = set(DirectoryIndex.objects.values_list("pk", flat=True))
+        assert remaining == {self.d_albums.pk, self.d_videos.pk}
+
+    def test_rebuild_tree_paths_repairs_drift(self) -> None:
+        """rebuild_tree_paths backfills empty paths and fixes wrong ones."""
+        expected = dict(DirectoryIndex.objects.values_list("pk", "tree_path"))
+        DirectoryIndex.objects.filter(pk=self.d_photos.pk).update(tree_path="")
+        DirectoryIndex.objects.filter(pk=self.d_jan.pk).update(tree_path="/999/")
+
+        assert DirectoryIndex.rebuild_tree_paths(dry_run=True) == 2
+        assert DirectoryIndex.objects.get(pk=self.d_jan.pk).tree_path == "/999/"
+        assert DirectoryIndex.rebuild_tree_paths() == 2
+        assert dict(DirectoryIndex.objects.values_list("pk", "tree_path")) == expected
+        assert DirectoryIndex.rebuild_tree_paths() == 0
@@ -0,0 +1,125 @@
+"""
+Tests for the persistent SHA256 cache in quickbbs/file_hash_cache.py.
+
+Covers hits for unchanged files at the same path, misses on content/mtime
+change, re-pointing an identity row after a rename, the enable switch, and
+pruning. Results must always equal what get_file_sha() computes from disk.
+
+DATABASE SAFETY NOTES
+---------------------
+- TestCase only (rolled-back transaction per test). No TransactionTestCase.
+- Files are created in tempfile.mkdtemp(); tearDown removes only that directory.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+
+from quickbbs import file_hash_cache
+from quickbbs.common import get_file_sha
+from quickbbs.file_hash_cache import FileHashCache
+
+pytestmark = pytest.mark.api
+
+
+class TestFileHashCache(TestCase):
+    """FileHashCache.compute_file_shas() is a drop-in for _batch_compute_file_shas()."""
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_file(self, name: str, content: bytes) -> str:
+        """Create a file in the temp directory and return its path."""
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as fh:
+            fh.write(content)
+        return path
+
+    def hashed_paths(self, paths: list[str]) -> tuple[dict, list[str]]:
+        """Run compute_file_shas, returning (results, paths that were read from disk)."""
+        with mock.patch.object(file_hash_cache, "_batch_compute_file_shas", wraps=file_hash_cache._batch_compute_file_shas) as batch:
+            results = FileHashCache.compute_file_shas(paths)
+        read = [path for call in batch.call_args_list for path in call.args[0]]
+        return results, read
+
+    def test_unchanged_file_is_answered_from_cache(self):
+        """Second request for the same unchanged files reads nothing from disk."""
+        paths = [self.write_file(f"f{i}.jpg", f"content {i}".encode()) for i in range(3)]
+
+        first, first_read = self.hashed_paths(paths)
+        second, second_read = self.hashed_paths(paths)
+
+        assert sorted(first_read) == sorted(paths)
+        assert not second_read
+        assert first == second == {path: get_file_sha(path) for path in paths}
+        assert FileHashCache.objects.count() == 3
+
+    def test_modified_file_is_rehashed(self):
+        """A new mtime/size is a different identity — the stale hash is never served."""
+        path = self.write_file("edit.jpg", b"first version")
+        self.hashed_paths([path])
+
+        with open(path, "wb") as fh:
+            fh.write(b"second version, longer")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+        results, read = self.hashed_paths([path])
+
+        assert read == [path]
+        assert results[path] == get_file_sha(path)
+
+    def test_renamed_file_rehashes_and_repoints_row(self):
+        """unique_sha256 is path-dependent: a rename reads once, then reuses the moved row."""
+        old_path = self.write_file("before.jpg", b"moving content")
+        self.hashed_paths([old_path])
+        new_path = os.path.join(self.temp_dir, "after.jpg")
+        os.rename(old_path, new_path)
+
+        results, read = self.hashed_paths([new_path])
+        _, reread = self.hashed_paths([new_path])
+
+        assert read == [new_path]
+        assert not reread
+        assert results[new_path] == get_file_sha(new_path)
+        row = FileHashCache.objects.get()
+        assert row.fqfn == new_path
+        assert row.unique_sha256 == results[new_path][1]
+
+    def test_unreadable_file_matches_batch_contract(self):
+        """Missing files come back as (None, None) and are not cached."""
+        missing = os.path.join(self.temp_dir, "missing.jpg")
+
+        results, _ = self.hashed_paths([missing])
+
+        assert results == {missing: (None, None)}
+        assert not FileHashCache.objects.exists()
+
+    @override_settings(FILE_HASH_CACHE_ENABLED=False)
+    def test_disabled_always_reads_from_disk(self):
+        """FILE_HASH_CACHE_ENABLED = False bypasses the table entirely."""
+        path = self.write_file("plain.jpg", b"plain")
+
+        self.hashed_paths([path])
+        _, read = self.hashed_paths([path])
+
+        assert read == [path]
+        assert not FileHashCache.objects.exists()
+
+    def test_prune_removes_only_idle_rows(self):
+        """prune() deletes rows whose last_used is older than the retain window."""
+        fresh, stale = (self.write_file(name, name.encode()) for name in ("fresh.jpg", "stale.jpg"))
+        self.hashed_paths([fresh, stale])
+        FileHashCache.objects.filter(fqfn=stale).update(last_used=time.time() - 10 * 86400)
+
+        assert FileHashCache.prune(retain_days=5) == 1
+        assert list(FileHashCache.objects.values_list("fqfn", flat=True)) == [fresh]
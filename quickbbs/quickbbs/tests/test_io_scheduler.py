@@ -0,0 +1,172 @@
+"""
+Tests for the per-volume I/O scheduler in quickbbs/io_scheduler.py.
+
+Covers device grouping and (directory, inode) read order, limit resolution
+from IO_DEVICE_LIMITS / IO_DEFAULT_DEVICE_LIMIT, run_per_device() in-flight
+caps, and the device_slot() semaphore.
+
+No database access — SimpleTestCase throughout.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.test import SimpleTestCase, override_settings
+
+from quickbbs.io_scheduler import (
+    UNKNOWN_DEVICE,
+    device_slot,
+    group_by_device,
+    limit_for_device,
+    order_for_reading,
+    run_per_device,
+)
+
+pytestmark = pytest.mark.api
+
+
+class IOSchedulerTestCase(SimpleTestCase):
+    """Creates two sub-directories of small files in a temp directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.device = os.stat(self.temp_dir).st_dev
+        self.paths = []
+        for subdir in ("b", "a"):
+            os.mkdir(os.path.join(self.temp_dir, subdir))
+            for i in range(4):
+                path = os.path.join(self.temp_dir, subdir, f"file_{i}.bin")
+                with open(path, "wb") as handle:
+                    handle.write(b"x" * 10)
+                self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _peak_concurrency(self, work) -> int:
+        """Run work(path, enter, leave) for every path on 4 threads; return the peak overlap."""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def enter():
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+
+        def leave():
+            with lock:
+                state["active"] -= 1
+
+        work(enter, leave)
+        return state["peak"]
+
+
+class TestReadOrder(IOSchedulerTestCase):
+    """group_by_device / order_for_reading."""
+
+    def test_groups_by_device_in_directory_then_inode_order(self):
+        groups = group_by_device(reversed(self.paths))
+
+        assert list(groups) == [self.device]
+        expected = sorted(self.paths, key=lambda path: (os.path.dirname(path), os.stat(path).st_ino))
+        assert groups[self.device] == expected
+
+    def test_unreadable_paths_get_their_own_group(self):
+        missing = os.path.join(self.temp_dir, "missing.bin")
+
+        groups = group_by_device([missing, self.paths[0]])
+
+        assert groups[UNKNOWN_DEVICE] == [missing]
+        assert groups[self.device] == [self.paths[0]]
+        assert sorted(order_for_reading([missing, self.paths[0]])) == sorted([missing, self.paths[0]])
+
+
+class TestLimits(IOSchedulerTestCase):
+    """limit_for_device() resolution."""
+
+    @override_settings(IO_DEVICE_LIMITS={}, IO_DEFAULT_DEVICE_LIMIT=0)
+    def test_unlimited_by_default(self):
+        assert limit_for_device(self.device) is None
+
+    @override_settings(IO_DEVICE_LIMITS={}, IO_DEFAULT_DEVICE_LIMIT=3)
+    def test_default_limit_applies_to_unlisted_devices(self):
+        assert limit_for_device(self.device) == 3
+
+    @override_settings(IO_DEFAULT_DEVICE_LIMIT=3)
+    def test_mount_path_limit_wins(self):
+        with override_settings(IO_DEVICE_LIMITS={self.temp_dir: 1, "/nonexistent/volume": 5}):
+            assert limit_for_device(self.device) == 1
+
+
+class TestRunPerDevice(IOSchedulerTestCase):
+    """run_per_device() keeps each device under its cap and visits every path."""
+
+    def _run(self) -> tuple[int, list[str]]:
+        completed = []
+
+        def work(enter, leave):
+            def read(path):
+                enter()
+                time.sleep(0.01)
+                leave()
+                return path
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                run_per_device(self.paths, lambda path: executor.submit(read, path), lambda path, future: completed.append(future.result()))
+
+        return self._peak_concurrency(work), completed
+
+    @override_settings(IO_DEFAULT_DEVICE_LIMIT=0)
+    def test_capped_device(self):
+        with override_settings(IO_DEVICE_LIMITS={self.temp_dir: 2}):
+            peak, completed = self._run()
+
+        assert peak <= 2
+        assert sorted(completed) == sorted(self.paths)
+
+    @override_settings(IO_DEVICE_LIMITS={}, IO_DEFAULT_DEVICE_LIMIT=1)
+    def test_single_reader_follows_read_order(self):
+        peak, completed = self._run()
+
+        assert peak == 1
+        assert completed == order_for_reading(self.paths)
+
+
+class TestDeviceSlot(IOSchedulerTestCase):
+    """device_slot() bounds readers across threads."""
+
+    def _run(self) -> int:
+        def work(enter, leave):
+            def read(path):
+                with device_slot(path):
+                    enter()
+                    time.sleep(0.01)
+                    leave()
+
+            threads = [threading.Thread(target=read, args=(path,)) for path in self.paths]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        return self._peak_concurrency(work)
+
+    @override_settings(IO_DEFAULT_DEVICE_LIMIT=0)
+    def test_limited_device_serializes(self):
+        with override_settings(IO_DEVICE_LIMITS={self.temp_dir: 1}):
+            assert self._run() == 1
+
+    @override_settings(IO_DEVICE_LIMITS={}, IO_DEFAULT_DEVICE_LIMIT=0)
+    def test_unlimited_device_does_not_block(self):
+        assert self._run() > 1
+
+    def test_missing_path_is_not_limited(self):
+        with device_slot(os.path.join(self.temp_dir, "missing.bin")):
+            pass
@@ -0,0 +1,148 @@
+"""
+Tests for the MediaProbe table (quickbbs/mediaprobe.py). The scan
+--add_thumbnails probe pass that fills it is tested with the other add_*
+helpers in management/tests/test_add_directories_files.py.
+
+DATABASE SAFETY NOTES
+---------------------
+- All tests use Django's TestCase (transaction rolled back per test).
+- thumbnails.engine.probe_media is patched where MediaProbe imports it, so
+  no file is decoded; FileIndex rows point into a tempfile directory.
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+
+from filetypes.models import filetypes
+from quickbbs.models import (
+    DirectoryIndex,
+    FileIndex,
+    MediaProbe,
+    media_probe_annotations,
+)
+from thumbnails.engine import VideoProcessingError
+
+pytestmark = pytest.mark.api
+
+VIDEO_INFO = {
+    "duration": 93.4,
+    "format": "mov,mp4,m4a,3gp,3g2,mj2",
+    "bit_rate": 2_500_000,
+    "width": 1920,
+    "height": 1080,
+    "fps": 29.97,
+    "codec": "h264",
+    "audio_codec": "aac",
+    "audio_channels": 2,
+    "sample_rate": 48000,
+}
+
+
+def _sha(prefix: str) -> str:
+    """Return a 64-char hex-like string padded with zeros."""
+    return (prefix + "0" * 64)[:64]
+
+
+def _fake_probe(path: str) -> dict:
+    """probe_media stand-in keyed on the file name."""
+    name = os.path.basename(path)
+    if name.startswith("gone"):
+        raise FileNotFoundError(path)
+    if name.startswith("broken"):
+        raise VideoProcessingError(f"No video stream found in {path}")
+    return VIDEO_INFO
+
+
+class MediaProbeTestCase(TestCase):
+    """Registers a tempfile albums directory; _add_file() creates FileIndex rows in it."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        albums_dir = os.path.join(self.temp_dir, "albums")
+        os.makedirs(albums_dir, exist_ok=True)
+        self._settings_override = override_settings(ALBUMS_PATH=self.temp_dir)
+        self._settings_override.enable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        _, self.dir_obj = DirectoryIndex.add_directory(albums_dir + "/")
+
+    def tearDown(self):
+        self._settings_override.disable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _add_file(self, name: str, file_sha: str, fileext: str = ".mp4", directory: DirectoryIndex | None = None, **kwargs) -> FileIndex:
+        """Create a minimal FileIndex record without touching the filesystem."""
+        return FileIndex.objects.create(
+            home_directory=directory or self.dir_obj,
+            name=name,
+            file_sha256=file_sha,
+            unique_sha256=_sha(file_sha[:8] + name.encode().hex()[:8]),
+            lastscan=0.0,
+            lastmod=0.0,
+            filetype=filetypes.objects.get(fileext=fileext),
+            delete_pending=False,
+            **kwargs,
+        )
+
+
+@mock.patch("quickbbs.mediaprobe.probe_media", side_effect=_fake_probe)
+class TestProbeFiles(MediaProbeTestCase):
+    """MediaProbe.probe_files() stores one row per hash and backfills durations."""
+
+    def test_stores_probe_result(self, _probe):
+        created = MediaProbe.probe_files({_sha("a1"): "/albums/clip.mp4"})
+
+        row = MediaProbe.objects.get(file_sha256=_sha("a1"))
+        assert created == 1
+        assert (row.duration, row.resolution, row.video_codec, row.audio_codec) == (93.4, "1920x1080", "h264", "aac")
+        assert row.probe_failed is False
+
+    def test_failed_probe_is_remembered_and_missing_file_skipped(self, _probe):
+        created = MediaProbe.probe_files({_sha("b1"): "/albums/broken.mp4", _sha("c1"): "/albums/gone.mp4"})
+
+        assert created == 1
+        assert MediaProbe.objects.get(file_sha256=_sha("b1")).probe_failed is True
+        assert not MediaProbe.objects.filter(file_sha256=_sha("c1")).exists()
+        assert MediaProbe.for_sha(_sha("b1")) is None
+
+    def test_backfills_missing_durations_only(self, _probe):
+        unset = self._add_file("clip.mp4", _sha("a1"))
+        already_set = self._add_file("copy.mp4", _sha("a1"), duration=12)
+
+        MediaProbe.probe_files({_sha("a1"): "/albums/clip.mp4"})
+
+        assert FileIndex.objects.get(pk=unset.pk).duration == 93
+        assert FileIndex.objects.get(pk=already_set.pk).duration == 12
+
+
+class TestSeekInfo(MediaProbeTestCase):
+    """seek_info() feeds the video backends only complete probes."""
+
+    def test_only_complete_rows(self):
+        MediaProbe.objects.create(file_sha256=_sha("a1"), duration=10.0, width=640, height=360)
+        MediaProbe.objects.create(file_sha256=_sha("b1"), duration=10.0)
+        MediaProbe.objects.create(file_sha256=_sha("c1"), probe_failed=True)
+
+        info = MediaProbe.seek_info([_sha("a1"), _sha("b1"), _sha("c1"), _sha("d1")])
+
+        assert info == {_sha("a1"): {"duration": 10.0, "width": 640, "height": 360}}
+
+    def test_annotations_carry_frame_size(self):
+        probed = self._add_file("clip.mp4", _sha("a1"))
+        unprobed = self._add_file("other.mp4", _sha("b1"))
+        MediaProbe.objects.create(file_sha256=_sha("a1"), duration=10.0, width=640, height=360)
+
+        files = {f.pk: f for f in FileIndex.objects.annotate(**media_probe_annotations())}
+
+        assert (files[probed.pk].probe_width, files[probed.pk].probe_height) == (640, 360)
+        assert files[unprobed.pk].probe_width is None
@@ -122,6 +122,16 @@ class TestMonitoredLRUCache(SimpleTestCase):
         self.assertEqual(stats["misses"], 1)
         self.assertEqual(stats["size"], 1)
 
+    def test_peek_items_does_not_count_hits_or_touch_lru_order(self):
+        """peek_items() snapshots entries without hits or recency updates."""
+        cache = MonitoredLRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(sorted(cache.peek_items()), [("a", 1), ("b", 2)])
+        self.assertEqual(cache.hits, 0)
+        cache["c"] = 3  # "a" is still least recently used despite the peek
+        self.assertNotIn("a", cache)
+
     def test_reset_stats(self):
         """reset_stats() zeroes the hit/miss counters."""
         cache = MonitoredLRUCache(4)
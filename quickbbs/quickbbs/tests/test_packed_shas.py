@@ -0,0 +1,104 @@
+"""
+Tests for PackedShaList in quickbbs/packed_shas.py.
+
+Covers the list contract layout_manager and build_context_info rely on
+(len, indexing, slicing, index, membership, equality with a plain list) and
+the position table behind O(1) index(): first-occurrence semantics, probe
+collisions, and windowed lookups.
+
+No database access — SimpleTestCase throughout.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+from django.test import SimpleTestCase
+
+from quickbbs.packed_shas import PackedShaList, pack_shas
+
+pytestmark = pytest.mark.api
+
+
+def _shas(count: int) -> list[str]:
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+class TestPackShas(SimpleTestCase):
+    """pack_shas() accepts only values it can reproduce exactly."""
+
+    def test_packs_32_bytes_per_entry(self):
+        assert len(pack_shas(_shas(10))) == 320
+
+    def test_rejects_non_hex_short_and_uppercase_values(self):
+        assert pack_shas(["abc"]) is None
+        assert pack_shas(["zz" * 32]) is None
+        assert pack_shas([_shas(1)[0].upper()]) is None
+        assert pack_shas([123]) is None
+
+
+class TestPackedShaList(SimpleTestCase):
+    """PackedShaList behaves like the list it replaces."""
+
+    def test_matches_list_operations(self):
+        shas = _shas(1000)
+        packed = PackedShaList.from_shas(shas)
+
+        assert len(packed) == 1000
+        assert packed == shas
+        assert packed[0] == shas[0]
+        assert packed[-1] == shas[-1]
+        assert packed[995:1005] == shas[995:1005]
+        assert packed[::250] == shas[::250]
+        for position in (0, 1, 499, 999):
+            assert packed.index(shas[position]) == position
+        assert shas[123] in packed
+        assert hashlib.sha256(b"absent").hexdigest() not in packed
+        with pytest.raises(IndexError):
+            packed[1000]  # pylint: disable=pointless-statement
+
+    def test_index_raises_value_error_like_list(self):
+        packed = PackedShaList.from_shas(_shas(5))
+
+        with pytest.raises(ValueError):
+            packed.index(hashlib.sha256(b"absent").hexdigest())
+        with pytest.raises(ValueError):
+            packed.index("not-a-sha")
+        with pytest.raises(ValueError):
+            packed.index(None)
+
+    def test_index_returns_first_occurrence(self):
+        first, second = _shas(2)
+        packed = PackedShaList.from_shas([second, first, second])
+
+        assert packed.index(second) == 0
+        assert packed.index(second, 1) == 2
+
+    def test_colliding_prefixes_probe_to_correct_entry(self):
+        # Same leading 8 bytes → same initial slot; the probe must compare
+        # full digests, not just the prefix.
+        prefix = "ab" * 8
+        shas = [prefix + hashlib.sha256(str(i).encode()).hexdigest()[16:] for i in range(20)]
+        packed = PackedShaList.from_shas(shas)
+
+        for position, sha in enumerate(shas):
+            assert packed.index(sha) == position
+
+    def test_none_entries_preserve_positions(self):
+        shas = _shas(2)
+        packed = PackedShaList.from_shas([shas[0], None, shas[1]])
+
+        assert list(packed) == [shas[0], None, shas[1]]
+        assert packed.index(None) == 1
+        assert packed.index(shas[1]) == 2
+
+    def test_empty_list(self):
+        packed = PackedShaList.from_shas([])
+
+        assert len(packed) == 0
+        assert not packed
+        assert packed == []
+        assert packed[0:5] == []
+        with pytest.raises(ValueError):
+            packed.index(_shas(1)[0])
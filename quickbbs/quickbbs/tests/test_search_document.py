@@ -0,0 +1,252 @@
+"""
+Tests for the full-text search index (SearchDocument in
+quickbbs/search_document.py): extraction per filetype, incremental indexing,
+pruning, and the content matches added to search results.
+
+The tsvector is PostgreSQL-only; the test database exercises the icontains
+fallback of SearchDocument.ranked_shas(). All tests use Django's TestCase on
+a temp albums tree (see SyncTestBase).
+"""
+
+from __future__ import annotations
+
+import io
+from unittest import mock
+
+import fitz
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase
+from PIL import Image
+
+from frontend.views import _get_paginated_search_results, create_search_regex_pattern
+from interactive_fiction.models import Story
+from quickbbs.cache_registry import search_results_cache
+from quickbbs.fileindex import FileIndex
+from quickbbs.models import SearchDocument
+from quickbbs.search_document import _xmp_values
+from quickbbs.tests.test_sync import SyncTestBase
+
+pytestmark = pytest.mark.api
+
+
+def jpeg_with_exif() -> bytes:
+    """Return a small JPEG with a description, an artist and Windows XP keywords."""
+    exif = Image.Exif()
+    exif[0x010E] = "Sunset over the harbour"
+    exif[0x013B] = "Ada Photographer"
+    exif[0x9C9E] = "boats;evening".encode("utf-16-le") + b"\x00\x00"
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), "orange").save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def pdf_with_text() -> bytes:
+    """Return a one-page PDF with a title, an author and a line of text."""
+    with fitz.open() as document:
+        document.new_page().insert_text((72, 72), "Annual lighthouse maintenance schedule")
+        document.set_metadata({"title": "Keeper Handbook", "author": "Grace Keeper"})
+        return document.tobytes()
+
+
+class SearchDocumentTestBase(SyncTestBase):
+    """Albums root holding one file of each indexed kind.
+
+    Files are written under their stored (title-cased) names, since the
+    indexer opens FileIndex.full_filepathname and the temp dir is on a
+    case-sensitive filesystem.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.write_file("Photo.Jpg", jpeg_with_exif())
+        self.write_file("Handbook.Pdf", pdf_with_text())
+        self.write_file("Notes.Md", b"# Field notes\n\nAn *albatross* followed the ship.\n")
+        self.write_file("Page.Html", b"<html><body><p>Tide &amp; weather tables</p></body></html>")
+        self.write_file("Book.Epub", b"PK\x03\x04 not indexed")
+        self.sync()
+
+    def sha(self, name: str) -> str:
+        """Return the file_sha256 of the albums root file *name*."""
+        return FileIndex.objects.get(home_directory=self.dir_obj, name__iexact=name).file_sha256
+
+    def document(self, name: str) -> SearchDocument:
+        """Return the SearchDocument of the albums root file *name*."""
+        return SearchDocument.objects.get(file_sha256=self.sha(name))
+
+
+class TestExtraction(SearchDocumentTestBase):
+    """index_pending() stores the text of each supported kind of file."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.created = SearchDocument.index_pending()
+
+    def test_image_exif_is_indexed(self):
+        """EXIF description, artist and XP keywords land in body, author and keywords."""
+        document = self.document("Photo.Jpg")
+        assert document.body == "Sunset over the harbour"
+        assert document.author == "Ada Photographer"
+        assert document.keywords == "boats;evening"
+        assert not document.extract_failed
+
+    def test_pdf_metadata_and_text_are_indexed(self):
+        """The document information and the page text are both stored."""
+        document = self.document("Handbook.Pdf")
+        assert (document.title, document.author) == ("Keeper Handbook", "Grace Keeper")
+        assert "lighthouse maintenance" in document.body
+
+    def test_text_bodies_are_indexed(self):
+        """Markdown is kept as text; HTML has its tags stripped and entities decoded."""
+        assert "albatross" in self.document("Notes.Md").body
+        assert self.document("Page.Html").body.strip() == "Tide & weather tables"
+
+    def test_only_indexable_filetypes_get_a_row(self):
+        """Files that are neither images, PDFs nor text (here an epub) are skipped."""
+        assert self.created == 4
+        assert not SearchDocument.objects.filter(file_sha256=self.sha("Book.Epub")).exists()
+
+
+class TestXmpValues(SimpleTestCase):
+    """_xmp_values() walks the nested dicts Image.getxmp() returns."""
+
+    def test_containers_and_language_attributes(self):
+        """Alt/Bag containers are descended into; xml:lang attributes are skipped."""
+        xmp = {
+            "xmpmeta": {
+                "RDF": {
+                    "Description": {
+                        "title": {"Alt": {"li": {"lang": "x-default", "text": "Harbour at dusk"}}},
+                        "subject": {"Bag": {"li": ["boats", "evening"]}},
+                    }
+                }
+            }
+        }
+        assert _xmp_values(xmp, "title") == ["Harbour at dusk"]
+        assert _xmp_values(xmp, "subject") == ["boats", "evening"]
+        assert _xmp_values(xmp, "creator") == []
+
+
+class TestIncrementalIndexing(SearchDocumentTestBase):
+    """Only contents without a row are extracted; stale rows are pruned."""
+
+    def test_second_run_extracts_nothing(self):
+        """Every hash already has a row, so nothing is read again."""
+        SearchDocument.index_pending()
+        assert SearchDocument.index_pending() == 0
+
+    def test_max_count_limits_the_run(self):
+        """max_count caps the number of hashes extracted per run."""
+        assert SearchDocument.index_pending(max_count=1) == 1
+        assert SearchDocument.index_pending() == 3
+
+    def test_new_file_is_indexed_alone(self):
+        """A file added after a run is the only one the next run reads."""
+        SearchDocument.index_pending()
+        self.write_file("Log.Txt", b"Sighted a petrel at dawn")
+        self.sync()
+        assert SearchDocument.index_pending() == 1
+        assert self.document("Log.Txt").body == "Sighted a petrel at dawn"
+
+    def test_rows_of_removed_files_are_pruned(self):
+        """prune() deletes rows whose hash no FileIndex row has any more."""
+        SearchDocument.index_pending()
+        old_sha = self.sha("Notes.Md")
+        FileIndex.objects.filter(file_sha256=old_sha).delete()
+        assert SearchDocument.prune() == 1
+        assert not SearchDocument.objects.filter(file_sha256=old_sha).exists()
+        assert SearchDocument.prune() == 0
+
+    def test_unreadable_file_is_not_retried(self):
+        """A file the decoder rejects gets an extract_failed row."""
+        self.write_file("Broken.Jpg", b"not a jpeg at all")
+        self.sync()
+        SearchDocument.index_pending()
+        assert self.document("Broken.Jpg").extract_failed
+        assert SearchDocument.index_pending() == 0
+
+
+class TestRejectedText(SearchDocumentTestBase):
+    """Text PostgreSQL would reject never stops the indexer."""
+
+    def test_embedded_nul_is_removed(self):
+        """NUL characters inside a text body are dropped before the row is written."""
+        self.write_file("Dump.Txt", b"Tide\x00tables\x00 for March")
+        self.sync()
+        with mock.patch.object(FileIndex, "get_text_encoding_cached", return_value="utf-8"):
+            SearchDocument.index_pending()
+        assert self.document("Dump.Txt").body == "Tidetables for March"
+
+    def test_rejected_row_does_not_fail_the_batch(self):
+        """A batch insert error falls back to row inserts; the rejected row is stored as extract_failed."""
+        self.write_file("Log.Txt", b"poison")
+        self.sync()
+        bulk_create = QuerySet.bulk_create
+
+        def reject_poison(queryset, objs, *args, **kwargs):
+            if any(getattr(obj, "body", "") == "poison" for obj in objs):
+                raise DatabaseError("invalid byte sequence")
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "bulk_create", reject_poison):
+            assert SearchDocument.index_pending() == 5
+        assert self.document("Log.Txt").extract_failed
+        assert "albatross" in self.document("Notes.Md").body
+        assert SearchDocument.index_pending() == 0
+
+
+class TestStoryTitles(SyncTestBase):
+    """Compiled Ink stories are indexed by their Story title once ingested."""
+
+    def test_inkj_is_indexed_after_ingestion(self):
+        """An .inkj without a Story waits; once ingested its title is stored."""
+        self.write_file("Tale.Inkj", b'{"inkVersion": 21, "root": [], "listDefs": {}}')
+        self.sync()
+        assert SearchDocument.index_pending() == 0
+
+        sha = FileIndex.objects.get(home_directory=self.dir_obj, name__iexact="Tale.Inkj").file_sha256
+        owner = get_user_model().objects.create_user(username="storyteller", password="unused")
+        Story.objects.create(
+            owner=owner,
+            title="The Drowned Lighthouse",
+            slug="drowned",
+            compiled_json={"inkVersion": 21, "root": [], "listDefs": {}},
+            source_sha256=sha,
+        )
+        assert SearchDocument.index_pending() == 1
+        assert SearchDocument.objects.get(file_sha256=sha).title == "The Drowned Lighthouse"
+
+
+class TestContentSearch(SearchDocumentTestBase):
+    """Search results add files matched by indexed content after the name matches."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        search_results_cache.clear()
+        SearchDocument.index_pending()
+
+    def tearDown(self) -> None:
+        search_results_cache.clear()
+        super().tearDown()
+
+    def search(self, text: str) -> tuple[list, list, int]:
+        """Run the first page of a search, sorted by name."""
+        return _get_paginated_search_results(text, create_search_regex_pattern(text), 0, 1, 50)
+
+    def test_ranked_shas_matches_any_column(self):
+        """The fallback matches title, author, keywords and body, title matches first."""
+        assert SearchDocument.ranked_shas("keeper", 10) == [self.sha("Handbook.Pdf")]
+        assert SearchDocument.ranked_shas("boats", 10) == [self.sha("Photo.Jpg")]
+        assert SearchDocument.ranked_shas("   ", 10) == []
+
+    def test_content_matches_follow_name_matches(self):
+        """A file found by name is listed once, before the content matches."""
+        self.write_file("Harbour_View.Txt", b"nothing to see")
+        self.sync()
+        SearchDocument.index_pending()
+        _, file_pks, total = self.search("harbour")
+        names = dict(FileIndex.objects.filter(pk__in=file_pks).values_list("pk", "name"))
+        assert [names[pk] for pk in file_pks] == ["Harbour_View.Txt", "Photo.Jpg"]
+        assert total == 2
@@ -0,0 +1,162 @@
+"""
+Tests for SHA256 hashing backends in quickbbs/sha_hashing.py and quickbbs/common.py.
+
+Covers hash compatibility with the values already stored in the database,
+the thread/process backend selector, the process-pool fallback, and the
+per-volume reader limit.
+
+No database access — SimpleTestCase throughout.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import pytest
+from django.test import SimpleTestCase, override_settings
+
+from quickbbs import common
+from quickbbs.common import (
+    _batch_compute_file_shas,
+    _cleanup_sha_executor,
+    get_file_sha,
+    get_sha_backend,
+    set_sha_backend,
+)
+from quickbbs.sha_hashing import hash_file, hash_file_or_error
+
+pytestmark = pytest.mark.api
+
+
+def _reference_shas(path: str) -> tuple[str, str]:
+    """The original get_file_sha() formula: content digest, then + title-cased path."""
+    with open(path, "rb") as handle:
+        digest = hashlib.file_digest(handle, "sha256")
+    file_sha256 = digest.hexdigest()
+    digest.update(str(path).title().encode("utf-8"))
+    return file_sha256, digest.hexdigest()
+
+
+class ShaHashingTestCase(SimpleTestCase):
+    """Creates a temp directory of files; restores the default backend afterwards."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(8):
+            path = os.path.join(self.temp_dir, f"file_{i}.bin")
+            with open(path, "wb") as handle:
+                handle.write(os.urandom(1000 + i * 70_000))
+            self.paths.append(path)
+
+    def tearDown(self):
+        set_sha_backend(None)
+        _cleanup_sha_executor()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestHashFile(ShaHashingTestCase):
+    """hash_file() must reproduce the stored SHA256 values exactly."""
+
+    def test_matches_reference_formula_for_any_buffer_size(self):
+        for path in self.paths:
+            assert hash_file(path) == _reference_shas(path)
+            assert hash_file(path, buffer_size=4096) == _reference_shas(path)
+
+    def test_empty_file(self):
+        path = os.path.join(self.temp_dir, "empty.bin")
+        open(path, "wb").close()  # pylint: disable=consider-using-with
+
+        assert hash_file(path) == _reference_shas(path)
+
+    def test_get_file_sha_delegates(self):
+        assert get_file_sha(self.paths[0]) == _reference_shas(self.paths[0])
+
+    def test_missing_file(self):
+        missing = os.path.join(self.temp_dir, "missing.bin")
+
+        with pytest.raises(OSError):
+            hash_file(missing)
+        file_sha256, unique_sha256, error = hash_file_or_error(missing)
+        assert (file_sha256, unique_sha256) == (None, None)
+        assert error
+        assert get_file_sha(missing) == (None, None)
+
+
+class TestBackendSelector(ShaHashingTestCase):
+    """set_sha_backend() / get_sha_backend() and _batch_compute_file_shas() dispatch."""
+
+    def test_default_comes_from_settings(self):
+        assert get_sha_backend() == "thread"
+        with override_settings(SHA256_BACKEND="process"):
+            assert get_sha_backend() == "process"
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError):
+            set_sha_backend("fork")
+
+    @override_settings(SHA256_MAX_WORKERS=2, SHA256_PARALLEL_THRESHOLD=2)
+    def test_process_backend_matches_thread_backend(self):
+        missing = os.path.join(self.temp_dir, "missing.bin")
+        paths = self.paths + [missing]
+
+        threaded = _batch_compute_file_shas(paths)
+        set_sha_backend("process")
+        processed = _batch_compute_file_shas(paths)
+
+        assert processed == threaded
+        assert processed[missing] == (None, None)
+        assert processed[self.paths[3]] == _reference_shas(self.paths[3])
+        assert get_sha_backend() == "process"
+
+    @override_settings(SHA256_PARALLEL_THRESHOLD=2)
+    def test_process_pool_failure_falls_back_to_threads(self):
+        set_sha_backend("process")
+
+        with mock.patch.object(common, "ProcessPoolExecutor", side_effect=OSError("no semaphores")):
+            results = _batch_compute_file_shas(self.paths)
+
+        assert results == {path: _reference_shas(path) for path in self.paths}
+        assert get_sha_backend() == "thread"
+
+
+class TestDeviceWorkerLimits(ShaHashingTestCase):
+    """IO_DEVICE_LIMITS caps concurrent reads per volume."""
+
+    def _max_concurrency(self) -> int:
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+        real_get_file_sha = common.get_file_sha
+
+        def tracking_get_file_sha(path):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            try:
+                return real_get_file_sha(path)
+            finally:
+                with lock:
+                    state["active"] -= 1
+
+        with mock.patch.object(common, "get_file_sha", side_effect=tracking_get_file_sha):
+            results = _batch_compute_file_shas(self.paths)
+        assert results == {path: _reference_shas(path) for path in self.paths}
+        return state["peak"]
+
+    @override_settings(SHA256_MAX_WORKERS=4, SHA256_PARALLEL_THRESHOLD=2)
+    def test_limited_volume_is_read_one_file_at_a_time(self):
+        with override_settings(IO_DEVICE_LIMITS={self.temp_dir: 1}):
+            assert self._max_concurrency() == 1
+
+    @override_settings(SHA256_MAX_WORKERS=4, SHA256_PARALLEL_THRESHOLD=2, IO_DEVICE_LIMITS={"/nonexistent/volume": 1})
+    def test_unlisted_or_unmounted_volume_uses_whole_pool(self):
+        if (os.cpu_count() or 4) < 2:
+            pytest.skip("needs at least two CPUs for a multi-worker pool")
+        assert self._max_concurrency() > 1
@@ -0,0 +1,195 @@
+"""
+Tests for the host-wide shared SHA list store in quickbbs/shared_sha_lists.py.
+
+Covers the ShaListView list contract used by layout_manager and
+build_context_info, generation (cache_lastscan) checks, fallbacks for values
+that can't be packed, and the DirectoryIndex._compact_sha_list integration.
+
+No database access — SimpleTestCase throughout, except the on-commit
+removal in clear_layout_cache_for_directories(), which needs a transaction.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import pytest
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quickbbs.cache_registry import clear_layout_cache_for_directories
+from quickbbs.directoryindex import DirectoryIndex
+from quickbbs.packed_shas import PackedShaList
+from quickbbs.shared_sha_lists import ShaListView, shared_sha_lists
+
+pytestmark = pytest.mark.api
+
+
+def _shas(count: int) -> list[str]:
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+class SharedShaListTestCase(SimpleTestCase):
+    """Points SHARED_SHA_LISTS_DIR at a fresh temp directory per test."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self._settings_override = override_settings(SHARED_SHA_LISTS_ENABLED=True, SHARED_SHA_LISTS_DIR=self.temp_dir)
+        self._settings_override.enable()
+
+    def tearDown(self):
+        self._settings_override.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestShaListView(SharedShaListTestCase):
+    """ShaListView behaves like the list it replaces."""
+
+    def test_round_trip_matches_list_operations(self):
+        shas = _shas(50)
+        view = shared_sha_lists.save(7, "distinct", 0, None, 1.5, shas)
+
+        assert isinstance(view, ShaListView)
+        assert len(view) == 50
+        assert view == shas
+        assert view[0] == shas[0]
+        assert view[-1] == shas[-1]
+        assert view[10:15] == shas[10:15]
+        assert view.index(shas[42]) == 42
+        assert shas[3] in view
+        with pytest.raises(IndexError):
+            view[50]  # pylint: disable=pointless-statement
+
+    def test_index_missing_or_malformed_raises_value_error(self):
+        view = shared_sha_lists.save(7, "distinct", 0, None, 1.5, _shas(5))
+
+        with pytest.raises(ValueError):
+            view.index(hashlib.sha256(b"absent").hexdigest())
+        with pytest.raises(ValueError):
+            view.index("not-a-sha")
+
+    def test_index_ignores_matches_straddling_entries(self):
+        # Entry 1 is the second half of X followed by the first half of Y,
+        # so X+Y's byte pattern occurs at a non-aligned offset.
+        first, second = _shas(2)
+        straddle = first[32:] + second[:32]
+        view = shared_sha_lists.save(7, "all", 0, None, 1.0, [first, second, straddle])
+
+        assert view.index(straddle) == 2
+
+    def test_empty_list(self):
+        view = shared_sha_lists.save(7, "all", 0, None, 1.0, [])
+
+        assert len(view) == 0
+        assert not view
+        assert view[0:5] == []
+
+    def test_null_sha_round_trips_as_none(self):
+        shas = _shas(2)
+        view = shared_sha_lists.save(7, "all", 0, None, 1.0, [shas[0], None, shas[1]])
+
+        assert list(view) == [shas[0], None, shas[1]]
+        assert view.index(None) == 1
+
+
+class TestSharedShaListStore(SharedShaListTestCase):
+    """Generation checks, fallbacks, and file removal."""
+
+    def test_load_requires_matching_generation(self):
+        shared_sha_lists.save(7, "distinct", 1, 3, 100.0, _shas(3))
+
+        assert shared_sha_lists.load(7, "distinct", 1, 3, 100.0) == _shas(3)
+        assert shared_sha_lists.load(7, "distinct", 1, 3, 200.0) is None
+        assert shared_sha_lists.load(7, "distinct", 1, None, 100.0) is None
+        assert shared_sha_lists.load(7, "all", 1, 3, 100.0) is None
+
+    def test_unpackable_values_are_not_stored(self):
+        assert shared_sha_lists.save(7, "all", 0, None, 1.0, ["abc"]) is None
+        assert shared_sha_lists.save(7, "all", 0, None, 1.0, [_shas(1)[0].upper()]) is None
+        assert not os.listdir(self.temp_dir)
+
+    def test_discard_directories_only_removes_matching_pk(self):
+        shared_sha_lists.save(7, "all", 0, None, 1.0, _shas(2))
+        shared_sha_lists.save(7, "distinct", 2, 4, 1.0, _shas(2))
+        shared_sha_lists.save(77, "all", 0, None, 1.0, _shas(2))
+
+        assert shared_sha_lists.discard_directories({7}) == 2
+        assert shared_sha_lists.load(77, "all", 0, None, 1.0) is not None
+
+    def test_mapping_survives_unlink(self):
+        view = shared_sha_lists.save(7, "all", 0, None, 1.0, _shas(4))
+        shared_sha_lists.clear()
+
+        assert view == _shas(4)
+
+
+@override_settings(CACHE_BUS_ENABLED=False)
+class TestClearLayoutCache(TestCase):
+    """clear_layout_cache_for_directories() removes the shared files once the write commits."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self._settings_override = override_settings(SHARED_SHA_LISTS_ENABLED=True, SHARED_SHA_LISTS_DIR=self.temp_dir)
+        self._settings_override.enable()
+
+    def tearDown(self):
+        self._settings_override.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_shared_files_are_removed_on_commit(self):
+        shared_sha_lists.save(7, "all", 0, None, 1.0, _shas(2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            clear_layout_cache_for_directories({7}, broadcast=True)
+            assert os.listdir(self.temp_dir)  # not before the commit
+
+        assert not os.listdir(self.temp_dir)
+
+
+class TestDirectoryIndexIntegration(SharedShaListTestCase):
+    """DirectoryIndex._compact_sha_list builds once per generation."""
+
+    def test_second_reader_maps_instead_of_building(self):
+        directory = DirectoryIndex(pk=12, cache_lastscan=5.0)
+        calls = []
+
+        def build():
+            calls.append(1)
+            return _shas(10)
+
+        first = directory._compact_sha_list("distinct", 0, None, build)
+        second = DirectoryIndex(pk=12, cache_lastscan=5.0)._compact_sha_list("distinct", 0, None, build)
+
+        assert len(calls) == 1
+        assert isinstance(second, ShaListView)
+        assert first == second == _shas(10)
+
+    def test_new_cache_lastscan_rebuilds(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return _shas(3)
+
+        DirectoryIndex(pk=12, cache_lastscan=5.0)._compact_sha_list("all", 0, None, build)
+        DirectoryIndex(pk=12, cache_lastscan=6.0)._compact_sha_list("all", 0, None, build)
+
+        assert len(calls) == 2
+
+    @override_settings(SHARED_SHA_LISTS_ENABLED=False)
+    def test_disabled_returns_per_process_packed_list(self):
+        result = DirectoryIndex(pk=12, cache_lastscan=5.0)._compact_sha_list("all", 0, None, lambda: _shas(3))
+
+        assert isinstance(result, PackedShaList)
+        assert not isinstance(result, ShaListView)
+        assert result == _shas(3)
+        assert not os.listdir(self.temp_dir)
+
+    @override_settings(SHARED_SHA_LISTS_ENABLED=False)
+    def test_unpackable_values_fall_back_to_plain_list(self):
+        result = DirectoryIndex(pk=12, cache_lastscan=5.0)._compact_sha_list("all", 0, None, lambda: ["abc", "def"])
+
+        assert result == ["abc", "def"]
+        assert isinstance(result, list)
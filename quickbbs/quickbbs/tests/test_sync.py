@@ -31,9 +31,10 @@ import pytest
 from django.test import TestCase, override_settings
 
 from frontend.file_listings import return_disk_listing_sync
-from quickbbs.directoryindex import update_database_from_disk
+from quickbbs.directoryindex import deferred_sync_cache, update_database_from_disk
 from quickbbs.fileindex import FileIndex
 from quickbbs.models import DirectoryIndex
+from quickbbs.tasks import sync_large_directory
 
 pytestmark = pytest.mark.api
 
@@ -267,6 +268,21 @@ class TestHandleMissing(SyncTestBase):
         assert not DirectoryIndex.objects.filter(pk=sub_pk).exists()
         assert DirectoryIndex.objects.filter(pk=root_pk).exists(), "parent record must survive"
 
+    def test_vanished_subdirectory_takes_its_subtree(self):
+        """sync_subdirectories deletes a vanished subdirectory's own subdirectories too."""
+        nested = os.path.join(self.albums_dir, "gone", "inner", "deepest")
+        os.makedirs(nested)
+        os.makedirs(os.path.join(self.albums_dir, "kept"))
+        self.sync()
+        _, deepest = DirectoryIndex.add_directory(nested + "/")
+        assert deepest is not None
+
+        shutil.rmtree(os.path.join(self.albums_dir, "gone"))
+        self.sync()
+
+        remaining = {d.name for d in DirectoryIndex.objects.all()}
+        assert remaining == {"albums", "kept"}
+
     def test_do_files_exist_reflects_disk_state(self):
         """do_files_exist is True only while the directory has files on record."""
         self.write_file("present.txt")
@@ -477,3 +493,96 @@ class TestTwoStageSyncOptimization(SyncTestBase):
 
         record.refresh_from_db()
         assert record.lastmod != old_lastmod, "sub-second mtime change was not detected"
+
+
+@override_settings(STREAMING_SYNC_THRESHOLD=3, STREAMING_SYNC_CHUNK_SIZE=2)
+class TestStreamingSync(SyncTestBase):
+    """Directories above STREAMING_SYNC_THRESHOLD sync chunk by chunk, same outcome.
+
+    The threshold and chunk size are shrunk so a handful of files exercises
+    several chunks plus the end-of-listing deletion pass.
+    """
+
+    def write_files(self, count: int) -> list[str]:
+        """Create file_0.txt .. file_<count-1>.txt with distinct content."""
+        return [self.write_file(f"file_{i}.txt", content=f"payload {i}".encode()) for i in range(count)]
+
+    def test_large_directory_is_streamed_in_chunks(self):
+        """Every file and subdirectory is created; progress is logged per chunk."""
+        self.write_files(5)
+        os.makedirs(os.path.join(self.albums_dir, "sub_dir"))
+
+        with self.assertLogs("quickbbs.directoryindex", level="INFO") as captured:
+            self.sync()
+
+        assert {n.lower() for n in self.file_pks()} == {f"file_{i}.txt" for i in range(5)}
+        assert DirectoryIndex.objects.filter(parent_directory=self.dir_obj, delete_pending=False).count() == 1
+        assert sum("Streaming sync " in message and "files processed" in message for message in captured.output) == 3
+        assert any("Directory rescan took" in message and "6 files" in message for message in captured.output)
+
+    def test_streamed_resync_deletes_only_vanished_files(self):
+        """RULE 1 holds across chunks: survivors keep PKs, only the removed file goes."""
+        paths = self.write_files(5)
+        self.sync()
+        before = self.file_pks()
+
+        os.remove(paths[3])
+        self.write_file("late_arrival.txt")
+        self.sync()
+
+        after = self.file_pks()
+        assert {n.lower() for n in set(before) - set(after)} == {"file_3.txt"}
+        assert {n.lower() for n in set(after) - set(before)} == {"late_arrival.txt"}
+        for name, pk in after.items():
+            if name in before:
+                assert before[name] == pk, f"survivor {name} was recreated with a new PK"
+
+    def test_streamed_unchanged_resync_writes_nothing(self):
+        """An unchanged large directory issues no bulk writes."""
+        self.write_files(5)
+        self.sync()
+
+        with mock.patch.object(FileIndex, "bulk_sync", wraps=FileIndex.bulk_sync) as bulk_sync:
+            self.sync()
+
+        for call in bulk_sync.call_args_list:
+            records_to_update, records_to_create, records_to_delete_ids, _ = call.args
+            assert not (records_to_update or records_to_create or records_to_delete_ids)
+
+    def test_web_sync_of_large_directory_is_queued(self):
+        """defer_large queues the sync once and leaves the request's directory unsynced."""
+        deferred_sync_cache.clear()
+        self.addCleanup(deferred_sync_cache.clear)
+        self.write_files(5)
+        self.dir_obj.invalidate_cache()
+        self.dir_obj.refresh_from_db()
+
+        with mock.patch("quickbbs.tasks.sync_large_directory") as sync_task:
+            assert update_database_from_disk(self.dir_obj, defer_large=True) is self.dir_obj
+            assert update_database_from_disk(self.dir_obj, defer_large=True) is self.dir_obj
+
+        sync_task.using.return_value.enqueue.assert_called_once_with(self.dir_obj.pk)
+        assert not self.file_pks()
+        self.dir_obj.refresh_from_db()
+        assert not self.dir_obj.is_cached
+
+    def test_queued_sync_task_streams_the_directory(self):
+        """sync_large_directory runs the streaming sync the web view deferred."""
+        self.write_files(5)
+        self.dir_obj.invalidate_cache()
+
+        assert sync_large_directory.call(self.dir_obj.pk)
+        assert len(self.file_pks()) == 5
+        self.dir_obj.refresh_from_db()
+        assert self.dir_obj.is_cached
+
+    @override_settings(STREAMING_SYNC_THRESHOLD=0)
+    def test_threshold_zero_uses_single_pass_sync(self):
+        """STREAMING_SYNC_THRESHOLD = 0 disables streaming entirely."""
+        self.write_files(5)
+
+        with mock.patch.object(DirectoryIndex, "sync_files_streaming") as streaming:
+            self.sync()
+
+        streaming.assert_not_called()
+        assert len(self.file_pks()) == 5
@@ -43,6 +43,7 @@ if settings.DEBUG_TOOLBAR:
 urlpatterns += [
     # Reports
     path("reports/duplicate_files.html", frontend.report_views.duplicate_files_report, name="duplicate_files_report"),
+    path("reports/near_duplicate_files.html", frontend.report_views.near_duplicate_files_report, name="near_duplicate_files_report"),
     path("search/", frontend.views.search_viewresults, name="search_viewresults"),
     path(
         "preferences/toggle-duplicates/",
@@ -75,6 +76,11 @@ urlpatterns += [
         thumbnails.views.thumbnail_dir,
         name="thumbnail_dir",
     ),
+    path(
+        "thumbnail_multipart/",
+        thumbnails.views.thumbnail_multipart,
+        name="thumbnail_multipart",
+    ),
     path(
         "resources/<path:pathstr>",
         frontend.serve_up.static_or_resources,
@@ -9,6 +9,10 @@
 #     have them yet. Enqueued automatically when a gallery page loads and
 #     missing thumbnails are detected.
 #
+#   - sync_large_directory: Syncs a directory too large to sync inside a
+#     web request (over STREAMING_SYNC_THRESHOLD entries). Enqueued when a
+#     gallery page for such a directory finds it out of date.
+#
 #   - daily_cleanup_finished_jobs: Periodic task that runs at midnight to
 #     purge completed task records from the database.
 #
@@ -45,6 +49,7 @@ echo "Backend:  django-dbtasks (DatabaseBackend)"
 echo ""
 echo "Tasks handled:"
 echo "  - generate_missing_thumbnails (on-demand)"
+echo "  - sync_large_directory (on-demand)"
 echo "  - daily_cleanup_finished_jobs (daily at midnight)"
 echo ""
 
@@ -5,8 +5,11 @@ import zipfile
 
 from django.contrib import admin
 from django.http import HttpResponse
+from django.utils import timezone
 
-from thumbnails.models import ThumbnailFiles
+from thumbnails.engine import get_encoder
+from thumbnails.generation_queue import QUEUE_PRIORITY_NAMES, thumbnail_queue_stats
+from thumbnails.models import ThumbnailFiles, ThumbnailQueueEntry
 
 
 @admin.register(ThumbnailFiles)
@@ -19,6 +22,8 @@ class AdminThumbnail_Files(admin.ModelAdmin):
         "mthumb",
         "lthumb",
         "sha256_hash",
+        "encoding",
+        "perceptual_hash",
     )
 
     search_fields = ["sha256_hash", "id"]
@@ -26,13 +31,17 @@ class AdminThumbnail_Files(admin.ModelAdmin):
     list_display = (
         "id",
         "sha256_hash",
+        "encoding",
         "sthumb",
         "mthumb",
         "lthumb",
     )
+    list_filter = ["encoding"]
     fields = (
         "id",
         "sha256_hash",
+        "encoding",
+        "perceptual_hash",
         "sthumb",
         "mthumb",
         "lthumb",
@@ -46,7 +55,7 @@ class AdminThumbnail_Files(admin.ModelAdmin):
 
         Creates a ZIP file containing all thumbnail sizes (small, medium, large)
         for the selected ThumbnailFiles records. Files are named using the format:
-        <sha256_hash>_<size>.jpg
+        <sha256_hash>_<size>.<extension of the row's encoding>
 
         Args:
             request: Django HttpRequest object.
@@ -62,20 +71,12 @@ class AdminThumbnail_Files(admin.ModelAdmin):
             for thumb in queryset:
                 sha = thumb.sha256_hash
 
-                # Add small thumbnail if exists
-                if thumb.small_thumb:
-                    filename = f"{sha}_small.jpg"
-                    zip_file.writestr(filename, thumb.small_thumb)
-
-                # Add medium thumbnail if exists
-                if thumb.medium_thumb:
-                    filename = f"{sha}_medium.jpg"
-                    zip_file.writestr(filename, thumb.medium_thumb)
-
-                # Add large thumbnail if exists
-                if thumb.large_thumb:
-                    filename = f"{sha}_large.jpg"
-                    zip_file.writestr(filename, thumb.large_thumb)
+                # Add each size that exists (database column or blob store)
+                extension = get_encoder(thumb.encoding).extension
+                for size in ("small", "medium", "large"):
+                    blob = thumb.retrieve_sized_tnail(size)
+                    if blob:
+                        zip_file.writestr(f"{sha}_{size}{extension}", blob)
 
         # Prepare HTTP response
         zip_buffer.seek(0)
@@ -110,3 +111,39 @@ class AdminThumbnail_Files(admin.ModelAdmin):
             return obj.large_thumb[0:25]
         else:
             return "None"
+
+
+@admin.register(ThumbnailQueueEntry)
+class ThumbnailQueueEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the thumbnail generation queue, with depth and age above the list."""
+
+    list_display = ("sha256_hash", "get_priority", "directory_id", "enqueued_at", "get_age", "claimed_at")
+    list_filter = ["priority"]
+    search_fields = ["sha256_hash"]
+    ordering = ("-priority", "enqueued_at")
+    readonly_fields = ("sha256_hash", "priority", "directory_id", "enqueued_at", "claimed_at")
+    change_list_template = "admin/thumbnails/thumbnailqueueentry/change_list.html"
+
+    def has_add_permission(self, request) -> bool:
+        """Disallow manual creation — rows are added by enqueue_thumbnails()."""
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        """Disallow edits — rows are claimed and removed by process_thumbnail_queue."""
+        return False
+
+    @admin.display(description="Priority", ordering="priority")
+    def get_priority(self, obj: ThumbnailQueueEntry) -> str:
+        """Return the priority's name."""
+        return QUEUE_PRIORITY_NAMES.get(obj.priority, str(obj.priority))
+
+    @admin.display(description="Age")
+    def get_age(self, obj: ThumbnailQueueEntry) -> str:
+        """Return how long the row has been queued, in seconds."""
+        return f"{(timezone.now() - obj.enqueued_at).total_seconds():.0f}s"
+
+    def changelist_view(self, request, extra_context=None):
+        """Add thumbnail_queue_stats() to the change list context."""
+        extra_context = extra_context or {}
+        extra_context["queue_stats"] = thumbnail_queue_stats()
+        return super().changelist_view(request, extra_context)
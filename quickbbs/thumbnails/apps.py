@@ -21,3 +21,6 @@ class ThumbnailsConfig(AppConfig):
         from thumbnails.engine import config
 
         config.macintosh_optimizations = bool(getattr(settings, "MACINTOSH_OPTIMIZATIONS", False))
+        config.video_decoder_workers = settings.VIDEO_DECODER_WORKERS
+        config.video_decoder_max_files = settings.VIDEO_DECODER_MAX_FILES
+        config.video_decoder_timeout = settings.VIDEO_DECODER_TIMEOUT
@@ -0,0 +1,184 @@
+"""
+On-disk storage tier for thumbnail blobs, outside PostgreSQL TOAST.
+
+ThumbnailFiles keeps its small/medium/large JPEGs in bytea columns, so the
+thumbnail tables hold hundreds of GB of TOAST data and every thumbnail hit
+pays a DB round-trip, a detoast, and a bytes() copy before the response is
+even built.
+
+Sizes listed in THUMBNAIL_BLOB_STORE_SIZES are written here instead: one
+content-addressed file per (size, SHA256) under THUMBNAIL_BLOB_STORE_PATH,
+sharded by hash prefix so no directory grows past a few thousand entries:
+
+    <THUMBNAIL_BLOB_STORE_PATH>/<size>/<sha[0:2]>/<sha[2:4]>/<sha>.jpg
+
+The .jpg extension is historical: the file holds whatever the row's
+encoding column says (JPEG, WebP, AVIF), and the Content-Type comes from
+that column, never from the file name.
+
+The row keeps its metadata and NULL in the blob column, with
+ThumbnailFiles.blobs_in_store set — "every size whose column is NULL lives in
+the blob store". Serving opens the file and hands it to FileResponse, which
+streams it with wsgi.file_wrapper (sendfile(2) under gunicorn) instead of
+copying it through Python.
+
+Files are written to a temporary name and os.replace()d into place, so a
+reader never sees a half-written blob. The key is the source file's SHA256,
+which also keys the ThumbnailFiles row, so a regenerated thumbnail simply
+replaces the previous file. Files of deleted or invalidated rows are left
+behind until "manage.py migrate_thumbnail_blobs --prune" removes them.
+
+Changing THUMBNAIL_BLOB_STORE_SIZES only affects thumbnails written from then
+on; "manage.py migrate_thumbnail_blobs" moves existing blobs in either
+direction.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import string
+import tempfile
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = ("small", "medium", "large")
+
+_HEX_DIGITS = frozenset(string.hexdigits)
+
+
+def _process_umask() -> int:
+    """Return the process umask (os.umask() can only be read by setting it)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Mode of written blob files: 0644 less the umask. mkstemp() creates its file
+# 0600, which os.replace() keeps, and a web or static server running as
+# another user could not read it. Read once at import, before any threads.
+_BLOB_FILE_MODE = 0o644 & ~_process_umask()
+
+
+def stored_sizes() -> frozenset[str]:
+    """
+    Return the thumbnail sizes written to the blob store (settings.THUMBNAIL_BLOB_STORE_SIZES).
+
+    Raises:
+        ValueError: If the setting names an unknown size.
+    """
+    sizes = frozenset(settings.THUMBNAIL_BLOB_STORE_SIZES)
+    unknown = sizes.difference(THUMBNAIL_SIZES)
+    if unknown:
+        raise ValueError(f"Unknown thumbnail size(s) in THUMBNAIL_BLOB_STORE_SIZES: {sorted(unknown)}")
+    return sizes
+
+
+class FileBlobStore:
+    """
+    Content-addressed thumbnail files, sharded by SHA256 prefix.
+
+    The root is read from settings per call so tests can override it.
+    """
+
+    @property
+    def root(self) -> str:
+        """Directory holding the per-size blob trees."""
+        return settings.THUMBNAIL_BLOB_STORE_PATH
+
+    def path(self, sha256: str, size: str) -> str:
+        """
+        Return the file path for one thumbnail blob.
+
+        Raises:
+            ValueError: For an unknown size or a key that is not a SHA256
+                hex digest (keeps arbitrary strings out of the path).
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unknown thumbnail size: {size!r}")
+        if len(sha256) != 64 or not _HEX_DIGITS.issuperset(sha256):
+            raise ValueError(f"Not a SHA256 hex digest: {sha256!r}")
+        return os.path.join(self.root, size, sha256[0:2], sha256[2:4], f"{sha256}.jpg")
+
+    def write(self, sha256: str, size: str, data: bytes | memoryview) -> None:
+        """
+        Write a blob atomically, replacing any previous file for the key.
+
+        Raises:
+            OSError: If the file could not be written.
+        """
+        path = self.path(sha256, size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per call: taskrunner threads may write the same key at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{sha256}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                os.fchmod(handle.fileno(), _BLOB_FILE_MODE)
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def open(self, sha256: str, size: str) -> BinaryIO | None:
+        """
+        Open a blob for streaming, or return None if it is missing.
+
+        The caller owns the handle (FileResponse closes it when the response
+        is finished).
+        """
+        path = self.path(sha256, size)
+        try:
+            return open(path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Thumbnail blob %s unreadable: %s", path, e)
+            return None
+
+    def read(self, sha256: str, size: str) -> bytes | None:
+        """Return a blob's bytes, or None if it is missing or unreadable."""
+        handle = self.open(sha256, size)
+        if handle is None:
+            return None
+        with handle:
+            return handle.read()
+
+    def blob_size(self, sha256: str, size: str) -> int | None:
+        """Return a blob's length in bytes, or None if it is missing."""
+        try:
+            return os.stat(self.path(sha256, size)).st_size
+        except OSError:
+            return None
+
+    def delete(self, sha256: str, size: str) -> bool:
+        """
+        Remove a blob.
+
+        Returns:
+            True if a file was removed
+        """
+        try:
+            os.unlink(self.path(sha256, size))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def iter_hashes(self, size: str) -> Iterator[str]:
+        """Yield the SHA256 of every blob stored for a size (directory walk, no order)."""
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unknown thumbnail size: {size!r}")
+        for _, _, filenames in os.walk(os.path.join(self.root, size)):
+            for filename in filenames:
+                if filename.endswith(".jpg"):
+                    yield filename[:-4]
+
+
+thumbnail_blob_store = FileBlobStore()
@@ -15,7 +15,7 @@ Typical use::
     thumbs = create_thumbnails_from_path(
         "/albums/photos/cover.jpg",
         {"small": (200, 200), "large": (1024, 1024)},
-        output="JPEG",
+        output="JPEG",  # or "WEBP" / "AVIF" (see encoders.py)
         quality=85,
     )
 """
@@ -23,6 +23,15 @@ Typical use::
 from __future__ import annotations
 
 from .config import EngineConfig, config
+from .encoders import (
+    ThumbnailEncoder,
+    available_encodings,
+    encode_image,
+    encoding_available,
+    get_encoder,
+    register_encoder,
+    transcode_image_bytes,
+)
 from .engine import (
     BackendType,
     FastImageProcessor,
@@ -33,6 +42,7 @@ from .engine import (
     get_cache_stats,
     get_video_info,
     is_all_white_thumbnail,
+    probe_media,
     resolve_backend_name,
 )
 from .exceptions import (
@@ -42,6 +52,7 @@ from .exceptions import (
     UnsupportedFormatError,
     VideoProcessingError,
 )
+from .perceptual_hash import find_similar_groups, hamming_distance, perceptual_hash
 
 __all__ = [
     "BackendType",
@@ -49,16 +60,27 @@ __all__ = [
     "FastImageProcessor",
     "MediaProcessingError",
     "PDFProcessingError",
+    "ThumbnailEncoder",
     "ThumbnailGenerationError",
     "UnsupportedFormatError",
     "VideoProcessingError",
+    "available_encodings",
     "clear_backend_caches",
     "config",
     "create_thumbnails_from_bytes",
     "create_thumbnails_from_path",
     "create_thumbnails_from_pil",
+    "encode_image",
+    "encoding_available",
+    "find_similar_groups",
     "get_cache_stats",
+    "get_encoder",
     "get_video_info",
+    "hamming_distance",
     "is_all_white_thumbnail",
+    "perceptual_hash",
+    "probe_media",
+    "register_encoder",
     "resolve_backend_name",
+    "transcode_image_bytes",
 ]
@@ -50,6 +50,8 @@ class AVFoundationVideoBackend(AbstractBackend):
         ['duration', 'format', 'small']
     """
 
+    uses_media_info = True
+
     def __init__(self):
         """Initialize the AVFoundation video backend.
 
@@ -84,6 +86,7 @@ class AVFoundationVideoBackend(AbstractBackend):
         sizes: dict[str, tuple[int, int]],
         output_format: str,
         quality: int,
+        media_info: dict[str, Any] | None = None,
     ) -> dict[str, bytes]:
         """Process a video file and generate thumbnails using AVFoundation.
 
@@ -95,6 +98,8 @@ class AVFoundationVideoBackend(AbstractBackend):
             sizes: Dictionary mapping size names to (width, height) tuples.
             output_format: Output format (JPEG, PNG, WEBP).
             quality: Image quality (1-100).
+            media_info: Previously probed metadata; when it carries a
+                'duration', the metadata probe is skipped.
 
         Returns:
             Dictionary with 'duration' (float seconds), 'format' (the output
@@ -115,8 +120,8 @@ class AVFoundationVideoBackend(AbstractBackend):
 
             output = {}
 
-            # Get video metadata
-            video_data = _get_video_info(str(file_path))
+            # Get video metadata (unless the caller already probed it)
+            video_data = media_info if media_info and media_info.get("duration") else _get_video_info(str(file_path))
             output["duration"] = video_data["duration"]
 
             # Calculate capture time (middle of video)
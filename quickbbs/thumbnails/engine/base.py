@@ -3,6 +3,7 @@ Abstract base class for image processing backends.
 """
 
 from abc import ABC, abstractmethod
+from typing import ClassVar
 
 from PIL import Image
 
@@ -12,6 +13,10 @@ class AbstractBackend(ABC):
 
     __slots__ = ()
 
+    # True for backends whose process_from_file() accepts a media_info
+    # keyword (previously probed duration/width/height — the video backends).
+    uses_media_info: ClassVar[bool] = False
+
     @abstractmethod
     def process_from_file(
         self,
@@ -21,9 +21,20 @@ class EngineConfig:
             consult this; an explicit request such as "coreimage" is never
             gated by it. Defaults to True so that standalone use gets the
             fastest available backend without configuration.
+        video_decoder_workers: Maximum long-lived PyAV decoder helper
+            processes VideoBackend may use (see video_decoder.py); 0 keeps
+            the per-file ffmpeg/ffprobe subprocesses. Ignored when PyAV is
+            not installed.
+        video_decoder_max_files: Files a decoder helper serves before it is
+            replaced, bounding leaks in the native libraries.
+        video_decoder_timeout: Seconds to wait for one file's frame before
+            the helper is killed and the file reported as failed.
     """
 
     macintosh_optimizations: bool = True
+    video_decoder_workers: int = 2
+    video_decoder_max_files: int = 500
+    video_decoder_timeout: float = 30.0
 
 
 config = EngineConfig()
@@ -70,8 +70,8 @@ except ImportError:
     _create_metal_device = None  # type: ignore[assignment]
 
 from .base import AbstractBackend
-from .exceptions import MediaProcessingError, UnsupportedFormatError
-from .pil_thumbnails import convert_image_for_format
+from .encoders import encode_image
+from .exceptions import MediaProcessingError
 
 
 @contextmanager
@@ -350,16 +350,20 @@ class CoreImageBackend(AbstractBackend):
         createCGImage:fromRect: to avoid IOSurface GPU memory leaks. The GPU
         renders directly into a CPU-side bytearray — no IOSurface is allocated.
 
-        PIL handles the final encoding to JPEG/PNG/WEBP, which is fast since
-        the thumbnail pixels are already small after GPU-accelerated Lanczos scaling.
+        PIL handles the final encoding (encoders.py: JPEG/PNG/WEBP/AVIF), which
+        is fast since the thumbnail pixels are already small after
+        GPU-accelerated Lanczos scaling.
 
         Args:
             ci_image: Core Image CIImage object to render
-            output_format: Output format (JPEG, PNG, WEBP)
+            output_format: Output format (JPEG, PNG, WEBP, AVIF)
             quality: Image quality (1-100)
 
         Returns:
             Image data as bytes
+
+        Raises:
+            UnsupportedFormatError: If the encoding is unknown or unavailable.
         """
         with autorelease_pool():
             extent = ci_image.extent()
@@ -392,26 +396,14 @@ class CoreImageBackend(AbstractBackend):
             # Convert raw RGBA bitmap to target format using PIL
             pil_img = Image.frombytes("RGBA", (width, height), bytes(bitmap_data))
 
-            buffer = io.BytesIO()
-            fmt = output_format.upper()
-            if fmt == "JPEG":
-                # Composite transparency onto a white background (same helper the
-                # PIL backend uses) instead of convert("RGB"), which drops alpha
-                # and leaves transparent regions black. Core Image output is
-                # premultiplied alpha, so semi-transparent edge pixels composite
-                # slightly darker than the PIL path; fully transparent/opaque
-                # pixels — the ones that matter for parity — are exact.
-                pil_img = convert_image_for_format(pil_img, "JPEG")
-                pil_img.save(buffer, format="JPEG", quality=quality)
-            elif fmt == "PNG":
-                pil_img.save(buffer, format="PNG")
-            elif fmt == "WEBP":
-                pil_img.save(buffer, format="WEBP", quality=quality)
-            else:
-                raise UnsupportedFormatError(output_format)
-
-            result = buffer.getvalue()
-            buffer.close()
-            pil_img.close()
-
-            return result
+            # For JPEG the encoder composites transparency onto a white
+            # background (convert_image_for_format, as in the PIL backend)
+            # instead of convert("RGB"), which drops alpha and leaves
+            # transparent regions black. Core Image output is premultiplied
+            # alpha, so semi-transparent edge pixels composite slightly darker
+            # than the PIL path; fully transparent/opaque pixels — the ones
+            # that matter for parity — are exact.
+            try:
+                return encode_image(pil_img, output_format, quality)
+            finally:
+                pil_img.close()
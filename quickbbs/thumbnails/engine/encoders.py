@@ -0,0 +1,195 @@
+"""Output encoders for thumbnail blobs.
+
+Every backend ends with the same step: a small, already-scaled PIL image is
+written out as bytes. That step lives here, so the output encoding is a
+plain name ("JPEG", "WEBP", "AVIF", "PNG") looked up in one registry instead
+of an if/elif chain repeated in each backend.
+
+WebP is built into Pillow. AVIF is built into Pillow 11.2 and later (when
+its libavif was compiled in); older Pillow releases get it from the
+pillow-avif-plugin package, which registers the format on import. An
+encoding whose codec is missing is reported by encoding_available(), and
+encoding with it raises UnsupportedFormatError; its registry entry (MIME
+type, extension) stays available for blobs written elsewhere.
+
+    >>> encode_image(img, "WEBP", quality=80)
+    b'RIFF...'
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from typing import Any
+
+from PIL import Image, features
+
+from .exceptions import UnsupportedFormatError
+
+
+def convert_image_for_format(img: Image.Image, output_format: str) -> Image.Image:
+    """
+    Convert PIL Image to appropriate color mode for output format.
+
+    Handles conversion of RGBA/P/LA images to RGB for JPEG compatibility,
+    which doesn't support transparency. Uses white background for transparency.
+
+    MEMORY SAFETY: This function may return a NEW Image object. The caller
+    must close the original image if it's no longer needed.
+
+    Args:
+        img: PIL Image object to convert
+        output_format: Target format (JPEG, PNG, WEBP, etc.)
+
+    Returns:
+        Converted PIL Image object ready for saving in target format
+    """
+    # JPEG doesn't support transparency - convert RGBA/P/LA to RGB with white background
+    if output_format.upper() == "JPEG" and img.mode in ("RGBA", "P", "LA"):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        if img.mode == "P":
+            # Convert P mode to RGBA first
+            rgba_img = img.convert("RGBA")
+            background.paste(rgba_img, mask=rgba_img.split()[-1])
+            rgba_img.close()  # Close intermediate RGBA image
+        else:
+            # img is already RGBA or LA
+            background.paste(img, mask=img.split()[-1])
+        return background
+    # Convert exotic color modes to RGB
+    if img.mode not in ("RGB", "RGBA", "L"):
+        return img.convert("RGB")
+    return img
+
+
+@dataclass(frozen=True)
+class ThumbnailEncoder:
+    """One output encoding.
+
+    Attributes:
+        name: Canonical upper-case name, as passed to Image.save(format=...).
+        mime_type: Content-Type of the encoded bytes.
+        extension: File name extension for the encoded bytes.
+        save_options: Extra Image.save() keyword arguments.
+        uses_quality: Whether the quality argument applies (False for PNG).
+        available: Returns True when the installed Pillow can write it.
+    """
+
+    name: str
+    mime_type: str
+    extension: str
+    save_options: dict[str, Any] = field(default_factory=dict)
+    uses_quality: bool = True
+    available: Callable[[], bool] = lambda: True
+
+    def encode(self, img: Image.Image, quality: int) -> bytes:
+        """Encode a PIL image, converting its mode first where the encoding requires it.
+
+        Does not take ownership of img; a converted copy is closed here.
+
+        Raises:
+            UnsupportedFormatError: If this Pillow installation can't write
+                the encoding.
+        """
+        if not self.available():
+            raise UnsupportedFormatError(self.name)
+        converted = convert_image_for_format(img, self.name)
+        buffer = io.BytesIO()
+        try:
+            options = dict(self.save_options)
+            if self.uses_quality:
+                options["quality"] = quality
+            converted.save(buffer, format=self.name, **options)
+            return buffer.getvalue()
+        finally:
+            buffer.close()
+            if converted is not img:
+                converted.close()
+
+
+@functools.cache
+def _avif_available() -> bool:
+    """Return True if Pillow can write AVIF, natively or through pillow-avif-plugin."""
+    try:
+        if features.check("avif"):
+            return True
+    except ValueError:
+        pass  # Pillow < 11.2 does not know the feature name
+    if find_spec("pillow_avif") is None:
+        return False
+    import pillow_avif  # noqa: F401  # pylint: disable=import-outside-toplevel,unused-import
+
+    return True
+
+
+_ENCODERS: dict[str, ThumbnailEncoder] = {}
+
+# Accepted spellings for a registered encoding
+_ALIASES = {"JPG": "JPEG"}
+
+
+def register_encoder(encoder: ThumbnailEncoder) -> None:
+    """Add (or replace) an encoding in the registry."""
+    _ENCODERS[encoder.name] = encoder
+
+
+# optimize=True makes the JPEG/PNG encoders search for smaller output; JPEG
+# is baseline (progressive=True costs 20-30% more encode time).
+register_encoder(ThumbnailEncoder("JPEG", "image/jpeg", ".jpg", {"optimize": True}))
+register_encoder(ThumbnailEncoder("PNG", "image/png", ".png", {"optimize": True}, uses_quality=False))
+register_encoder(ThumbnailEncoder("WEBP", "image/webp", ".webp", available=lambda: features.check("webp")))
+# speed 8: close to the default speed-6 size at roughly half the encode time
+register_encoder(ThumbnailEncoder("AVIF", "image/avif", ".avif", {"speed": 8}, available=_avif_available))
+
+
+def canonical_encoding(name: str) -> str:
+    """Return the registry name for an encoding name ("jpg" → "JPEG")."""
+    upper = name.upper()
+    return _ALIASES.get(upper, upper)
+
+
+def get_encoder(name: str) -> ThumbnailEncoder:
+    """Return the registered encoder for a name (available or not).
+
+    Raises:
+        UnsupportedFormatError: If no encoder is registered under the name.
+    """
+    encoder = _ENCODERS.get(canonical_encoding(name))
+    if encoder is None:
+        raise UnsupportedFormatError(name)
+    return encoder
+
+
+def encoding_available(name: str) -> bool:
+    """Return True if thumbnails can be written in this encoding here."""
+    encoder = _ENCODERS.get(canonical_encoding(name))
+    return encoder is not None and encoder.available()
+
+
+def available_encodings() -> list[str]:
+    """Return the registered encodings this Pillow installation can write."""
+    return [name for name, encoder in _ENCODERS.items() if encoder.available()]
+
+
+def encode_image(img: Image.Image, output_format: str, quality: int) -> bytes:
+    """Encode a PIL image as output_format.
+
+    Raises:
+        UnsupportedFormatError: If the encoding is unknown or unavailable.
+    """
+    return get_encoder(output_format).encode(img, quality)
+
+
+def transcode_image_bytes(image_bytes: bytes, output_format: str, quality: int) -> bytes:
+    """Decode an encoded thumbnail and re-encode it as output_format.
+
+    Used to serve a stored blob to a client that can't decode its encoding,
+    and to convert stored thumbnails between encodings.
+    """
+    encoder = get_encoder(output_format)
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        return encoder.encode(img, quality)
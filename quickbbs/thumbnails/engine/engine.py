@@ -164,6 +164,35 @@ def get_video_info(path: str) -> dict[str, Any]:
         return _ffmpeg_get_video_info(path)
 
 
+def probe_media(path: str) -> dict[str, Any]:
+    """Return container and stream metadata for a video or audio file.
+
+    Uses a long-lived PyAV decoder helper when available (video_decoder.py —
+    no process start per file), otherwise ffprobe. Unlike get_video_info(),
+    audio-only files are accepted.
+
+    Args:
+        path: Fully qualified path to the media file.
+
+    Returns:
+        Dictionary with 'duration', 'format', 'bit_rate', 'width', 'height',
+        'fps', 'codec', 'audio_codec', 'audio_channels' and 'sample_rate'
+        (None when absent).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        MediaProcessingError: If the file can't be probed or has no video
+            or audio stream.
+    """
+    from .video_decoder import video_decoder_enabled, video_decoder_pool
+
+    if video_decoder_enabled():
+        return video_decoder_pool.probe(path)
+    from .video_thumbnails import _probe_media
+
+    return _probe_media(path)
+
+
 def is_all_white_thumbnail(small_thumb: bytes | memoryview | None) -> bool:
     """Return True if the thumbnail blob decodes to an entirely white image.
 
@@ -324,8 +353,16 @@ class FastImageProcessor:
         """Get name of currently active backend."""
         return type(self._backend).__name__
 
-    def process_image_file(self, file_path: str, output_format: str = "JPEG", quality: int = 85) -> dict[str, bytes]:
-        """Process image file and generate multiple thumbnails."""
+    def process_image_file(
+        self, file_path: str, output_format: str = "JPEG", quality: int = 85, media_info: dict[str, Any] | None = None
+    ) -> dict[str, bytes]:
+        """Process image file and generate multiple thumbnails.
+
+        media_info (previously probed video metadata) is passed on only to
+        backends that use it; the others ignore it.
+        """
+        if media_info is not None and self._backend.uses_media_info:
+            return self._backend.process_from_file(file_path, self.image_sizes, output_format, quality, media_info=media_info)  # type: ignore[call-arg]
         return self._backend.process_from_file(file_path, self.image_sizes, output_format, quality)
 
     def process_image_bytes(self, image_bytes: bytes, output_format: str = "JPEG", quality: int = 85) -> dict[str, bytes]:
@@ -515,6 +552,7 @@ def create_thumbnails_from_path(
     output: str = "JPEG",
     quality: int = 85,
     backend: BackendType = "auto",
+    media_info: dict[str, Any] | None = None,
 ) -> dict[str, bytes]:
     """Create thumbnails from a file path with processor caching.
 
@@ -525,9 +563,12 @@ def create_thumbnails_from_path(
         file_path: Path to the source media file (image, video, or PDF —
             must match the chosen backend).
         sizes: Dictionary mapping size names to (width, height) tuples.
-        output: Output format (JPEG, PNG, WEBP).
+        output: Output encoding (JPEG, PNG, WEBP, AVIF — see encoders.py).
         quality: Image quality (1-100).
         backend: Backend selector; see FastImageProcessor for valid values.
+        media_info: Optional previously probed video metadata ('duration',
+            'width', 'height', as returned by probe_media()). Video backends
+            use it to choose the seek offset without probing the file again.
 
     Returns:
         Dictionary mapping size names to thumbnail bytes. Video and PDF
@@ -545,7 +586,7 @@ def create_thumbnails_from_path(
         True
     """
     proc = _get_cached_processor(sizes, backend)
-    return proc.process_image_file(file_path, output, quality)
+    return proc.process_image_file(file_path, output, quality, media_info=media_info)
 
 
 def create_thumbnails_from_pil(
@@ -560,7 +601,7 @@ def create_thumbnails_from_pil(
     Args:
         pil_image: PIL Image object to process.
         sizes: Dictionary mapping size names to (width, height) tuples.
-        output: Output format (JPEG, PNG, WEBP).
+        output: Output encoding (JPEG, PNG, WEBP, AVIF — see encoders.py).
         quality: Image quality (1-100).
         backend: Backend selector; see FastImageProcessor for valid values.
 
@@ -583,7 +624,7 @@ def create_thumbnails_from_bytes(
     Args:
         image_bytes: Raw image (or PDF, per backend) data as bytes.
         sizes: Dictionary mapping size names to (width, height) tuples.
-        output: Output format (JPEG, PNG, WEBP).
+        output: Output encoding (JPEG, PNG, WEBP, AVIF — see encoders.py).
         quality: Image quality (1-100).
         backend: Backend selector; see FastImageProcessor for valid values.
 
@@ -38,7 +38,14 @@ class PDFBackend(AbstractBackend):
     @lru_cache(maxsize=500)  # ASYNC-SAFE: Pure function (no DB/IO, deterministic computation)
     def _calculate_optimal_zoom(page_width: float, page_height: float, target_width: int, target_height: int) -> float:
         """
-        Calculate the optimal zoom to render a PDF page slightly larger than target size.
+        Calculate the smallest zoom that renders a PDF page at the target size.
+
+        The page is rasterized directly at the scale the largest thumbnail
+        needs — the PDF counterpart of ImageBackend's reduced-scale decode.
+        The former 10% oversize buffer cost ~21% more rasterized pixels and
+        was then thrown away by the resize. The zoom is nudged up by half a
+        pixel so rounding in get_pixmap() never lands one pixel short of the
+        target (which would make the largest thumbnail a pixel smaller).
 
         Cached to avoid redundant calculations for similar page dimensions.
 
@@ -49,15 +56,14 @@ class PDFBackend(AbstractBackend):
             target_height: Target height in pixels.
 
         Returns:
-            Zoom factor that fits the page within the target bounds, with a
-            10% buffer for quality.
+            Zoom factor that fits the page within the target bounds.
         """
         # Calculate zoom for each dimension (fit within target bounds)
-        zoom_x = target_width / page_width
-        zoom_y = target_height / page_height
+        zoom_x = (target_width + 0.5) / page_width
+        zoom_y = (target_height + 0.5) / page_height
 
-        # Use smaller zoom to fit, add 10% buffer for quality
-        return min(zoom_x, zoom_y) * 1.1
+        # Use smaller zoom to fit
+        return min(zoom_x, zoom_y)
 
     def _render_pdf_page(
         self,
@@ -69,8 +75,8 @@ class PDFBackend(AbstractBackend):
         """
         Render a PDF page to thumbnails in every requested size.
 
-        Renders once at the optimal zoom for the largest size, then resizes
-        via the PIL backend.
+        Renders once at the smallest zoom that covers the largest size (see
+        _calculate_optimal_zoom), then resizes via the PIL backend.
 
         ASYNC-SAFE: Pure computation with no DB/IO operations.
 
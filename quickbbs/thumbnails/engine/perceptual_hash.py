@@ -0,0 +1,130 @@
+"""Perceptual hashes of thumbnails and a near-duplicate finder over them.
+
+perceptual_hash() computes a 64-bit difference hash (dHash) from an encoded
+thumbnail: the image is reduced to 9x8 grayscale and each bit records
+whether a pixel is brighter than its right-hand neighbour. Resized,
+re-encoded or lightly edited copies of an image keep (nearly) the same bits,
+so the Hamming distance between two hashes measures visual similarity.
+Hashing the small thumbnail instead of the source keeps it cheap and makes
+it work the same for every format the thumbnail backends can read.
+
+find_similar_groups() finds every pair of hashes within a given distance
+using multi-index hashing: the 64 bits are split into max_distance + 1
+chunks, and by the pigeonhole principle two hashes that close agree
+exactly on at least one chunk. Hashes are bucketed by each chunk in turn
+and only hashes sharing a bucket are compared, with NumPy XOR/popcount over
+whole blocks at a time. Pairs are joined into groups (connected components).
+
+Hashes are returned signed (two's complement), ready for a 64-bit signed
+database column; find_similar_groups() accepts them either way.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+# dHash grid: HASH_WIDTH - 1 comparisons per row x HASH_HEIGHT rows = 64 bits
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# Rows of a bucket compared against the whole bucket per NumPy operation;
+# bounds the distance matrix to COMPARE_BLOCK x bucket size.
+COMPARE_BLOCK = 1024
+
+_SIGN_BIT = 1 << 63
+
+
+def perceptual_hash(thumbnail: bytes | memoryview | None) -> int | None:
+    """Return the 64-bit difference hash (dHash) of an encoded thumbnail.
+
+    Args:
+        thumbnail: Encoded image blob (JPEG, PNG, WebP, ...), or None.
+
+    Returns:
+        The hash as a signed 64-bit integer, or None for an empty blob or
+        one Pillow can't decode.
+    """
+    if not thumbnail:
+        return None
+    from PIL import Image as PILImage  # pylint: disable=import-outside-toplevel
+
+    try:
+        with PILImage.open(io.BytesIO(thumbnail)) as img:
+            # JPEG decodes straight to a reduced grayscale image (DCT scaling)
+            img.draft("L", (HASH_WIDTH * 4, HASH_HEIGHT * 4))
+            pixels = img.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), PILImage.Resampling.BOX).tobytes()
+    except (OSError, ValueError, PILImage.DecompressionBombError) as e:
+        logger.debug("Could not compute perceptual hash: %s", e)
+        return None
+
+    value = 0
+    for row in range(HASH_HEIGHT):
+        offset = row * HASH_WIDTH
+        for column in range(HASH_WIDTH - 1):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value - (1 << 64) if value & _SIGN_BIT else value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Return the number of differing bits between two 64-bit hashes (signed or not)."""
+    return ((first ^ second) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def find_similar_groups(hashes: Sequence[int], max_distance: int) -> list[list[int]]:
+    """Group hashes that are within max_distance bits of one another.
+
+    Two hashes land in the same group when a chain of hashes, each within
+    max_distance of the next, connects them.
+
+    Args:
+        hashes: 64-bit hashes (signed or unsigned).
+        max_distance: Largest Hamming distance counted as similar (0-63).
+
+    Returns:
+        Groups of indices into hashes, each with at least two members and
+        in ascending order; largest groups first.
+    """
+    # Deferred: NumPy is only needed by the (report-time) finder
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    count = len(hashes)
+    if count < 2:
+        return []
+    values = np.array([value & 0xFFFFFFFFFFFFFFFF for value in hashes], dtype=np.uint64)
+    chunks = min(max(max_distance, 0) + 1, 64)
+    parent = list(range(count))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for chunk in range(chunks):
+        start, stop = chunk * 64 // chunks, (chunk + 1) * 64 // chunks
+        keys = (values >> np.uint64(start)) & np.uint64((1 << (stop - start)) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+        sizes = np.diff(np.append(starts, count))
+        for begin, size in zip(starts[sizes > 1].tolist(), sizes[sizes > 1].tolist()):
+            members = order[begin : begin + size]
+            bucket = values[members]
+            member_list = members.tolist()
+            for block in range(0, size, COMPARE_BLOCK):
+                distances = np.bitwise_count(bucket[block : block + COMPARE_BLOCK, None] ^ bucket[None, :])
+                rows, columns = np.nonzero(distances <= max_distance)
+                for row, column in zip((rows + block).tolist(), columns.tolist()):
+                    if column > row:
+                        root_a, root_b = find(member_list[row]), find(member_list[column])
+                        if root_a != root_b:
+                            parent[root_b] = root_a
+
+    groups: dict[int, list[int]] = {}
+    for index in range(count):
+        groups.setdefault(find(index), []).append(index)
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda group: (-len(group), group[0]))
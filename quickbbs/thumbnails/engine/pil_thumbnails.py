@@ -1,45 +1,47 @@
 """PIL/Pillow backend for image thumbnail generation."""
 
 import io
+import math
 
-from PIL import Image, ImageOps
+from PIL import ExifTags, Image, ImageOps
 
 from .base import AbstractBackend
+from .encoders import convert_image_for_format, encode_image
 
+# EXIF orientations that rotate the image by 90/270 degrees, swapping its
+# stored width and height on display
+_TRANSPOSING_ORIENTATIONS = frozenset({5, 6, 7, 8})
+
+# Modes Image.reduce() supports (it raises ValueError for P, 1 and I;16)
+_REDUCIBLE_MODES = frozenset({"L", "LA", "RGB", "RGBA", "CMYK", "I", "F"})
 
-def convert_image_for_format(img: Image.Image, output_format: str) -> Image.Image:
-    """
-    Convert PIL Image to appropriate color mode for output format.
 
-    Handles conversion of RGBA/P/LA images to RGB for JPEG compatibility,
-    which doesn't support transparency. Uses white background for transparency.
+def minimum_decode_size(img: Image.Image, sizes: dict[str, tuple[int, int]]) -> tuple[int, int] | None:
+    """
+    Return the smallest stored-orientation size that still covers the largest thumbnail.
 
-    MEMORY SAFETY: This function may return a NEW Image object. The caller
-    must close the original image if it's no longer needed.
+    The largest requested box is fitted to the image as it will be displayed
+    (after EXIF orientation), then mapped back to the stored orientation, so
+    a decode at or above this size never makes the largest thumbnail smaller.
 
     Args:
-        img: PIL Image object to convert
-        output_format: Target format (JPEG, PNG, WEBP, etc.)
+        img: Opened (ideally not yet loaded) PIL image.
+        sizes: Dictionary mapping size names to (width, height) tuples.
 
     Returns:
-        Converted PIL Image object ready for saving in target format
+        (width, height) to decode at, or None if the image is no larger than
+        the largest box (nothing to gain from a reduced decode).
     """
-    # JPEG doesn't support transparency - convert RGBA/P/LA to RGB with white background
-    if output_format.upper() == "JPEG" and img.mode in ("RGBA", "P", "LA"):
-        background = Image.new("RGB", img.size, (255, 255, 255))
-        if img.mode == "P":
-            # Convert P mode to RGBA first
-            rgba_img = img.convert("RGBA")
-            background.paste(rgba_img, mask=rgba_img.split()[-1])
-            rgba_img.close()  # Close intermediate RGBA image
-        else:
-            # img is already RGBA or LA
-            background.paste(img, mask=img.split()[-1])
-        return background
-    # Convert exotic color modes to RGB
-    if img.mode not in ("RGB", "RGBA", "L"):
-        return img.convert("RGB")
-    return img
+    if not sizes:
+        return None
+    width, height = img.size
+    box_width, box_height = max(sizes.values(), key=lambda s: s[0] * s[1])
+    if img.getexif().get(ExifTags.Base.Orientation, 1) in _TRANSPOSING_ORIENTATIONS:
+        box_width, box_height = box_height, box_width
+    scale = min(box_width / width, box_height / height)
+    if scale >= 1:
+        return None
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
 
 
 class ImageBackend(AbstractBackend):
@@ -86,7 +88,7 @@ class ImageBackend(AbstractBackend):
             PIL.UnidentifiedImageError: If the file cannot be decoded as an image.
         """
         with Image.open(file_path) as img:
-            return self._process_pil_image(img, sizes, output_format, quality)
+            return self._process_reduced(img, sizes, output_format, quality)
 
     def process_from_memory(
         self,
@@ -111,7 +113,7 @@ class ImageBackend(AbstractBackend):
             PIL.UnidentifiedImageError: If the bytes cannot be decoded as an image.
         """
         with Image.open(io.BytesIO(image_bytes)) as img:
-            return self._process_pil_image(img, sizes, output_format, quality)
+            return self._process_reduced(img, sizes, output_format, quality)
 
     def process_data(
         self,
@@ -150,6 +152,86 @@ class ImageBackend(AbstractBackend):
             except (OSError, AttributeError):
                 pass  # Ignore errors during cleanup
 
+    @staticmethod
+    def _decode_reduced(img: Image.Image, sizes: dict[str, tuple[int, int]]) -> Image.Image:
+        """
+        Decode an opened image at the smallest scale that covers the largest thumbnail.
+
+        _process_pil_image copies the image before its first resize, which
+        forces a full-resolution decode — for a 50-megapixel camera original
+        that is ~150 MB of pixels to produce a 1024px thumbnail.
+
+        Only formats whose decoder can scale keep the full-size bitmap from
+        ever existing:
+
+        - JPEG: Image.draft() makes libjpeg decode with DCT scaling (1/2, 1/4
+          or 1/8) at the smallest scale still >= minimum_decode_size().
+        - JPEG 2000: the plugin's reduce attribute, set before load(), makes
+          OpenJPEG decode only the resolution levels needed (1/2**n scale).
+
+        Other formats (PNG, WebP, TIFF, ...) have no reduced decode in Pillow:
+        they are still decoded at full size, and only shrunk afterwards by the
+        largest integer Image.reduce() factor that stays >=
+        minimum_decode_size(). That does not lower the decode's peak memory;
+        it only makes the copy and resizes that follow work on the smaller
+        bitmap.
+
+        Args:
+            img: Opened, not yet loaded, PIL image (caller retains ownership).
+            sizes: Dictionary mapping size names to (width, height) tuples.
+
+        Returns:
+            img itself (drafted, set to decode reduced, or unchanged), or a
+            new reduced image the caller must close.
+        """
+        target = minimum_decode_size(img, sizes)
+        if target is None:
+            return img
+        if img.format == "JPEG":
+            img.draft(None, target)
+            return img
+        if img.format == "JPEG2000":
+            # Largest power-of-two reduction whose (rounded) size still covers target
+            levels = 0
+            while img.width >> (levels + 1) >= target[0] and img.height >> (levels + 1) >= target[1]:
+                levels += 1
+            if levels:
+                img.reduce = levels  # type: ignore[assignment,method-assign]
+            return img
+        if img.mode not in _REDUCIBLE_MODES:
+            return img
+        factor = min(img.width // target[0], img.height // target[1])
+        if factor < 2:
+            return img
+        return img.reduce(factor)
+
+    def _process_reduced(
+        self,
+        img: Image.Image,
+        sizes: dict[str, tuple[int, int]],
+        output_format: str,
+        quality: int,
+    ) -> dict[str, bytes]:
+        """
+        Run _process_pil_image on a reduced-scale decode of a freshly opened image.
+
+        Args:
+            img: Opened, not yet loaded, PIL image (caller retains ownership).
+            sizes: Dictionary mapping size names to (width, height) tuples.
+            output_format: Output format (JPEG, PNG, WEBP).
+            quality: Image quality (1-100).
+
+        Returns:
+            Dictionary mapping size names to thumbnail bytes.
+        """
+        reduced = self._decode_reduced(img, sizes)
+        try:
+            return self._process_pil_image(reduced, sizes, output_format, quality)
+        finally:
+            # MEMORY: Close the reduced copy (never the caller's image)
+            if reduced is not img:
+                reduced.close()
+
     def _process_pil_image(
         self,
         img: Image.Image,
@@ -222,20 +304,8 @@ class ImageBackend(AbstractBackend):
                 thumbnail.thumbnail(target_size, Image.Resampling.BICUBIC)
                 previous_img = thumbnail
 
-                buffer = io.BytesIO()
-                save_kwargs = {"format": output_format}
-
-                if output_format.upper() in ["JPEG", "JPG"]:
-                    # Removed progressive=True for faster encoding (20-30% faster)
-                    save_kwargs.update({"quality": quality, "optimize": True})
-                elif output_format.upper() == "PNG":
-                    save_kwargs.update({"optimize": True})
-                elif output_format.upper() == "WEBP":
-                    save_kwargs.update({"quality": quality, "optimize": True})
-
-                thumbnail.save(buffer, **save_kwargs)
-                results[size_name] = buffer.getvalue()
-                buffer.close()  # MEMORY: Explicitly close BytesIO buffer
+                # Encoder registry (encoders.py): JPEG, PNG, WEBP, AVIF
+                results[size_name] = encode_image(thumbnail, output_format, quality)
 
             # MEMORY: Close the last thumbnail (the smallest one)
             if previous_img is not None:
@@ -0,0 +1,106 @@
+"""Tests for the thumbnail output encoders (thumbnails/engine/encoders.py).
+
+Like test_engine.py, these import nothing from Django. AVIF cases are
+skipped when this Pillow installation can't write AVIF.
+"""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+from thumbnails.engine import (
+    UnsupportedFormatError,
+    available_encodings,
+    create_thumbnails_from_pil,
+    encode_image,
+    encoding_available,
+    get_encoder,
+    transcode_image_bytes,
+)
+from thumbnails.engine.encoders import ThumbnailEncoder
+
+IMAGE_SIZES = {"small": (200, 200), "medium": (740, 740), "large": (1024, 1024)}
+
+
+def _gradient(size: tuple[int, int] = (300, 200), mode: str = "RGB") -> Image.Image:
+    """Return an image with non-uniform pixel content."""
+    img = Image.new("RGB", size)
+    img.putdata([(x % 256, (x * 7) % 256, (x * 13) % 256) for x in range(size[0] * size[1])])
+    return img.convert(mode) if mode != "RGB" else img
+
+
+def _decoded_format(data: bytes) -> str:
+    """Return the format Pillow detects for encoded bytes."""
+    with Image.open(io.BytesIO(data)) as img:
+        return img.format
+
+
+class TestRegistry:
+    """Lookup, aliases and availability."""
+
+    def test_jpeg_and_webp_always_registered(self):
+        assert {"JPEG", "PNG", "WEBP"} <= set(available_encodings())
+        assert get_encoder("jpg").name == "JPEG"
+        assert get_encoder("webp").mime_type == "image/webp"
+
+    def test_unknown_encoding(self):
+        with pytest.raises(UnsupportedFormatError):
+            get_encoder("BMP")
+        assert encoding_available("BMP") is False
+
+    def test_unavailable_encoder_refuses_to_encode(self):
+        encoder = ThumbnailEncoder("WEBP", "image/webp", ".webp", available=lambda: False)
+
+        with pytest.raises(UnsupportedFormatError):
+            encoder.encode(_gradient(), 80)
+
+
+class TestEncoding:
+    """encode_image / transcode_image_bytes output."""
+
+    @pytest.mark.parametrize("encoding", ["JPEG", "PNG", "WEBP", "AVIF"])
+    def test_encodes_in_requested_format(self, encoding):
+        if not encoding_available(encoding):
+            pytest.skip(f"{encoding} not supported by this Pillow")
+
+        data = encode_image(_gradient(), encoding, 80)
+
+        assert _decoded_format(data) == encoding
+
+    def test_jpeg_flattens_transparency_onto_white(self):
+        img = Image.new("RGBA", (20, 20), (0, 0, 0, 0))
+
+        with Image.open(io.BytesIO(encode_image(img, "JPEG", 90))) as decoded:
+            assert decoded.mode == "RGB"
+            assert all(channel > 245 for channel in decoded.getpixel((10, 10)))
+
+    def test_webp_keeps_transparency(self):
+        img = Image.new("RGBA", (20, 20), (0, 0, 0, 0))
+
+        with Image.open(io.BytesIO(encode_image(img, "WEBP", 90))) as decoded:
+            assert decoded.mode == "RGBA"
+
+    def test_transcode(self):
+        webp = encode_image(_gradient(), "WEBP", 80)
+
+        assert _decoded_format(transcode_image_bytes(webp, "JPEG", 85)) == "JPEG"
+
+
+class TestBackendOutput:
+    """Backends route their output through the registry."""
+
+    def test_pil_backend_writes_webp(self):
+        thumbnails = create_thumbnails_from_pil(_gradient((1200, 800)), IMAGE_SIZES, output="WEBP", quality=80, backend="image")
+
+        assert {size: _decoded_format(thumbnails[size]) for size in IMAGE_SIZES} == dict.fromkeys(IMAGE_SIZES, "WEBP")
+
+    def test_webp_smaller_than_jpeg_at_matching_settings(self):
+        img = _gradient((1200, 800))
+
+        jpeg = create_thumbnails_from_pil(img, IMAGE_SIZES, output="JPEG", quality=85, backend="image")
+        webp = create_thumbnails_from_pil(img, IMAGE_SIZES, output="WEBP", quality=80, backend="image")
+
+        assert len(webp["large"]) < len(jpeg["large"])
@@ -10,7 +10,7 @@ from __future__ import annotations
 import io
 
 import pytest
-from PIL import Image
+from PIL import ExifTags, Image, features
 
 from thumbnails import engine as engine_pkg
 from thumbnails.engine import (
@@ -24,6 +24,8 @@ from thumbnails.engine.engine import (
     is_apple_silicon,
     macintosh_optimizations_enabled,
 )
+from thumbnails.engine.pdf_thumbnails import PDFBackend
+from thumbnails.engine.pil_thumbnails import ImageBackend, minimum_decode_size
 
 IMAGE_SIZES = {"small": (200, 200), "medium": (740, 740), "large": (1024, 1024)}
 
@@ -185,3 +187,96 @@ class TestAllWhiteDetector:
     def test_memoryview_accepted(self):
         """A memoryview (as read from a binary column) decodes the same as bytes."""
         assert is_all_white_thumbnail(memoryview(_jpeg_bytes((255, 255, 255)))) is True
+
+
+# ===========================================================================
+# Reduced-scale decoding (ImageBackend draft/reduce, PDFBackend zoom)
+# ===========================================================================
+
+
+def _encoded(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **kwargs)
+    img.close()
+    return buffer.getvalue()
+
+
+def _thumbnail_sizes(blobs: dict[str, bytes]) -> dict[str, tuple[int, int]]:
+    sizes = {}
+    for name, blob in blobs.items():
+        with Image.open(io.BytesIO(blob)) as img:
+            sizes[name] = img.size
+    return sizes
+
+
+class TestReducedScaleDecode:
+    """Reduced decodes cover the largest box, so thumbnail sizes never change."""
+
+    def test_minimum_decode_size(self):
+        img = Image.new("RGB", (4000, 3000))
+        assert minimum_decode_size(img, {"large": (1024, 512), "small": (200, 200)}) == (683, 512)
+        assert minimum_decode_size(Image.new("RGB", (800, 600)), IMAGE_SIZES) is None
+
+    def test_minimum_decode_size_follows_exif_orientation(self):
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6  # stored landscape, displayed portrait
+        blob = _encoded(Image.new("RGB", (4000, 3000)), "JPEG", exif=exif.tobytes())
+
+        with Image.open(io.BytesIO(blob)) as img:
+            assert minimum_decode_size(img, {"large": (1024, 512)}) == (512, 384)
+
+    def test_jpeg_is_drafted_and_sizes_match_full_decode(self):
+        blob = _encoded(Image.new("RGB", (4000, 3000), (30, 90, 150)), "JPEG", quality=90)
+        backend = ImageBackend()
+
+        with Image.open(io.BytesIO(blob)) as img:
+            reduced = backend._decode_reduced(img, IMAGE_SIZES)
+            assert reduced is img
+            assert img.size == (2000, 1500)  # 1/2 DCT scale still covers 1024x768
+
+        with Image.open(io.BytesIO(blob)) as full:
+            full.load()
+            expected = _thumbnail_sizes(backend.process_data(full, IMAGE_SIZES, "JPEG", 85))
+        assert _thumbnail_sizes(backend.process_from_memory(blob, IMAGE_SIZES, "JPEG", 85)) == expected
+
+    def test_rotated_jpeg_keeps_thumbnail_size(self):
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        blob = _encoded(Image.new("RGB", (4000, 3000)), "JPEG", exif=exif.tobytes())
+
+        sizes = _thumbnail_sizes(ImageBackend().process_from_memory(blob, IMAGE_SIZES, "JPEG", 85))
+
+        assert sizes["large"] == (768, 1024)
+
+    @pytest.mark.skipif(not features.check_codec("jpg_2000"), reason="Pillow built without OpenJPEG")
+    def test_jpeg2000_decodes_reduced_resolution_levels(self):
+        blob = _encoded(Image.new("RGB", (2400, 1800), (30, 90, 150)), "JPEG2000")
+        backend = ImageBackend()
+
+        with Image.open(io.BytesIO(blob)) as img:
+            assert backend._decode_reduced(img, IMAGE_SIZES) is img
+            img.load()
+            assert img.size == (1200, 900)  # one level down still covers 1024x768
+        assert _thumbnail_sizes(backend.process_from_memory(blob, IMAGE_SIZES, "JPEG", 85))["large"] == (1024, 768)
+
+    def test_png_is_reduced_by_integer_factor(self):
+        blob = _encoded(Image.new("RGB", (3000, 2400), (200, 10, 10)), "PNG")
+        backend = ImageBackend()
+
+        with Image.open(io.BytesIO(blob)) as img:
+            reduced = backend._decode_reduced(img, IMAGE_SIZES)
+            assert reduced is not img
+            assert reduced.size == (1500, 1200)
+            reduced.close()
+        assert _thumbnail_sizes(backend.process_from_memory(blob, IMAGE_SIZES, "JPEG", 85))["large"] == (1024, 819)
+
+    def test_palette_image_is_not_reduced(self):
+        blob = _encoded(Image.new("P", (3000, 3000)), "PNG")
+
+        with Image.open(io.BytesIO(blob)) as img:
+            assert ImageBackend._decode_reduced(img, IMAGE_SIZES) is img
+
+    def test_pdf_zoom_renders_at_target_without_oversize(self):
+        zoom = PDFBackend._calculate_optimal_zoom(612.0, 792.0, 1024, 1024)
+
+        assert 1024 <= 792.0 * zoom < 1025
@@ -0,0 +1,107 @@
+"""Tests for thumbnails/engine/perceptual_hash.py — dHash and the near-duplicate finder.
+
+Pure pytest, like test_engine.py: no Django, no database.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+from itertools import combinations
+
+from PIL import Image, ImageDraw
+
+from thumbnails.engine import find_similar_groups, hamming_distance, perceptual_hash
+
+
+def _scene(seed: int, size: tuple[int, int] = (320, 240)) -> Image.Image:
+    """Return an image of random overlapping rectangles (distinct per seed)."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        x1, y1 = x0 + rng.randrange(20, 160), y0 + rng.randrange(20, 120)
+        draw.rectangle((x0, y0, x1, y1), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return img
+
+
+def _encode(img: Image.Image, fmt: str = "JPEG", **params) -> bytes:
+    """Return img encoded in fmt."""
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+class TestPerceptualHash:
+    """perceptual_hash() on encoded thumbnails."""
+
+    def test_resized_and_reencoded_copies_stay_close(self):
+        """A smaller, lower-quality copy in another format differs in only a few bits."""
+        original = _scene(1)
+        copy = original.resize((200, 150))
+        first = perceptual_hash(_encode(original, quality=90))
+        second = perceptual_hash(_encode(copy, "WEBP", quality=40))
+        assert first is not None and second is not None
+        assert hamming_distance(first, second) <= 4
+
+    def test_different_images_are_far_apart(self):
+        """Unrelated images differ in many bits."""
+        assert hamming_distance(perceptual_hash(_encode(_scene(1))), perceptual_hash(_encode(_scene(2)))) > 12
+
+    def test_hash_fits_a_signed_bigint(self):
+        """Hashes are returned in the signed 64-bit range."""
+        for seed in range(20):
+            value = perceptual_hash(_encode(_scene(seed)))
+            assert -(1 << 63) <= value < (1 << 63)
+
+    def test_uniform_image_hashes_to_zero(self):
+        """A solid image has no gradient, so every bit is clear."""
+        assert perceptual_hash(_encode(Image.new("RGB", (64, 64), "gray"))) == 0
+
+    def test_undecodable_blobs_return_none(self):
+        """Empty, missing and garbage blobs have no hash rather than raising."""
+        assert perceptual_hash(None) is None
+        assert perceptual_hash(b"") is None
+        assert perceptual_hash(b"not an image") is None
+
+
+class TestFindSimilarGroups:
+    """find_similar_groups() — multi-index hashing against a brute-force check."""
+
+    def test_matches_brute_force(self):
+        """Every pair within the distance ends up grouped, and nothing else."""
+        rng = random.Random(7)
+        hashes = [rng.getrandbits(64) for _ in range(300)]
+        for base in hashes[:40]:
+            flipped = base
+            for _ in range(rng.randrange(6)):
+                flipped ^= 1 << rng.randrange(64)
+            hashes.append(flipped - (1 << 64) if flipped >> 63 else flipped)
+
+        groups = find_similar_groups(hashes, 3)
+
+        group_of = {index: number for number, group in enumerate(groups) for index in group}
+        for first, second in combinations(range(len(hashes)), 2):
+            if hamming_distance(hashes[first], hashes[second]) <= 3:
+                assert group_of.get(first) is not None and group_of.get(first) == group_of.get(second)
+        for group in groups:
+            # Each member is within the distance of at least one other member
+            for index in group:
+                assert any(hamming_distance(hashes[index], hashes[other]) <= 3 for other in group if other != index)
+
+    def test_chains_are_joined_and_largest_groups_come_first(self):
+        """A-B and B-C similar puts A, B and C in one group even when A-C isn't."""
+        a, b, c = 0b1111, 0b0111, 0b0011  # a-c distance 2
+        far = 0xFFFF_0000_FFFF_0000
+        groups = find_similar_groups([a, far, b, c, far ^ 1], 1)
+        assert groups == [[0, 2, 3], [1, 4]]
+
+    def test_distance_zero_groups_identical_hashes_only(self):
+        """max_distance 0 (one 64-bit chunk) groups exact matches."""
+        assert find_similar_groups([5, 5, 4, -1, -1], 0) == [[0, 1], [3, 4]]
+
+    def test_fewer_than_two_hashes(self):
+        """Nothing to compare: no groups."""
+        assert find_similar_groups([], 4) == []
+        assert find_similar_groups([123], 4) == []
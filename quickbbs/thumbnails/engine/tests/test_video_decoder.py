@@ -0,0 +1,138 @@
+"""Tests for the long-lived video decoder helpers (thumbnails/engine/video_decoder.py).
+
+Like test_engine.py, these import nothing from Django. The helpers run the
+module-level handlers below instead of PyAV, so the pool's protocol,
+recycling, and timeout handling are exercised whether or not PyAV is
+installed; real decoding is only tested when it is.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from thumbnails.engine import VideoProcessingError, config
+from thumbnails.engine.video_decoder import (
+    VideoDecoderPool,
+    _fit_within,
+    decode_midpoint_frame,
+    probe_streams,
+    pyav_available,
+    video_decoder_enabled,
+)
+
+
+def _solid_frame(file_path: str, max_size: tuple[int, int]) -> tuple[Image.Image, float]:
+    """Test handler: a solid frame of max_size; the 'duration' is the helper's PID."""
+    if file_path == "missing.mp4":
+        raise FileNotFoundError(file_path)
+    if file_path == "corrupt.mp4":
+        raise ValueError("invalid data found when processing input")
+    if file_path == "hang.mp4":
+        time.sleep(60)
+    return Image.new("L", max_size, 128), float(os.getpid())
+
+
+def _fake_probe(file_path: str) -> dict:
+    """Test probe handler: the 'duration' is the helper's PID."""
+    if file_path == "missing.mp4":
+        raise FileNotFoundError(file_path)
+    return {"duration": float(os.getpid()), "width": 640, "height": 360, "codec": "h264"}
+
+
+@pytest.fixture(name="decoder_config")
+def _decoder_config():
+    """Restore the video_decoder_* config fields after a test changes them."""
+    original = (config.video_decoder_workers, config.video_decoder_max_files, config.video_decoder_timeout)
+    yield config
+    config.video_decoder_workers, config.video_decoder_max_files, config.video_decoder_timeout = original
+
+
+@pytest.fixture(name="pool")
+def _pool(decoder_config):
+    """A decoder pool running _solid_frame on one helper."""
+    decoder_config.video_decoder_workers = 1
+    decoder_pool = VideoDecoderPool(handler=_solid_frame, probe_handler=_fake_probe)
+    yield decoder_pool
+    decoder_pool.shutdown()
+
+
+class TestVideoDecoderPool:
+    """Requests, errors, recycling and timeouts on real helper processes."""
+
+    def test_helper_serves_many_files(self, pool):
+        frame, first_pid = pool.decode("a.mp4", (64, 48))
+        _, second_pid = pool.decode("b.mp4", (64, 48))
+
+        assert frame.mode == "RGB" and frame.size == (64, 48)
+        assert frame.getpixel((0, 0)) == (128, 128, 128)
+        assert first_pid == second_pid != os.getpid()
+
+    def test_errors_keep_the_helper(self, pool):
+        _, pid = pool.decode("a.mp4", (8, 8))
+
+        with pytest.raises(FileNotFoundError):
+            pool.decode("missing.mp4", (8, 8))
+        with pytest.raises(VideoProcessingError, match="invalid data"):
+            pool.decode("corrupt.mp4", (8, 8))
+
+        assert pool.decode("a.mp4", (8, 8))[1] == pid
+
+    def test_helper_recycled_after_max_files(self, pool, decoder_config):
+        decoder_config.video_decoder_max_files = 2
+
+        pids = [pool.decode("a.mp4", (8, 8))[1] for _ in range(3)]
+
+        assert pids[0] == pids[1] != pids[2]
+
+    def test_timeout_kills_the_helper(self, pool, decoder_config):
+        decoder_config.video_decoder_timeout = 0.5
+        _, pid = pool.decode("a.mp4", (8, 8))
+
+        with pytest.raises(VideoProcessingError, match="timed out"):
+            pool.decode("hang.mp4", (8, 8))
+
+        assert pool.decode("a.mp4", (8, 8))[1] != pid
+
+    def test_unexpected_error_frees_the_slot(self, pool):
+        _, pid = pool.decode("a.mp4", (8, 8))
+
+        with pytest.raises(Exception):
+            pool.decode(lambda: None, (8, 8))  # can't be pickled onto the pipe
+
+        assert pool.decode("a.mp4", (8, 8))[1] != pid
+
+    def test_probe_shares_the_helper(self, pool):
+        _, pid = pool.decode("a.mp4", (8, 8))
+
+        info = pool.probe("a.mp4")
+        with pytest.raises(FileNotFoundError):
+            pool.probe("missing.mp4")
+
+        assert info == {"duration": pid, "width": 640, "height": 360, "codec": "h264"}
+
+
+class TestDecoderSelection:
+    """When VideoBackend uses the pool, and frame sizing."""
+
+    def test_disabled_with_zero_workers(self, decoder_config):
+        decoder_config.video_decoder_workers = 0
+
+        assert video_decoder_enabled() is False
+
+    def test_fit_within_never_upscales(self):
+        assert _fit_within(1920, 1080, (1024, 1024)) == (1024, 576)
+        assert _fit_within(320, 240, (1024, 1024)) == (320, 240)
+
+    @pytest.mark.skipif(not pyav_available(), reason="PyAV is not installed")
+    def test_decode_missing_file(self):
+        with pytest.raises(FileNotFoundError):
+            decode_midpoint_frame("/nonexistent/clip.mp4", (200, 200))
+
+    @pytest.mark.skipif(not pyav_available(), reason="PyAV is not installed")
+    def test_probe_missing_file(self):
+        with pytest.raises(FileNotFoundError):
+            probe_streams("/nonexistent/clip.mp4")
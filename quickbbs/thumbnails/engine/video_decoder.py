@@ -0,0 +1,366 @@
+"""Long-lived video frame decoding workers for the FFmpeg video backend.
+
+VideoBackend extracts its frame by running ffprobe and then ffmpeg for every
+video: two process start-ups, container probing, and codec initialisation per
+file. For a directory of short clips that overhead is most of the cost.
+
+When PyAV (the ``av`` package — FFmpeg's libraries in-process) is installed,
+VideoBackend hands the frame extraction to a small pool of helper processes
+instead. Each helper loads libav* once and then serves many files: it opens
+the container, reads the duration and dimensions from the stream headers it
+has already parsed (no separate probe), seeks to the midpoint, decodes one
+frame scaled down to the largest requested thumbnail size, and returns the
+RGB pixels. The same helpers answer stream-metadata probes (probe_streams)
+for the media probe table, again without a process per file.
+
+Requests and replies travel over a ``multiprocessing`` Pipe, whose
+Connection frames every message with a length prefix. The caller waits at
+most ``config.video_decoder_timeout`` seconds per file; a helper that
+overruns is killed — a demuxer stuck on a damaged file can't be interrupted
+from outside — and a fresh one is started for the next request. Helpers are
+retired after ``config.video_decoder_max_files`` files so leaks in libav* or
+PyAV stay bounded.
+
+Decoding runs in separate processes rather than threads so a crash in native
+code takes down a helper, not the web server or taskrunner.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from fractions import Fraction
+from multiprocessing.connection import Connection
+from typing import Any
+
+from PIL import Image
+
+from .config import config
+from .exceptions import VideoProcessingError
+
+logger = logging.getLogger(__name__)
+
+# (file_path, max_size) -> (frame, duration in seconds); runs in the helper
+DecodeHandler = Callable[[str, tuple[int, int]], tuple[Image.Image, float]]
+# file_path -> stream metadata (see probe_streams); runs in the helper
+ProbeHandler = Callable[[str], dict[str, Any]]
+
+
+@functools.cache
+def pyav_available() -> bool:
+    """Return True if PyAV can be imported (checked once per process)."""
+    return importlib.util.find_spec("av") is not None
+
+
+def video_decoder_enabled() -> bool:
+    """Return True when VideoBackend should use the decoder pool."""
+    return config.video_decoder_workers > 0 and pyav_available()
+
+
+def _fit_within(width: int, height: int, max_size: tuple[int, int]) -> tuple[int, int]:
+    """Return (width, height) scaled down to fit max_size, aspect ratio preserved; never upscales."""
+    scale = min(1.0, max_size[0] / width, max_size[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def decode_midpoint_frame(file_path: str, max_size: tuple[int, int]) -> tuple[Image.Image, float]:
+    """
+    Decode the frame at a video's midpoint with PyAV.
+
+    Runs inside a decoder helper. Seeks to the keyframe at or before the
+    midpoint (whole seconds, as the ffmpeg path does) and decodes the first
+    frame from there, scaled by libswscale to fit within max_size.
+
+    Args:
+        file_path: Path to the video file.
+        max_size: (width, height) bounding box — the largest thumbnail size.
+
+    Returns:
+        (RGB PIL image, duration in seconds)
+
+    Raises:
+        FileNotFoundError: If the video file does not exist.
+        VideoProcessingError: If the file has no video stream or no frame
+            could be decoded.
+    """
+    import av  # pylint: disable=import-outside-toplevel  # optional dependency, loaded only in helpers
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Video file not found: {file_path}")
+
+    with av.open(file_path) as container:
+        if not container.streams.video:
+            raise VideoProcessingError("No video stream found", file_path=file_path)
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+
+        if container.duration is not None:
+            duration = container.duration / av.time_base
+        elif stream.duration is not None and stream.time_base is not None:
+            duration = float(stream.duration * stream.time_base)
+        else:
+            duration = 0.0
+
+        capture_time = int(duration / 2)
+        if capture_time and stream.time_base is not None:
+            container.seek(int(capture_time / stream.time_base), stream=stream)
+
+        frame = next(container.decode(stream), None)
+        if frame is None:
+            raise VideoProcessingError("No video frame could be decoded", file_path=file_path)
+        width, height = _fit_within(frame.width, frame.height, max_size)
+        return frame.to_image(width=width, height=height), duration
+
+
+def probe_streams(file_path: str) -> dict[str, Any]:
+    """
+    Read container and stream metadata with PyAV, without decoding.
+
+    Runs inside a decoder helper.
+
+    Args:
+        file_path: Path to a video or audio file.
+
+    Returns:
+        Dictionary with 'duration' (float seconds), 'format' (container
+        name), 'bit_rate', and — for the first video stream — 'width',
+        'height', 'fps', 'codec'; for the first audio stream 'audio_codec',
+        'audio_channels', 'sample_rate'. Absent values are None.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        VideoProcessingError: If the file has neither a video nor an audio stream.
+    """
+    import av  # pylint: disable=import-outside-toplevel  # optional dependency, loaded only in helpers
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Media file not found: {file_path}")
+
+    with av.open(file_path) as container:
+        video = container.streams.video[0] if container.streams.video else None
+        audio = container.streams.audio[0] if container.streams.audio else None
+        if video is None and audio is None:
+            raise VideoProcessingError("No video or audio stream found", file_path=file_path)
+        rate = video.average_rate if video is not None else None
+        return {
+            "duration": container.duration / av.time_base if container.duration is not None else None,
+            "format": container.format.name,
+            "bit_rate": container.bit_rate or None,
+            "width": video.codec_context.width if video is not None else None,
+            "height": video.codec_context.height if video is not None else None,
+            "fps": float(Fraction(rate)) if rate else None,
+            "codec": video.codec_context.name if video is not None else None,
+            "audio_codec": audio.codec_context.name if audio is not None else None,
+            "audio_channels": audio.codec_context.channels if audio is not None else None,
+            "sample_rate": audio.codec_context.sample_rate if audio is not None else None,
+        }
+
+
+def _helper_main(conn: Connection, handler: DecodeHandler, probe_handler: ProbeHandler) -> None:
+    """
+    Helper process loop: answer requests until the pipe closes.
+
+    Requests are ("frame", file_path, max_size) or ("probe", file_path, None).
+    Replies are ("ok", payload), ("missing", message) or ("error", message);
+    a frame payload is ((width, height), rgb_bytes, duration), a probe payload
+    the metadata dict. Exceptions are sent as text, since backend exception
+    types are not guaranteed to pickle.
+    """
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        operation, file_path, max_size = request
+        try:
+            if operation == "probe":
+                reply = ("ok", probe_handler(file_path))
+            else:
+                image, duration = handler(file_path, max_size)
+                with image:
+                    rgb = image if image.mode == "RGB" else image.convert("RGB")
+                    reply = ("ok", (rgb.size, rgb.tobytes(), float(duration)))
+        except FileNotFoundError as e:
+            reply = ("missing", str(e))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            reply = ("error", f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+
+class _DecoderHelper:
+    """One spawned helper process and the parent's end of its pipe."""
+
+    __slots__ = ("conn", "process", "files_served")
+
+    def __init__(self, handler: DecodeHandler, probe_handler: ProbeHandler) -> None:
+        # spawn, not fork: callers hold DB connections and threads
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_helper_main, args=(child_conn, handler, probe_handler), name="video-decoder", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.files_served = 0
+
+    def request(self, operation: str, file_path: str, max_size: tuple[int, int] | None, timeout: float) -> Any:
+        """
+        Send one request and wait for the reply.
+
+        Returns:
+            The reply payload.
+
+        Raises:
+            TimeoutError: If no reply arrives within timeout seconds.
+            EOFError / OSError: If the helper died.
+            FileNotFoundError / VideoProcessingError: Reported by the helper.
+        """
+        self.conn.send((operation, file_path, max_size))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"No reply after {timeout:g}s")
+        reply = self.conn.recv()
+        self.files_served += 1
+        if reply[0] == "ok":
+            return reply[1]
+        if reply[0] == "missing":
+            raise FileNotFoundError(reply[1])
+        raise VideoProcessingError(reply[1], file_path=file_path)
+
+    def stop(self, kill: bool = False) -> None:
+        """Ask the helper to exit (or kill it) and close the pipe."""
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.kill()
+        self.conn.close()
+        self.process.join(timeout=5)
+
+
+class VideoDecoderPool:
+    """
+    Process-wide pool of up to config.video_decoder_workers decoder helpers.
+
+    Helpers start on first use. A caller borrows an idle helper (or waits for
+    one), so concurrent threads decode in parallel up to the worker limit.
+    """
+
+    def __init__(self, handler: DecodeHandler = decode_midpoint_frame, probe_handler: ProbeHandler = probe_streams) -> None:
+        self._handler = handler
+        self._probe_handler = probe_handler
+        self._available = threading.Condition()
+        self._idle: list[_DecoderHelper] = []
+        self._started = 0
+        self._pid = os.getpid()
+        self._atexit_registered = False
+
+    def _acquire(self) -> _DecoderHelper | None:
+        """Return an idle helper, or None once the caller may start a new one."""
+        with self._available:
+            if self._pid != os.getpid():
+                # Forked child: the inherited helpers belong to the parent
+                self._idle, self._started, self._pid = [], 0, os.getpid()
+            while not self._idle and self._started >= max(1, config.video_decoder_workers):
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+            return None
+
+    def _release(self, helper: _DecoderHelper | None, retire: bool, kill: bool = False) -> None:
+        """Return a helper to the idle list, or stop it and free its slot."""
+        if helper is not None and retire:
+            helper.stop(kill=kill)
+        with self._available:
+            if helper is not None and not retire:
+                self._idle.append(helper)
+            else:
+                self._started -= 1
+            self._available.notify()
+
+    def decode(self, file_path: str, max_size: tuple[int, int]) -> tuple[Image.Image, float]:
+        """
+        Decode the midpoint frame of a video on a helper process.
+
+        Args:
+            file_path: Path to the video file.
+            max_size: (width, height) bounding box for the returned frame.
+
+        Returns:
+            (RGB PIL image, duration in seconds)
+
+        Raises:
+            FileNotFoundError: If the video file does not exist.
+            VideoProcessingError: If decoding failed, timed out, or the
+                helper died.
+        """
+        size, pixels, duration = self._request("frame", file_path, max_size)
+        return Image.frombytes("RGB", size, pixels), duration
+
+    def probe(self, file_path: str) -> dict[str, Any]:
+        """
+        Read a media file's stream metadata on a helper process (see probe_streams).
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            VideoProcessingError: If probing failed, timed out, or the
+                helper died.
+        """
+        return self._request("probe", file_path, None)
+
+    def _request(self, operation: str, file_path: str, max_size: tuple[int, int] | None) -> Any:
+        """Run one request on a borrowed helper, retiring it on timeout, crash, or max_files."""
+        helper = self._acquire()
+        try:
+            if helper is None:
+                helper = _DecoderHelper(self._handler, self._probe_handler)
+        except (OSError, RuntimeError) as e:
+            self._release(None, retire=True)
+            raise VideoProcessingError(f"Could not start video decoder: {e}", file_path=file_path) from e
+        except BaseException:
+            self._release(None, retire=True)
+            raise
+
+        try:
+            result = helper.request(operation, file_path, max_size, config.video_decoder_timeout)
+        except (FileNotFoundError, VideoProcessingError):
+            # Reported by the helper, which is still healthy
+            self._release(helper, retire=helper.files_served >= config.video_decoder_max_files)
+            raise
+        except TimeoutError as e:
+            logger.warning("Video decoder timed out on %s; restarting it", file_path)
+            self._release(helper, retire=True, kill=True)
+            raise VideoProcessingError(f"Video decoding timed out: {e}", file_path=file_path) from e
+        except (EOFError, OSError) as e:
+            self._release(helper, retire=True, kill=True)
+            raise VideoProcessingError(f"Video decoder exited: {e!r}", file_path=file_path) from e
+        except BaseException:
+            # Anything else (e.g. an unpicklable request) leaves the pipe in an
+            # unknown state; retire the helper so its slot is never leaked
+            self._release(helper, retire=True, kill=True)
+            raise
+        self._release(helper, retire=helper.files_served >= config.video_decoder_max_files)
+        return result
+
+    def shutdown(self) -> None:
+        """Stop every idle helper (called at exit)."""
+        with self._available:
+            helpers, self._idle = self._idle, []
+            self._started -= len(helpers)
+            self._available.notify_all()
+        for helper in helpers:
+            helper.stop()
+
+
+video_decoder_pool = VideoDecoderPool()
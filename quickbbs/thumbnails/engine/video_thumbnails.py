@@ -9,8 +9,10 @@ import ffmpeg
 from PIL import Image
 
 from .base import AbstractBackend
-from .exceptions import UnsupportedFormatError, VideoProcessingError
-from .pil_thumbnails import ImageBackend, convert_image_for_format
+from .encoders import encode_image
+from .exceptions import VideoProcessingError
+from .pil_thumbnails import ImageBackend
+from .video_decoder import video_decoder_enabled, video_decoder_pool
 
 
 class VideoBackend(AbstractBackend):
@@ -34,6 +36,8 @@ class VideoBackend(AbstractBackend):
 
     __slots__ = ("_image_backend",)
 
+    uses_media_info = True
+
     def __init__(self):
         # Cache ImageBackend instance for reuse
         self._image_backend = ImageBackend()
@@ -44,18 +48,25 @@ class VideoBackend(AbstractBackend):
         sizes: dict[str, tuple[int, int]],
         output_format: str,
         quality: int,
+        media_info: dict[str, Any] | None = None,
     ) -> dict[str, bytes]:
         """
         Process a video file and generate thumbnails from a frame at its midpoint.
 
-        Extracts a single frame at half the video's duration via FFmpeg, then
-        resizes it to each requested size using the PIL image backend.
+        Extracts a single frame at half the video's duration, then resizes it
+        to each requested size using the PIL image backend. With PyAV
+        installed the frame comes from a long-lived decoder helper
+        (video_decoder.py), already scaled to the largest requested size;
+        otherwise from ffprobe + ffmpeg subprocesses.
 
         Args:
             file_path: Path to the video file.
             sizes: Dictionary mapping size names to (width, height) tuples.
             output_format: Output format (JPEG, PNG, WEBP).
             quality: Image quality (1-100).
+            media_info: Previously probed 'duration', 'width' and 'height'
+                (e.g. from the embedding application's probe table); when
+                given, the ffprobe call is skipped.
 
         Returns:
             Dictionary with 'duration' (float seconds), 'format' (the output
@@ -64,14 +75,19 @@ class VideoBackend(AbstractBackend):
 
         Raises:
             FileNotFoundError: If the video file does not exist.
-            VideoProcessingError: If FFmpeg cannot probe the file or extract a frame.
+            VideoProcessingError: If FFmpeg cannot probe the file or extract a
+                frame, or the decoder helper failed or timed out.
         """
         output = {}
-        video_data = _get_video_info(file_path)
-        output["duration"] = video_data["duration"]
-        height, width = video_data["height"], video_data["width"]
-        capture_time = int(video_data["duration"] / 2)  # Capture at half the duration
-        thumbnail = _generate_thumbnail_to_pil(file_path, time_offset=capture_time, width=width, height=height)
+        if video_decoder_enabled():
+            max_size = (max(width for width, _ in sizes.values()), max(height for _, height in sizes.values()))
+            thumbnail, output["duration"] = video_decoder_pool.decode(str(file_path), max_size)
+        else:
+            video_data = media_info if _has_seek_info(media_info) else _get_video_info(file_path)
+            output["duration"] = video_data["duration"]
+            height, width = video_data["height"], video_data["width"]
+            capture_time = int(video_data["duration"] / 2)  # Capture at half the duration
+            thumbnail = _generate_thumbnail_to_pil(file_path, time_offset=capture_time, width=width, height=height)
         pillow_output = self._image_backend._process_pil_image(thumbnail, sizes, output_format, quality)
         output["format"] = output_format
         output.update(pillow_output)
@@ -239,6 +255,11 @@ def _generate_thumbnail_to_pil(
 #     return thumbnails
 
 
+def _has_seek_info(media_info: dict[str, Any] | None) -> bool:
+    """Return True if media_info carries the duration and frame size a frame grab needs."""
+    return bool(media_info) and all(media_info.get(key) for key in ("duration", "width", "height"))
+
+
 def _get_video_info(video_path: str) -> dict[str, Any]:
     """
     Get basic information about a video file using ffprobe.
@@ -287,72 +308,65 @@ def _get_video_info(video_path: str) -> dict[str, Any]:
         raise VideoProcessingError(f"Error getting video info: {e}", file_path=str(video_path)) from e
 
 
+def _probe_media(media_path: str) -> dict[str, Any]:
+    """
+    Read container and stream metadata of a video or audio file using ffprobe.
+
+    Args:
+        media_path: Path to the media file.
+
+    Returns:
+        Dictionary with the keys of video_decoder.probe_streams(): 'duration',
+        'format', 'bit_rate', 'width', 'height', 'fps', 'codec',
+        'audio_codec', 'audio_channels', 'sample_rate' (None when absent).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        VideoProcessingError: If the ffprobe call fails or the file has
+            neither a video nor an audio stream.
+    """
+    if not Path(media_path).exists():
+        raise FileNotFoundError(f"Media file not found: {media_path}")
+    try:
+        probe = ffmpeg.probe(str(media_path))
+    except ffmpeg.Error as e:
+        raise VideoProcessingError(f"Error probing media: {e}", file_path=str(media_path)) from e
+
+    streams = probe.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+    audio = next((stream for stream in streams if stream.get("codec_type") == "audio"), None)
+    if video is None and audio is None:
+        raise VideoProcessingError("No video or audio stream found", file_path=str(media_path))
+
+    container = probe.get("format", {})
+    frame_rate = video.get("avg_frame_rate") or video.get("r_frame_rate") if video is not None else None
+    return {
+        "duration": float(container["duration"]) if container.get("duration") else None,
+        "format": container.get("format_name"),
+        "bit_rate": int(container["bit_rate"]) if container.get("bit_rate") else None,
+        "width": int(video["width"]) if video is not None and video.get("width") else None,
+        "height": int(video["height"]) if video is not None and video.get("height") else None,
+        "fps": float(Fraction(frame_rate)) if frame_rate and frame_rate != "0/0" else None,
+        "codec": video.get("codec_name") if video is not None else None,
+        "audio_codec": audio.get("codec_name") if audio is not None else None,
+        "audio_channels": int(audio["channels"]) if audio is not None and audio.get("channels") else None,
+        "sample_rate": int(audio["sample_rate"]) if audio is not None and audio.get("sample_rate") else None,
+    }
+
+
 def _pil_to_binary(image: Image.Image, img_format: str = "JPEG", quality: int = 85) -> bytes:
     """
     Convert a PIL Image to binary data.
 
     Args:
         image: PIL Image object to convert.
-        img_format: Output format (JPEG, PNG, or WEBP).
-        quality: Quality for JPEG/WEBP (1-100). Ignored for PNG.
+        img_format: Output encoding (JPEG, PNG, WEBP or AVIF; see encoders.py).
+        quality: Quality for lossy encodings (1-100). Ignored for PNG.
 
     Returns:
         Binary image data as bytes.
 
     Raises:
-        UnsupportedFormatError: If a format other than JPEG, PNG, or WEBP
-            is specified.
+        UnsupportedFormatError: If the encoding is unknown or unavailable.
     """
-    output_buffer = io.BytesIO()
-
-    # Convert image to appropriate color mode for target format
-    image = convert_image_for_format(image, img_format)
-
-    if img_format.upper() == "JPEG":
-        image.save(output_buffer, format="JPEG", quality=quality, optimize=True)
-    elif img_format.upper() == "PNG":
-        image.save(output_buffer, format="PNG", optimize=True)
-    elif img_format.upper() == "WEBP":
-        image.save(output_buffer, format="WEBP", quality=quality, optimize=True)
-    else:
-        raise UnsupportedFormatError(img_format)
-
-    binary_data = output_buffer.getvalue()
-    output_buffer.close()
-
-    return binary_data
-
-
-# Example usage
-if __name__ == "__main__":
-    # Single thumbnail
-    # try:
-    #     video_file = "sample_video.mp4"  # Replace with your video file
-    #     thumbnail_path = _generate_thumbnail(video_file, time_offset="00:01:30")
-    #     print(f"Thumbnail generated: {thumbnail_path}")
-
-    #     # Multiple thumbnails
-    #     thumbnails = _generate_multiple_thumbnails(video_file, count=3)
-    #     print(f"Generated {len(thumbnails)} thumbnails")
-
-    #     # Video info
-    #     info = _get_video_info(video_file)
-    #     print(f"Video info: {info}")
-
-    # except Exception as e:
-    #     print(f"Error: {e}")
-    video_file = "test.mp4"
-    processor = VideoBackend()
-    result = processor.process_from_file(
-        video_file,
-        sizes={"small": (320, 240), "medium": (640, 480), "large": (1280, 720)},
-        output_format="PNG",
-        quality=85,
-    )
-    print(result.keys())
-    print(f"Duration: {result['duration']} seconds")
-    print(f"Format: {result['format']}")
-    print(f"size of small thumbnail: {len(result['small'])} bytes")
-    print(f"size of medium thumbnail: {len(result['medium'])} bytes")
-    print(f"size of large thumbnail: {len(result['large'])} bytes")
-    # print(output)
+    return encode_image(image, img_format, quality)
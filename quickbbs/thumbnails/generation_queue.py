@@ -0,0 +1,203 @@
+"""
+ThumbnailQueueEntry Model - persistent priority queue for thumbnail generation
+
+Every gallery view used to enqueue its own generate_missing_thumbnails task
+for the first THUMBNAIL_BATCH_LIMIT files of the directory lacking a
+thumbnail. The same directory viewed by several users (or page after page)
+queued overlapping work, and the files on the page being looked at waited
+behind it in task order.
+
+This table holds one row per thumbnail still to generate (sha256_hash is
+unique, so a hash requested again is coalesced into its existing row):
+
+    enqueue_thumbnails(shas, priority, directory_pk)
+        Inserts the hashes not queued yet and raises the priority of the
+        ones that are, then (if anything changed) queues a
+        quickbbs.tasks.process_thumbnail_queue drain task.
+
+    claim_thumbnail_batch(batch_size)
+        Claims the highest-priority, oldest rows with
+        SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers each get a
+        different small batch without waiting on each other. Workers pull
+        batches until the queue is empty; a page-priority row added while a
+        background batch renders is taken by the next claim.
+
+    complete_thumbnail_batch(entries)
+        Deletes the processed rows.
+
+A claim that is never completed (the worker died) expires after
+THUMBNAIL_QUEUE_CLAIM_TIMEOUT seconds and the rows are claimed again; the
+periodic process_thumbnail_queue run picks them up.
+
+thumbnail_queue_stats() reports depth, claimed rows, rows per priority and
+the age of the oldest row for monitoring (shown on the admin change list).
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Queue priorities (higher is generated first)
+QUEUE_PRIORITY_PAGE = 100  # Files on the gallery page being viewed
+QUEUE_PRIORITY_DIRECTORY = 50  # Other files of a directory being viewed
+QUEUE_PRIORITY_BACKGROUND = 0  # Bulk maintenance (scan --add_thumbnails)
+
+QUEUE_PRIORITY_NAMES = {
+    QUEUE_PRIORITY_PAGE: "page",
+    QUEUE_PRIORITY_DIRECTORY: "directory",
+    QUEUE_PRIORITY_BACKGROUND: "background",
+}
+
+
+class ThumbnailQueueEntry(models.Model):
+    """
+    One thumbnail waiting to be generated, keyed by file content hash.
+
+    directory_id is the directory whose layout cache is cleared once the
+    thumbnail exists (NULL for background work). It is a plain integer, not
+    a foreign key: deleting a directory must not wait on queue rows, and a
+    stale id only clears a cache entry that no longer exists.
+    """
+
+    sha256_hash = models.CharField(max_length=64, unique=True)
+    priority = models.SmallIntegerField(default=QUEUE_PRIORITY_BACKGROUND)
+    directory_id = models.IntegerField(null=True, blank=True)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Thumbnail Queue Entry"
+        verbose_name_plural = "Thumbnail Queue"
+        indexes = [
+            # Claim order: highest priority first, oldest first within it
+            models.Index(fields=["-priority", "enqueued_at"], name="thumbqueue_claim_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.sha256_hash} ({QUEUE_PRIORITY_NAMES.get(self.priority, self.priority)})"
+
+
+def enqueue_thumbnails(sha256_list: Iterable[str], priority: int, directory_pk: int | None = None) -> int:
+    """
+    Queue thumbnails for generation, coalescing hashes already queued.
+
+    A hash already queued at a lower priority is raised to priority (and
+    moved to directory_pk, the directory now waiting for it); one queued at
+    the same or a higher priority is left alone. Claimed rows are updated
+    too, which only matters if their claim expires.
+
+    Args:
+        sha256_list: File SHA256 hashes needing thumbnails
+        priority: One of the QUEUE_PRIORITY_* values
+        directory_pk: Directory whose layout cache to clear afterwards
+
+    Returns:
+        Number of rows inserted or raised in priority.
+    """
+    shas = list(dict.fromkeys(sha for sha in sha256_list if sha))
+    if not shas:
+        return 0
+
+    queued = set(ThumbnailQueueEntry.objects.filter(sha256_hash__in=shas).values_list("sha256_hash", flat=True))
+    new_entries = [ThumbnailQueueEntry(sha256_hash=sha, priority=priority, directory_id=directory_pk) for sha in shas if sha not in queued]
+    # ignore_conflicts: another request may insert the same hash in between
+    ThumbnailQueueEntry.objects.bulk_create(new_entries, ignore_conflicts=True)
+
+    raised = 0
+    if queued:
+        update: dict[str, Any] = {"priority": priority}
+        if directory_pk is not None:
+            update["directory_id"] = directory_pk
+        raised = ThumbnailQueueEntry.objects.filter(sha256_hash__in=queued, priority__lt=priority).update(**update)
+
+    changed = len(new_entries) + raised
+    if changed:
+        # Imported here: quickbbs.tasks imports thumbnails.models, which imports this module
+        # pylint: disable-next=import-outside-toplevel
+        from quickbbs.tasks import process_thumbnail_queue
+
+        # Web-triggered work runs ahead of bulk maintenance in the task runner too
+        task_priority = 50 if priority > QUEUE_PRIORITY_BACKGROUND else 0
+        process_thumbnail_queue.using(priority=task_priority).enqueue()
+    return changed
+
+
+def claim_thumbnail_batch(batch_size: int | None = None) -> list[ThumbnailQueueEntry]:
+    """
+    Claim the next batch of queue rows for this worker.
+
+    Rows locked by another worker's claim are skipped (SKIP LOCKED), not
+    waited on. Unclaimed rows and rows whose claim has expired are eligible.
+
+    Args:
+        batch_size: Rows to claim (default: THUMBNAIL_QUEUE_BATCH_SIZE)
+
+    Returns:
+        Claimed entries, highest priority and oldest first (empty when the
+        queue has nothing to claim).
+    """
+    batch_size = batch_size or settings.THUMBNAIL_QUEUE_BATCH_SIZE
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.THUMBNAIL_QUEUE_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        entries = list(
+            ThumbnailQueueEntry.objects.select_for_update(skip_locked=True)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired))
+            .order_by("-priority", "enqueued_at")[:batch_size]
+        )
+        if entries:
+            ThumbnailQueueEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(claimed_at=now)
+    for entry in entries:
+        entry.claimed_at = now
+    return entries
+
+
+def complete_thumbnail_batch(entries: Iterable[ThumbnailQueueEntry]) -> None:
+    """
+    Remove processed rows from the queue.
+
+    Failed thumbnails are removed as well: get_or_create_thumbnail_record
+    has already recorded what it could (generic icon, orphan cleanup), and
+    the next view of the directory queues whatever is still missing.
+
+    Only rows still holding this batch's claim are deleted; a row whose claim
+    expired and was taken by another worker stays with that worker.
+    """
+    entries = list(entries)
+    if entries:
+        ThumbnailQueueEntry.objects.filter(pk__in=[entry.pk for entry in entries], claimed_at=entries[0].claimed_at).delete()
+
+
+def thumbnail_queue_stats() -> dict[str, Any]:
+    """
+    Return queue depth and age for monitoring.
+
+    Returns:
+        Dictionary with "depth" (rows queued), "claimed" (rows being
+        generated), "by_priority" (priority name → rows) and
+        "oldest_age_seconds" (age of the oldest row, None when empty).
+    """
+    by_priority = {
+        QUEUE_PRIORITY_NAMES.get(row["priority"], str(row["priority"])): row["count"]
+        for row in ThumbnailQueueEntry.objects.values("priority").annotate(count=Count("id")).order_by("-priority")
+    }
+    totals = ThumbnailQueueEntry.objects.aggregate(
+        claimed=Count("id", filter=Q(claimed_at__isnull=False)),
+        oldest=Min("enqueued_at"),
+    )
+    return {
+        "depth": sum(by_priority.values()),
+        "claimed": totals["claimed"],
+        "by_priority": by_priority,
+        "oldest_age_seconds": (timezone.now() - totals["oldest"]).total_seconds() if totals["oldest"] else None,
+    }
@@ -28,21 +28,36 @@ v3 - Pilot changing the thumbnail storage to be a single table, with the small,
 
 from __future__ import annotations
 
+import hashlib
 import io
 import logging
-from typing import TYPE_CHECKING, cast
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, BinaryIO, cast
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import connection, models, transaction
-from django.db.models import Q
+from django.db.models import ExpressionWrapper, F, Q
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
 
 from frontend.serve_up import send_file_response
-from quickbbs.cache_registry import clear_layout_cache_for_directories
+from quickbbs.cache_registry import (
+    bump_search_generation,
+    clear_layout_cache_for_directories,
+)
+from quickbbs.io_scheduler import device_slot
+from quickbbs.mediaprobe import MediaProbe
+from quickbbs.MonitoredCache import create_cache
+from thumbnails.blob_store import THUMBNAIL_SIZES, stored_sizes, thumbnail_blob_store
 from thumbnails.engine import (
     BackendType,
     create_thumbnails_from_path,
+    encoding_available,
+    get_encoder,
     is_all_white_thumbnail,
+    perceptual_hash,
+    transcode_image_bytes,
 )
 from thumbnails.exceptions import (
     MediaProcessingError,
@@ -71,6 +86,13 @@ __email__ = "Benjamin@schollnick.net"
 __url__ = "https://github.com/bschollnick/quickbbs"
 __license__ = "TBD"
 
+# JPEG fallbacks of thumbnails stored in another encoding, for clients whose
+# Accept doesn't list it (negotiate_thumbnail_encoding), so each is decoded and
+# re-encoded once per process rather than on every hit.
+# Cache key: (sha256_hash, size, generation, encoding) — invalidate_thumb() and
+# re-encoding bump the generation, so an outdated transcode is never looked up again.
+transcoded_thumbnail_cache = create_cache(settings.TRANSCODED_THUMBNAIL_CACHE_SIZE, "transcoded_thumbnail", monitored=settings.CACHE_MONITORING)
+
 
 ThumbnailFiles_Prefetch_List = [
     "FileIndex__filetype",
@@ -96,6 +118,229 @@ THUMBNAILFILES_PR_FILEINDEX_FILETYPE = ("FileIndex__filetype",)
 # Empty-value sentinel for thumbnail existence checks (avoids per-call list creation)
 _EMPTY_THUMB_VALUES = ("", b"", None)
 
+# Every field written when thumbnail blobs are stored or invalidated
+# (save(update_fields=...) / bulk_update).
+THUMBNAIL_BLOB_FIELDS = ("small_thumb", "medium_thumb", "large_thumb", "blobs_in_store", "generation", "encoding", "perceptual_hash")
+
+# A thumbnail has been generated when its small blob is in the database or its
+# blobs were written to the blob store (thumbnails.blob_store). Blobs are
+# always generated together, so the small size stands for all three.
+THUMBNAIL_GENERATED_Q = Q(small_thumb__isnull=False) | Q(blobs_in_store=True)
+THUMBNAIL_MISSING_Q = Q(small_thumb__isnull=True, blobs_in_store=False)
+
+
+# =============================================================================
+# Output encoding
+# New thumbnails are written in THUMBNAIL_ENCODING (thumbnails.engine.encoders);
+# each row records the encoding of its blobs, so rows written before a change
+# keep serving correctly until "manage.py reencode_thumbnails" converts them.
+# =============================================================================
+
+# Every client can decode JPEG; it is the fallback for every other encoding.
+BASELINE_ENCODING = "JPEG"
+
+
+def thumbnail_encoding() -> str:
+    """
+    Return the encoding new thumbnails are written in (settings.THUMBNAIL_ENCODING).
+
+    Falls back to JPEG, with a warning, when this Pillow can't write the
+    configured encoding (e.g. AVIF without libavif).
+    """
+    encoding = settings.THUMBNAIL_ENCODING.upper()
+    if encoding_available(encoding):
+        return get_encoder(encoding).name
+    logger.warning("THUMBNAIL_ENCODING %r is not available in this Pillow installation, writing JPEG", settings.THUMBNAIL_ENCODING)
+    return BASELINE_ENCODING
+
+
+def thumbnail_quality(encoding: str) -> int:
+    """Return the encoder quality for an encoding (THUMBNAIL_ENCODING_QUALITY, else PIL_IMAGE_QUALITY)."""
+    return settings.THUMBNAIL_ENCODING_QUALITY.get(encoding, settings.PIL_IMAGE_QUALITY)
+
+
+def negotiate_thumbnail_encoding(stored_encoding: str, accept: str | None) -> str:
+    """
+    Return the encoding to send a stored thumbnail in, given the request's Accept header.
+
+    The stored encoding is sent when it is JPEG, when there is no Accept
+    header, or when Accept names its media type explicitly (q > 0).
+    Wildcards don't count: browsers send image/* and */* whether or not
+    they decode WebP/AVIF, but those that do list image/webp / image/avif.
+    Anything else is sent as JPEG (transcoded on the fly).
+    """
+    if stored_encoding == BASELINE_ENCODING or not accept:
+        return stored_encoding
+    mime_type = get_encoder(stored_encoding).mime_type
+    for entry in accept.split(","):
+        media_range, *params = (part.strip() for part in entry.split(";"))
+        if media_range.lower() != mime_type:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    if float(value) <= 0:
+                        return BASELINE_ENCODING
+                except ValueError:
+                    pass
+        return stored_encoding
+    return BASELINE_ENCODING
+
+
+# =============================================================================
+# HTTP caching
+# A thumbnail's bytes are fully determined by (source SHA256, size,
+# ThumbnailFiles.generation), so gallery URLs carry a version token and the
+# response is cacheable forever; invalidate_thumb() and re-encoding bump the
+# generation, which changes both the URL and the ETag. A row stored in an
+# encoding other than JPEG is negotiated on Accept: its responses carry
+# Vary: Accept and an ETag naming the encoding actually sent.
+# =============================================================================
+
+
+def thumbnail_cache_version(sha256_hash: str, generation: int) -> str:
+    """Return the ?v= token for a thumbnail URL (cover hash prefix + generation)."""
+    return f"{sha256_hash[:16]}-{generation}"
+
+
+def thumbnail_etag(sha256_hash: str, size: str, generation: int, encoding: str = BASELINE_ENCODING) -> str:
+    """Return the strong ETag for one size of a thumbnail, as sent in encoding."""
+    if encoding == BASELINE_ENCODING:
+        return f'"{sha256_hash}-{size}-{generation}"'
+    return f'"{sha256_hash}-{size}-{generation}-{encoding.lower()}"'
+
+
+def thumbnail_cache_control(sha256_hash: str, generation: int, requested_version: str | None) -> str:
+    """
+    Return the Cache-Control value for a served thumbnail.
+
+    Only a request whose ?v= token names the generation actually served is
+    immutable; unversioned or stale URLs keep the short HTTP_CACHE_MAX_AGE.
+    """
+    if requested_version == thumbnail_cache_version(sha256_hash, generation):
+        return f"public, max-age={settings.THUMBNAIL_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+
+
+def thumbnail_version_annotations(prefix: str = "") -> dict[str, F]:
+    """
+    Return queryset annotations that let get_thumbnail_url() emit a versioned URL.
+
+    Args:
+        prefix: Lookup path to the FileIndex carrying new_ftnail — "" for a
+            FileIndex queryset, "thumbnail__" for DirectoryIndex (cover file).
+
+    Example:
+        >>> files = FileIndex.objects.filter(...).annotate(**thumbnail_version_annotations())
+    """
+    return {
+        "thumbnail_sha256": F(f"{prefix}new_ftnail__sha256_hash"),
+        "thumbnail_generation": F(f"{prefix}new_ftnail__generation"),
+    }
+
+
+def thumbnail_missing_annotations() -> dict[str, ExpressionWrapper]:
+    """
+    Return a FileIndex queryset annotation flagging files with no generated thumbnail.
+
+    thumbnail_missing matches get_files_needing_thumbnail_shas(): no linked
+    ThumbnailFiles row, or one in the THUMBNAIL_MISSING_Q state. It reads the
+    join thumbnail_version_annotations() already makes, not the blobs.
+
+    Example:
+        >>> files = FileIndex.objects.filter(...).annotate(**thumbnail_missing_annotations())
+    """
+    missing = Q(new_ftnail__isnull=True) | Q(new_ftnail__small_thumb__isnull=True, new_ftnail__blobs_in_store=False)
+    return {"thumbnail_missing": ExpressionWrapper(missing, output_field=models.BooleanField())}
+
+
+def versioned_thumbnail_url(url: str, item: object) -> str:
+    """
+    Append ?v= to a thumbnail URL when item carries thumbnail_version_annotations().
+
+    Items loaded without the annotations (or without a linked thumbnail) get
+    the unversioned URL, which is served with the short cache lifetime.
+    """
+    sha256_hash = getattr(item, "thumbnail_sha256", None)
+    generation = getattr(item, "thumbnail_generation", None)
+    if sha256_hash is None or generation is None:
+        return url
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}v={thumbnail_cache_version(sha256_hash, generation)}"
+
+
+# =============================================================================
+# Multipart gallery thumbnails
+# With THUMBNAIL_MULTIPART_ENABLED, a gallery page fetches the small
+# thumbnails of all its files in one thumbnail_multipart request instead of
+# one thumbnail_file request per item. Items that are left out (directories,
+# links, generic icons, thumbnails not generated yet) keep their own URL.
+# =============================================================================
+
+
+def thumbnail_multipart_version(rows: Iterable[tuple[str, int]]) -> str:
+    """Return the ?v= token for a multipart response holding (sha256_hash, generation) rows, in order."""
+    digest = hashlib.sha256(",".join(f"{sha256_hash}-{generation}" for sha256_hash, generation in rows).encode())
+    return digest.hexdigest()[:16]
+
+
+def thumbnail_multipart_url(items: Iterable[Any]) -> str | None:
+    """
+    Return the thumbnail_multipart URL for a page's files, flagging the items it serves.
+
+    Items must carry thumbnail_version_annotations(). Each file with a linked
+    thumbnail that isn't shown as a generic icon gets thumbnail_multipart =
+    True (the gallery card then leaves its src to the multipart loader), up
+    to THUMBNAIL_MULTIPART_MAX_ITEMS distinct hashes. Duplicates share a part.
+
+    Returns:
+        The URL, versioned with the generations of the included rows, or
+        None when no item qualifies.
+    """
+    generations: dict[str, int] = {}
+    for item in items:
+        sha256_hash = getattr(item, "thumbnail_sha256", None)
+        if sha256_hash is None or item.is_generic_icon or item.filetype.generic:
+            continue
+        if sha256_hash not in generations:
+            if len(generations) >= settings.THUMBNAIL_MULTIPART_MAX_ITEMS:
+                continue
+            generations[sha256_hash] = item.thumbnail_generation
+        item.thumbnail_multipart = True
+    if not generations:
+        return None
+    version = thumbnail_multipart_version(generations.items())
+    return f"{reverse('thumbnail_multipart')}?shas={','.join(generations)}&v={version}"
+
+
+def _create_thumbnails(
+    filename: str,
+    backend: BackendType,
+    prerendered: dict[str, bytes] | None = None,
+    media_info: dict[str, Any] | None = None,
+) -> dict[str, bytes]:
+    """
+    Generate thumbnails (THUMBNAIL_ENCODING) for a source file while holding its volume's read slot.
+
+    The slot (quickbbs.io_scheduler.device_slot) caps how many taskrunner
+    threads read from one volume at once, per IO_DEVICE_LIMITS. Blobs already
+    rendered by the batch process pool (thumbnails.render_pool) are returned
+    as-is. media_info (MediaProbe.seek_info) spares video backends their probe.
+    """
+    if prerendered:
+        return prerendered
+    encoding = thumbnail_encoding()
+    with device_slot(filename):
+        return create_thumbnails_from_path(
+            filename,
+            settings.IMAGE_SIZE,
+            output=encoding,
+            quality=thumbnail_quality(encoding),
+            backend=backend,
+            media_info=media_info,
+        )
+
 
 def _is_suspect_all_white(small_thumb: bytes) -> bool:
     """Return True if a fresh thumbnail looks like GPU all-white corruption.
@@ -104,7 +349,7 @@ def _is_suspect_all_white(small_thumb: bytes) -> bool:
     (below SMALL_THUMBNAIL_SAFEGUARD_SIZE) are decoded and pixel-checked.
 
     Args:
-        small_thumb: JPEG blob of the freshly generated small thumbnail.
+        small_thumb: Encoded blob of the freshly generated small thumbnail.
 
     Returns:
         True if the blob is below the safeguard size and entirely white.
@@ -125,9 +370,16 @@ class ThumbnailFiles(models.Model):
     * small_thumb - Binary storage for the small thumbnail
     * medium_thumb - Binary storage for the medium thumbnail
     * large_thumb - Binary storage for the large thumbnail
+    * blobs_in_store - Sizes whose column is NULL live in the on-disk blob
+      store (thumbnails.blob_store, THUMBNAIL_BLOB_STORE_SIZES)
+    * generation - Invalidation counter used for HTTP cache versioning
+    * encoding - Encoding of all three blobs (JPEG, WEBP, AVIF, ...)
+    * perceptual_hash - dHash of the small thumbnail, for near-duplicate search
 
     NULL is the only "no thumbnail data" state for the blob fields; empty
-    bytes are rejected by the thumbnails_no_empty_blobs constraint.
+    bytes are rejected by the thumbnails_no_empty_blobs constraint. Use
+    thumbnail_exists() / open_sized_tnail() rather than reading the columns
+    directly, so store-resident blobs are found.
 
     Example:
         >>> thumb = ThumbnailFiles.get_or_create_thumbnail_record(
@@ -153,6 +405,20 @@ class ThumbnailFiles(models.Model):
     small_thumb = models.BinaryField(default=None, null=True)
     medium_thumb = models.BinaryField(default=None, null=True)
     large_thumb = models.BinaryField(default=None, null=True)
+    # True when the blobs of this row were written with THUMBNAIL_BLOB_STORE_SIZES
+    # set: each size whose column above is NULL is a file in the blob store.
+    blobs_in_store = models.BooleanField(default=False)
+    # Bumped by invalidate_thumb(); part of the thumbnail URL version and ETag,
+    # so browsers holding an immutable copy fetch the regenerated one.
+    generation = models.PositiveIntegerField(default=0)
+    # Encoder name (thumbnails.engine.encoders) the three blobs were written
+    # with; set by store_blobs(). Rows from before encodings were pluggable
+    # are JPEG.
+    encoding = models.CharField(max_length=8, default=BASELINE_ENCODING)
+    # 64-bit difference hash of the small thumbnail (thumbnails.engine.perceptual_hash),
+    # set by store_blobs(); NULL until generated or if the blob can't be decoded.
+    # Compared by Hamming distance to find visually similar images.
+    perceptual_hash = models.BigIntegerField(default=None, null=True)
 
     # Reverse ForeignKey relationship
     FileIndex: "RelatedManager[FileIndexModel]"  # From FileIndex.new_ftnail
@@ -182,7 +448,7 @@ class ThumbnailFiles(models.Model):
             models.Index(
                 fields=["id"],
                 name="thumbnails_small_missing_idx",
-                condition=models.Q(small_thumb__isnull=True),
+                condition=models.Q(small_thumb__isnull=True, blobs_in_store=False),
             ),
         ]
         constraints = [
@@ -200,6 +466,7 @@ class ThumbnailFiles(models.Model):
         suppress_save: bool,
         prefetch_related_thumbnail: list[str] | tuple[str, ...],
         select_related_fileindex: list[str] | tuple[str, ...],
+        prerendered: dict[str, bytes] | None = None,
     ) -> "ThumbnailFiles":
         """
         Get or create a thumbnail record for a file.
@@ -209,6 +476,9 @@ class ThumbnailFiles(models.Model):
             suppress_save: If True, do not save the thumbnail after creation
             prefetch_related_thumbnail: Related fields to prefetch for ThumbnailFiles (required)
             select_related_fileindex: Related fields to select_related for FileIndex (required)
+            prerendered: Blobs already rendered for this SHA256 by the batch
+                process pool (thumbnails.render_pool); used instead of
+                rendering in-process. All validation still applies.
 
         Returns:
             ThumbnailFiles object, either retrieved from database or newly created
@@ -289,15 +559,16 @@ class ThumbnailFiles(models.Model):
             # all three blob columns — no blob data crosses the wire just to
             # answer "is it generated yet?". NULL is the only "no thumbnail
             # data" state (thumbnails_no_empty_blobs constraint), and blobs are
-            # generated together, so probing small_thumb alone is sufficient.
+            # generated together, so probing small_thumb (or the blob-store
+            # flag) alone is sufficient.
             # Skip the probe on fresh creates — no other process could have
             # modified a record that didn't exist until this transaction.
-            if not created and ThumbnailFiles.objects.filter(pk=thumbnail.pk, small_thumb__isnull=False).exists():
+            if not created and ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q, pk=thumbnail.pk).exists():
                 return thumbnail
 
             index_data_item = ThumbnailFiles._resolve_index_item_for_sha(thumbnail, file_sha256, select_related_fileindex, created, has_unlinked)
 
-            return ThumbnailFiles._generate_and_store_blobs(thumbnail, index_data_item, file_sha256, suppress_save)
+            return ThumbnailFiles._generate_and_store_blobs(thumbnail, index_data_item, file_sha256, suppress_save, prerendered)
 
     @staticmethod
     def _resolve_index_item_for_sha(
@@ -401,6 +672,7 @@ class ThumbnailFiles(models.Model):
         index_data_item: "FileIndexModel",
         file_sha256: str,
         suppress_save: bool,
+        prerendered: dict[str, bytes] | None = None,
     ) -> "ThumbnailFiles":
         """
         Generate thumbnail blobs for a resolved FileIndex record and store them.
@@ -413,6 +685,7 @@ class ThumbnailFiles(models.Model):
             index_data_item: The resolved FileIndex record to generate a thumbnail for
             file_sha256: The sha256 hash of the file
             suppress_save: If True, do not save the thumbnail after creation
+            prerendered: Blobs rendered by the batch process pool, if any
 
         Returns:
             The thumbnail record, populated with blobs on success or unchanged
@@ -454,17 +727,12 @@ class ThumbnailFiles(models.Model):
 
         # Try to create thumbnails, but mark as generic on any failure
         thumbnails = None  # Initialize to prevent UnboundLocalError
+        media_info = None
         try:
             if filetype.is_image:
                 # "auto" resolves to CoreImage only when settings.MACINTOSH_OPTIMIZATIONS
                 # is True (and the platform supports it); otherwise PIL.
-                thumbnails = create_thumbnails_from_path(
-                    filename,
-                    settings.IMAGE_SIZE,
-                    output="JPEG",
-                    quality=settings.PIL_IMAGE_QUALITY,
-                    backend="auto",
-                )
+                thumbnails = _create_thumbnails(filename, "auto", prerendered)
 
                 # Validate thumbnail is not empty
                 if not thumbnails or not thumbnails.get("small"):
@@ -476,13 +744,9 @@ class ThumbnailFiles(models.Model):
             elif filetype.is_movie:
                 # "corevideo" resolves to AVFoundation only when
                 # settings.MACINTOSH_OPTIMIZATIONS is True; otherwise FFmpeg.
-                thumbnails = create_thumbnails_from_path(
-                    filename,
-                    settings.IMAGE_SIZE,
-                    output="JPEG",
-                    quality=settings.PIL_IMAGE_QUALITY,
-                    backend="corevideo",
-                )
+                # A stored probe supplies the seek offset (no probe subprocess).
+                media_info = None if prerendered else MediaProbe.seek_info([file_sha256]).get(file_sha256)
+                thumbnails = _create_thumbnails(filename, "corevideo", prerendered, media_info)
                 # Validate result
                 if not thumbnails or not thumbnails.get("small"):
                     raise ThumbnailGenerationError(
@@ -493,13 +757,7 @@ class ThumbnailFiles(models.Model):
             elif filetype.is_pdf:
                 # "pdf" resolves to PDFKit only when settings.MACINTOSH_OPTIMIZATIONS
                 # is True (and the platform supports it); otherwise PyMuPDF.
-                thumbnails = create_thumbnails_from_path(
-                    filename,
-                    settings.IMAGE_SIZE,
-                    output="JPEG",
-                    quality=settings.PIL_IMAGE_QUALITY,
-                    backend="pdf",
-                )
+                thumbnails = _create_thumbnails(filename, "pdf", prerendered)
                 # Validate result
                 if not thumbnails or not thumbnails.get("small"):
                     raise ThumbnailGenerationError(
@@ -537,20 +795,12 @@ class ThumbnailFiles(models.Model):
                 )
                 logger.warning("%s", white_defect_msg)
                 print(white_defect_msg)
-                thumbnails = create_thumbnails_from_path(
-                    filename,
-                    settings.IMAGE_SIZE,
-                    output="JPEG",
-                    quality=settings.PIL_IMAGE_QUALITY,
-                    backend=fallback_backend,
-                )
+                thumbnails = _create_thumbnails(filename, fallback_backend, media_info=media_info)
 
-            thumbnail.small_thumb = thumbnails["small"]
-            thumbnail.medium_thumb = thumbnails["medium"]
-            thumbnail.large_thumb = thumbnails["large"]
+            thumbnail.store_blobs(thumbnails, thumbnail_encoding())
 
             if not suppress_save:
-                thumbnail.save(update_fields=["small_thumb", "medium_thumb", "large_thumb"])
+                thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
 
             # If this was a retry (file was marked generic), turn off generic flag
             # on success for ALL instances
@@ -570,6 +820,7 @@ class ThumbnailFiles(models.Model):
             # Clear layout cache so gallery view reflects the removed file
             if index_data_item.home_directory_id:
                 clear_layout_cache_for_directories({index_data_item.home_directory_id})
+            bump_search_generation()
 
         except MediaProcessingError as e:
             # File exists but the media backend could not decode it (corrupt,
@@ -603,23 +854,77 @@ class ThumbnailFiles(models.Model):
 
         Returns:
             True if the thumbnail exists, False otherwise
+
+        Note:
+            A store-resident blob is reported from the blobs_in_store flag
+            alone (no stat); open_sized_tnail() returns None if its file has
+            gone missing.
         """
         match size.lower():
             case "small":
-                return self.small_thumb not in _EMPTY_THUMB_VALUES
+                blobdata = self.small_thumb
             case "medium":
-                return self.medium_thumb not in _EMPTY_THUMB_VALUES
+                blobdata = self.medium_thumb
             case "large":
-                return self.large_thumb not in _EMPTY_THUMB_VALUES
-        return False
+                blobdata = self.large_thumb
+            case _:
+                return False
+        return blobdata not in _EMPTY_THUMB_VALUES or self.blobs_in_store
+
+    def store_blobs(self, thumbnails: dict[str, bytes], encoding: str = BASELINE_ENCODING, write_store: bool = True) -> dict[str, bytes]:
+        """
+        Assign freshly generated blobs, routing each size to the database or the blob store.
+
+        Sizes in THUMBNAIL_BLOB_STORE_SIZES are written to the blob store and
+        their column left NULL; the rest go in their column as before. A size
+        whose file can't be written falls back to its column. The perceptual
+        hash is computed from the small blob here, while it is in memory.
+        Does not save — callers save (or bulk_update) THUMBNAIL_BLOB_FIELDS.
+
+        Args:
+            thumbnails: {"small", "medium", "large"} → encoded bytes
+            encoding: Encoder name the blobs were written with
+            write_store: Write blob-store files now (default). When False the
+                row is assigned as if every write succeeded and the files are
+                returned for the caller to write once its update commits.
+
+        Returns:
+            {size: bytes} still to be written to the blob store (empty when
+            write_store is True)
+        """
+        to_store = stored_sizes()
+        in_store = False
+        unwritten: dict[str, bytes] = {}
+        for size in THUMBNAIL_SIZES:
+            blobdata: bytes | None = thumbnails[size]
+            if size in to_store and self.sha256_hash and not write_store:
+                unwritten[size] = thumbnails[size]
+                blobdata = None
+                in_store = True
+            elif size in to_store and self.sha256_hash:
+                try:
+                    thumbnail_blob_store.write(self.sha256_hash, size, thumbnails[size])
+                    blobdata = None
+                    in_store = True
+                except OSError as e:
+                    logger.warning("Blob store write failed for %s (%s), keeping it in the database: %s", self.sha256_hash, size, e)
+            setattr(self, f"{size}_thumb", blobdata)
+        self.blobs_in_store = in_store
+        self.encoding = encoding
+        self.perceptual_hash = perceptual_hash(thumbnails["small"])
+        return unwritten
 
     def invalidate_thumb(self) -> None:
         """
         Clear all thumbnail data for regeneration.
 
         Sets all thumbnail binary fields (small, medium, large) to None —
-        NULL is the canonical "no thumbnail data" state.
-        Does not save the object - call save() explicitly after invalidation.
+        NULL is the canonical "no thumbnail data" state — clears
+        blobs_in_store and perceptual_hash, and bumps generation so cached
+        copies (versioned URLs, ETags) are superseded. Blob-store files are left to be overwritten on
+        regeneration (or pruned by migrate_thumbnail_blobs --prune).
+        Does not save the object - call save(update_fields=THUMBNAIL_BLOB_FIELDS)
+        explicitly after invalidation.
 
         Returns:
             None
@@ -636,6 +941,20 @@ class ThumbnailFiles(models.Model):
         self.small_thumb = None
         self.medium_thumb = None
         self.large_thumb = None
+        self.blobs_in_store = False
+        self.perceptual_hash = None
+        self.generation += 1
+
+    def _column_blob(self, size: str) -> bytes | memoryview | None:
+        """Return the database column for a size (None for an unknown size)."""
+        match size.lower():
+            case "small":
+                return self.small_thumb
+            case "medium":
+                return self.medium_thumb
+            case "large":
+                return self.large_thumb
+        return None
 
     def retrieve_sized_tnail(self, size: str = "small") -> bytes:
         """
@@ -646,17 +965,74 @@ class ThumbnailFiles(models.Model):
 
         Returns:
             Binary blob containing the image data for the specified size,
-            or b"" when no thumbnail has been generated (column is NULL).
+            from its column or the blob store, or b"" when no thumbnail has
+            been generated (column is NULL and nothing is stored).
         """
-        blobdata: bytes | memoryview | None = b""
-        match size.lower():
-            case "small":
-                blobdata = self.small_thumb
-            case "medium":
-                blobdata = self.medium_thumb
-            case "large":
-                blobdata = self.large_thumb
-        return bytes(blobdata) if blobdata else b""
+        blobdata = self._column_blob(size)
+        if blobdata:
+            return bytes(blobdata)
+        if self.blobs_in_store and self.sha256_hash and size.lower() in THUMBNAIL_SIZES:
+            return thumbnail_blob_store.read(self.sha256_hash, size.lower()) or b""
+        return b""
+
+    def transcoded_sized_tnail(self, size: str, encoding: str) -> bytes:
+        """
+        Get thumbnail blob of specified size, re-encoded in another encoding.
+
+        Used when the client can't decode the stored encoding. The result is
+        kept in transcoded_thumbnail_cache, keyed on the row's generation.
+
+        Args:
+            size: The size string (small, medium, or large)
+            encoding: The encoding to send (normally JPEG)
+
+        Returns:
+            The re-encoded blob, or b"" when no thumbnail has been generated
+        """
+        key = (self.sha256_hash, size.lower(), self.generation, encoding)
+        blob = transcoded_thumbnail_cache.get(key)
+        if blob is None:
+            stored = self.retrieve_sized_tnail(size=size)
+            if not stored:
+                return b""
+            blob = transcode_image_bytes(stored, encoding, thumbnail_quality(encoding))
+            if self.sha256_hash:
+                transcoded_thumbnail_cache[key] = blob
+        return blob
+
+    def stored_blob_exists(self, size: str = "small") -> bool:
+        """
+        Return True unless a size that should be in the blob store has no file there.
+
+        Database-resident sizes are always reported present; one stat() for
+        a store-resident size.
+        """
+        if self._column_blob(size) or not self.blobs_in_store or not self.sha256_hash:
+            return True
+        return size.lower() in THUMBNAIL_SIZES and thumbnail_blob_store.blob_size(self.sha256_hash, size.lower()) is not None
+
+    def open_sized_tnail(self, size: str = "small") -> BinaryIO | None:
+        """
+        Open the thumbnail of a size for streaming into a response.
+
+        A store-resident blob is returned as an open file, which
+        FileResponse streams with wsgi.file_wrapper (sendfile where the
+        server supports it); a database blob is wrapped in BytesIO without
+        the intermediate bytes() copy retrieve_sized_tnail makes.
+
+        Args:
+            size: The size string (small, medium, or large)
+
+        Returns:
+            A binary file object (the response closes it), or None when the
+            size has no data or its blob-store file is missing.
+        """
+        blobdata = self._column_blob(size)
+        if blobdata:
+            return io.BytesIO(blobdata)
+        if self.blobs_in_store and self.sha256_hash and size.lower() in THUMBNAIL_SIZES:
+            return thumbnail_blob_store.open(self.sha256_hash, size.lower())
+        return None
 
     def send_thumbnail(
         self,
@@ -664,6 +1040,8 @@ class ThumbnailFiles(models.Model):
         fext_override: str | None = None,
         size: str = "small",
         index_data_item: "FileIndexModel | None" = None,
+        version: str | None = None,
+        accept: str | None = None,
     ):
         """
         Send thumbnail as HTTP response with appropriate headers.
@@ -673,13 +1051,20 @@ class ThumbnailFiles(models.Model):
             fext_override: Unused; retained for API compatibility
             size: The size of thumbnail to send (small, medium, or large)
             index_data_item: Pre-fetched FileIndex to avoid additional query
+            version: The request's ?v= token; when it matches this row's
+                cache version the response is marked immutable
+            accept: The request's Accept header; a blob stored in an
+                encoding the client doesn't list is sent as JPEG
+                (negotiate_thumbnail_encoding)
 
         Returns:
             Django FileResponse containing the thumbnail with appropriate headers
 
         Note:
-            Thumbnails are stored as JPEGs, so JPEG will always be sent regardless of
-            the original file type.
+            The Content-Type is the encoding sent (the row's encoding, or JPEG
+            after negotiation), regardless of the original file type. Rendered
+            thumbnails carry a strong ETag; generic filetype icons are sent
+            with the filetype's own headers.
 
         Example:
             >>> thumbnail.send_thumbnail(filename_override="cover.jpg", size="medium")
@@ -711,26 +1096,38 @@ class ThumbnailFiles(models.Model):
         else:
             filename = filename_override or "thumbnail"
 
-        mtype = "image/jpeg"
-        blob = self.retrieve_sized_tnail(size=size)
+        encoding = negotiate_thumbnail_encoding(self.encoding, accept)
+        if encoding == self.encoding:
+            content = self.open_sized_tnail(size=size)
+        else:
+            # Client can't decode the stored encoding: send the (cached) transcode
+            transcoded = self.transcoded_sized_tnail(size, encoding)
+            content = io.BytesIO(transcoded) if transcoded else None
 
         # Validate that thumbnail blob is not empty
-        if not blob:
+        if content is None:
             raise ThumbnailGenerationError(f"Thumbnail blob is empty for {filename}", filename=filename)
 
-        return send_file_response(
+        response = send_file_response(
             filename=filename,
-            content_to_send=io.BytesIO(blob),
-            mtype=mtype or "image/jpeg",
+            content_to_send=content,
+            mtype=get_encoder(encoding).mime_type,
             attachment=False,
-            expiration=300,
+            expiration=settings.HTTP_CACHE_MAX_AGE,
         )
+        if self.sha256_hash:
+            response["ETag"] = thumbnail_etag(self.sha256_hash, size.lower(), self.generation, encoding)
+            response["Cache-Control"] = thumbnail_cache_control(self.sha256_hash, self.generation, version)
+        if self.encoding != BASELINE_ENCODING:
+            patch_vary_headers(response, ("Accept",))
+        return response
 
     # Batch thumbnail generation lives in quickbbs.tasks.generate_missing_thumbnails
-    # (suppress_save=True + one bulk_update). Image decode there is sequential by
-    # design: ThreadPoolExecutor with the ORM is forbidden (see
-    # .claude/critical-runtime.md) and ProcessPoolExecutor cannot spawn from the
-    # daemon worker threads that run tasks (see quickbbs/common.py).
+    # (suppress_save=True + one bulk_update). The ORM side there is sequential by
+    # design — ThreadPoolExecutor with the ORM is forbidden (see
+    # .claude/critical-runtime.md) — while decode/resize for the cross-platform
+    # backends is pre-rendered on a process pool (thumbnails/render_pool.py)
+    # and handed in through get_or_create_thumbnail_record(prerendered=...).
     @classmethod
     def get_files_needing_thumbnail_shas(cls, directory: "DirectoryIndex", sort_ordering: int) -> "QuerySet":
         """
@@ -738,9 +1135,10 @@ class ThumbnailFiles(models.Model):
 
         A file needs a thumbnail when either:
         1. It has no ThumbnailFiles link (``new_ftnail__isnull=True``), or
-        2. Its linked ThumbnailFiles row has ``small_thumb`` NULL — the canonical
-           "no thumbnail data" state (a record is linked before generation
-           completes; see get_or_create_thumbnail_record).
+        2. Its linked ThumbnailFiles row has ``small_thumb`` NULL and nothing
+           in the blob store — the canonical "no thumbnail data" state (a
+           record is linked before generation completes; see
+           get_or_create_thumbnail_record).
 
         The NULL condition is evaluated as a subquery over the
         ``thumbnails_small_missing_idx`` partial index, so the planner hashes
@@ -759,7 +1157,7 @@ class ThumbnailFiles(models.Model):
         Returns:
             QuerySet of file_sha256 values for files needing thumbnail generation.
         """
-        missing_thumb_ids = cls.objects.filter(small_thumb__isnull=True).values("id")
+        missing_thumb_ids = cls.objects.filter(THUMBNAIL_MISSING_Q).values("id")
         # cast: files_in_dir with distinct=False always returns a QuerySet,
         # but its union return type can't be narrowed by mypy.
         return (
@@ -770,3 +1168,9 @@ class ThumbnailFiles(models.Model):
             .filter(Q(new_ftnail__isnull=True) | Q(new_ftnail_id__in=missing_thumb_ids))
             .values_list("file_sha256", flat=True)
         )
+
+
+# Registers the generation queue model with the thumbnails app (allows: from thumbnails.models import ThumbnailQueueEntry)
+from thumbnails.generation_queue import (  # noqa: E402,F401  # pylint: disable=wrong-import-position,unused-import
+    ThumbnailQueueEntry,
+)
@@ -0,0 +1,191 @@
+"""
+Process pool for the CPU-bound part of batch thumbnail generation.
+
+quickbbs.tasks.generate_missing_thumbnails used to decode and resize every
+file of a batch one after another in the task thread: ORM work may not be
+spread across threads, so the whole get_or_create_thumbnail_record pipeline
+ran sequentially and a 16-core host produced a few thumbnails per second.
+
+The pure-CPU step — create_thumbnails_from_path() — needs no database. This
+module renders it for a whole batch on a pool of spawned worker processes
+that receive only (path, backend) and return the three encoded blobs. Everything
+that touches the ORM (advisory locks, FileIndex resolution, generic-icon
+flags, the single bulk_update) still runs in the task thread, which then
+finds each blob set already rendered (get_or_create_thumbnail_record's
+prerendered argument).
+
+Only the cross-platform backends are offloaded — PIL ("image"), PyMuPDF
+("pymupdf") and FFmpeg ("video"). When MACINTOSH_OPTIMIZATIONS selects Core
+Image / AVFoundation / PDFKit, those GPU/framework-backed backends keep
+running in-process. A file that fails to render in a worker is simply not
+returned; the task thread renders it again in-process so the existing error
+handling (delete_pending, generic icon) applies unchanged.
+
+Worker reads go through quickbbs.io_scheduler.run_per_device, so
+IO_DEVICE_LIMITS caps readers per volume as it does for SHA256 hashing.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from django.conf import settings
+
+from quickbbs.io_scheduler import run_per_device
+from thumbnails.engine import create_thumbnails_from_path, resolve_backend_name
+
+logger = logging.getLogger(__name__)
+
+# Backend selector used for each media kind in ThumbnailFiles._generate_and_store_blobs
+MEDIA_BACKENDS = {"image": "auto", "movie": "corevideo", "pdf": "pdf"}
+
+# Resolved backend class → explicit backend name a worker can run. Classes
+# missing here (CoreImageBackend, AVFoundationVideoBackend, PDFKitBackend)
+# stay in-process.
+_OFFLOADABLE_BACKENDS = {"ImageBackend": "image", "VideoBackend": "video", "PDFBackend": "pymupdf"}
+
+
+def render_thumbnails(
+    file_path: str,
+    sizes: dict[str, tuple[int, int]],
+    quality: int,
+    backend: str,
+    media_info: dict[str, Any] | None = None,
+    output: str = "JPEG",
+) -> tuple[dict[str, bytes] | None, str | None]:
+    """
+    Worker entry point: render thumbnails for one file in the output encoding.
+
+    media_info is the stored probe of a video (quickbbs.mediaprobe), passed
+    to the backend so it skips its own probe.
+
+    Returns:
+        (blobs, None) on success, or (None, error_message) on any failure —
+        worker exceptions are reported as text, since backend exception
+        types are not guaranteed to pickle.
+    """
+    try:
+        return (
+            create_thumbnails_from_path(file_path, sizes, output=output, quality=quality, backend=backend, media_info=media_info),  # type: ignore[arg-type]
+            None,
+        )
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return None, f"{type(exc).__name__}: {exc}"
+
+
+class ThumbnailRenderPool:
+    """
+    Lazily started, process-wide pool of thumbnail render workers.
+
+    Shared by every taskrunner thread; a pool that can't start or breaks is
+    disabled for the rest of the process and batches render in-process.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._broken = False
+
+    @property
+    def enabled(self) -> bool:
+        """True when THUMBNAIL_PROCESS_POOL_ENABLED is set and the pool has not failed."""
+        return settings.THUMBNAIL_PROCESS_POOL_ENABLED and not self._broken
+
+    @staticmethod
+    def offload_backend(media_kind: str) -> str | None:
+        """
+        Return the explicit backend a worker should use for a media kind, or None to render in-process.
+
+        Args:
+            media_kind: "image", "movie", or "pdf"
+        """
+        backend = MEDIA_BACKENDS.get(media_kind)
+        if backend is None:
+            return None
+        return _OFFLOADABLE_BACKENDS.get(resolve_backend_name(backend, settings.IMAGE_SIZE))  # type: ignore[arg-type]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    max_workers = settings.THUMBNAIL_PROCESS_WORKERS or os.cpu_count() or 4
+                    # spawn, not fork: the taskrunner holds DB connections and threads
+                    self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+                    atexit.register(self.shutdown)
+                    logger.info("Initialized thumbnail render ProcessPoolExecutor with %d workers", max_workers)
+        return self._executor
+
+    def render(self, jobs: dict[str, tuple[str, str]], media_info: dict[str, dict[str, Any]] | None = None) -> dict[str, dict[str, bytes]]:
+        """
+        Render a batch on the pool.
+
+        Args:
+            jobs: Key (SHA256) → (file path, explicit backend from offload_backend())
+            media_info: Key → stored video probe (MediaProbe.seek_info), for
+                the keys that have one
+
+        Returns:
+            Key → {"small", "medium", "large"} blobs for every job that
+            rendered successfully. Failed jobs are omitted (logged at debug);
+            the caller renders them in-process.
+        """
+        rendered: dict[str, dict[str, bytes]] = {}
+        if not jobs or not self.enabled:
+            return rendered
+
+        keys_by_path: dict[str, list[str]] = {}
+        backend_by_path: dict[str, str] = {}
+        media_info_by_path: dict[str, dict[str, Any]] = {}
+        for key, (path, backend) in jobs.items():
+            keys_by_path.setdefault(path, []).append(key)
+            backend_by_path[path] = backend
+            if media_info and key in media_info:
+                media_info_by_path[path] = media_info[key]
+
+        # Imported here: spawned workers import this module before Django is set up
+        from thumbnails.models import (  # pylint: disable=import-outside-toplevel
+            thumbnail_encoding,
+            thumbnail_quality,
+        )
+
+        sizes = settings.IMAGE_SIZE
+        # Same encoding and quality as in-process generation (_create_thumbnails)
+        output = thumbnail_encoding()
+        quality = thumbnail_quality(output)
+
+        def submit(path: str) -> Future:
+            return executor.submit(render_thumbnails, path, sizes, quality, backend_by_path[path], media_info_by_path.get(path), output)
+
+        def collect(path: str, future: Future) -> None:
+            blobs, error = future.result()
+            if blobs is None or not blobs.get("small"):
+                logger.debug("Thumbnail worker could not render %s: %s", path, error or "empty result")
+                return
+            for key in keys_by_path[path]:
+                rendered[key] = blobs
+
+        try:
+            executor = self._get_executor()
+            run_per_device(keys_by_path, submit, collect)
+        except (BrokenProcessPool, OSError, RuntimeError, AssertionError) as e:
+            logger.warning("Thumbnail render pool unavailable, rendering in-process: %s", e)
+            self._broken = True
+            self.shutdown()
+        return rendered
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (called at exit, or after the pool broke)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+thumbnail_render_pool = ThumbnailRenderPool()
@@ -0,0 +1,206 @@
+"""
+Tests for the on-disk thumbnail blob store (thumbnails/blob_store.py), its use
+by ThumbnailFiles, and the migrate_thumbnail_blobs management command.
+
+DATABASE SAFETY NOTES
+---------------------
+- Store tests use SimpleTestCase (no database).
+- Model and command tests use Django's TestCase (transaction rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import tempfile
+from unittest import mock
+
+import pytest
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quickbbs.management.commands.migrate_thumbnail_blobs import (
+    migrate_thumbnail_blobs,
+    prune_thumbnail_blobs,
+)
+from thumbnails import models as thumbnail_models
+from thumbnails.blob_store import stored_sizes, thumbnail_blob_store
+from thumbnails.models import (
+    THUMBNAIL_BLOB_FIELDS,
+    THUMBNAIL_GENERATED_Q,
+    THUMBNAIL_MISSING_Q,
+    ThumbnailFiles,
+)
+
+pytestmark = pytest.mark.api
+
+SHA = "ab" * 32
+BLOBS = {"small": b"\xff\xd8small", "medium": b"\xff\xd8medium", "large": b"\xff\xd8large"}
+
+
+class BlobStoreMixin:
+    """Points THUMBNAIL_BLOB_STORE_PATH at a fresh temp directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.store_dir = tempfile.mkdtemp()
+        self._store_override = override_settings(THUMBNAIL_BLOB_STORE_PATH=self.store_dir)
+        self._store_override.enable()
+
+    def tearDown(self):
+        self._store_override.disable()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        super().tearDown()
+
+
+class TestFileBlobStore(BlobStoreMixin, SimpleTestCase):
+    """FileBlobStore layout and file operations."""
+
+    def test_path_is_sharded_by_hash_prefix(self):
+        assert thumbnail_blob_store.path(SHA, "medium") == os.path.join(self.store_dir, "medium", "ab", "ab", f"{SHA}.jpg")
+
+    def test_round_trip(self):
+        thumbnail_blob_store.write(SHA, "small", BLOBS["small"])
+
+        assert thumbnail_blob_store.read(SHA, "small") == BLOBS["small"]
+        assert thumbnail_blob_store.blob_size(SHA, "small") == len(BLOBS["small"])
+        with thumbnail_blob_store.open(SHA, "small") as handle:
+            assert handle.read() == BLOBS["small"]
+        assert list(thumbnail_blob_store.iter_hashes("small")) == [SHA]
+
+        assert thumbnail_blob_store.delete(SHA, "small") is True
+        assert thumbnail_blob_store.delete(SHA, "small") is False
+        assert thumbnail_blob_store.read(SHA, "small") is None
+        assert thumbnail_blob_store.open(SHA, "small") is None
+
+    def test_written_files_are_world_readable(self):
+        """Blobs get 0644 less the umask, not mkstemp()'s 0600."""
+        umask = os.umask(0)
+        os.umask(umask)
+        thumbnail_blob_store.write(SHA, "small", BLOBS["small"])
+
+        assert stat.S_IMODE(os.stat(thumbnail_blob_store.path(SHA, "small")).st_mode) == 0o644 & ~umask
+
+    def test_rejects_keys_that_are_not_hashes(self):
+        with pytest.raises(ValueError):
+            thumbnail_blob_store.path("../../etc/passwd", "small")
+        with pytest.raises(ValueError):
+            thumbnail_blob_store.path(SHA, "huge")
+
+    @override_settings(THUMBNAIL_BLOB_STORE_SIZES=("large", "tiny"))
+    def test_unknown_size_setting_rejected(self):
+        with pytest.raises(ValueError):
+            stored_sizes()
+
+
+class ThumbnailRowTestCase(BlobStoreMixin, TestCase):
+    """Creates one ThumbnailFiles row with no blobs."""
+
+    def setUp(self):
+        super().setUp()
+        self.thumbnail = ThumbnailFiles.objects.create(sha256_hash=SHA)
+
+    def _stored(self, sizes: tuple[str, ...]) -> ThumbnailFiles:
+        with override_settings(THUMBNAIL_BLOB_STORE_SIZES=sizes):
+            self.thumbnail.store_blobs(dict(BLOBS))
+        self.thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
+        return ThumbnailFiles.objects.get(pk=self.thumbnail.pk)
+
+
+class TestThumbnailFilesStorage(ThumbnailRowTestCase):
+    """ThumbnailFiles routes, finds, and serves blobs per THUMBNAIL_BLOB_STORE_SIZES."""
+
+    def test_default_keeps_everything_in_the_database(self):
+        thumbnail = self._stored(())
+
+        assert thumbnail.blobs_in_store is False
+        assert bytes(thumbnail.large_thumb) == BLOBS["large"]
+        assert list(thumbnail_blob_store.iter_hashes("large")) == []
+
+    def test_selected_sizes_go_to_the_store(self):
+        thumbnail = self._stored(("medium", "large"))
+
+        assert thumbnail.blobs_in_store is True
+        assert bytes(thumbnail.small_thumb) == BLOBS["small"]
+        assert thumbnail.medium_thumb is None and thumbnail.large_thumb is None
+        for size, blob in BLOBS.items():
+            assert thumbnail.thumbnail_exists(size)
+            assert thumbnail.retrieve_sized_tnail(size) == blob
+
+    def test_store_only_row_counts_as_generated(self):
+        self._stored(("small", "medium", "large"))
+
+        assert ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q, pk=self.thumbnail.pk).exists()
+        assert not ThumbnailFiles.objects.filter(THUMBNAIL_MISSING_Q, pk=self.thumbnail.pk).exists()
+
+    def test_send_thumbnail_streams_the_store_file(self):
+        thumbnail = self._stored(("large",))
+
+        response = thumbnail.send_thumbnail(filename_override="photo.jpg", size="large")
+
+        assert response.file_to_stream.name == thumbnail_blob_store.path(SHA, "large")
+        assert b"".join(response.streaming_content) == BLOBS["large"]
+
+    def test_missing_store_file(self):
+        thumbnail = self._stored(("large",))
+        thumbnail_blob_store.delete(SHA, "large")
+
+        assert thumbnail.stored_blob_exists("small") is True
+        assert thumbnail.stored_blob_exists("large") is False
+        assert thumbnail.open_sized_tnail("large") is None
+
+    def test_write_failure_keeps_the_blob_in_the_database(self):
+        with mock.patch.object(thumbnail_models.thumbnail_blob_store, "write", side_effect=OSError("read-only volume")):
+            thumbnail = self._stored(("large",))
+
+        assert thumbnail.blobs_in_store is False
+        assert bytes(thumbnail.large_thumb) == BLOBS["large"]
+
+    def test_invalidate_clears_the_store_flag(self):
+        thumbnail = self._stored(("large",))
+
+        thumbnail.invalidate_thumb()
+        thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
+
+        assert ThumbnailFiles.objects.filter(THUMBNAIL_MISSING_Q, pk=self.thumbnail.pk).exists()
+
+
+class TestMigrateThumbnailBlobs(ThumbnailRowTestCase):
+    """migrate_thumbnail_blobs moves existing rows in both directions."""
+
+    def test_moves_to_store_and_back(self):
+        self._stored(())
+
+        with override_settings(THUMBNAIL_BLOB_STORE_SIZES=("medium", "large")):
+            assert migrate_thumbnail_blobs(dry_run=True)["to_store"] == 2
+            totals = migrate_thumbnail_blobs()
+        thumbnail = ThumbnailFiles.objects.get(pk=self.thumbnail.pk)
+        assert (totals["rows"], totals["to_store"]) == (1, 2)
+        assert thumbnail.blobs_in_store is True and thumbnail.large_thumb is None
+        assert thumbnail_blob_store.read(SHA, "large") == BLOBS["large"]
+
+        totals = migrate_thumbnail_blobs()
+        thumbnail = ThumbnailFiles.objects.get(pk=self.thumbnail.pk)
+        assert totals["to_database"] == 2
+        assert thumbnail.blobs_in_store is False
+        assert bytes(thumbnail.large_thumb) == BLOBS["large"]
+        assert thumbnail_blob_store.read(SHA, "large") is None
+
+    def test_missing_store_file_invalidates_the_row(self):
+        self._stored(("large",))
+        thumbnail_blob_store.delete(SHA, "large")
+
+        totals = migrate_thumbnail_blobs()
+
+        assert totals["invalidated"] == 1
+        assert ThumbnailFiles.objects.filter(THUMBNAIL_MISSING_Q, pk=self.thumbnail.pk).exists()
+
+    def test_prune_removes_unreferenced_files(self):
+        self._stored(("large",))
+        orphan = "cd" * 32
+        thumbnail_blob_store.write(orphan, "large", b"orphan")
+
+        assert prune_thumbnail_blobs() == 1
+        assert thumbnail_blob_store.read(SHA, "large") == BLOBS["large"]
+        assert thumbnail_blob_store.read(orphan, "large") is None
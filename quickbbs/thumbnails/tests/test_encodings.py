@@ -0,0 +1,214 @@
+"""
+Tests for pluggable thumbnail encodings: Accept negotiation, serving rows
+stored as WebP, and the reencode_thumbnails management command.
+
+DATABASE SAFETY NOTES
+---------------------
+- Helper tests use SimpleTestCase (no database).
+- Model, view and command tests use Django's TestCase (transaction rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+from django.db.models import Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from quickbbs.management.commands import reencode_thumbnails as reencode_command
+from quickbbs.management.commands.reencode_thumbnails import reencode_thumbnails
+from thumbnails.blob_store import thumbnail_blob_store
+from thumbnails.engine import encode_image, transcode_image_bytes
+from thumbnails.models import (
+    ThumbnailFiles,
+    negotiate_thumbnail_encoding,
+    thumbnail_encoding,
+    thumbnail_etag,
+    transcoded_thumbnail_cache,
+)
+from thumbnails.views import _not_modified
+
+pytestmark = pytest.mark.api
+
+SHA = "ab" * 32
+CHROME_ACCEPT = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+LEGACY_ACCEPT = "image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5"
+
+
+def _encoded_blobs(encoding: str) -> dict[str, bytes]:
+    """Return small/medium/large blobs of a gradient in an encoding."""
+    blobs = {}
+    for size, edge in (("small", 40), ("medium", 80), ("large", 120)):
+        img = Image.new("RGB", (edge, edge))
+        img.putdata([(x % 256, (x * 7) % 256, (x * 13) % 256) for x in range(edge * edge)])
+        blobs[size] = encode_image(img, encoding, 85)
+    return blobs
+
+
+def _format_of(data: bytes) -> str:
+    with Image.open(io.BytesIO(data)) as img:
+        return img.format
+
+
+class TestNegotiation(SimpleTestCase):
+    """negotiate_thumbnail_encoding() only trusts explicit media types."""
+
+    def test_jpeg_is_always_sent_as_is(self):
+        assert negotiate_thumbnail_encoding("JPEG", LEGACY_ACCEPT) == "JPEG"
+
+    def test_explicit_media_type_keeps_stored_encoding(self):
+        assert negotiate_thumbnail_encoding("WEBP", CHROME_ACCEPT) == "WEBP"
+        assert negotiate_thumbnail_encoding("AVIF", CHROME_ACCEPT) == "AVIF"
+
+    def test_wildcards_and_q_zero_fall_back_to_jpeg(self):
+        assert negotiate_thumbnail_encoding("WEBP", LEGACY_ACCEPT) == "JPEG"
+        assert negotiate_thumbnail_encoding("WEBP", "image/webp;q=0, */*") == "JPEG"
+
+    def test_missing_header_keeps_stored_encoding(self):
+        assert negotiate_thumbnail_encoding("WEBP", None) == "WEBP"
+
+    def test_etag_names_the_sent_encoding(self):
+        assert thumbnail_etag(SHA, "small", 2) == f'"{SHA}-small-2"'
+        assert thumbnail_etag(SHA, "small", 2, "WEBP") == f'"{SHA}-small-2-webp"'
+
+    @override_settings(THUMBNAIL_ENCODING="webp")
+    def test_setting_is_canonicalised(self):
+        assert thumbnail_encoding() == "WEBP"
+
+    @override_settings(THUMBNAIL_ENCODING="BMP")
+    def test_unavailable_setting_falls_back_to_jpeg(self):
+        assert thumbnail_encoding() == "JPEG"
+
+
+class TestServeWebpRow(TestCase):
+    """send_thumbnail() and _not_modified() for a row stored as WebP."""
+
+    def setUp(self):
+        self.thumbnail = ThumbnailFiles(sha256_hash=SHA)
+        self.thumbnail.store_blobs(_encoded_blobs("WEBP"), "WEBP")
+        self.thumbnail.save()
+        self.factory = RequestFactory()
+
+    def test_client_listing_webp_gets_the_stored_blob(self):
+        response = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small", accept=CHROME_ACCEPT)
+
+        assert response["Content-Type"] == "image/webp"
+        assert response["ETag"] == f'"{SHA}-small-0-webp"'
+        assert "Accept" in response["Vary"]
+        assert _format_of(b"".join(response.streaming_content)) == "WEBP"
+
+    def test_other_clients_get_a_jpeg(self):
+        response = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small", accept=LEGACY_ACCEPT)
+
+        assert response["Content-Type"] == "image/jpeg"
+        assert response["ETag"] == f'"{SHA}-small-0"'
+        assert _format_of(b"".join(response.streaming_content)) == "JPEG"
+
+    def test_jpeg_fallback_is_transcoded_once_per_generation(self):
+        transcoded_thumbnail_cache.clear()
+        self.addCleanup(transcoded_thumbnail_cache.clear)
+
+        with mock.patch("thumbnails.models.transcode_image_bytes", wraps=transcode_image_bytes) as transcode:
+            first = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small", accept=LEGACY_ACCEPT)
+            second = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small", accept=LEGACY_ACCEPT)
+            assert b"".join(first.streaming_content) == b"".join(second.streaming_content)
+            assert transcode.call_count == 1
+
+            self.thumbnail.generation += 1
+            self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small", accept=LEGACY_ACCEPT)
+            assert transcode.call_count == 2
+
+    def test_not_modified_matches_the_negotiated_etag(self):
+        webp_request = self.factory.get("/thumbnail_file/x", HTTP_IF_NONE_MATCH=f'"{SHA}-small-0-webp"', HTTP_ACCEPT=CHROME_ACCEPT)
+        legacy_request = self.factory.get("/thumbnail_file/x", HTTP_IF_NONE_MATCH=f'"{SHA}-small-0-webp"', HTTP_ACCEPT=LEGACY_ACCEPT)
+
+        response = _not_modified(webp_request, Q(sha256_hash=SHA), "small")
+
+        assert response.status_code == 304
+        assert "Accept" in response["Vary"]
+        assert _not_modified(legacy_request, Q(sha256_hash=SHA), "small") is None
+
+    def test_jpeg_row_does_not_vary(self):
+        jpeg = ThumbnailFiles(sha256_hash="cd" * 32)
+        jpeg.store_blobs(_encoded_blobs("JPEG"))
+        jpeg.save()
+
+        response = jpeg.send_thumbnail(filename_override="a.jpg", size="small", accept=LEGACY_ACCEPT)
+
+        assert response["Content-Type"] == "image/jpeg"
+        assert not response.has_header("Vary")
+
+
+class TestReencodeCommand(TestCase):
+    """reencode_thumbnails() converts rows and measures the change."""
+
+    def setUp(self):
+        self.jpeg = ThumbnailFiles(sha256_hash=SHA)
+        self.jpeg.store_blobs(_encoded_blobs("JPEG"))
+        self.jpeg.save()
+        self.webp = ThumbnailFiles(sha256_hash="cd" * 32)
+        self.webp.store_blobs(_encoded_blobs("WEBP"), "WEBP")
+        self.webp.save()
+        ThumbnailFiles.objects.create(sha256_hash="ef" * 32)  # not generated yet
+
+    def test_converts_other_encodings_and_bumps_generation(self):
+        totals = reencode_thumbnails("WEBP")
+
+        converted = ThumbnailFiles.objects.get(pk=self.jpeg.pk)
+        assert (totals["rows"], totals["converted"], totals["blobs"]) == (1, 1, 3)
+        assert converted.encoding == "WEBP"
+        assert converted.generation == 1
+        assert _format_of(converted.retrieve_sized_tnail("large")) == "WEBP"
+        assert totals["bytes_before"] > 0 and totals["bytes_after"] > 0
+        assert totals["encode_ns"] > 0 and totals["baseline_encode_ns"] > 0
+        assert ThumbnailFiles.objects.get(pk=self.webp.pk).generation == 0
+
+    def test_dry_run_counts_by_encoding(self):
+        totals = reencode_thumbnails("JPEG", dry_run=True)
+
+        assert totals["rows"] == 1 and totals["from_WEBP"] == 1
+        assert ThumbnailFiles.objects.get(pk=self.webp.pk).encoding == "WEBP"
+
+    def test_undecodable_blob_left_unchanged(self):
+        ThumbnailFiles.objects.filter(pk=self.jpeg.pk).update(small_thumb=b"\xff\xd8broken")
+
+        totals = reencode_thumbnails("WEBP")
+
+        assert totals["failed"] == 1 and totals["converted"] == 0
+        assert ThumbnailFiles.objects.get(pk=self.jpeg.pk).encoding == "JPEG"
+
+    def test_row_changed_during_reencode_is_skipped(self):
+        """A row invalidated after it was loaded keeps the newer state."""
+        real_reencode = reencode_command._reencode_blobs
+
+        def invalidate_meanwhile(*args):
+            ThumbnailFiles.objects.filter(pk=self.jpeg.pk).update(small_thumb=None, medium_thumb=None, large_thumb=None, generation=5)
+            return real_reencode(*args)
+
+        with mock.patch.object(reencode_command, "_reencode_blobs", side_effect=invalidate_meanwhile):
+            totals = reencode_thumbnails("WEBP")
+
+        row = ThumbnailFiles.objects.get(pk=self.jpeg.pk)
+        assert totals["changed"] == 1 and totals["converted"] == 0
+        assert (row.generation, row.small_thumb, row.encoding) == (5, None, "JPEG")
+
+    def test_store_files_written_after_commit(self):
+        """Blob-store files are only rewritten once the row update commits."""
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir, ignore_errors=True)
+        with override_settings(THUMBNAIL_BLOB_STORE_PATH=store_dir, THUMBNAIL_BLOB_STORE_SIZES=("large",)):
+            with self.captureOnCommitCallbacks() as callbacks:
+                reencode_thumbnails("WEBP")
+            assert thumbnail_blob_store.read(SHA, "large") is None
+            assert ThumbnailFiles.objects.get(pk=self.jpeg.pk).blobs_in_store
+
+            for callback in callbacks:
+                callback()
+
+            assert _format_of(thumbnail_blob_store.read(SHA, "large")) == "WEBP"
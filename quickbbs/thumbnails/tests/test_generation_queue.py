@@ -0,0 +1,195 @@
+"""
+Tests for the thumbnail generation queue (thumbnails/generation_queue.py),
+its drain task and the gallery helper that fills it.
+
+DATABASE SAFETY NOTES
+---------------------
+- All tests use Django's TestCase (transaction rolled back per test).
+  SQLite ignores FOR UPDATE SKIP LOCKED; claim order and claim expiry are
+  still exercised.
+- The drain task enqueued by enqueue_thumbnails() is mocked; thumbnail
+  generation itself is mocked in the drain tests.
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.test import TestCase
+from django.utils import timezone
+
+from frontend.tests.test_views import ViewSmokeTestBase
+from frontend.views import _check_and_enqueue_missing_thumbnails
+from quickbbs import tasks
+from quickbbs.fileindex import FileIndex
+from quickbbs.tasks import process_thumbnail_queue
+from thumbnails.generation_queue import (
+    QUEUE_PRIORITY_BACKGROUND,
+    QUEUE_PRIORITY_DIRECTORY,
+    QUEUE_PRIORITY_PAGE,
+    claim_thumbnail_batch,
+    complete_thumbnail_batch,
+    enqueue_thumbnails,
+    thumbnail_queue_stats,
+)
+from thumbnails.models import ThumbnailFiles, ThumbnailQueueEntry, thumbnail_missing_annotations
+
+pytestmark = pytest.mark.api
+
+SHA_A = "aa" * 32
+SHA_B = "bb" * 32
+SHA_C = "cc" * 32
+
+
+def _priorities() -> dict[str, int]:
+    return dict(ThumbnailQueueEntry.objects.values_list("sha256_hash", "priority"))
+
+
+class QueueTestBase(TestCase):
+    """Patches out the drain task enqueue_thumbnails() queues."""
+
+    def setUp(self):
+        patcher = mock.patch("quickbbs.tasks.process_thumbnail_queue")
+        self.drain_task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestEnqueue(QueueTestBase):
+    """enqueue_thumbnails() coalesces hashes and only ever raises priority."""
+
+    def test_duplicates_are_coalesced(self):
+        assert enqueue_thumbnails([SHA_A, SHA_A, SHA_B], QUEUE_PRIORITY_DIRECTORY, 7) == 2
+        assert enqueue_thumbnails([SHA_A, SHA_B], QUEUE_PRIORITY_DIRECTORY, 7) == 0
+
+        assert _priorities() == {SHA_A: QUEUE_PRIORITY_DIRECTORY, SHA_B: QUEUE_PRIORITY_DIRECTORY}
+        self.drain_task.using.assert_called_once_with(priority=50)
+
+    def test_page_view_raises_queued_background_work(self):
+        enqueue_thumbnails([SHA_A, SHA_B], QUEUE_PRIORITY_BACKGROUND)
+
+        assert enqueue_thumbnails([SHA_A], QUEUE_PRIORITY_PAGE, 7) == 1
+
+        entry = ThumbnailQueueEntry.objects.get(sha256_hash=SHA_A)
+        assert (entry.priority, entry.directory_id) == (QUEUE_PRIORITY_PAGE, 7)
+        assert self.drain_task.using.call_args_list == [mock.call(priority=0), mock.call(priority=50)]
+
+    def test_lower_priority_does_not_demote(self):
+        enqueue_thumbnails([SHA_A], QUEUE_PRIORITY_PAGE, 7)
+
+        assert enqueue_thumbnails([SHA_A], QUEUE_PRIORITY_BACKGROUND) == 0
+        assert _priorities() == {SHA_A: QUEUE_PRIORITY_PAGE}
+
+
+class TestClaim(QueueTestBase):
+    """claim_thumbnail_batch() / complete_thumbnail_batch()."""
+
+    def setUp(self):
+        super().setUp()
+        enqueue_thumbnails([SHA_A], QUEUE_PRIORITY_BACKGROUND)
+        enqueue_thumbnails([SHA_B], QUEUE_PRIORITY_DIRECTORY, 7)
+        enqueue_thumbnails([SHA_C], QUEUE_PRIORITY_PAGE, 7)
+
+    def test_claims_highest_priority_first_and_skips_claimed_rows(self):
+        first = claim_thumbnail_batch(2)
+        second = claim_thumbnail_batch(2)
+
+        assert [entry.sha256_hash for entry in first] == [SHA_C, SHA_B]
+        assert [entry.sha256_hash for entry in second] == [SHA_A]
+        assert claim_thumbnail_batch(2) == []
+
+    def test_expired_claim_is_claimed_again(self):
+        claim_thumbnail_batch(3)
+        ThumbnailQueueEntry.objects.filter(sha256_hash=SHA_A).update(claimed_at=timezone.now() - timedelta(hours=1))
+
+        assert [entry.sha256_hash for entry in claim_thumbnail_batch(3)] == [SHA_A]
+
+    def test_complete_leaves_rows_reclaimed_by_another_worker(self):
+        batch = claim_thumbnail_batch(3)
+        ThumbnailQueueEntry.objects.filter(sha256_hash=SHA_A).update(claimed_at=timezone.now() + timedelta(seconds=1))
+
+        complete_thumbnail_batch(batch)
+
+        assert list(ThumbnailQueueEntry.objects.values_list("sha256_hash", flat=True)) == [SHA_A]
+
+    def test_stats(self):
+        ThumbnailQueueEntry.objects.filter(sha256_hash=SHA_A).update(enqueued_at=timezone.now() - timedelta(minutes=5))
+        claim_thumbnail_batch(1)
+
+        stats = thumbnail_queue_stats()
+
+        assert stats["depth"] == 3 and stats["claimed"] == 1
+        assert stats["by_priority"] == {"page": 1, "directory": 1, "background": 1}
+        assert stats["oldest_age_seconds"] >= 300
+
+
+class TestProcessQueue(QueueTestBase):
+    """process_thumbnail_queue drains the queue in claimed batches."""
+
+    def test_drains_in_batches_and_clears_directories(self):
+        enqueue_thumbnails([SHA_A, SHA_B], QUEUE_PRIORITY_DIRECTORY, 7)
+        enqueue_thumbnails([SHA_C], QUEUE_PRIORITY_BACKGROUND)
+
+        with self.settings(THUMBNAIL_QUEUE_BATCH_SIZE=2), mock.patch.object(tasks, "_generate_thumbnails") as generate:
+            assert process_thumbnail_queue.func() == 3
+
+        assert generate.call_args_list == [mock.call([SHA_A, SHA_B], {7}), mock.call([SHA_C], set())]
+        assert not ThumbnailQueueEntry.objects.exists()
+
+    def test_failed_batch_is_still_removed(self):
+        enqueue_thumbnails([SHA_A], QUEUE_PRIORITY_PAGE, 7)
+
+        with mock.patch.object(tasks, "_generate_thumbnails", side_effect=RuntimeError("boom")), pytest.raises(RuntimeError):
+            process_thumbnail_queue.func()
+
+        assert not ThumbnailQueueEntry.objects.exists()
+
+
+class TestGalleryEnqueue(ViewSmokeTestBase):
+    """_check_and_enqueue_missing_thumbnails() queues the viewed page first."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("quickbbs.tasks.process_thumbnail_queue")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_page_files_get_page_priority(self):
+        sha = self.file_obj.file_sha256
+
+        _check_and_enqueue_missing_thumbnails(self.dir_obj, 0, 10, page_shas=[sha])
+
+        entry = ThumbnailQueueEntry.objects.get(sha256_hash=sha)
+        assert (entry.priority, entry.directory_id) == (QUEUE_PRIORITY_PAGE, self.dir_obj.pk)
+
+    def test_batch_covering_the_page_skips_the_page_query(self):
+        """Only page files that are missing, and cut off by the batch, cost a second query."""
+        sha = self.file_obj.file_sha256
+        qs = mock.MagicMock()
+        qs.__getitem__.return_value = [sha]
+        with (
+            mock.patch("frontend.views._get_files_needing_thumbnails", return_value=qs),
+            mock.patch("frontend.views.enqueue_thumbnails", return_value=0),
+        ):
+            _check_and_enqueue_missing_thumbnails(self.dir_obj, 0, 1, page_shas=[sha])
+            qs.filter.assert_not_called()
+
+            _check_and_enqueue_missing_thumbnails(self.dir_obj, 0, 1, page_shas=[sha, "f" * 64])
+            qs.filter.assert_called_once()
+
+    def test_missing_annotation_flags_files_without_thumbnails(self):
+        def missing() -> bool:
+            return FileIndex.objects.filter(pk=self.file_obj.pk).annotate(**thumbnail_missing_annotations()).get().thumbnail_missing
+
+        assert missing() is True
+        thumbnail, _ = ThumbnailFiles.objects.update_or_create(sha256_hash=self.file_obj.file_sha256, defaults={"small_thumb": b"\xff\xd8small"})
+        FileIndex.objects.filter(pk=self.file_obj.pk).update(new_ftnail=thumbnail)
+        assert missing() is False
+
+    def test_repeat_view_adds_nothing(self):
+        _check_and_enqueue_missing_thumbnails(self.dir_obj, 0, 10)
+
+        assert _check_and_enqueue_missing_thumbnails(self.dir_obj, 0, 10) == 0
+        assert ThumbnailQueueEntry.objects.get().priority == QUEUE_PRIORITY_DIRECTORY
@@ -0,0 +1,184 @@
+"""
+Tests for content-addressed HTTP caching of thumbnail responses: version
+tokens, ETags, Cache-Control, and If-None-Match revalidation.
+
+DATABASE SAFETY NOTES
+---------------------
+- Helper tests use SimpleTestCase (no database).
+- Model and view tests use Django's TestCase (transaction rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from django.db.models import Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from thumbnails.models import (
+    THUMBNAIL_BLOB_FIELDS,
+    ThumbnailFiles,
+    thumbnail_cache_control,
+    thumbnail_cache_version,
+    thumbnail_etag,
+    thumbnail_version_annotations,
+    versioned_thumbnail_url,
+)
+from thumbnails.views import _not_modified
+
+pytestmark = pytest.mark.api
+
+SHA = "ab" * 32
+BLOBS = {"small": b"\xff\xd8small", "medium": b"\xff\xd8medium", "large": b"\xff\xd8large"}
+
+
+@override_settings(HTTP_CACHE_MAX_AGE=300, THUMBNAIL_IMMUTABLE_MAX_AGE=31536000)
+class TestCacheHelpers(SimpleTestCase):
+    """Version tokens, ETags and Cache-Control values."""
+
+    def test_version_and_etag(self):
+        assert thumbnail_cache_version(SHA, 3) == f"{SHA[:16]}-3"
+        assert thumbnail_etag(SHA, "large", 3) == f'"{SHA}-large-3"'
+
+    def test_cache_control_is_immutable_only_for_the_served_version(self):
+        assert thumbnail_cache_control(SHA, 3, f"{SHA[:16]}-3") == "public, max-age=31536000, immutable"
+        assert thumbnail_cache_control(SHA, 3, f"{SHA[:16]}-2") == "public, max-age=300"
+        assert thumbnail_cache_control(SHA, 3, None) == "public, max-age=300"
+
+    def test_versioned_url(self):
+        item = SimpleNamespace(thumbnail_sha256=SHA, thumbnail_generation=0)
+
+        assert versioned_thumbnail_url("/thumbnail_file/x", item) == f"/thumbnail_file/x?v={SHA[:16]}-0"
+        assert versioned_thumbnail_url("/thumbnail_file/x?size=large", item) == f"/thumbnail_file/x?size=large&v={SHA[:16]}-0"
+
+    def test_unannotated_or_unlinked_items_keep_the_plain_url(self):
+        assert versioned_thumbnail_url("/thumbnail_file/x", SimpleNamespace()) == "/thumbnail_file/x"
+        unlinked = SimpleNamespace(thumbnail_sha256=None, thumbnail_generation=None)
+        assert versioned_thumbnail_url("/thumbnail_file/x", unlinked) == "/thumbnail_file/x"
+
+    def test_annotations_follow_the_prefix(self):
+        annotations = thumbnail_version_annotations("thumbnail__")
+
+        assert annotations["thumbnail_sha256"].name == "thumbnail__new_ftnail__sha256_hash"
+        assert annotations["thumbnail_generation"].name == "thumbnail__new_ftnail__generation"
+
+
+class ThumbnailRowTestCase(TestCase):
+    """Creates one ThumbnailFiles row with all three sizes in the database."""
+
+    def setUp(self):
+        self.thumbnail = ThumbnailFiles.objects.create(
+            sha256_hash=SHA,
+            small_thumb=BLOBS["small"],
+            medium_thumb=BLOBS["medium"],
+            large_thumb=BLOBS["large"],
+        )
+        self.factory = RequestFactory()
+
+
+@override_settings(HTTP_CACHE_MAX_AGE=300, THUMBNAIL_IMMUTABLE_MAX_AGE=31536000)
+class TestSendThumbnailHeaders(ThumbnailRowTestCase):
+    """send_thumbnail() sets the ETag and chooses the cache lifetime."""
+
+    def test_versioned_request_is_immutable(self):
+        response = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="medium", version=thumbnail_cache_version(SHA, 0))
+
+        assert response["ETag"] == f'"{SHA}-medium-0"'
+        assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    def test_unversioned_request_gets_short_lifetime(self):
+        response = self.thumbnail.send_thumbnail(filename_override="a.jpg", size="small")
+
+        assert response["ETag"] == f'"{SHA}-small-0"'
+        assert response["Cache-Control"] == "public, max-age=300"
+
+    def test_invalidate_bumps_generation(self):
+        self.thumbnail.invalidate_thumb()
+        self.thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
+
+        assert ThumbnailFiles.objects.get(pk=self.thumbnail.pk).generation == 1
+
+
+class TestNotModified(ThumbnailRowTestCase):
+    """_not_modified() answers If-None-Match from (sha256_hash, generation)."""
+
+    def _request(self, etag: str | None, version: str | None = None):
+        data = {"v": version} if version else {}
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.factory.get("/thumbnail_file/x", data, **headers)
+
+    def test_matching_etag_returns_304(self):
+        response = _not_modified(self._request(f'"{SHA}-large-0"'), Q(sha256_hash=SHA), "large")
+
+        assert response.status_code == 304
+        assert response["ETag"] == f'"{SHA}-large-0"'
+
+    def test_other_size_or_generation_is_served(self):
+        assert _not_modified(self._request(f'"{SHA}-small-0"'), Q(sha256_hash=SHA), "large") is None
+
+        self.thumbnail.invalidate_thumb()
+        self.thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
+        assert _not_modified(self._request(f'"{SHA}-large-0"'), Q(sha256_hash=SHA), "large") is None
+
+    def test_no_header_or_no_row(self):
+        assert _not_modified(self._request(None), Q(sha256_hash=SHA), "large") is None
+        assert _not_modified(self._request(f'"{"cd" * 32}-large-0"'), Q(sha256_hash="cd" * 32), "large") is None
+
+
+class TestGalleryUrls(TestCase):
+    """FileIndex/DirectoryIndex URLs carry ?v= when loaded with the annotations."""
+
+    def setUp(self):
+        from filetypes.models import filetypes
+        from quickbbs.models import DirectoryIndex, FileIndex
+
+        self.temp_dir = tempfile.mkdtemp()
+        albums_dir = os.path.join(self.temp_dir, "albums")
+        os.makedirs(albums_dir, exist_ok=True)
+        self._settings_override = override_settings(ALBUMS_PATH=self.temp_dir)
+        self._settings_override.enable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        _, self.dir_obj = DirectoryIndex.add_directory(albums_dir + "/")
+
+        thumbnail = ThumbnailFiles.objects.create(sha256_hash=SHA, small_thumb=BLOBS["small"], generation=2)
+        self.file = FileIndex.objects.create(
+            home_directory=self.dir_obj,
+            name="photo.jpg",
+            file_sha256=SHA,
+            unique_sha256="cd" * 32,
+            lastscan=0.0,
+            lastmod=0.0,
+            filetype=filetypes.objects.get(fileext=".jpg"),
+            new_ftnail=thumbnail,
+        )
+        self.dir_obj.thumbnail = self.file
+        self.dir_obj.save(update_fields=["thumbnail"])
+
+    def tearDown(self):
+        from quickbbs.models import DirectoryIndex
+
+        self._settings_override.disable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_file_url(self):
+        from quickbbs.models import FileIndex
+
+        annotated = FileIndex.objects.annotate(**thumbnail_version_annotations()).get(pk=self.file.pk)
+
+        assert annotated.get_thumbnail_url(size="large").endswith(f"?size=large&v={SHA[:16]}-2")
+        assert "v=" not in FileIndex.objects.get(pk=self.file.pk).get_thumbnail_url()
+
+    def test_directory_url(self):
+        from quickbbs.models import DirectoryIndex
+
+        annotated = DirectoryIndex.objects.annotate(**thumbnail_version_annotations("thumbnail__")).get(pk=self.dir_obj.pk)
+
+        assert annotated.get_thumbnail_url().endswith(f"?v={SHA[:16]}-2")
@@ -0,0 +1,162 @@
+"""
+Tests for multipart gallery thumbnails: thumbnail_multipart_url() and the
+thumbnail_multipart view.
+
+DATABASE SAFETY NOTES
+---------------------
+- Helper tests use SimpleTestCase (no database).
+- View tests build on ViewSmokeTestBase (Django TestCase, rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from frontend.tests.test_views import ViewSmokeTestBase
+from quickbbs.models import FileIndex
+from thumbnails.engine import encode_image
+from thumbnails.models import (
+    ThumbnailFiles,
+    thumbnail_multipart_url,
+    thumbnail_multipart_version,
+    thumbnail_version_annotations,
+)
+
+pytestmark = pytest.mark.web
+
+OTHER_SHA = "ab" * 32
+
+
+def _parse_parts(response) -> dict[str, tuple[str, bytes]]:
+    """Split a multipart response by Content-Length into {sha: (content type, bytes)}."""
+    boundary = response["Content-Type"].split("boundary=")[1]
+    body = response.content
+    parts = {}
+    offset = 0
+    while not body.startswith(f"--{boundary}--".encode(), offset):
+        header_end = body.index(b"\r\n\r\n", offset)
+        delimiter, *header_lines = body[offset:header_end].decode().split("\r\n")
+        assert delimiter == f"--{boundary}"
+        headers = dict(line.split(": ", 1) for line in header_lines)
+        start = header_end + 4
+        end = start + int(headers["Content-Length"])
+        parts[headers["Content-ID"].strip("<>")] = (headers["Content-Type"], body[start:end])
+        offset = end + 2
+    return parts
+
+
+def _item(sha: str | None, generation: int = 0, generic_icon: bool = False, generic_filetype: bool = False) -> SimpleNamespace:
+    """Stand-in for an annotated FileIndex row."""
+    return SimpleNamespace(
+        thumbnail_sha256=sha,
+        thumbnail_generation=generation,
+        is_generic_icon=generic_icon,
+        filetype=SimpleNamespace(generic=generic_filetype),
+    )
+
+
+class TestMultipartUrl(SimpleTestCase):
+    """thumbnail_multipart_url() covers only files with a servable thumbnail."""
+
+    def test_flags_covered_items_and_versions_url(self):
+        items = [_item("a" * 64, 3), _item("a" * 64, 3), _item(None), _item("b" * 64, generic_icon=True), _item("c" * 64, generic_filetype=True)]
+
+        url = thumbnail_multipart_url(items)
+
+        assert url == f"/thumbnail_multipart/?shas={'a' * 64}&v={thumbnail_multipart_version([('a' * 64, 3)])}"
+        assert [getattr(item, "thumbnail_multipart", False) for item in items] == [True, True, False, False, False]
+
+    def test_nothing_to_cover(self):
+        assert thumbnail_multipart_url([_item(None)]) is None
+
+    @override_settings(THUMBNAIL_MULTIPART_MAX_ITEMS=1)
+    def test_capped_items_keep_their_own_url(self):
+        items = [_item("a" * 64), _item("b" * 64)]
+
+        assert "b" * 64 not in thumbnail_multipart_url(items)
+        assert not hasattr(items[1], "thumbnail_multipart")
+
+
+class TestMultipartView(ViewSmokeTestBase):
+    """thumbnail_multipart serves generated thumbnails of servable files in one body."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()  # site cache (UpdateCacheMiddleware) would replay earlier responses
+        self.sha = self.file_obj.file_sha256
+        self.small = encode_image(Image.new("RGB", (24, 24), (200, 40, 40)), "JPEG", 85)
+        self.thumbnail = ThumbnailFiles.objects.create(sha256_hash=self.sha, small_thumb=self.small, generation=4)
+        FileIndex.objects.filter(pk=self.file_obj.pk).update(new_ftnail=self.thumbnail)
+
+    def _multipart(self, *shas: str, **extra):
+        return self.get(f"/thumbnail_multipart/?shas={','.join(shas)}", **extra)
+
+    def test_serves_generated_rows_and_skips_the_rest(self):
+        ThumbnailFiles.objects.create(sha256_hash=OTHER_SHA)  # not generated, no file
+
+        response = self._multipart(self.sha, OTHER_SHA, "not-a-sha")
+
+        assert response.status_code == 200
+        assert _parse_parts(response) == {self.sha: ("image/jpeg", self.small)}
+        assert "immutable" not in response["Cache-Control"]
+
+    def test_generic_icon_file_is_left_out(self):
+        FileIndex.objects.filter(pk=self.file_obj.pk).update(is_generic_icon=True)
+
+        assert _parse_parts(self._multipart(self.sha)) == {}
+
+    def test_matching_version_is_immutable(self):
+        version = thumbnail_multipart_version([(self.sha, 4)])
+
+        fresh = self.get(f"/thumbnail_multipart/?shas={self.sha}&v={version}")
+        stale = self.get(f"/thumbnail_multipart/?shas={self.sha}&v=0123456789abcdef")
+
+        assert "immutable" in fresh["Cache-Control"]
+        assert "immutable" not in stale["Cache-Control"]
+
+    def test_webp_row_is_negotiated_per_part(self):
+        webp = encode_image(Image.new("RGB", (24, 24), (10, 200, 10)), "WEBP", 80)
+        self.thumbnail.store_blobs({"small": webp, "medium": webp, "large": webp}, "WEBP")
+        self.thumbnail.save()
+
+        listed = self._multipart(self.sha, HTTP_ACCEPT="multipart/mixed, image/webp, image/jpeg")
+        unlisted = self._multipart(self.sha, HTTP_ACCEPT="*/*")
+
+        assert _parse_parts(listed)[self.sha] == ("image/webp", webp)
+        assert "Accept" in listed["Vary"]
+        assert _parse_parts(unlisted)[self.sha][0] == "image/jpeg"
+
+    def test_no_hashes_is_bad_request(self):
+        assert self.get("/thumbnail_multipart/?shas=").status_code == 400
+
+    def _render_card(self, item: FileIndex) -> str:
+        template = engines["Jinja2"].from_string(
+            "{% from 'macros/gallery.jinja' import show_gallery_item_card %}{{ show_gallery_item_card(item, 20, 0, fromtimestamp) }}"
+        )
+        return template.render({"item": item, "fromtimestamp": datetime.datetime.fromtimestamp})
+
+    def test_gallery_card_defers_covered_thumbnail(self):
+        item = FileIndex.objects.select_related("filetype", "home_directory").annotate(**thumbnail_version_annotations()).get(pk=self.file_obj.pk)
+        url = thumbnail_multipart_url([item])
+
+        card = self._render_card(item)
+
+        assert f'data-thumbnail-sha="{self.sha}"' in card
+        assert " src=" not in card
+        assert "immutable" in self.get(url)["Cache-Control"]
+
+    def test_gallery_card_default_is_unchanged(self):
+        item = FileIndex.objects.select_related("filetype", "home_directory").get(pk=self.file_obj.pk)
+
+        card = self._render_card(item)
+
+        assert "data-thumbnail-sha" not in card
+        assert f'src="{item.get_thumbnail_url()}"' in card
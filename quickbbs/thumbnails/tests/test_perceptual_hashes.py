@@ -0,0 +1,71 @@
+"""
+Tests for ThumbnailFiles.perceptual_hash: set when blobs are stored, cleared
+on invalidation, and backfilled by the compute_perceptual_hashes command.
+
+DATABASE SAFETY NOTES
+---------------------
+- All tests use Django's TestCase (transaction rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import pytest
+from django.test import TestCase
+
+from quickbbs.management.commands.compute_perceptual_hashes import (
+    compute_perceptual_hashes,
+)
+from thumbnails.engine import perceptual_hash
+from thumbnails.models import ThumbnailFiles
+from thumbnails.tests.test_encodings import _encoded_blobs
+
+pytestmark = pytest.mark.api
+
+
+class TestStoredHash(TestCase):
+    """store_blobs() hashes the small blob; invalidate_thumb() clears it."""
+
+    def test_store_and_invalidate(self):
+        blobs = _encoded_blobs("JPEG")
+        thumbnail = ThumbnailFiles(sha256_hash="ab" * 32)
+        thumbnail.store_blobs(blobs)
+        thumbnail.save()
+
+        stored = ThumbnailFiles.objects.get(pk=thumbnail.pk)
+        assert stored.perceptual_hash is not None
+        assert stored.perceptual_hash == perceptual_hash(blobs["small"])
+
+        stored.invalidate_thumb()
+        assert stored.perceptual_hash is None
+
+
+class TestComputeCommand(TestCase):
+    """compute_perceptual_hashes() fills in rows generated without a hash."""
+
+    def setUp(self):
+        self.thumbnail = ThumbnailFiles(sha256_hash="ab" * 32)
+        self.thumbnail.store_blobs(_encoded_blobs("JPEG"))
+        self.thumbnail.save()
+        self.expected = self.thumbnail.perceptual_hash
+        ThumbnailFiles.objects.filter(pk=self.thumbnail.pk).update(perceptual_hash=None)
+        ThumbnailFiles.objects.create(sha256_hash="ef" * 32)  # not generated yet
+
+    def test_backfills_generated_rows(self):
+        totals = compute_perceptual_hashes()
+
+        assert (totals["rows"], totals["hashed"], totals["failed"]) == (1, 1, 0)
+        assert ThumbnailFiles.objects.get(pk=self.thumbnail.pk).perceptual_hash == self.expected
+        assert compute_perceptual_hashes()["rows"] == 0
+
+    def test_dry_run_changes_nothing(self):
+        assert compute_perceptual_hashes(dry_run=True)["rows"] == 1
+        assert ThumbnailFiles.objects.get(pk=self.thumbnail.pk).perceptual_hash is None
+
+    def test_undecodable_blob_stays_null(self):
+        ThumbnailFiles.objects.filter(pk=self.thumbnail.pk).update(small_thumb=b"\xff\xd8broken")
+
+        totals = compute_perceptual_hashes()
+
+        assert totals["failed"] == 1 and totals["hashed"] == 0
+        assert ThumbnailFiles.objects.get(pk=self.thumbnail.pk).perceptual_hash is None
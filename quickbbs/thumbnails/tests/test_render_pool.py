@@ -0,0 +1,185 @@
+"""
+Tests for the batch thumbnail render process pool (thumbnails/render_pool.py)
+and its use from quickbbs.tasks.generate_missing_thumbnails.
+
+DATABASE SAFETY NOTES
+---------------------
+- Pool tests use SimpleTestCase (no database).
+- Task wiring tests use Django's TestCase (transaction rolled back per test).
+- No TransactionTestCase is used — ever.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from quickbbs import tasks
+from thumbnails import render_pool
+from thumbnails.render_pool import ThumbnailRenderPool, render_thumbnails
+
+pytestmark = pytest.mark.api
+
+IMAGE_SIZES = {"small": (200, 200), "medium": (740, 740), "large": (1024, 1024)}
+
+
+def _write_jpeg(path: str, size: tuple[int, int] = (1200, 900)) -> None:
+    img = Image.new("RGB", size, (40, 120, 200))
+    img.save(path, format="JPEG", quality=85)
+    img.close()
+
+
+class RenderPoolTestCase(SimpleTestCase):
+    """Writes two JPEGs and one corrupt file into a temp directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.good = []
+        for name in ("a.jpg", "b.jpg"):
+            path = os.path.join(self.temp_dir, name)
+            _write_jpeg(path)
+            self.good.append(path)
+        self.corrupt = os.path.join(self.temp_dir, "corrupt.jpg")
+        with open(self.corrupt, "wb") as handle:
+            handle.write(b"not a jpeg")
+        self.pool = ThumbnailRenderPool()
+
+    def tearDown(self):
+        self.pool.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestRenderThumbnails(RenderPoolTestCase):
+    """The worker entry point never raises."""
+
+    def test_renders_all_sizes(self):
+        blobs, error = render_thumbnails(self.good[0], IMAGE_SIZES, 85, "image")
+
+        assert error is None
+        assert set(blobs) == {"small", "medium", "large"}
+        assert blobs["small"].startswith(b"\xff\xd8")
+
+    def test_failure_is_returned_as_text(self):
+        blobs, error = render_thumbnails(self.corrupt, IMAGE_SIZES, 85, "image")
+
+        assert blobs is None
+        assert error
+
+
+@override_settings(THUMBNAIL_PROCESS_POOL_ENABLED=True, THUMBNAIL_PROCESS_WORKERS=1, IMAGE_SIZE=IMAGE_SIZES)
+class TestThumbnailRenderPool(RenderPoolTestCase):
+    """ThumbnailRenderPool.render() on real worker processes."""
+
+    def test_renders_batch_and_omits_failures(self):
+        jobs = {"sha-a": (self.good[0], "image"), "sha-b": (self.good[1], "image"), "sha-bad": (self.corrupt, "image")}
+
+        rendered = self.pool.render(jobs)
+
+        assert set(rendered) == {"sha-a", "sha-b"}
+        assert rendered["sha-a"]["small"] == render_thumbnails(self.good[0], IMAGE_SIZES, 85, "image")[0]["small"]
+
+    def test_pool_failure_disables_pool(self):
+        with mock.patch.object(render_pool, "ProcessPoolExecutor", side_effect=OSError("no semaphores")):
+            rendered = self.pool.render({"sha-a": (self.good[0], "image")})
+
+        assert rendered == {}
+        assert self.pool.enabled is False
+
+    @override_settings(THUMBNAIL_PROCESS_POOL_ENABLED=False)
+    def test_disabled_pool_renders_nothing(self):
+        assert self.pool.render({"sha-a": (self.good[0], "image")}) == {}
+
+    def test_offload_backend(self):
+        with mock.patch.object(render_pool, "resolve_backend_name", return_value="ImageBackend"):
+            assert self.pool.offload_backend("image") == "image"
+        with mock.patch.object(render_pool, "resolve_backend_name", return_value="CoreImageBackend"):
+            assert self.pool.offload_backend("image") is None
+        assert self.pool.offload_backend("archive") is None
+
+
+class TestGenerateMissingThumbnailsWiring(TestCase):
+    """generate_missing_thumbnails hands pool renders to get_or_create_thumbnail_record."""
+
+    def setUp(self):
+        from filetypes.models import filetypes
+        from quickbbs.models import DirectoryIndex, FileIndex
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.albums_dir = os.path.join(self.temp_dir, "albums")
+        os.makedirs(self.albums_dir, exist_ok=True)
+        self._settings_override = override_settings(ALBUMS_PATH=self.temp_dir)
+        self._settings_override.enable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        _, self.dir_obj = DirectoryIndex.add_directory(self.albums_dir + "/")
+
+        jpg = filetypes.objects.get(fileext=".jpg")
+        self.shas = []
+        for i, generic in enumerate((False, False, False, False, True)):
+            sha = f"{i:x}" * 64
+            name = f"photo_{i}.jpg"
+            _write_jpeg(os.path.join(self.albums_dir, name), size=(64, 64))
+            FileIndex.objects.create(
+                home_directory=self.dir_obj,
+                name=name,
+                file_sha256=sha,
+                unique_sha256=f"{i + 5:x}" * 64,
+                lastscan=0.0,
+                lastmod=0.0,
+                filetype=jpg,
+                delete_pending=False,
+                is_generic_icon=generic,
+            )
+            self.shas.append(sha)
+
+    def tearDown(self):
+        from quickbbs.models import DirectoryIndex
+
+        self._settings_override.disable()
+        DirectoryIndex._albums_prefix = None
+        DirectoryIndex._albums_root = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sources_skip_generic_icons(self):
+        sources = tasks._thumbnail_sources(self.shas)
+
+        assert set(sources) == set(self.shas)
+        assert sources[self.shas[0]][1] == "image"
+        assert sources[self.shas[4]][1] is None
+        assert sources[self.shas[0]][0].endswith("photo_0.jpg")
+
+    @override_settings(THUMBNAIL_PROCESS_POOL_ENABLED=True, THUMBNAIL_PROCESS_POOL_THRESHOLD=2)
+    def test_prerendered_blobs_are_passed_through(self):
+        blobs = {"small": b"s", "medium": b"m", "large": b"l"}
+        pool_result = {sha: blobs for sha in self.shas[:4]}
+        with (
+            mock.patch.object(tasks.thumbnail_render_pool, "offload_backend", return_value="image"),
+            mock.patch.object(tasks.thumbnail_render_pool, "render", return_value=dict(pool_result)) as render,
+            mock.patch.object(tasks.ThumbnailFiles, "get_or_create_thumbnail_record") as get_or_create,
+        ):
+            get_or_create.return_value.thumbnail_exists.return_value = False
+            tasks.generate_missing_thumbnails.func(self.shas, batch_size=len(self.shas))
+
+        jobs = render.call_args.args[0]
+        assert set(jobs) == set(self.shas[:4])
+        passed = {call.args[0]: call.kwargs["prerendered"] for call in get_or_create.call_args_list}
+        assert passed == {**pool_result, self.shas[4]: None}
+
+    @override_settings(THUMBNAIL_PROCESS_POOL_ENABLED=True, THUMBNAIL_PROCESS_POOL_THRESHOLD=10)
+    def test_small_batches_render_in_process(self):
+        with (
+            mock.patch.object(tasks.thumbnail_render_pool, "offload_backend", return_value="image"),
+            mock.patch.object(tasks.thumbnail_render_pool, "render") as render,
+            mock.patch.object(tasks.ThumbnailFiles, "get_or_create_thumbnail_record") as get_or_create,
+        ):
+            get_or_create.return_value.thumbnail_exists.return_value = False
+            tasks.generate_missing_thumbnails.func(self.shas, batch_size=len(self.shas))
+
+        render.assert_not_called()
+        assert all(call.kwargs["prerendered"] is None for call in get_or_create.call_args_list)
@@ -6,42 +6,102 @@ thumbnail generation, and fallback to generic icons.
 """
 
 import logging
+import secrets
 import warnings
 
+from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
 from django.db import transaction
-from django.http import Http404, HttpResponseBadRequest
+from django.db.models import Exists, OuterRef, Q
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotModified,
+)
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from PIL import Image
 
-from quickbbs.common import require_login_if_configured
+from quickbbs.common import normalize_sha_input, require_login_if_configured
 from quickbbs.fileindex import FILEINDEX_SR_FILETYPE_HOME_VIRTUAL
 from quickbbs.models import DirectoryIndex, FileIndex
+from thumbnails.engine import get_encoder
 from thumbnails.exceptions import (
     OrphanedFileIndex,
     OrphanedThumbnail,
     ThumbnailGenerationError,
 )
-from thumbnails.models import THUMBNAILFILES_PR_FILEINDEX_FILETYPE, ThumbnailFiles
+from thumbnails.models import (
+    BASELINE_ENCODING,
+    THUMBNAIL_BLOB_FIELDS,
+    THUMBNAIL_GENERATED_Q,
+    THUMBNAILFILES_PR_FILEINDEX_FILETYPE,
+    ThumbnailFiles,
+    negotiate_thumbnail_encoding,
+    thumbnail_cache_control,
+    thumbnail_etag,
+    thumbnail_multipart_version,
+)
 
 logger = logging.getLogger()
 
 warnings.simplefilter("ignore", Image.DecompressionBombWarning)
 
 
+def _not_modified(request: WSGIRequest, thumbnail_filter: Q, size: str):
+    """
+    Answer a conditional thumbnail request from the row's generation alone.
+
+    The ETag is derived from (sha256_hash, size, generation) and the encoding
+    negotiated from Accept, so revalidation reads three small columns and
+    never the blob columns or the blob store.
+    Callers must have already ruled out the generic-icon and link cases.
+
+    Args:
+        request: Django Request object
+        thumbnail_filter: Selects the one ThumbnailFiles row being served
+        size: Validated thumbnail size (small, medium, or large)
+
+    Returns:
+        HttpResponseNotModified when If-None-Match names the current ETag of a
+        generated thumbnail, otherwise None.
+    """
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return None
+    row = ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q, thumbnail_filter).values_list("sha256_hash", "generation", "encoding").first()
+    if row is None or row[0] is None:
+        return None
+    sha256_hash, generation, stored_encoding = row
+    etag = thumbnail_etag(sha256_hash, size, generation, negotiate_thumbnail_encoding(stored_encoding, request.headers.get("Accept")))
+    if etag not in parse_etags(if_none_match):
+        return None
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    response["Cache-Control"] = thumbnail_cache_control(sha256_hash, generation, request.GET.get("v"))
+    if stored_encoding != BASELINE_ENCODING:
+        patch_vary_headers(response, ("Accept",))
+    return response
+
+
 @require_login_if_configured
-def thumbnail_dir(request: WSGIRequest, dir_sha256: str | None = None):  # pylint: disable=unused-argument
+def thumbnail_dir(request: WSGIRequest, dir_sha256: str | None = None):
     """
     Serve directory thumbnail using prioritized cover image selection.
 
     Uses DirectoryIndex.get_cover_image() to select thumbnails based on priority filenames
     (e.g., "cover", "title") before falling back to the first available file.
+    A cached cover answers If-None-Match with a 304; the ?v= token (cover hash
+    + generation) makes the response immutable when it names the cover served.
 
     Args:
-        request: Django Request object.
+        request: Django Request object. The optional ?v= query parameter is
+            the version token from DirectoryIndex.get_thumbnail_url().
         dir_sha256: The dir_fqpn_sha256 of the directory.
 
     Returns:
-        FileResponse containing the cover thumbnail JPEG, or the filetype's
+        FileResponse containing the cover thumbnail, or the filetype's
         generic icon when no cover image can be found or served.
 
     Raises:
@@ -53,11 +113,20 @@ def thumbnail_dir(request: WSGIRequest, dir_sha256: str | None = None):  # pylin
         logger.warning("Directory not found for thumbnail request: %s", dir_sha256)
         raise Http404(f"Directory not found: {dir_sha256}")
 
+    version = request.GET.get("v")
+
     # If directory already has a thumbnail set AND cache is valid, try to return it
     try:
-        if directory.thumbnail and directory.thumbnail.new_ftnail and directory.is_cached:
+        if directory.thumbnail and directory.thumbnail.new_ftnail_id and directory.is_cached:
+            cover = directory.thumbnail
+            if not (cover.is_generic_icon or cover.filetype.generic):
+                not_modified = _not_modified(request, Q(pk=cover.new_ftnail_id), "small")
+                if not_modified is not None:
+                    return not_modified
             try:
-                return directory.thumbnail.new_ftnail.send_thumbnail(fext_override=".jpg", size="small", index_data_item=directory.thumbnail)
+                return cover.new_ftnail.send_thumbnail(
+                    fext_override=".jpg", size="small", index_data_item=cover, version=version, accept=request.headers.get("Accept")
+                )
             except (OSError, ValueError, AttributeError, ThumbnailGenerationError) as e:
                 # If thumbnail serving fails, fall through to cover image logic
                 print(f"Directory thumbnail serving failed for {directory.fqpndirectory}: {e}")
@@ -81,7 +150,7 @@ def thumbnail_dir(request: WSGIRequest, dir_sha256: str | None = None):  # pylin
             update_database_from_disk,  # pylint: disable=import-outside-toplevel
         )
 
-        update_database_from_disk(directory)
+        update_database_from_disk(directory, defer_large=True)
         cover_image = directory.get_cover_image()
 
     # If still no cover image found, return default directory icon
@@ -124,7 +193,9 @@ def thumbnail_dir(request: WSGIRequest, dir_sha256: str | None = None):  # pylin
 
     # Try to return the thumbnail, fall back to generic icon on error
     try:
-        return directory.thumbnail.new_ftnail.send_thumbnail(fext_override=".jpg", size="small", index_data_item=directory.thumbnail)
+        return directory.thumbnail.new_ftnail.send_thumbnail(
+            fext_override=".jpg", size="small", index_data_item=directory.thumbnail, version=version, accept=request.headers.get("Accept")
+        )
     except (OSError, ValueError, AttributeError, ThumbnailGenerationError) as e:
         # If thumbnail generation/serving fails, mark directory as generic and return filetype icon
         print(f"Directory thumbnail generation failed for {directory.fqpndirectory}: {e}")
@@ -142,8 +213,9 @@ def _serve_existing_thumbnail(request: WSGIRequest, sha256: str, thumbsize: str)
 
     Read-only fast path for thumbnail_file: resolves the FileIndex via the
     cached get_by_sha256 lookup, honors the generic-icon and link
-    short-circuits, then serves the requested blob size loaded with a single
-    single-column SELECT.
+    short-circuits, answers If-None-Match revalidation with a 304 from the
+    row's generation alone, then serves the requested blob size loaded with
+    a single single-column SELECT, in the encoding negotiated from Accept.
 
     Args:
         request: Django Request object
@@ -168,8 +240,25 @@ def _serve_existing_thumbnail(request: WSGIRequest, sha256: str, thumbsize: str)
     if index_data_item.filetype.is_link and index_data_item.virtual_directory:
         return thumbnail_dir(request, index_data_item.virtual_directory.dir_fqpn_sha256)
 
-    existing_thumbnail = ThumbnailFiles.objects.only("id", "sha256_hash", f"{thumbsize}_thumb").filter(sha256_hash=sha256).first()
-    if existing_thumbnail is None or not existing_thumbnail.retrieve_sized_tnail(size=thumbsize):
+    not_modified = _not_modified(request, Q(sha256_hash=sha256), thumbsize)
+    if not_modified is not None:
+        return not_modified
+
+    existing_thumbnail = (
+        ThumbnailFiles.objects.only("id", "sha256_hash", f"{thumbsize}_thumb", "blobs_in_store", "generation", "encoding")
+        .filter(sha256_hash=sha256)
+        .first()
+    )
+    if existing_thumbnail is None or not existing_thumbnail.thumbnail_exists(size=thumbsize):
+        return None
+
+    # A blob-store file that has gone missing (volume restored without the
+    # store, manual cleanup) invalidates the record so the slow path
+    # regenerates it instead of marking the file generic.
+    if existing_thumbnail.blobs_in_store and not existing_thumbnail.stored_blob_exists(size=thumbsize):
+        logger.warning("Blob store file missing for thumbnail %s (%s), regenerating", sha256, thumbsize)
+        existing_thumbnail.invalidate_thumb()
+        existing_thumbnail.save(update_fields=THUMBNAIL_BLOB_FIELDS)
         return None
 
     try:
@@ -178,6 +267,8 @@ def _serve_existing_thumbnail(request: WSGIRequest, sha256: str, thumbsize: str)
             fext_override=".jpg",
             size=thumbsize,
             index_data_item=index_data_item,
+            version=request.GET.get("v"),
+            accept=request.headers.get("Accept"),
         )
     except (OSError, ValueError, AttributeError, ThumbnailGenerationError) as e:
         # If thumbnail serving fails, mark ALL files with this SHA256 as generic
@@ -201,11 +292,13 @@ def thumbnail_file(request: WSGIRequest, sha256: str):
 
     Args:
         request: Django Request object. The optional ?size= query parameter
-            selects small (default), medium, or large.
+            selects small (default), medium, or large; ?v= is the version
+            token from FileIndex.get_thumbnail_url() (immutable caching).
         sha256: The file_sha256 of the FileIndex record.
 
     Returns:
-        FileResponse containing the thumbnail JPEG; the filetype's generic
+        FileResponse containing the thumbnail (or a 304 when
+        If-None-Match names its current ETag); the filetype's generic
         icon for generic/failed files; or HttpResponseBadRequest when no
         FileIndex exists for the hash.
     """
@@ -259,6 +352,8 @@ def thumbnail_file(request: WSGIRequest, sha256: str):
             fext_override=".jpg",
             size=thumbsize,
             index_data_item=index_data_item,
+            version=request.GET.get("v"),
+            accept=request.headers.get("Accept"),
         )
     except (OSError, ValueError, AttributeError, ThumbnailGenerationError) as e:
         # If thumbnail generation/serving fails, mark ALL files with this SHA256 as generic
@@ -266,3 +361,82 @@ def thumbnail_file(request: WSGIRequest, sha256: str):
         print(f"Thumbnail generation failed for {index_data_item.name}: {e}")
         FileIndex.set_generic_icon_for_sha(sha256, is_generic=True, clear_cache=True)
         return index_data_item.filetype.send_thumbnail()
+
+
+@require_login_if_configured
+def thumbnail_multipart(request: WSGIRequest):
+    """
+    Serve the small thumbnails of a whole gallery page in one response.
+
+    Replaces the page's individual thumbnail_file requests (each paying the
+    session/auth middleware, a FileIndex lookup and a ThumbnailFiles fetch)
+    with one query: every requested row that is generated and belongs to a
+    non-generic, non-deleted file. The body is multipart/mixed, one part per
+    thumbnail, each with Content-ID <sha256>, its Content-Type and a
+    Content-Length, so the client slices parts by length instead of
+    scanning for the boundary. Hashes without a servable thumbnail are left
+    out; the client falls back to their thumbnail_file URL.
+
+    Nothing is generated here — missing thumbnails go through
+    thumbnail_file's locked generation path as before.
+
+    Args:
+        request: Django Request object. ?shas= is the comma-separated list
+            of file_sha256 values (at most THUMBNAIL_MULTIPART_MAX_ITEMS are
+            served); ?v= is the token from thumbnail_multipart_url()
+            (immutable caching when it names the rows served).
+
+    Returns:
+        HttpResponse with the multipart body, or HttpResponseBadRequest when
+        ?shas= names no hash.
+    """
+    shas = list(dict.fromkeys(normalize_sha_input(sha) for sha in request.GET.get("shas", "").split(",") if sha.strip()))
+    shas = [sha for sha in shas if len(sha) == 64][: settings.THUMBNAIL_MULTIPART_MAX_ITEMS]
+    if not shas:
+        return HttpResponseBadRequest(content="No thumbnail hashes requested.")
+
+    servable_file = FileIndex.objects.filter(
+        file_sha256=OuterRef("sha256_hash"), is_generic_icon=False, filetype__generic=False, delete_pending=False
+    )
+    rows = {
+        thumbnail.sha256_hash: thumbnail
+        for thumbnail in ThumbnailFiles.objects.filter(THUMBNAIL_GENERATED_Q, Exists(servable_file), sha256_hash__in=shas).only(
+            "id", "sha256_hash", "small_thumb", "blobs_in_store", "generation", "encoding"
+        )
+    }
+
+    accept = request.headers.get("Accept")
+    boundary = secrets.token_hex(16)
+    body = []
+    served = []
+    for sha256_hash in shas:
+        thumbnail = rows.get(sha256_hash)
+        if thumbnail is None:
+            continue
+        blob = thumbnail.retrieve_sized_tnail("small")
+        if not blob:
+            # Blob-store file missing: thumbnail_file invalidates and regenerates it
+            continue
+        encoding = negotiate_thumbnail_encoding(thumbnail.encoding, accept)
+        if encoding != thumbnail.encoding:
+            blob = thumbnail.transcoded_sized_tnail("small", encoding)
+        body.append(
+            f"--{boundary}\r\n"
+            f"Content-Type: {get_encoder(encoding).mime_type}\r\n"
+            f"Content-ID: <{sha256_hash}>\r\n"
+            f"Content-Length: {len(blob)}\r\n\r\n".encode()
+        )
+        body.append(blob)
+        body.append(b"\r\n")
+        served.append(thumbnail)
+    body.append(f"--{boundary}--\r\n".encode())
+
+    response = HttpResponse(b"".join(body), content_type=f"multipart/mixed; boundary={boundary}")
+    version = thumbnail_multipart_version((thumbnail.sha256_hash, thumbnail.generation) for thumbnail in served)
+    if served and len(served) == len(shas) and request.GET.get("v") == version:
+        response["Cache-Control"] = f"public, max-age={settings.THUMBNAIL_IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+    if any(thumbnail.encoding != BASELINE_ENCODING for thumbnail in served):
+        patch_vary_headers(response, ("Accept",))
+    return response
@@ -263,6 +263,113 @@
         }
     }
 
+    // Multipart Thumbnail Loader
+    //
+    // A gallery grid rendered with THUMBNAIL_MULTIPART_ENABLED carries
+    // data-thumbnail-multipart (the thumbnail_multipart URL) and its file
+    // <img>s carry data-thumbnail-sha instead of a src. One fetch returns all
+    // of them as a multipart/mixed body whose parts each have Content-ID
+    // <sha256>, Content-Type and Content-Length; every part becomes a Blob
+    // URL. An image with no part (or a failed fetch) falls back to its own
+    // thumbnail_file URL in data-src. Blob URLs of grids that have been
+    // swapped out are revoked after the next settle.
+    class ThumbnailMultipartLoader {
+        constructor() {
+            this.loadedGrids = new WeakSet();
+            this.objectUrls = new Map();
+        }
+
+        load() {
+            document.querySelectorAll('[data-thumbnail-multipart]').forEach((grid) => {
+                if (!this.loadedGrids.has(grid)) {
+                    this.loadedGrids.add(grid);
+                    this.loadGrid(grid);
+                }
+            });
+        }
+
+        async loadGrid(grid) {
+            const images = grid.querySelectorAll('img[data-thumbnail-sha]');
+            const filled = new Set();
+            try {
+                const response = await fetch(grid.dataset.thumbnailMultipart, {
+                    credentials: 'same-origin',
+                    headers: { 'Accept': 'multipart/mixed, image/webp, image/jpeg' }
+                });
+                const boundary = /boundary=([^;]+)/.exec(response.headers.get('Content-Type') || '');
+                if (!response.ok || !boundary) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const parts = this.parseParts(new Uint8Array(await response.arrayBuffer()), boundary[1]);
+                const urls = [];
+                images.forEach((img) => {
+                    const part = parts.get(img.dataset.thumbnailSha);
+                    if (part) {
+                        const url = URL.createObjectURL(part);
+                        urls.push(url);
+                        img.src = url;
+                        filled.add(img);
+                    }
+                });
+                this.objectUrls.set(grid, urls);
+            } catch (e) {
+                console.warn('Multipart thumbnail request failed, loading individually:', e);
+            }
+            images.forEach((img) => {
+                if (!filled.has(img)) {
+                    img.src = img.dataset.src;
+                }
+            });
+        }
+
+        parseParts(body, boundary) {
+            // Parts are sliced by Content-Length; the boundary is only checked
+            // at each part start. The closing "--boundary--" has no header
+            // block, which ends the loop.
+            const decoder = new TextDecoder();
+            const delimiter = `--${boundary}`;
+            const parts = new Map();
+            let offset = 0;
+            while (offset < body.length) {
+                const headerEnd = this.findHeaderEnd(body, offset);
+                if (headerEnd < 0) break;
+                const lines = decoder.decode(body.subarray(offset, headerEnd)).split('\r\n');
+                if (lines[0] !== delimiter) break;
+                const headers = {};
+                lines.slice(1).forEach((line) => {
+                    const colon = line.indexOf(':');
+                    headers[line.slice(0, colon).trim().toLowerCase()] = line.slice(colon + 1).trim();
+                });
+                const start = headerEnd + 4;
+                const length = parseInt(headers['content-length'], 10);
+                if (Number.isNaN(length)) break;
+                const sha = (headers['content-id'] || '').replace(/[<>]/g, '');
+                parts.set(sha, new Blob([body.subarray(start, start + length)], { type: headers['content-type'] }));
+                offset = start + length + 2;
+            }
+            return parts;
+        }
+
+        findHeaderEnd(body, offset) {
+            // Index of the blank line (CRLF CRLF) ending a part's headers
+            for (let i = offset; i + 3 < body.length; i++) {
+                if (body[i] === 13 && body[i + 1] === 10 && body[i + 2] === 13 && body[i + 3] === 10) {
+                    return i;
+                }
+            }
+            return -1;
+        }
+
+        releaseDetached() {
+            this.objectUrls.forEach((urls, grid) => {
+                if (!grid.isConnected) {
+                    urls.forEach((url) => URL.revokeObjectURL(url));
+                    this.objectUrls.delete(grid);
+                }
+            });
+        }
+    }
+
     // Cache Manager for HTMX Requests
     class CacheManager {
         constructor() {
@@ -327,6 +434,7 @@
             this.spinner = new SpinnerManager();
             this.lazyLoader = new LazyLoadManager();
             this.nativeLazyLoader = new NativeLazyLoadManager();
+            this.thumbnailMultipart = new ThumbnailMultipartLoader();
             this.cache = new CacheManager();
             this.performance = new PerformanceMonitor();
             this.init();
@@ -336,6 +444,7 @@
             this.setupEventListeners();
             this.setupHTMXOptimizations();
             this.setupTitleUpdates();
+            this.thumbnailMultipart.load();
         }
 
         setupEventListeners() {
@@ -367,6 +476,8 @@
             document.addEventListener("htmx:afterSettle", () => {
                 this.lazyLoader.refresh();
                 this.nativeLazyLoader.refresh();
+                this.thumbnailMultipart.releaseDetached();
+                this.thumbnailMultipart.load();
                 this.reloadVideos();
             });
 
@@ -422,6 +533,8 @@
                 this.spinner.forceHide();
                 // Reload lazy images when HTMX restores from history
                 this.lazyLoader.handleBFCache();
+                // Restored grids are new elements whose blob: URLs may be revoked
+                this.thumbnailMultipart.load();
                 // History snapshots contain stale <video> markup; re-kick playback
                 this.reloadVideos();
             });